@@ -1,10 +1,68 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 from utils.logger import setup_logger
+from utils.tracing import get_request_id
+from utils import cost_tracker, metrics
+import asyncio
+import functools
+import time
+
+def _attributed(method):
+    """
+    __call__'ı sar: çağrı boyunca LLM/embedding maliyeti bu agent'a ve state'teki
+    user_id'ye yazılır; süre/hata agent metriklerine işlenir (iç içe çağrı bir kez sayılır)
+    """
+    @functools.wraps(method)
+    def wrapper(self, state, *args, **kwargs):
+        name = type(self).__name__
+        outer = cost_tracker.current_agent() != name
+        tokens = cost_tracker.bind(agent=name, user_id=_state_user(state))
+        started = time.perf_counter()
+        try:
+            return method(self, state, *args, **kwargs)
+        except Exception:
+            if outer:
+                metrics.AGENT_ERRORS.inc(name)
+            raise
+        finally:
+            cost_tracker.reset(tokens)
+            if outer:
+                metrics.AGENT_LATENCY.observe(time.perf_counter() - started, name)
+    return wrapper
+
+def _aattributed(method):
+    @functools.wraps(method)
+    async def wrapper(self, state, *args, **kwargs):
+        name = type(self).__name__
+        outer = cost_tracker.current_agent() != name
+        tokens = cost_tracker.bind(agent=name, user_id=_state_user(state))
+        started = time.perf_counter()
+        try:
+            return await method(self, state, *args, **kwargs)
+        except Exception:
+            if outer:
+                metrics.AGENT_ERRORS.inc(name)
+            raise
+        finally:
+            cost_tracker.reset(tokens)
+            if outer:
+                metrics.AGENT_LATENCY.observe(time.perf_counter() - started, name)
+    return wrapper
+
+def _state_user(state):
+    return state.get("user_id") if isinstance(state, dict) else None
 
 class BaseAgent(ABC):
     """Tüm agent'ların base class'ı"""
     
+    def __init_subclass__(cls, **kwargs):
+        """Alt sınıfın __call__/acall'ı maliyet atfı ve metrikler için sarılır (bkz. utils/cost_tracker.py, utils/metrics.py)"""
+        super().__init_subclass__(**kwargs)
+        if "__call__" in cls.__dict__:
+            cls.__call__ = _attributed(cls.__dict__["__call__"])
+        if "acall" in cls.__dict__:
+            cls.acall = _aattributed(cls.__dict__["acall"])
+    
     def __init__(self, name: str):
         self.name = name
         self.logger = setup_logger(name)
@@ -14,8 +72,19 @@ class BaseAgent(ABC):
         """Agent'ın ana işlev metodu - her agent implement etmeli"""
         pass
     
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async çalıştırma.
+        Varsayılan: sync __call__ thread pool'da çalışır (event loop bloklanmaz).
+        LLM çağrısı yapan agent'lar bunu ainvoke ile override eder.
+        """
+        return await asyncio.to_thread(self, state)
+    
     def log(self, message: str, level: str = "info"):
-        """Log mesajı gönder"""
+        """Log mesajı gönder (request içindeyse request id ile - trace'lerle eşleştirmek için)"""
+        request_id = get_request_id()
+        if request_id:
+            message = f"(req={request_id}) {message}"
         if level == "info":
             self.logger.info(f"[{self.name}] {message}")
         elif level == "error":
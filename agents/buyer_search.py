@@ -1,25 +1,40 @@
 """
 BuyerSearchAgent - Alıcı için ürün arama
-Semantic search + filters
+Hybrid search: vector (search_listings) + lexical (search_listings_lexical),
+eşzamanlı çalıştırılır ve Reciprocal Rank Fusion ile birleştirilir + filters
 """
 from agents.base import BaseAgent
-from utils.supabase_client import get_supabase_admin
-from utils.openai_client import get_llm
-from typing import Dict, Any, List
-import json
-import openai
-from config import get_settings
+from utils.supabase_client import get_supabase_admin, get_supabase_admin_async
+from utils.model_policy import tiered_llm
+from utils.embeddings import get_embedding_service
+from utils.vector_index import local_vector_search
+from tools.hybrid_search import reciprocal_rank_fusion
+from utils.query_parser import parse_search_query
+from utils.metrics import FILTER_EXTRACTION, record_fallback
+from utils.structured_output import invoke_structured, ainvoke_structured
+from models.schemas import SearchFilters
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import asyncio
+import contextvars
+
+MATCH_THRESHOLD = 0.3  # Adjusted based on test data
+PAGE_SIZE = 20
+LISTING_CONDITIONS = {"new", "used", "refurbished"}
+
+# Sync aramada lexical RPC, embedding + vector search ile paralel çalışır
+_lexical_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="lexical-search")
 
 class BuyerSearchAgent(BaseAgent):
     def __init__(self):
         super().__init__("BuyerSearchAgent")
         self.supabase = get_supabase_admin()
-        self.llm = get_llm(model="gpt-4o-mini", temperature=0)
+        self.llm = tiered_llm("buyer_search", temperature=0, cache_namespace="search_filters")
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Search products based on user query
-        Uses semantic search + filters
+        Uses hybrid search (vector + lexical, RRF) + filters
         """
         query = state.get("search_query", "")
         filters = state.get("search_filters", {})
@@ -32,68 +47,78 @@ class BuyerSearchAgent(BaseAgent):
                 filters = self._extract_filters(query)
                 self.log(f"Extracted filters: {filters}")
             
+            # Lexical arama arka planda başlar (request id, span ve cost attribution context'iyle)
+            lexical_future = _lexical_executor.submit(
+                contextvars.copy_context().run, self._lexical_rows, self.supabase, query, filters, state
+            )
+            
             # Get embedding for semantic search
             embedding = self._get_embedding(query)
+            vector_rows = self._local_matches(embedding, filters, state)
+            if vector_rows is None:
+                self.log(f"Calling search_listings RPC...")
+                vector_rows = self.supabase.rpc(
+                    'search_listings',
+                    self._search_params(embedding, filters, state)
+                ).execute().data or []
             
-            # Vector search
-            self.log(f"Calling match_products RPC...")
-            vector_results = self.supabase.rpc(
-                'match_products',
-                {
-                    'query_embedding': embedding,
-                    'match_threshold': 0.3,  # Adjusted based on test data
-                    'match_count': 50
-                }
-            ).execute()
-            
-            self.log(f"Vector results: {len(vector_results.data) if vector_results.data else 0} matches")
-            
-            if not vector_results.data:
-                self.log("No vector search results")
-                state["search_results"] = []
-                state["search_count"] = 0
-                return state
-            
-            listing_ids = [r['listing_id'] for r in vector_results.data]
-            
-            # Get full listing data with filters
-            query_builder = self.supabase.table('listings')\
-                .select('*')\
-                .in_('id', listing_ids)\
-                .eq('status', 'active')
-            
-            # Apply filters
-            if filters.get('category'):
-                query_builder = query_builder.eq('category', filters['category'])
+            page, missing = self._fuse(state, vector_rows, lexical_future.result())
+            if missing:
+                listings = self.supabase.table('listings')\
+                    .select('*')\
+                    .in_('id', missing)\
+                    .eq('status', 'active')\
+                    .execute()
+                page = self._hydrate(page, listings.data)
+            self._apply_rows(state, page)
             
-            if filters.get('min_price'):
-                query_builder = query_builder.gte('price', filters['min_price'])
-            
-            if filters.get('max_price'):
-                query_builder = query_builder.lte('price', filters['max_price'])
+        except Exception as e:
+            self.log(f"Search failed: {str(e)}", "error")
+            state["search_results"] = []
+            state["search_count"] = 0
+        
+        return state
+    
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async search - LLM, embedding ve Supabase çağrıları event loop'u bloklamaz"""
+        query = state.get("search_query", "")
+        filters = state.get("search_filters", {})
+        
+        self.log(f"Searching for (async): {query}")
+        
+        try:
+            if not filters:
+                filters = await self._aextract_filters(query)
+                self.log(f"Extracted filters: {filters}")
             
-            if filters.get('location'):
-                query_builder = query_builder.ilike('location', f"%{filters['location']}%")
+            supabase = await get_supabase_admin_async()
             
-            # Sort by similarity (maintain vector search order)
-            results = query_builder.execute()
+            async def vector_rows():
+                embedding = await self._aget_embedding(query)
+                local = self._local_matches(embedding, filters, state)
+                if local is not None:
+                    return local
+                self.log(f"Calling search_listings RPC...")
+                results = await supabase.rpc(
+                    'search_listings',
+                    self._search_params(embedding, filters, state)
+                ).execute()
+                return results.data or []
             
-            # Preserve similarity order
-            similarity_map = {r['listing_id']: r['similarity'] for r in vector_results.data}
-            sorted_results = sorted(
-                results.data, 
-                key=lambda x: similarity_map.get(x['id'], 0), 
-                reverse=True
+            vector_data, lexical_data = await asyncio.gather(
+                vector_rows(),
+                self._alexical_rows(supabase, query, filters, state)
             )
             
-            # Add similarity score to results
-            for item in sorted_results:
-                item['similarity_score'] = similarity_map.get(item['id'], 0)
-            
-            state["search_results"] = sorted_results[:20]  # Top 20
-            state["search_count"] = len(sorted_results)
-            
-            self.log(f"Found {len(sorted_results)} matching products")
+            page, missing = self._fuse(state, vector_data, lexical_data)
+            if missing:
+                listings = await supabase.table('listings')\
+                    .select('*')\
+                    .in_('id', missing)\
+                    .eq('status', 'active')\
+                    .execute()
+                page = self._hydrate(page, listings.data)
+            self._apply_rows(state, page)
             
         except Exception as e:
             self.log(f"Search failed: {str(e)}", "error")
@@ -102,9 +127,143 @@ class BuyerSearchAgent(BaseAgent):
         
         return state
     
+    def _depth(self, state: Dict[str, Any]) -> int:
+        """Füzyon için her kaynaktan istenen satır: offset + sayfa + 1 (has_more)"""
+        return state.get("search_offset", 0) + state.get("search_limit", PAGE_SIZE) + 1
+    
+    def _filter_params(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        condition = filters.get('condition')
+        return {
+            'filter_category': filters.get('category') or None,
+            'min_price': filters.get('min_price') or None,
+            'max_price': filters.get('max_price') or None,
+            'filter_location': filters.get('location') or None,
+            # listings.condition: new | used | refurbished (LLM "damaged" da dönebilir)
+            'filter_condition': condition if condition in LISTING_CONDITIONS else None
+        }
+    
+    def _search_params(self, embedding: List[float], filters: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+        """search_listings RPC parametreleri (sayfalama füzyondan sonra yapılır)"""
+        return {
+            'query_embedding': embedding,
+            'match_threshold': MATCH_THRESHOLD,
+            'match_count': self._depth(state),
+            'match_offset': 0,
+            **self._filter_params(filters)
+        }
+    
+    def _lexical_params(self, query: str, filters: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'query_text': query,
+            'match_count': self._depth(state),
+            'match_offset': 0,
+            **self._filter_params(filters)
+        }
+    
+    def _lexical_rows(self, supabase, query: str, filters: Dict[str, Any], state: Dict[str, Any]) -> List[Dict]:
+        """Full-text + trigram arama (hata olursa sadece vector sonuçları kullanılır)"""
+        try:
+            return supabase.rpc('search_listings_lexical', self._lexical_params(query, filters, state)).execute().data or []
+        except Exception as e:
+            self.log(f"Lexical search failed: {str(e)}", "warning")
+            record_fallback("buyer_search", "lexical_failed")
+            return []
+    
+    async def _alexical_rows(self, supabase, query: str, filters: Dict[str, Any], state: Dict[str, Any]) -> List[Dict]:
+        try:
+            results = await supabase.rpc('search_listings_lexical', self._lexical_params(query, filters, state)).execute()
+            return results.data or []
+        except Exception as e:
+            self.log(f"Lexical search failed: {str(e)}", "warning")
+            record_fallback("buyer_search", "lexical_failed")
+            return []
+    
+    def _local_matches(self, embedding: List[float], filters: Dict[str, Any], state: Dict[str, Any]) -> Optional[List[Dict]]:
+        """
+        Process içi ANN index (sadece filtresiz aramalar; filtreler top-k'dan önce
+        uygulanmalı, bu yüzden filtreli aramalar search_listings'e gider).
+        Kapalı/cold ise None.
+        """
+        if filters:
+            return None
+        matches = local_vector_search(embedding, k=self._depth(state), threshold=MATCH_THRESHOLD)
+        if matches is None:
+            return None
+        self.log(f"Local vector index: {len(matches)} matches")
+        return [{'id': m['listing_id'], 'similarity': m['similarity']} for m in matches]
+    
+    def _fuse(self, state: Dict[str, Any], vector_rows: List[Dict], lexical_rows: List[Dict]):
+        """RRF ile birleştir, sayfayı kes; listing alanları eksik (yerel index) id'leri döndür"""
+        self.log(f"Hybrid candidates: vector={len(vector_rows)}, lexical={len(lexical_rows)}")
+        fused = reciprocal_rank_fusion([vector_rows, lexical_rows])
+        offset = state.get("search_offset", 0)
+        page = fused[offset:offset + state.get("search_limit", PAGE_SIZE) + 1]
+        missing = [row['id'] for row in page if 'title' not in row]
+        return page, missing
+    
+    def _hydrate(self, page: List[Dict], listings: List[Dict]) -> List[Dict]:
+        """Yerel index satırlarını listings verisiyle doldur (aktif olmayanlar düşer)"""
+        by_id = {item['id']: item for item in listings}
+        hydrated = []
+        for row in page:
+            if 'title' in row:
+                hydrated.append(row)
+            elif row['id'] in by_id:
+                hydrated.append({**by_id[row['id']], **row})
+        return hydrated
+    
+    def _apply_rows(self, state: Dict[str, Any], rows: List[Dict]):
+        """Füzyon sıralı satırları state'e yaz (fazladan istenen satır has_more için)"""
+        limit = state.get("search_limit", PAGE_SIZE)
+        results = rows[:limit]
+        for item in results:
+            item['similarity_score'] = item.pop('similarity', 0)
+            item.pop('rank', None)
+        
+        state["search_results"] = results
+        state["search_count"] = len(results)
+        state["search_has_more"] = len(rows) > limit
+        
+        self.log(f"Found {len(results)} matching products")
+    
+    def _rule_based_filters(self, query: str) -> Optional[Dict[str, Any]]:
+        """Kural tabanlı hızlı yol; confidence düşükse None (LLM'e düşülür)"""
+        parsed = parse_search_query(query)
+        if parsed.confident:
+            FILTER_EXTRACTION.inc("rule_based")
+            return parsed.filters
+        FILTER_EXTRACTION.inc("llm")
+        self.log(f"Rule-based filters not confident ({parsed.ambiguities}), using LLM")
+        return None
+    
     def _extract_filters(self, query: str) -> Dict[str, Any]:
-        """Extract filters from natural language query using LLM"""
-        prompt = f"""Kullanıcının arama sorgusundan filtreleri çıkar:
+        """Extract filters from natural language query (rule-based, LLM fallback)"""
+        filters = self._rule_based_filters(query)
+        if filters is not None:
+            return filters
+        try:
+            # Remove null values
+            return invoke_structured(self.llm, self._build_filter_prompt(query), SearchFilters).model_dump(exclude_none=True)
+            
+        except Exception as e:
+            self.log(f"Filter extraction failed: {str(e)}", "warning")
+            return {}
+    
+    async def _aextract_filters(self, query: str) -> Dict[str, Any]:
+        """Extract filters from natural language query (rule-based, LLM fallback, async)"""
+        filters = self._rule_based_filters(query)
+        if filters is not None:
+            return filters
+        try:
+            filters = await ainvoke_structured(self.llm, self._build_filter_prompt(query), SearchFilters)
+            return filters.model_dump(exclude_none=True)
+            
+        except Exception as e:
+            self.log(f"Filter extraction failed: {str(e)}", "warning")
+            return {}
+    
+    def _build_filter_prompt(self, query: str) -> str:
+        return f"""Kullanıcının arama sorgusundan filtreleri çıkar:
 
 Query: "{query}"
 
@@ -129,36 +288,14 @@ Query: "İstanbul'da 1000-5000 TL arası ikinci el laptop"
 → {{"category": "Elektronik", "min_price": 1000, "max_price": 5000, "location": "İstanbul", "condition": "used"}}
 
 Sadece JSON döndür."""
-        
-        try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            filters = json.loads(content)
-            
-            # Remove null values
-            return {k: v for k, v in filters.items() if v is not None}
-            
-        except Exception as e:
-            self.log(f"Filter extraction failed: {str(e)}", "warning")
-            return {}
     
     def _get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for semantic search"""
-        settings = get_settings()
-        client = openai.OpenAI(api_key=settings.openai_api_key)
-        
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        
-        return response.data[0].embedding
+        """Generate embedding for semantic search (cache'li, batch'li)"""
+        return get_embedding_service().embed(text)
+    
+    async def _aget_embedding(self, text: str) -> List[float]:
+        """Generate embedding for semantic search (async)"""
+        return await get_embedding_service().aembed(text)
     
     def format_results(self, results: List[Dict]) -> str:
         """Format search results for user display"""
@@ -1,5 +1,6 @@
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils import intent_engine
 from langchain_core.prompts import ChatPromptTemplate
 from typing import Dict, Any
 
@@ -8,7 +9,7 @@ class ConversationAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("ConversationAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0.7)
+        self.llm = tiered_llm("conversation", temperature=0.7)
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """Sen Megapazar'ın yardımcı asistanısın.
 
@@ -64,21 +65,18 @@ Eğer fotoğraf eklemişse bunu fark et."""),
     
     def _detect_intent(self, user_message: str, ai_response: str, has_image: bool) -> str:
         """Kullanıcı niyetini tespit et"""
-        msg_lower = user_message.lower()
+        signals = intent_engine.match(user_message)
         
         # İlan verme kelimeleri
-        listing_keywords = ["ilan", "sat", "satmak", "satacağım", "ürün ver", "ekle", "yükle"]
-        if any(kw in msg_lower for kw in listing_keywords) or has_image:
+        if signals.has("chat_listing") or has_image:
             return "listing"
         
         # Arama kelimeleri
-        search_keywords = ["ara", "bul", "arıyorum", "fiyat", "kaç para", "ne kadar", "var mı"]
-        if any(kw in msg_lower for kw in search_keywords):
+        if signals.has("chat_search"):
             return "search"
         
         # Satın alma kelimeleri
-        order_keywords = ["satın al", "sipariş", "almak istiyorum", "sepet", "siparişimi"]
-        if any(kw in msg_lower for kw in order_keywords):
+        if signals.has("chat_order"):
             return "order"
         
         # Default: conversation
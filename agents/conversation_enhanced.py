@@ -3,12 +3,29 @@ Enhanced Conversation Agent
 Multi-turn conversation, eksik bilgi toplama, müzakere yapabilir
 """
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils.token_stream import stream_llm
+from utils import intent_engine, intent_model, metrics
+from utils.history_manager import get_history_manager
+from utils.structured_output import invoke_structured
+from models.schemas import EditInstruction, GatheringExtraction, ListingInfoExtraction
 from langchain_core.prompts import ChatPromptTemplate
 from typing import Dict, Any, List
 from models.conversation_state import ConversationStage, UserIntent
 import json
 
+# Anahtar kelime bulunamadığında yerel modelin eşiği geçen tahmini kullanılır
+MODEL_INTENTS = {
+    "create_listing": UserIntent.LISTING,
+    "product_search": UserIntent.SEARCHING,
+    "help": UserIntent.QUESTION,
+}
+
+SMALL_TALK_REPLY = """😊 Size nasıl yardımcı olabilirim?
+
+• İlan vermek için: ürününüzü yazın veya fotoğraf gönderin
+• Ürün aramak için: "... arıyorum" yazın"""
+
 class EnhancedConversationAgent(BaseAgent):
     """
     Gelişmiş konuşma agent'ı
@@ -21,7 +38,7 @@ class EnhancedConversationAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("EnhancedConversationAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0.7)
+        self.llm = tiered_llm("conversation", temperature=0.7)
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -117,71 +134,57 @@ class EnhancedConversationAgent(BaseAgent):
     
     def _detect_intent(self, message: str, session) -> UserIntent:
         """Intent detection"""
-        msg_lower = message.lower()
+        signals = intent_engine.match(message)
         
         # 🎯 CRITICAL FIX: Teknik kullanıcı - marka+model+özellik varsa direkt LISTING
-        technical_keywords = ["snapdragon", "ram", "gb", "işlemci", "ekran", "kamera", "mp", "amoled", "ssd"]
-        has_brand = any(brand in msg_lower for brand in ["iphone", "samsung", "hp", "dell", "lenovo", "mercedes", "bmw", "s23", "c180"])
-        has_technical = any(keyword in msg_lower for keyword in technical_keywords)
-        
-        if has_brand and has_technical:
+        if signals.has("brand", "model_code") and signals.has("technical"):
             self.log("🎯 TECHNICAL USER detected: brand + technical specs → LISTING")
             return UserIntent.LISTING
         
         # Fiyat müzakeresi (ÖNCE kontrol et - PREVIEW stage'de sayı+TL varsa)
-        if session.stage == ConversationStage.PREVIEW:
-            import re
-            # "2000 TL", "1500 lira", "fiyat 2000" gibi formatlar
-            price_patterns = [r'\d+[\.,]?\d*\s*tl', r'\d+[\.,]?\d*\s*lira', r'fiyat.*\d+']
-            if any(re.search(pattern, msg_lower) for pattern in price_patterns):
-                return UserIntent.NEGOTIATING
-            
-            # "pahalı", "ucuz" gibi kelimeler
-            if any(word in msg_lower for word in ["pahalı", "ucuz", "indirim", "düşür"]):
-                return UserIntent.NEGOTIATING
+        # "2000 TL", "1500 lira", "fiyat 2000" gibi formatlar, "pahalı", "ucuz" gibi kelimeler
+        if session.stage == ConversationStage.PREVIEW and signals.has("price_amount", "negotiate"):
+            return UserIntent.NEGOTIATING
         
         # İptal
-        if any(word in msg_lower for word in ["iptal", "vazgeç", "bırak", "kapat"]):
+        if signals.has("cancel"):
             return UserIntent.CANCELLING
         
         # Onaylama
-        if any(word in msg_lower for word in ["onayla", "tamam", "kabul", "evet", "olur", "onay"]):
+        if signals.has("confirm"):
             return UserIntent.CONFIRMING
         
         # Düzenleme
-        if any(word in msg_lower for word in ["düzenle", "değiştir", "güncelle", "edit"]):
+        if signals.has("edit"):
             return UserIntent.EDITING
         
         # İlan verme (SADECE açık niyet varsa) - genişletilmiş keywords
         has_image = bool(session.image_url)
-        listing_keywords = [
-            "ilan ver", "ilan vereceğim", "satmak istiyorum", "satacağım", "satış yap",
-            "satmayı düşünüyorum", "satmak istiyordum", "ilan oluştur",
-            "kurtulmak istiyorum", "satabilirim", "fiyat öğrenmem lazım"
-        ]
         
         # 🎯 CRITICAL FIX: Eğer brand veya teknik detay varsa + fiyat sorusu → LISTING intent
-        has_brand = any(brand in msg_lower for brand in ["iphone", "samsung", "hp", "dell", "lenovo", "mercedes", "bmw"])
-        has_price_question = any(word in msg_lower for word in ["düşük mü", "çok mu", "kaç", "fiyat", "tl", "lira"])
-        
-        if has_brand and has_price_question:
+        if signals.has("brand") and signals.has("price_word"):
             self.log("🎯 LISTING intent detected: brand + price question")
             return UserIntent.LISTING
         
-        if any(keyword in msg_lower for keyword in listing_keywords) or has_image:
+        if signals.has("listing_phrase", "listing_phrase_ext") or has_image:
             return UserIntent.LISTING
         
         # 🛑 CRITICAL FIX: Search sadece AÇIKÇA arama niyeti varsa tetiklensin
         # "premium cihaz", "kategori var mı" gibi → QUESTION (help)
         # Sadece "arıyorum", "bul" gibi → SEARCH
-        explicit_search_keywords = ["arıyorum", "bul", "ara bana", "listele"]
-        if any(keyword in msg_lower for keyword in explicit_search_keywords):
+        if signals.has("search_explicit"):
             return UserIntent.SEARCHING
         
         # Soru - search yerine help dönsün
-        if "?" in message or any(word in msg_lower for word in ["nasıl", "neden", "nedir", "ne", "kim", "kategori", "premium"]):
+        if signals.has("question_mark", "question_word"):
             return UserIntent.QUESTION
         
+        prediction = intent_model.classify(message, allowed=MODEL_INTENTS)
+        if prediction is not None:
+            self.log(f"🧠 Local intent model: {prediction.label} ({prediction.confidence:.2f})")
+            metrics.INTENT_ROUTING.inc("conversation", "local")
+            return MODEL_INTENTS[prediction.label]
+        
         return UserIntent.UNKNOWN
     
     def _handle_initial(self, message: str, session, state: Dict) -> str:
@@ -191,15 +194,12 @@ class EnhancedConversationAgent(BaseAgent):
         
         self.log(f"🔍 _handle_initial called - Intent: {intent} (type: {type(intent)}), History length: {len(conversation_history)}")
         
-        # Conversation history varsa context oluştur
+        # Conversation history varsa context oluştur (son mesajlar + kayan özet, token bütçeli)
         history_text = ""
         self.log(f"📜 Conversation history length: {len(conversation_history)}")
         if len(conversation_history) > 1:  # En son mesaj zaten message değişkeninde
             self.log(f"⚠️ History has {len(conversation_history)} messages - using context")
-            history_text = "\n".join([
-                f"{'Kullanıcı' if msg['role'] == 'user' else 'Asistan'}: {msg['content']}"
-                for msg in conversation_history[:-1]  # Son mesajı dahil etme (zaten yeni mesaj olarak gelecek)
-            ])
+            history_text = get_history_manager().build_context(session, agent="conversation")
         
         # Intent enum karşılaştırması - hem enum hem string desteği
         if intent == UserIntent.LISTING or (isinstance(intent, str) and intent == "listing"):
@@ -208,10 +208,7 @@ class EnhancedConversationAgent(BaseAgent):
             
             # BASIT YAKLAŞIM: İlk mesajda sadece akışı başlat, detaylı extraction gathering_info'da yap
             # Eğer mesajda açıkça ürün bilgisi yoksa basit cevap ver
-            msg_lower = message.lower()
-            has_product_mention = any(keyword in msg_lower for keyword in ["telefon", "laptop", "iphone", "samsung", "bilgisayar", "araba", "ev", "kanepe"])
-            
-            if not has_product_mention:
+            if not intent_engine.match(message).has("product_mention"):
                 state["response_type"] = "gathering_info"
                 return "Harika! Hangi ürünü satmak istiyorsunuz? 📸"
             
@@ -260,15 +257,10 @@ JSON:
                 ])
                 
                 try:
-                    response = self.llm.invoke(prompt.format_messages())
-                    content = response.content.strip()
-                    if content.startswith("```json"):
-                        content = content.replace("```json", "").replace("```", "").strip()
+                    result = invoke_structured(self.llm, prompt.format_messages(), ListingInfoExtraction)
                     
-                    result = json.loads(content)
-                    
-                    product_info = result.get("product_info", {})
-                    missing = result.get("missing_fields", [])
+                    product_info = result.product_info
+                    missing = result.missing_fields
                     
                     print(f"\n🔍 DEBUG _handle_initial extraction:")
                     print(f"   LLM returned product_info: {product_info}")
@@ -343,14 +335,15 @@ JSON:
             
             # History yoksa VEYA extraction başarısız olduysa - ilk mesaj fallback
             # Ama mesajda zaten ürün bilgisi varsa ona göre cevap ver
-            if any(keyword in msg_lower for keyword in ["telefon", "laptop", "bilgisayar", "iphone", "samsung"]):
+            signals = intent_engine.match(message)
+            if signals.has("device_mention"):
                 state["response_type"] = "gathering_info"
                 # Stage'i gathering_info'ya çek
                 session.set_stage(ConversationStage.GATHERING_INFO)
                 # Basit extraction yap
-                if "iphone" in msg_lower or "telefon" in msg_lower:
+                if signals.has("phone_mention"):
                     return "Hangi marka ve model? Durumu nedir? (yeni/2.el)"
-                elif "laptop" in msg_lower or "bilgisayar" in msg_lower:
+                elif signals.has("computer_mention"):
                     return "Hangi marka ve model laptop? Durumu nedir? (yeni/2.el)"
                 else:
                     return "Ürününüzün marka, model ve durumunu (yeni/2.el) belirtir misiniz?"
@@ -359,13 +352,11 @@ JSON:
                 return "Harika! Hangi ürünü satmak istiyorsunuz? Fotoğraf gönderebilir veya ürün detaylarını yazabilirsiniz. 📸"
         
         # Check if it's a price-related question with product details
-        msg_lower = message.lower()
-        has_brand = any(brand in msg_lower for brand in ["iphone", "samsung", "hp", "dell", "lenovo", "mercedes", "bmw"])
-        has_price_question = any(word in msg_lower for word in ["düşük mü", "çok mu", "kaç", "fiyat", "tl", "lira"])
+        signals = intent_engine.match(message)
         
-        if intent == UserIntent.LISTING and has_brand and has_price_question:
+        if intent == UserIntent.LISTING and signals.has("brand") and signals.has("price_word"):
             # 🎯 LISTING with price question - PricingAgent'a yönlendir
-            from agents.pricing import PricingAgent
+            from agents.registry import get_pricing_agent
             self.log("💰 LISTING with price question - calling PricingAgent")
             
             # Product info session'dan al
@@ -384,7 +375,7 @@ JSON:
                         break
             
             # PricingAgent çağır
-            pricing_agent = PricingAgent()
+            pricing_agent = get_pricing_agent()
             pricing_state = {
                 "user_id": session.user_id,
                 "product_info": product_info,
@@ -420,8 +411,14 @@ JSON:
         else:
             state["response_type"] = "conversation"
             
+            # Selamlaşma/teşekkür için gpt-4o'ya gitme
+            if history_text and intent_model.classify(message, allowed=("small_talk",)):
+                metrics.INTENT_ROUTING.inc("conversation", "local")
+                return SMALL_TALK_REPLY
+            
             # Eğer önceki konuşma varsa context-aware yanıt ver
             if history_text:
+                metrics.INTENT_ROUTING.inc("conversation", "llm")
                 prompt = ChatPromptTemplate.from_messages([
                     ("system", f"""Sen Megapazar asistanısın.
 
@@ -434,7 +431,7 @@ Kısa, sade, yardımsever Türkçe konuş."""),
                     ("human", "{message}")
                 ])
                 
-                response = self.llm.invoke(prompt.format_messages(message=message))
+                response = stream_llm(self.llm, prompt.format_messages(message=message), source="conversation")
                 return response.content
             
             # İlk sefer - welcome mesajı
@@ -457,10 +454,7 @@ PazarGlobal'e hoş geldiniz! Size nasıl yardımcı olabilirim?
         # Conversation history'yi context'e ekle
         history_context = ""
         if len(conversation_history) > 2:  # Son 2 mesajdan fazlaysa context ekle
-            history_context = "\n\nÖNCEKİ MESAJLAR:\n" + "\n".join([
-                f"{'Kullanıcı' if msg['role'] == 'user' else 'Asistan'}: {msg['content']}"
-                for msg in conversation_history[-6:-1]  # Son 5 mesaj (en son hariç)
-            ])
+            history_context = "\n\nÖNCEKİ MESAJLAR:\n" + get_history_manager().build_context(session, agent="gathering_info")
         
         # LLM ile kullanıcı cevabını parse et
         prompt = ChatPromptTemplate.from_messages([
@@ -501,21 +495,15 @@ Kullanıcı: "Samsung S23 Ultra satıyorum. Snapdragon 8 Gen 2"
         ])
         
         try:
-            response = self.llm.invoke(prompt.format_messages(
+            result = invoke_structured(self.llm, prompt.format_messages(
                 current_info=json.dumps(current_product_info, ensure_ascii=False),
                 history_context=history_context,
                 missing_fields=', '.join(missing_fields) if missing_fields else "Hiçbiri (tüm bilgiler tam)",
                 message=message
-            ))
-            
-            content = response.content.strip()
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            result = json.loads(content)
-            extracted = result.get("extracted", {})
-            still_missing = result.get("still_missing", [])
-            next_question = result.get("next_question")
+            ), GatheringExtraction)
+            extracted = result.extracted
+            still_missing = result.still_missing
+            next_question = result.next_question
             
             self.log(f"Extracted: {extracted}, Still missing: {still_missing}")
             
@@ -569,7 +557,7 @@ Kullanıcı: "Samsung S23 Ultra satıyorum. Snapdragon 8 Gen 2"
                 next_field = field_tr.get(missing_fields[0], missing_fields[0])
                 
                 # 🎯 FALLBACK SORU: Brand karışıklığında alternatif soru sor
-                if missing_fields[0] == "brand" and any(word in message.lower() for word in ["unuttum", "karışık", "galiba", "muydu"]):
+                if missing_fields[0] == "brand" and intent_engine.match(message).has("unsure"):
                     return "Markayı tam hatırlamıyorsanız sorun değil! Ürünün rengini, ekran boyutunu veya başka bir özelliğini söyleyebilir misiniz? Böylece bulabilirim. 🔍"
                 
                 return f"{next_field} nedir? 🤔"
@@ -734,23 +722,18 @@ JSON döndür:
         ])
         
         try:
-            response = self.llm.invoke(prompt.format_messages(
+            edit_info = invoke_structured(self.llm, prompt.format_messages(
                 listing_draft=json.dumps(session.listing_draft or {}, ensure_ascii=False),
                 message=message
-            ))
-            content = response.content.strip()
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            edit_info = json.loads(content)
+            ), EditInstruction)
             
             # Debug
             self.log(f"Parsed edit_info: {edit_info}")
             
             state["response_type"] = "edit_field"
-            state["edit_field"] = edit_info.get("field")
-            state["edit_value"] = edit_info.get("new_value")
-            state["edit_description"] = edit_info.get("change_description")
+            state["edit_field"] = edit_info.field
+            state["edit_value"] = edit_info.new_value
+            state["edit_description"] = edit_info.change_description
             
             # Debug
             self.log(f"State updated - field: {state['edit_field']}, value: {state['edit_value']}")
@@ -762,7 +745,7 @@ JSON döndür:
                 "category": "Kategori"
             }
             
-            field_tr = field_names.get(edit_info.get("field"), "Alan")
+            field_tr = field_names.get(edit_info.field, "Alan")
             return f"{field_tr} düzenleniyor... ✏️"
             
         except Exception as e:
@@ -779,16 +762,16 @@ Kullanıcıya rehberlik et."""),
             ("human", "{message}")
         ])
         
-        response = self.llm.invoke(prompt.format_messages(message=message))
+        response = stream_llm(self.llm, prompt.format_messages(message=message), source="conversation")
         state["response_type"] = "conversation"
         return response.content
     
     def _answer_question(self, message: str, session) -> str:
         """Soru cevaplama - KISA ve ÖZ"""
-        msg_lower = message.lower()
+        signals = intent_engine.match(message)
         
         # 🎯 KRITIK: "laptop satacaktım" gibi ifadeler listing'e dönmeli
-        if any(word in msg_lower for word in ["satacak", "satmak", "satacağım", "satmayı"]):
+        if signals.has("sell_verb"):
             # Bu aslında listing niyeti - intent override
             self.log("🔄 QUESTION intent override: detected listing keywords in question")
             session.intent = UserIntent.LISTING
@@ -796,14 +779,14 @@ Kullanıcıya rehberlik et."""),
             return "Harika! Hangi ürünü satmak istiyorsunuz? 📸"
         
         # Kısa help responses
-        if "kategori" in msg_lower or "premium" in msg_lower:
+        if signals.has("help_category"):
             return """Premium ürünler Elektronik › Üst Seviye kategorisinde listelenir.
             
 Ne yapmak istersiniz?
 • Ürün satmak → "Satmak istiyorum" yazın
 • Ürün aramak → "Arıyorum" yazın"""
         
-        if "nasıl" in msg_lower or "nedir" in msg_lower:
+        if signals.has("help_howto"):
             return """PazarGlobal'de ürün satmak çok kolay:
 1. Ürün bilgilerinizi paylaşın
 2. AI otomatik fiyat önerisi sunar
@@ -820,24 +803,17 @@ Platform özellikleri: ilan verme, AI fiyat önerisi, ürün arama."""),
             ("human", "{question}")
         ])
         
-        response = self.llm.invoke(prompt.format_messages(question=message))
+        response = stream_llm(self.llm, prompt.format_messages(question=message), source="conversation")
         return response.content
     
     def _extract_price(self, message: str) -> float:
         """Mesajdan fiyat çıkar"""
-        import re
-        
         self.log(f"Extracting price from: '{message}'")
         
-        # "2000 TL", "1500 TL", "1.500 TL", "1500tl" gibi formatları yakala
-        patterns = [
-            r'(\d+[\.,]?\d*)\s*tl',
-            r'(\d+[\.,]?\d*)\s*lira',
-            r'fiyat[ı]?\s*(\d+[\.,]?\d*)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message.lower())
+        # "2000 TL", "1500 TL", "1.500 TL", "1500tl" gibi formatları yakala (derlenmiş pattern'ler)
+        text = intent_engine.normalize(message)
+        for pattern in intent_engine.PRICE_VALUE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 price_str = match.group(1).replace('.', '').replace(',', '.')
                 try:
@@ -3,7 +3,7 @@ HelpAgent - Yardım ve Rehberlik
 ChatGPT-5 recommendation
 """
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
 from typing import Dict, Any
 
 class HelpAgent(BaseAgent):
@@ -14,7 +14,7 @@ class HelpAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("HelpAgent")
-        self.llm = get_llm(model="gpt-4o-mini", temperature=0.7)
+        self.llm = tiered_llm("help", temperature=0.7)
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Yardım mesajı döndür"""
@@ -43,6 +43,29 @@ class HelpAgent(BaseAgent):
         
         return state
     
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Yardım mesajı döndür (async)"""
+        message = state.get("message", "")
+        
+        self.log(f"Providing help for (async): {message[:50]}...")
+        
+        if self._is_general_help(message):
+            state["ai_response"] = self._get_general_help()
+            state["response_type"] = "help"
+            return state
+        
+        try:
+            response = await self.llm.ainvoke(self._build_help_prompt(message))
+            state["ai_response"] = response.content
+            state["response_type"] = "help"
+            
+        except Exception as e:
+            self.log(f"Help generation failed: {str(e)}", "error")
+            state["ai_response"] = self._get_general_help()
+            state["response_type"] = "help"
+        
+        return state
+    
     def _is_general_help(self, message: str) -> bool:
         """Genel yardım mı yoksa spesifik soru mu?"""
         msg_lower = message.lower()
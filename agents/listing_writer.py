@@ -1,28 +1,58 @@
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils.token_stream import stream_llm, astream_llm
+from utils.structured_output import with_response_format, parse_structured, aparse_structured
+from models.schemas import ListingCopy
 from typing import Dict, Any
 import json
 
+STREAM_FIELDS = ("title", "description")
+
 class ListingWriterAgent(BaseAgent):
     """İlan metni yazan agent"""
     
     def __init__(self):
         super().__init__("ListingWriterAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0.8)
+        self.llm = tiered_llm("listing_writer", temperature=0.8)
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        self.log("Writing listing content...")
+        
+        try:
+            # Web streaming açıksa başlık/açıklama token token iletilir
+            llm = with_response_format(self.llm, ListingCopy)
+            response = stream_llm(llm, self._build_prompt(state), source="listing_writer", json_fields=STREAM_FIELDS)
+            self._apply_listing(state, parse_structured(response.content, ListingCopy))
+        except Exception as e:
+            self.log(f"Listing writing failed: {str(e)}", "error")
+            state["listing_draft"] = None
+        
+        return state
+    
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        self.log("Writing listing content (async)...")
+        
+        try:
+            llm = with_response_format(self.llm, ListingCopy)
+            response = await astream_llm(llm, self._build_prompt(state), source="listing_writer", json_fields=STREAM_FIELDS)
+            self._apply_listing(state, await aparse_structured(response.content, ListingCopy))
+        except Exception as e:
+            self.log(f"Listing writing failed: {str(e)}", "error")
+            state["listing_draft"] = None
+        
+        return state
+    
+    def _build_prompt(self, state: Dict[str, Any]) -> str:
         product_info = state.get("product_info", {})
         pricing = state.get("pricing", {})
         user_location = state.get("user_location", "Türkiye")
         
-        self.log("Writing listing content...")
-        
         # Fiyatı al - hem suggested_price hem recommended_price destekle
         price = pricing.get('recommended_price') or pricing.get('suggested_price', 0)
         
         self.log(f"Using price: {price} TL (from pricing: {pricing})")
         
-        prompt = f"""Sen PazarGlobal için çalışan bir İlan Yazma ve Düzenleme Ajanısın.
+        return f"""Sen PazarGlobal için çalışan bir İlan Yazma ve Düzenleme Ajanısın.
 
 Görevin, kullanıcının verdiği ham bilgileri kullanarak:
 - Net bir başlık (max 80 karakter)
@@ -57,38 +87,26 @@ JSON formatı:
 }}
 
 SADECE JSON DÖNDÜR:"""
+    
+    def _apply_listing(self, state: Dict[str, Any], listing: ListingCopy):
+        """Doğrulanmış ilan metninden ListingDraft oluştur"""
+        product_info = state.get("product_info", {})
+        pricing = state.get("pricing", {})
         
-        try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            listing_data = json.loads(content)
-            
-            # ListingDraft oluştur
-            # Fiyatı al - hem recommended_price hem suggested_price destekle
-            final_price = pricing.get("recommended_price") or pricing.get("suggested_price", 0)
-            
-            listing_draft = {
-                "title": listing_data["title"],
-                "description": listing_data["description"],
-                "short_summary": listing_data["short_summary"],
-                "price": final_price,
-                "category": product_info.get("category", "Diğer"),
-                "product_info": product_info
-            }
-            
-            self.log(f"✅ Listing created with price: {final_price} TL")
-            
-            state["listing_draft"] = listing_draft
-            self.log(f"Listing written: {listing_data['title'][:30]}...")
-            
-        except Exception as e:
-            self.log(f"Listing writing failed: {str(e)}", "error")
-            state["listing_draft"] = None
+        # ListingDraft oluştur
+        # Fiyatı al - hem recommended_price hem suggested_price destekle
+        final_price = pricing.get("recommended_price") or pricing.get("suggested_price", 0)
         
-        return state
+        listing_draft = {
+            "title": listing.title,
+            "description": listing.description,
+            "short_summary": listing.short_summary,
+            "price": final_price,
+            "category": product_info.get("category", "Diğer"),
+            "product_info": product_info
+        }
+        
+        self.log(f"✅ Listing created with price: {final_price} TL")
+        
+        state["listing_draft"] = listing_draft
+        self.log(f"Listing written: {listing.title[:30]}...")
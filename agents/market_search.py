@@ -1,6 +1,10 @@
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils.metrics import record_fallback
+from utils.structured_output import invoke_structured, ainvoke_structured
+from models.schemas import ExternalPriceStats
 from typing import Dict, Any
+import asyncio
 import json
 
 class MarketSearchAgent(BaseAgent):
@@ -8,7 +12,8 @@ class MarketSearchAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("MarketSearchAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0)
+        self.llm = tiered_llm("market_search", temperature=0, cache_namespace="market_search")
+        self.estimate_llm = tiered_llm("market_search", temperature=0, cache_namespace="market_search", task="estimate")
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         product_info = state.get("product_info")
@@ -32,24 +37,73 @@ class MarketSearchAgent(BaseAgent):
                 
         except Exception as e:
             self.log(f"Market search failed: {str(e)}", "error")
+            record_fallback("market_search", "no_external_stats")
             state["external_stats"] = {}
         
         return state
     
-    def _search_with_tavily(self, state: Dict[str, Any], product_info: Dict[str, Any]):
-        """Tavily ile web search"""
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        product_info = state.get("product_info")
+        if not product_info:
+            state["external_stats"] = {}
+            return state
+        
+        product_type = product_info.get("product_type", "")
+        self.log(f"Searching web for (async): {product_type}")
+        
         try:
-            from tavily import TavilyClient
             from config import get_settings
-            
             settings = get_settings()
-            tavily = TavilyClient(api_key=settings.tavily_api_key)
             
-            query = f"{product_info['product_type']} fiyat Türkiye"
-            results = tavily.search(query, max_results=5)
+            if settings.tavily_api_key:
+                await self._asearch_with_tavily(state, product_info)
+            else:
+                await self._aestimate_price(state, product_info)
+                
+        except Exception as e:
+            self.log(f"Market search failed: {str(e)}", "error")
+            record_fallback("market_search", "no_external_stats")
+            state["external_stats"] = {}
+        
+        return state
+    
+    def _search_with_tavily(self, state: Dict[str, Any], product_info: Dict[str, Any]):
+        """Tavily ile web search"""
+        try:
+            results = self._tavily_search(product_info)
             
             # LLM ile fiyat analizi
-            prompt = f"""Aşağıdaki web arama sonuçlarından {product_info['product_type']} için fiyat bilgisi çıkar:
+            self._apply_external_stats(state, invoke_structured(self.llm, self._build_tavily_prompt(product_info, results), ExternalPriceStats))
+            
+        except Exception as e:
+            self.log(f"Tavily search failed: {str(e)}", "error")
+            record_fallback("market_search", "tavily_failed")
+            self._estimate_price(state, product_info)
+    
+    async def _asearch_with_tavily(self, state: Dict[str, Any], product_info: Dict[str, Any]):
+        """Tavily ile web search (async) - Tavily client sync, thread'de çalışır"""
+        try:
+            results = await asyncio.to_thread(self._tavily_search, product_info)
+            
+            self._apply_external_stats(state, await ainvoke_structured(self.llm, self._build_tavily_prompt(product_info, results), ExternalPriceStats))
+            
+        except Exception as e:
+            self.log(f"Tavily search failed: {str(e)}", "error")
+            record_fallback("market_search", "tavily_failed")
+            await self._aestimate_price(state, product_info)
+    
+    def _tavily_search(self, product_info: Dict[str, Any]) -> Dict[str, Any]:
+        from tavily import TavilyClient
+        from config import get_settings
+        
+        settings = get_settings()
+        tavily = TavilyClient(api_key=settings.tavily_api_key)
+        
+        query = f"{product_info['product_type']} fiyat Türkiye"
+        return tavily.search(query, max_results=5)
+    
+    def _build_tavily_prompt(self, product_info: Dict[str, Any], results: Dict[str, Any]) -> str:
+        return f"""Aşağıdaki web arama sonuçlarından {product_info['product_type']} için fiyat bilgisi çıkar:
 
 {json.dumps(results, ensure_ascii=False)}
 
@@ -62,27 +116,35 @@ JSON döndür:
 }}
 
 Sadece JSON döndür."""
+    
+    def _apply_external_stats(self, state: Dict[str, Any], result: ExternalPriceStats):
+        state["external_stats"] = result.model_dump()
+        
+        self.log(f"Web search complete, avg: {result.external_avg_price:.2f} TL")
+    
+    def _estimate_price(self, state: Dict[str, Any], product_info: Dict[str, Any]):
+        """Tavily yoksa LLM ile fiyat tahmini"""
+        try:
+            state["external_stats"] = invoke_structured(self.estimate_llm, self._build_estimate_prompt(product_info), ExternalPriceStats).model_dump()
+            self.log("Price estimated (no Tavily API)")
             
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            external_stats = json.loads(content)
-            state["external_stats"] = external_stats
-            
-            self.log(f"Web search complete, avg: {external_stats.get('external_avg_price', 0):.2f} TL")
+        except Exception as e:
+            self.log(f"Price estimation failed: {str(e)}", "error")
+            state["external_stats"] = {}
+    
+    async def _aestimate_price(self, state: Dict[str, Any], product_info: Dict[str, Any]):
+        """Tavily yoksa LLM ile fiyat tahmini (async)"""
+        try:
+            result = await ainvoke_structured(self.estimate_llm, self._build_estimate_prompt(product_info), ExternalPriceStats)
+            state["external_stats"] = result.model_dump()
+            self.log("Price estimated (no Tavily API)")
             
         except Exception as e:
-            self.log(f"Tavily search failed: {str(e)}", "error")
-            self._estimate_price(state, product_info)
+            self.log(f"Price estimation failed: {str(e)}", "error")
+            state["external_stats"] = {}
     
-    def _estimate_price(self, state: Dict[str, Any], product_info: Dict[str, Any]):
-        """Tavily yoksa LLM ile fiyat tahmini"""
-        prompt = f"""Türkiye piyasasında {product_info['product_type']} ürünü için ortalama fiyat aralığı tahmin et.
+    def _build_estimate_prompt(self, product_info: Dict[str, Any]) -> str:
+        return f"""Türkiye piyasasında {product_info['product_type']} ürünü için ortalama fiyat aralığı tahmin et.
 
 Ürün kategorisi: {product_info.get('category', 'Bilinmiyor')}
 Durum: {product_info.get('condition', 'used')}
@@ -96,19 +158,3 @@ JSON döndür:
 }}
 
 Mantıklı bir fiyat aralığı ver. Sadece JSON döndür."""
-        
-        try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            state["external_stats"] = json.loads(content)
-            self.log("Price estimated (no Tavily API)")
-            
-        except Exception as e:
-            self.log(f"Price estimation failed: {str(e)}", "error")
-            state["external_stats"] = {}
@@ -1,5 +1,8 @@
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils.metrics import record_fallback
+from utils.structured_output import invoke_structured, ainvoke_structured
+from models.schemas import MarketPriceEstimate, PriceValidation, PricingSuggestion
 from typing import Dict, Any
 import json
 
@@ -8,7 +11,9 @@ class PricingAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("PricingAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0)
+        self.llm = tiered_llm("pricing", temperature=0, cache_namespace="pricing")
+        self.validation_llm = tiered_llm("pricing", temperature=0, cache_namespace="pricing", task="validation")
+        self.market_price_llm = tiered_llm("pricing", temperature=0, cache_namespace="pricing", task="market_price")
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         # Session'da pricing varsa kullan (tutarlılık için)
@@ -16,19 +21,61 @@ class PricingAgent(BaseAgent):
             self.log(f"Using cached price: {state['pricing'].get('suggested_price', 0)} TL")
             return state
         
-        product_info = state.get("product_info", {})
-        internal_stats = state.get("internal_stats", {})
-        external_stats = state.get("external_stats", {})
-        user_given_price = state.get("user_price", 0)
-        
         self.log("Calculating price recommendation...")
+        user_given_price = state.get("user_price", 0)
         
         # Eğer kullanıcı fiyat verdiyse, kontrol et
         if user_given_price and user_given_price > 0:
-            return self._validate_user_price(state, user_given_price, product_info, internal_stats, external_stats)
+            self.log(f"Validating user price: {user_given_price} TL")
+            try:
+                result = invoke_structured(self.validation_llm, self._build_validation_prompt(state, user_given_price), PriceValidation)
+                self._apply_validation(state, user_given_price, result)
+            except Exception as e:
+                self.log(f"Price validation failed: {str(e)}", "error")
+                self._accept_user_price(state, user_given_price)
+            return state
         
         # Normal fiyat hesaplama
-        prompt = f"""Sen PazarGlobal'ın Fiyat Analiz ve Öneri Ajanısın.
+        try:
+            self._apply_pricing(state, invoke_structured(self.llm, self._build_pricing_prompt(state), PricingSuggestion))
+        except Exception as e:
+            self.log(f"Pricing failed: {str(e)}", "error")
+            self._apply_fallback(state)
+        
+        return state
+    
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        if state.get("pricing"):
+            self.log(f"Using cached price: {state['pricing'].get('suggested_price', 0)} TL")
+            return state
+        
+        self.log("Calculating price recommendation (async)...")
+        user_given_price = state.get("user_price", 0)
+        
+        if user_given_price and user_given_price > 0:
+            self.log(f"Validating user price: {user_given_price} TL")
+            try:
+                result = await ainvoke_structured(self.validation_llm, self._build_validation_prompt(state, user_given_price), PriceValidation)
+                self._apply_validation(state, user_given_price, result)
+            except Exception as e:
+                self.log(f"Price validation failed: {str(e)}", "error")
+                self._accept_user_price(state, user_given_price)
+            return state
+        
+        try:
+            self._apply_pricing(state, await ainvoke_structured(self.llm, self._build_pricing_prompt(state), PricingSuggestion))
+        except Exception as e:
+            self.log(f"Pricing failed: {str(e)}", "error")
+            self._apply_fallback(state)
+        
+        return state
+    
+    def _build_pricing_prompt(self, state: Dict[str, Any]) -> str:
+        product_info = state.get("product_info", {})
+        internal_stats = state.get("internal_stats", {})
+        external_stats = state.get("external_stats", {})
+        
+        return f"""Sen PazarGlobal'ın Fiyat Analiz ve Öneri Ajanısın.
 
 Görevin:
 1. İç ve dış piyasa verilerini analiz et
@@ -54,43 +101,34 @@ JSON döndür:
 }}
 
 SADECE JSON DÖNDÜR:"""
+    
+    def _apply_pricing(self, state: Dict[str, Any], result: PricingSuggestion):
+        pricing_data = result.model_dump(exclude_none=True)
+        pricing_data["action"] = "accept"  # Default action
+        state["pricing"] = pricing_data
         
-        try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            pricing_data = json.loads(content)
-            pricing_data["action"] = "accept"  # Default action
-            state["pricing"] = pricing_data
-            
-            self.log(f"Price calculated: {pricing_data.get('suggested_price', 0):.2f} TL")
-            
-        except Exception as e:
-            self.log(f"Pricing failed: {str(e)}", "error")
-            # Fallback fiyat
-            state["pricing"] = {
-                "action": "accept",
-                "suggested_price": 1000,
-                "min_price": 800,
-                "max_price": 1200,
-                "reason": "Fiyat hesaplanamadı, tahmin edildi."
-            }
-        
-        return state
+        self.log(f"Price calculated: {pricing_data.get('suggested_price', 0):.2f} TL")
+    
+    def _apply_fallback(self, state: Dict[str, Any]):
+        # Fallback fiyat
+        record_fallback("pricing", "default_price")
+        state["pricing"] = {
+            "action": "accept",
+            "suggested_price": 1000,
+            "min_price": 800,
+            "max_price": 1200,
+            "reason": "Fiyat hesaplanamadı, tahmin edildi."
+        }
     
-    def _validate_user_price(self, state: Dict[str, Any], user_price: float, 
-                            product_info: Dict, internal_stats: Dict, external_stats: Dict) -> Dict[str, Any]:
+    def _build_validation_prompt(self, state: Dict[str, Any], user_price: float) -> str:
         """
         Kullanıcının verdiği fiyatı kontrol et (ChatGPT-5 recommendation)
         """
-        self.log(f"Validating user price: {user_price} TL")
+        product_info = state.get("product_info", {})
+        internal_stats = state.get("internal_stats", {})
+        external_stats = state.get("external_stats", {})
         
-        prompt = f"""Sen PazarGlobal'ın Fiyat Analiz Ajanısın.
+        return f"""Sen PazarGlobal'ın Fiyat Analiz Ajanısın.
 
 Kullanıcı şu ürün için {user_price} TL fiyat belirledi.
 
@@ -122,58 +160,45 @@ Kurallar:
 - Dolandırıcılık şüphesi (örn: iPhone 5 TL) → "suggest" + gerçekçi fiyat
 
 SADECE JSON DÖNDÜR:"""
-        
-        try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            validation_result = json.loads(content)
-            
-            if validation_result.get("action") == "accept":
-                # Kullanıcı fiyatı kabul et
-                state["pricing"] = {
-                    "action": "accept",
-                    "suggested_price": user_price,
-                    "given_price": user_price,
-                    "reason": validation_result.get("reason", "Fiyat makul görünüyor.")
-                }
-                self.log(f"✅ User price accepted: {user_price} TL")
-            else:
-                # Alternatif öner
-                suggested = validation_result.get("suggested_price", user_price)
-                state["pricing"] = {
-                    "action": "suggest",
-                    "given_price": user_price,
-                    "suggested_price": suggested,
-                    "reason": validation_result.get("reason", "Fiyat ayarlaması önerildi.")
-                }
-                state["ai_response"] = f"""⚠️ Fiyat Uyarısı
+    
+    def _apply_validation(self, state: Dict[str, Any], user_price: float, validation_result: PriceValidation):
+        if validation_result.action == "accept":
+            # Kullanıcı fiyatı kabul et
+            state["pricing"] = {
+                "action": "accept",
+                "suggested_price": user_price,
+                "given_price": user_price,
+                "reason": validation_result.reason or "Fiyat makul görünüyor."
+            }
+            self.log(f"✅ User price accepted: {user_price} TL")
+        else:
+            # Alternatif öner
+            suggested = validation_result.suggested_price or user_price
+            state["pricing"] = {
+                "action": "suggest",
+                "given_price": user_price,
+                "suggested_price": suggested,
+                "reason": validation_result.reason or "Fiyat ayarlaması önerildi."
+            }
+            state["ai_response"] = f"""⚠️ Fiyat Uyarısı
 
 Belirlediğiniz fiyat: {user_price} TL
 Önerilen fiyat: {suggested} TL
 
-Sebep: {validation_result.get('reason')}
+Sebep: {validation_result.reason}
 
 Fiyatı değiştirmek ister misiniz?"""
-                state["response_type"] = "price_warning"
-                self.log(f"⚠️ User price questioned: {user_price} TL → Suggest: {suggested} TL")
-            
-        except Exception as e:
-            self.log(f"Price validation failed: {str(e)}", "error")
-            # Hata durumunda kullanıcı fiyatını kabul et
-            state["pricing"] = {
-                "action": "accept",
-                "suggested_price": user_price,
-                "given_price": user_price,
-                "reason": "Fiyat kontrolü yapılamadı, kullanıcı fiyatı kabul edildi."
-            }
-        
-        return state
+            state["response_type"] = "price_warning"
+            self.log(f"⚠️ User price questioned: {user_price} TL → Suggest: {suggested} TL")
+    
+    def _accept_user_price(self, state: Dict[str, Any], user_price: float):
+        # Hata durumunda kullanıcı fiyatını kabul et
+        state["pricing"] = {
+            "action": "accept",
+            "suggested_price": user_price,
+            "given_price": user_price,
+            "reason": "Fiyat kontrolü yapılamadı, kullanıcı fiyatı kabul edildi."
+        }
     
     def get_market_price(self, title: str, category: str) -> float:
         """
@@ -197,16 +222,7 @@ JSON döndür:
 Sadece JSON döndür."""
         
         try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            pricing_data = json.loads(content)
-            return float(pricing_data.get("suggested_price", 0))
+            return invoke_structured(self.market_price_llm, prompt, MarketPriceEstimate).suggested_price
             
         except Exception as e:
             self.log(f"Market price lookup failed: {str(e)}", "error")
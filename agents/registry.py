@@ -0,0 +1,62 @@
+"""
+Agent Registry
+Process genelinde paylaşılan, lazy oluşturulan agent instance'ları.
+Agent'lar stateless (state dict ile çalışır), bu yüzden request'ler arasında paylaşılabilir.
+"""
+from typing import Dict, Type, TypeVar
+from functools import lru_cache
+import threading
+
+from agents.base import BaseAgent
+
+AgentT = TypeVar("AgentT", bound=BaseAgent)
+
+class AgentRegistry:
+    """Agent class'ı başına tek instance tutar (ilk kullanımda oluşturulur)"""
+    
+    def __init__(self):
+        self._agents: Dict[type, BaseAgent] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, agent_cls: Type[AgentT]) -> AgentT:
+        """Agent'ı getir, yoksa oluştur (thread-safe)"""
+        agent = self._agents.get(agent_cls)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(agent_cls)
+                if agent is None:
+                    agent = agent_cls()
+                    self._agents[agent_cls] = agent
+        return agent
+    
+    def clear(self):
+        """Tüm instance'ları bırak (testler için)"""
+        with self._lock:
+            self._agents.clear()
+
+@lru_cache()
+def get_agent_registry() -> AgentRegistry:
+    """Global agent registry"""
+    return AgentRegistry()
+
+# FastAPI dependency'leri (Depends ile kullanılır)
+
+def get_conversation_agent():
+    from agents.conversation_enhanced import EnhancedConversationAgent
+    return get_agent_registry().get(EnhancedConversationAgent)
+
+def get_help_agent():
+    from agents.help import HelpAgent
+    return get_agent_registry().get(HelpAgent)
+
+def get_search_agent():
+    from agents.buyer_search import BuyerSearchAgent
+    return get_agent_registry().get(BuyerSearchAgent)
+
+def get_order_agent():
+    from agents.order import OrderAgent
+    return get_agent_registry().get(OrderAgent)
+
+def get_pricing_agent():
+    from agents.pricing import PricingAgent
+    return get_agent_registry().get(PricingAgent)
@@ -4,11 +4,18 @@ Intent detection + field extraction in single call
 Based on ChatGPT-5 recommendations
 """
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils import intent_engine, intent_model, metrics
+from utils.structured_output import invoke_structured
+from models.schemas import RouterDecision
 from typing import Dict, Any
-import json
 import re
 
+# Alan çıkarımı gerektirmeyen intent'ler yerel modelden cevaplanabilir
+# (create_listing alanları, get_listing_details ve listing_management'taki
+# "1. ürün" / "2500 TL olan ürün" referansı için LLM gerekir)
+LOCAL_INTENTS = ("product_search", "help", "small_talk", "unknown")
+
 class RouterAgent(BaseAgent):
     """
     Intent yönlendirici ve alan doldurucu agent
@@ -17,7 +24,7 @@ class RouterAgent(BaseAgent):
     
     def __init__(self):
         super().__init__("RouterAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0.3)
+        self.llm = tiered_llm("router", temperature=0.3)
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -28,32 +35,31 @@ class RouterAgent(BaseAgent):
         
         self.log(f"Routing message: {message[:50]}...")
         
+        # Yerel model eşiği geçerse gpt-4o çağrısı yapılmaz
+        prediction = None if has_image else intent_model.classify(message, allowed=LOCAL_INTENTS)
+        if prediction is not None:
+            metrics.INTENT_ROUTING.inc("router", "local")
+            self.log(f"Intent (local model): {prediction.label} ({prediction.confidence:.2f})")
+            return self._apply_local_prediction(state, message, prediction)
+        metrics.INTENT_ROUTING.inc("router", "llm")
+        
         prompt = self._build_router_prompt(message, has_image)
         
         try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            result = json.loads(content)
+            result = invoke_structured(self.llm, prompt, RouterDecision)
             
             # State'e aktar
-            state["intent"] = result.get("intent", "unknown")
-            state["query"] = result.get("query")
-            state["listing_reference"] = result.get("listing_reference", {})
+            state["intent"] = result.intent
+            state["query"] = result.query
+            state["listing_reference"] = result.listing_reference
             
             # Create listing intent'i varsa alanları doldur
-            if result.get("intent") == "create_listing":
-                create_listing_data = result.get("create_listing", {})
-                state["router_extracted_listing"] = create_listing_data
-                state["missing_fields"] = result.get("missing_fields", [])
+            if result.intent == "create_listing":
+                state["router_extracted_listing"] = result.create_listing
+                state["missing_fields"] = result.missing_fields
             
             # Meta bilgileri
-            state["router_meta"] = result.get("meta", {})
+            state["router_meta"] = result.meta
             
             self.log(f"Intent: {state['intent']}, Missing: {state.get('missing_fields', [])}")
             
@@ -66,6 +72,21 @@ class RouterAgent(BaseAgent):
         
         return state
     
+    def _apply_local_prediction(self, state: Dict[str, Any], message: str, prediction) -> Dict[str, Any]:
+        """Yerel model sonucunu LLM çıktısıyla aynı state alanlarına yaz"""
+        state["intent"] = prediction.label
+        state["query"] = message if prediction.label == "product_search" else None
+        state["listing_reference"] = {}
+        state["router_extracted_listing"] = {}
+        state["missing_fields"] = []
+        state["router_meta"] = {
+            "language": "tr",
+            "raw_text": message,
+            "source": "local_model",
+            "confidence": round(prediction.confidence, 3),
+        }
+        return state
+    
     def _build_router_prompt(self, message: str, has_image: bool) -> str:
         """RouterAgent prompt (ChatGPT-5 recommendation)"""
         
@@ -136,26 +157,22 @@ SADECE JSON DÖNDÜR:"""
     
     def _simple_intent_detection(self, message: str, has_image: bool) -> str:
         """Fallback basit intent detection"""
-        msg_lower = message.lower()
+        signals = intent_engine.match(message)
         
         # İlan verme
-        listing_keywords = ["ilan", "sat", "satmak", "satacağım", "ürün ver", "ekle"]
-        if any(kw in msg_lower for kw in listing_keywords) or has_image:
+        if signals.has("router_listing") or has_image:
             return "create_listing"
         
         # Arama
-        search_keywords = ["ara", "bul", "arıyorum", "var mı"]
-        if any(kw in msg_lower for kw in search_keywords):
+        if signals.has("router_search"):
             return "product_search"
         
         # Yardım
-        help_keywords = ["nasıl", "yardım", "ne yapmalıyım"]
-        if any(kw in msg_lower for kw in help_keywords):
+        if signals.has("router_help"):
             return "help"
         
         # Selamlaşma
-        greeting_keywords = ["merhaba", "selam", "hey", "günaydın"]
-        if any(kw in msg_lower for kw in greeting_keywords):
+        if signals.has("greeting"):
             return "small_talk"
         
         return "unknown"
@@ -1,21 +1,43 @@
 from agents.base import BaseAgent
-from utils.openai_client import get_llm
+from utils.model_policy import tiered_llm
+from utils.structured_output import invoke_structured, ainvoke_structured
+from models.schemas import ProductExtraction
 from langchain_core.prompts import ChatPromptTemplate
 from typing import Dict, Any
-import json
 
 class TextParserAgent(BaseAgent):
     """Kullanıcı metninden ürün bilgisi çıkaran agent"""
     
     def __init__(self):
         super().__init__("TextParserAgent")
-        self.llm = get_llm(model="gpt-4o", temperature=0)
+        self.llm = tiered_llm("text_parser", temperature=0, cache_namespace="text_parser")
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         raw_text = state.get("message", "")
         self.log(f"Parsing text: {raw_text[:50]}...")
         
-        prompt = f"""Kullanıcının aşağıdaki metninden ürün bilgisini çıkar:
+        try:
+            self._apply_product(state, invoke_structured(self.llm, self._build_prompt(raw_text), ProductExtraction))
+        except Exception as e:
+            self.log(f"Text parsing failed: {str(e)}", "error")
+            state["product_info"] = None
+        
+        return state
+    
+    async def acall(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        raw_text = state.get("message", "")
+        self.log(f"Parsing text (async): {raw_text[:50]}...")
+        
+        try:
+            self._apply_product(state, await ainvoke_structured(self.llm, self._build_prompt(raw_text), ProductExtraction))
+        except Exception as e:
+            self.log(f"Text parsing failed: {str(e)}", "error")
+            state["product_info"] = None
+        
+        return state
+    
+    def _build_prompt(self, raw_text: str) -> str:
+        return f"""Kullanıcının aşağıdaki metninden ürün bilgisini çıkar:
 
 "{raw_text}"
 
@@ -42,27 +64,9 @@ Tahmin yapman gerekiyorsa en mantıklı tahmini ver ama BİLGİ UYDURMA.
 Emin olmadığın alanları null bırak.
 
 SADECE JSON DÖNDÜR:"""
-        
-        try:
-            response = self.llm.invoke(prompt)
-            content = response.content.strip()
-            
-            # Markdown code block varsa temizle
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            product_data = json.loads(content)
-            state["product_info"] = product_data
-            self.log(f"Product parsed: {product_data.get('product_type', 'Unknown')}")
-            
-        except json.JSONDecodeError as e:
-            self.log(f"JSON parse error: {str(e)}", "error")
-            self.log(f"Response was: {response.content[:200]}", "error")
-            state["product_info"] = None
-        except Exception as e:
-            self.log(f"Text parsing failed: {str(e)}", "error")
-            state["product_info"] = None
-        
-        return state
+    
+    def _apply_product(self, state: Dict[str, Any], product: ProductExtraction):
+        """Doğrulanmış ürün bilgisini state'e yaz"""
+        product_data = product.model_dump(exclude_none=True)
+        state["product_info"] = product_data
+        self.log(f"Product parsed: {product_data.get('product_type', 'Unknown')}")
@@ -1,14 +1,15 @@
 from agents.base import BaseAgent
-from utils.openai_client import get_vision_llm
+from utils.model_policy import tiered_llm
+from utils.structured_output import StructuredOutputError, invoke_structured
+from models.schemas import ProductExtraction
 from typing import Dict, Any
-import json
 
 class VisionAgent(BaseAgent):
     """Fotoğraftan ürün bilgisi çıkaran agent"""
     
     def __init__(self):
         super().__init__("VisionAgent")
-        self.llm = get_vision_llm()
+        self.llm = tiered_llm("vision", temperature=0)
     
     def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         image_url = state.get("image_url")
@@ -50,28 +51,18 @@ JSON formatında döndür:
 SADECE JSON DÖNDÜR:"""
         
         try:
-            response = self.llm.invoke([
+            # Şemaya uymayan cevap görsel tekrar gönderilmeden onarılır
+            product_data = invoke_structured(self.llm, [
                 {"type": "text", "text": prompt},
                 {"type": "image_url", "image_url": {"url": image_url}}
-            ])
-            
-            # JSON parse et
-            content = response.content.strip()
-            
-            # Markdown code block varsa temizle
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            product_data = json.loads(content)
+            ], ProductExtraction).model_dump(exclude_none=True)
             
             state["product_info"] = product_data
             self.log(f"Product identified: {product_data.get('product_type', 'Unknown')}")
             
-        except json.JSONDecodeError as e:
+        except StructuredOutputError as e:
             self.log(f"JSON parse error: {str(e)}", "error")
-            self.log(f"Response was: {response.content[:200]}", "error")
+            self.log(f"Response was: {e.content[:200]}", "error")
             state["product_info"] = None
         except Exception as e:
             self.log(f"Vision analysis failed: {str(e)}", "error")
@@ -0,0 +1,91 @@
+"""
+Per-request agent kurulum maliyeti benchmark'ı
+
+Önce: her request'te EnhancedConversationAgent/HelpAgent/BuyerSearchAgent/OrderAgent
+ve her biri için yeni ChatOpenAI client oluşturuluyordu.
+Sonra: AgentRegistry'den paylaşılan instance + model config başına tek client.
+
+Not: TLS handshake tasarrufu burada ölçülmez (network yok); yalnızca
+Python tarafındaki kurulum maliyeti ölçülür.
+
+Kullanım:
+    python bench_agent_registry.py --requests 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "bench-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench-key")
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+from config import get_settings  # noqa: E402
+import utils.openai_client as openai_client  # noqa: E402
+from agents.conversation_enhanced import EnhancedConversationAgent  # noqa: E402
+from agents.help import HelpAgent  # noqa: E402
+from agents.buyer_search import BuyerSearchAgent  # noqa: E402
+from agents.order import OrderAgent  # noqa: E402
+from agents.registry import get_agent_registry  # noqa: E402
+
+AGENT_CLASSES = [EnhancedConversationAgent, HelpAgent, BuyerSearchAgent, OrderAgent]
+
+
+def legacy_get_llm(model: str = "gpt-4o", temperature: float = 0.7, **kwargs) -> ChatOpenAI:
+    """Eski get_llm: her çağrıda yeni client + yeni HTTP pool (cache_namespace yok sayılır)"""
+    settings = get_settings()
+    return ChatOpenAI(model=model, temperature=temperature, api_key=settings.openai_api_key)
+
+
+def legacy_tiered_llm(agent: str, temperature: float = 0.7, **kwargs) -> ChatOpenAI:
+    """Agent'lar artık tiered_llm ile kurulur; eski davranışta burada yeni client oluşuyordu"""
+    return legacy_get_llm(temperature=temperature)
+
+
+def per_request_construction(requests: int) -> float:
+    """Önce: her request'te agent'ları sıfırdan kur"""
+    import agents.conversation_enhanced as conv_mod
+    import agents.help as help_mod
+    import agents.buyer_search as search_mod
+
+    patched = [conv_mod, help_mod, search_mod]
+    originals = [mod.tiered_llm for mod in patched]
+    for mod in patched:
+        mod.tiered_llm = legacy_tiered_llm
+    try:
+        start = time.perf_counter()
+        for _ in range(requests):
+            for agent_cls in AGENT_CLASSES:
+                agent_cls()
+        return time.perf_counter() - start
+    finally:
+        for mod, original in zip(patched, originals):
+            mod.tiered_llm = original
+
+
+def registry_lookup(requests: int) -> float:
+    """Sonra: registry'den paylaşılan instance"""
+    registry = get_agent_registry()
+    registry.clear()
+    openai_client.get_llm.cache_clear()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        for agent_cls in AGENT_CLASSES:
+            registry.get(agent_cls)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent setup overhead benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    before = per_request_construction(args.requests)
+    after = registry_lookup(args.requests)
+
+    print(f"Requests             : {args.requests}")
+    print(f"Per-request (before) : {before / args.requests * 1000:.3f} ms")
+    print(f"Per-request (after)  : {after / args.requests * 1000:.3f} ms")
+    print(f"Speedup              : {before / max(after, 1e-9):.0f}x")
@@ -0,0 +1,124 @@
+"""
+/conversation eşzamanlılık benchmark'ı (stub LLM + stub Supabase)
+
+Eski (blocking) akış: agent'lar async endpoint içinde sync çağrılıyordu,
+yavaş bir LLM çağrısı tüm worker'ı kilitliyordu.
+Yeni akış: conversation_endpoint -> agent.acall / workflow.ainvoke.
+
+Kullanım:
+    python bench_conversation_concurrency.py --users 100 --llm-latency 0.3
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import utils.openai_client as openai_client
+import utils.supabase_client as supabase_client
+
+
+class StubMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubLLM:
+    """OpenAI yerine sabit gecikmeli sahte LLM"""
+    latency = 0.3
+
+    def invoke(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return StubMessage("Kargo ücreti genelde alıcıya aittir.")
+
+    async def ainvoke(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return StubMessage("Kargo ücreti genelde alıcıya aittir.")
+
+
+class StubSupabase:
+    """Benchmark'ta Supabase'e gidilmez"""
+    def table(self, *args, **kwargs):
+        raise RuntimeError("Supabase stub - not used in benchmark")
+
+    def rpc(self, *args, **kwargs):
+        raise RuntimeError("Supabase stub - not used in benchmark")
+
+
+# Agent modülleri import edilmeden önce patch'le
+openai_client.get_llm = lambda *args, **kwargs: StubLLM()
+openai_client.get_mini_llm = lambda *args, **kwargs: StubLLM()
+openai_client.get_vision_llm = lambda *args, **kwargs: StubLLM()
+supabase_client.get_supabase_admin = lambda: StubSupabase()
+
+import main  # noqa: E402
+from agents.conversation_enhanced import EnhancedConversationAgent  # noqa: E402
+from agents.help import HelpAgent  # noqa: E402
+from agents.registry import get_conversation_agent, get_help_agent  # noqa: E402
+from models.conversation_state import session_manager  # noqa: E402
+
+# LLM çağrısına giden bir soru (QUESTION -> _answer_question + HelpAgent)
+MESSAGE = "Kargo ücretini kim öder?"
+
+
+async def legacy_turn(user_id: str):
+    """Eski endpoint davranışı: async handler içinde sync agent çağrıları"""
+    session = session_manager.get_or_create_session(user_id, "whatsapp")
+    state = {
+        "user_id": user_id,
+        "message": MESSAGE,
+        "platform": "whatsapp",
+        "image_url": session.image_url or "",
+        "intent": "unknown",
+        "response_type": "",
+    }
+    result = EnhancedConversationAgent()(state)
+    if result.get("response_type") == "question_response":
+        result = HelpAgent()(result)
+    return result
+
+
+async def async_turn(user_id: str):
+    """Yeni endpoint: acall / ainvoke"""
+    return await main.conversation_endpoint(
+        {"user_id": user_id, "message": MESSAGE, "platform": "whatsapp"},
+        conversation_agent=get_conversation_agent(),
+        help_agent=get_help_agent(),
+        search_agent=None
+    )
+
+
+async def run(turn, users: int) -> float:
+    user_ids = [f"bench-{uuid.uuid4()}" for _ in range(users)]
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - start
+    for user_id in user_ids:
+        session_manager.delete_session(user_id)
+    return elapsed
+
+
+async def bench(users: int):
+    await main.startup_event()
+
+    legacy = await run(legacy_turn, users)
+    current = await run(async_turn, users)
+
+    print(f"Concurrent users : {users}")
+    print(f"LLM latency      : {StubLLM.latency * 1000:.0f} ms/call")
+    print(f"Blocking (before): {legacy:.2f}s  -> {users / legacy:.1f} conversations/s")
+    print(f"Async (after)    : {current:.2f}s  -> {users / current:.1f} conversations/s")
+    print(f"Speedup          : {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/conversation concurrency benchmark")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    StubLLM.latency = args.llm_latency
+    try:
+        asyncio.run(bench(args.users))
+    finally:
+        if main.scheduler:
+            main.scheduler.shutdown()
@@ -0,0 +1,94 @@
+"""
+Konuşma geçmişi prompt boyutu benchmark'ı (utils/history_manager.py)
+
+Uzun bir session simüle edilir (kullanıcı mesajları data/whatsapp_messages.json'dan,
+asistan cevapları tipik uzunlukta). Her turn'de prompt'a giden geçmiş:
+- full:    eski davranış, tüm conversation_history
+- managed: son N mesaj + kayan özet, token bütçesi içinde
+
+Özetleyici:
+- extractive (varsayılan): API'sız, mesaj başlarından ~80 kelimelik özet (boyut davranışı için)
+- llm: gerçek gpt-4o-mini özetleri (OPENAI_API_KEY gerekir)
+
+Özet işleri her turn sonunda beklenir (kullanıcının yazma süresi içinde biter varsayımı);
+--lag ile bir turn gecikmeli tamamlanma simüle edilir.
+
+Kullanım:
+    python bench_history_window.py
+    python bench_history_window.py --turns 300 --budget 800 --summarizer llm
+"""
+import argparse
+import json
+import time
+
+from models.conversation_state import SessionState
+from utils.history_manager import HistoryManager, count_tokens, format_message, llm_summarize
+
+CORPUS = "data/whatsapp_messages.json"
+
+ASSISTANT_REPLIES = [
+    "Anladım! Ürününüzün marka, model ve durumunu (yeni/2.el) belirtir misiniz? Fotoğraf da gönderebilirsiniz. 📸",
+    "Harika! Piyasa araştırması yaptım: benzer ilanlar 18.000 - 24.000 TL arasında. Önerilen fiyat 21.500 TL. Bu fiyatla devam edelim mi?",
+    "İlanınız hazır! Başlık: Apple iPhone 13 128GB - Temiz, Kutulu. Açıklama: Cihaz sorunsuz çalışıyor, ekranda çizik yok, pil sağlığı %89. Onaylıyor musunuz?",
+    "Premium ürünler Elektronik › Üst Seviye kategorisinde listelenir. Başka bir sorunuz var mı?",
+]
+
+
+def extractive_summarize(previous_summary, messages):
+    words = previous_summary.split()
+    for message in messages:
+        if message["role"] == "user":
+            words += message["content"].split()[:12]
+    return " ".join(words[-80:])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--verbatim", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=1200)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--summarizer", choices=["extractive", "llm"], default="extractive")
+    parser.add_argument("--lag", action="store_true", help="özet bir sonraki turn'den sonra hazır olur")
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding="utf-8") as f:
+        user_messages = [row["text"] for row in json.load(f)]
+
+    manager = HistoryManager(
+        verbatim_messages=args.verbatim, default_budget=args.budget, summary_batch=args.batch,
+        summarize=llm_summarize if args.summarizer == "llm" else extractive_summarize,
+    )
+    session = SessionState(user_id="bench-history")
+    checkpoints = {1, 5, 10, 25, 50, 100, 200, 500, 1000, args.turns}
+
+    print(f"verbatim={args.verbatim} budget={args.budget} batch={args.batch} summarizer={args.summarizer}")
+    print("-" * 60)
+    print(f"{'turn':>6} {'full':>10} {'managed':>10} {'özet kapsamı':>14} {'build':>10}")
+    totals = [0, 0]
+    build_us = []
+    for turn in range(1, args.turns + 1):
+        session.add_message("user", user_messages[turn % len(user_messages)])
+        full = count_tokens("\n".join(format_message(m) for m in session.conversation_history[:-1]))
+        started = time.perf_counter()
+        managed_text = manager.build_context(session)
+        build_us.append((time.perf_counter() - started) * 1e6)
+        managed = count_tokens(managed_text)
+        totals[0] += full
+        totals[1] += managed
+        if not args.lag or turn % 2 == 0:
+            manager.wait()
+        if turn in checkpoints:
+            print(f"{turn:>6} {full:>10,} {managed:>10,} {session.summary_message_count:>14} {build_us[-1]:>8.0f}µs")
+        session.add_message("assistant", ASSISTANT_REPLIES[turn % len(ASSISTANT_REPLIES)])
+        assert managed <= args.budget, (turn, managed)
+
+    manager.wait()
+    print("-" * 60)
+    print(f"turn başına ortalama geçmiş token'ı: full {totals[0] / args.turns:,.0f}, managed {totals[1] / args.turns:,.0f} "
+          f"({totals[1] / max(1, totals[0]):.1%})")
+    print(f"build_context ortalama: {sum(build_us) / len(build_us):.0f} µs, özet sayısı: {manager.summaries_built}")
+
+
+if __name__ == "__main__":
+    main()
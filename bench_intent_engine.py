@@ -0,0 +1,84 @@
+"""
+Intent engine throughput benchmark'ı
+
+data/whatsapp_messages.json içindeki WhatsApp mesajları üzerinde:
+- legacy: her sinyal tablosu için ayrı `msg.lower()` + `any(k in msg for k in [...])`
+  ve mesaj başına re.search (entry point'lerin eski hali)
+- engine: utils/intent_engine tek geçiş (cache'siz IntentEngine.match)
+
+Ayrıca iki yöntemin sinyal farkları listelenir; farklar Türkçe küçültme ve
+ASCII varyantlarından gelir ("ariyorum" -> arıyorum, "İPTAL" -> iptal).
+
+Kullanım:
+    python bench_intent_engine.py
+    python bench_intent_engine.py --repeat 200 --show-diff
+"""
+import argparse
+import json
+import re
+import time
+
+from utils.intent_engine import KEYWORD_SIGNALS, REGEX_SIGNALS, IntentEngine
+
+CORPUS = "data/whatsapp_messages.json"
+
+
+def legacy_signals(message):
+    found = set()
+    for name, keywords in KEYWORD_SIGNALS.items():
+        msg_lower = message.lower()
+        if any(keyword in msg_lower for keyword in keywords):
+            found.add(name)
+    for name, pattern in REGEX_SIGNALS.items():
+        if re.search(pattern, message.lower()):
+            found.add(name)
+    return found
+
+
+def run(label, func, messages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            func(message)
+    elapsed = time.perf_counter() - start
+    total = repeat * len(messages)
+    print(f"{label:<8} {total / elapsed:>12,.0f} msg/s   {elapsed / total * 1e6:6.2f} µs/msg")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--show-diff", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        messages = [row["text"] for row in json.load(f)]
+
+    started = time.perf_counter()
+    engine = IntentEngine(KEYWORD_SIGNALS, REGEX_SIGNALS)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(messages)} mesaj, {len(KEYWORD_SIGNALS) + len(REGEX_SIGNALS)} sinyal, "
+          f"{engine.keyword_count} anahtar kelime, {engine.state_count} state (build {build_ms:.1f} ms)")
+    print("-" * 60)
+
+    legacy = run("legacy", legacy_signals, messages, args.repeat)
+    compiled = run("engine", engine.match, messages, args.repeat)
+    print("-" * 60)
+    print(f"speedup: {legacy / compiled:.1f}x")
+
+    diffs = []
+    for message in messages:
+        old = legacy_signals(message)
+        new = set(engine.match(message).names())
+        if old != new:
+            diffs.append((message, sorted(new - old), sorted(old - new)))
+    print(f"sinyal farkı olan mesaj: {len(diffs)}/{len(messages)}")
+    if args.show_diff:
+        for message, added, removed in diffs:
+            print(f"  {message[:60]!r}  +{added} -{removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Listing workflow latency benchmark'ı: sıralı vs paralel product_match/market_search
+
+Agent'lar registry'de, gerçek çağrıların tipik sürelerini sleep ile taklit eden
+stand-in'lerle değiştirilir (network yok). Her koşuda node_timings state'ten
+okunur; paralel akışta toplam süre ≈ sıralı - kısa branch süresi olmalıdır.
+
+Kullanım:
+    python bench_listing_workflow.py --runs 5 --product-match-ms 400 --market-search-ms 1500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "bench-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench-key")
+
+from agents.base import BaseAgent  # noqa: E402
+from agents.conversation_enhanced import EnhancedConversationAgent  # noqa: E402
+from agents.text_parser import TextParserAgent  # noqa: E402
+from agents.product_match import ProductMatchAgent  # noqa: E402
+from agents.market_search import MarketSearchAgent  # noqa: E402
+from agents.pricing import PricingAgent  # noqa: E402
+from agents.listing_writer import ListingWriterAgent  # noqa: E402
+from agents.registry import get_agent_registry  # noqa: E402
+from workflows.listing_flow_enhanced import create_enhanced_listing_workflow  # noqa: E402
+
+
+class SleepAgent(BaseAgent):
+    """delay kadar bekleyip updates'i state'e yazan stand-in"""
+
+    def __init__(self, name, delay_ms, updates):
+        super().__init__(name)
+        self.delay = delay_ms / 1000
+        self.updates = updates
+
+    def __call__(self, state):
+        time.sleep(self.delay)
+        state.update(self.updates)
+        return state
+
+    async def acall(self, state):
+        await asyncio.sleep(self.delay)
+        state.update(self.updates)
+        return state
+
+
+def install_stand_ins(args):
+    registry = get_agent_registry()
+    registry.clear()
+    registry._agents.update({
+        EnhancedConversationAgent: SleepAgent("conversation", args.conversation_ms, {"response_type": "start_listing_flow"}),
+        TextParserAgent: SleepAgent("text_parser", args.text_parser_ms, {
+            # brand + condition -> check_product_info LLM çağırmadan geçer
+            "product_info": {"product_type": "laptop", "category": "Elektronik", "brand": "Lenovo", "condition": "used"}
+        }),
+        ProductMatchAgent: SleepAgent("product_match", args.product_match_ms, {"internal_stats": {"similar_count": 3}}),
+        MarketSearchAgent: SleepAgent("market_search", args.market_search_ms, {"external_stats": {"avg_price": 15000}}),
+        PricingAgent: SleepAgent("pricing", args.pricing_ms, {"pricing": {"recommended_price": 14500}}),
+        ListingWriterAgent: SleepAgent("listing_writer", args.listing_writer_ms, {"listing_draft": {"title": "Lenovo laptop"}}),
+    })
+
+
+def initial_state(run):
+    return {
+        "user_id": f"bench-user-{run}", "message": "laptop satmak istiyorum", "image_url": "", "platform": "web",
+        "user_location": "", "session_state": {}, "intent": "", "response_type": "", "ai_response": "",
+        "conversation_history": [], "product_info": {}, "internal_stats": {}, "external_stats": {}, "pricing": {},
+        "listing_draft": {}, "user_price": 0.0, "edit_field": "", "edit_value": "", "edit_description": "",
+    }
+
+
+async def measure(workflow, runs):
+    totals, timings = [], None
+    for run in range(runs):
+        start = time.perf_counter()
+        result = await workflow.ainvoke(initial_state(run))
+        totals.append((time.perf_counter() - start) * 1000)
+        timings = result.get("node_timings", {})
+        assert result["pricing"]["recommended_price"] == 14500
+        assert result["internal_stats"] and result["external_stats"]
+    return sum(totals) / len(totals), timings
+
+
+def run(args):
+    install_stand_ins(args)
+    print("LISTING WORKFLOW BENCHMARK")
+    print(f"runs={args.runs}, product_match={args.product_match_ms}ms, market_search={args.market_search_ms}ms")
+    print("=" * 60)
+
+    results = {}
+    for label, parallel in [("sequential", False), ("parallel", True)]:
+        workflow = create_enhanced_listing_workflow(parallel_analysis=parallel)
+        avg, timings = asyncio.run(measure(workflow, args.runs))
+        results[label] = avg
+        nodes = ", ".join(f"{name}={ms:.0f}" for name, ms in timings.items())
+        print(f"{label:<11} avg {avg:7.0f} ms   nodes: {nodes}")
+
+    print("-" * 60)
+    saved = results["sequential"] - results["parallel"]
+    print(f"saved {saved:.0f} ms (shorter branch: {min(args.product_match_ms, args.market_search_ms)} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--conversation-ms", type=int, default=50)
+    parser.add_argument("--text-parser-ms", type=int, default=600)
+    parser.add_argument("--product-match-ms", type=int, default=400)
+    parser.add_argument("--market-search-ms", type=int, default=1500)
+    parser.add_argument("--pricing-ms", type=int, default=800)
+    parser.add_argument("--listing-writer-ms", type=int, default=1200)
+    args = parser.parse_args()
+    run(args)
@@ -0,0 +1,184 @@
+"""
+Model tier A/B benchmark'ı (utils/model_policy.py)
+
+data/model_tier_fixtures.json'daki örnek girdiler agent'ların kendi prompt
+builder'larıyla prompt'a çevrilir ve her iki tier'dan (premium / economy) geçirilir.
+Görev başına:
+- geçerli JSON oranı (şemaya uyan ilk cevap, onarımsız)
+- beklenen alanlara göre doğruluk (fixture'da "expected" varsa)
+- economy cevabının premium ile uyuşması (karşılaştırma alanları)
+- gecikme p50 / p95, çağrı başına token ve TRY maliyeti
+- öneri: economy doğruluğu/uyuşması tolerans içindeyse görev downshift'e uygun
+
+LLM cache kullanılmaz; gerçek API çağrısı yapılır (OPENAI_API_KEY gerekir).
+Sonuç MODEL_POLICY_OVERRIDES / AGENT_TASKS karmaşıklık sınıflarını ayarlamak içindir.
+
+Kullanım:
+    python bench_model_tiers.py
+    python bench_model_tiers.py --tasks router pricing.validation --repeat 3 --out logs/model_ab.jsonl
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.buyer_search import BuyerSearchAgent
+from agents.listing_writer import ListingWriterAgent
+from agents.market_search import MarketSearchAgent
+from agents.pricing import PricingAgent
+from agents.router import RouterAgent
+from agents.text_parser import TextParserAgent
+from config import get_settings
+from models.schemas import (
+    ExternalPriceStats, ListingCopy, PriceValidation, PricingSuggestion, ProductExtraction, RouterDecision, SearchFilters,
+)
+from utils.cost_tracker import get_cost_tracker
+from utils.openai_client import get_llm
+from utils.structured_output import parse_json, with_response_format
+
+FIXTURES = "data/model_tier_fixtures.json"
+
+
+def build_tasks():
+    """görev -> (şema, agent LLM'i (sıcaklık için), prompt builder, karşılaştırma alanları)"""
+    router, parser, pricing = RouterAgent(), TextParserAgent(), PricingAgent()
+    market, search, writer = MarketSearchAgent(), BuyerSearchAgent(), ListingWriterAgent()
+    return {
+        "router": (RouterDecision, router.llm,
+                   lambda i: router._build_router_prompt(i["message"], False), {"intent": "exact"}),
+        "text_parser": (ProductExtraction, parser.llm,
+                        lambda i: parser._build_prompt(i["message"]), {"brand": "exact", "condition": "exact"}),
+        "pricing": (PricingSuggestion, pricing.llm,
+                    lambda i: pricing._build_pricing_prompt(i), {"suggested_price": 0.15}),
+        "pricing.validation": (PriceValidation, pricing.validation_llm,
+                               lambda i: pricing._build_validation_prompt(i, i["user_price"]), {"action": "exact"}),
+        "market_search.estimate": (ExternalPriceStats, market.estimate_llm,
+                                   lambda i: market._build_estimate_prompt(i["product_info"]), {"external_avg_price": 0.25}),
+        "buyer_search": (SearchFilters, search.llm, lambda i: search._build_filter_prompt(i["query"]),
+                         {"category": "exact", "min_price": 0.0, "max_price": 0.0, "location": "exact", "condition": "exact"}),
+        "listing_writer": (ListingCopy, writer.llm, lambda i: writer._build_prompt(dict(i)), {}),
+    }
+
+
+def same(a, b, rule) -> bool:
+    """rule: "exact" (büyük/küçük harf duyarsız) ya da sayısal göreli tolerans"""
+    if a is None or b is None:
+        return a is None and b is None
+    if rule == "exact":
+        return str(a).strip().casefold() == str(b).strip().casefold()
+    a, b = float(a), float(b)
+    return abs(a - b) <= rule * max(abs(a), abs(b), 1e-9)
+
+
+def matches(output, reference, rules) -> bool:
+    return all(same(output.get(field), reference.get(field), rules.get(field, "exact")) for field in reference)
+
+
+def run_one(model, schema, temperature, prompt):
+    llm = with_response_format(get_llm(model=model, temperature=temperature), schema)
+    started = time.perf_counter()
+    row = {"model": model, "valid": False, "output": None, "error": None, "tokens": (0, 0)}
+    try:
+        response = llm.invoke(prompt)
+        usage = getattr(response, "usage_metadata", None) or {}
+        row["tokens"] = (usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+        row["output"] = parse_json(response.content, schema).model_dump()
+        row["valid"] = True
+    except Exception as e:
+        row["error"] = str(e)[:200]
+    row["latency_ms"] = (time.perf_counter() - started) * 1000
+    return row
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--tasks", nargs="*", help="sadece bu görevler")
+    parser.add_argument("--premium", default=settings.model_tier_premium)
+    parser.add_argument("--economy", default=settings.model_tier_economy)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="kabul edilen doğruluk/uyuşma kaybı")
+    parser.add_argument("--out", help="ham sonuçlar (JSONL)")
+    args = parser.parse_args()
+
+    with open(args.fixtures, encoding="utf-8") as f:
+        fixtures = [row for row in json.load(f) if not args.tasks or row["task"] in args.tasks]
+    tasks = build_tasks()
+    tiers = {"premium": args.premium, "economy": args.economy}
+    tracker = get_cost_tracker()
+
+    jobs = []
+    for index, fixture in enumerate(fixtures):
+        schema, agent_llm, build, _ = tasks[fixture["task"]]
+        prompt = build(fixture["input"])
+        for attempt in range(args.repeat):
+            for tier, model in tiers.items():
+                jobs.append((index, attempt, tier, model, schema, agent_llm.temperature, prompt))
+
+    print(f"{len(fixtures)} fixture x {args.repeat} tekrar x 2 tier = {len(jobs)} çağrı "
+          f"(premium={args.premium}, economy={args.economy})")
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        rows = list(executor.map(lambda job: (job, run_one(*job[3:])), jobs))
+
+    results = {}  # (fixture, attempt, tier) -> row
+    for (index, attempt, tier, *_), row in rows:
+        results[(index, attempt, tier)] = row
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for (index, attempt, tier), row in sorted(results.items()):
+                f.write(json.dumps({"fixture": index, "task": fixtures[index]["task"], "attempt": attempt,
+                                    "tier": tier, **row}, ensure_ascii=False) + "\n")
+
+    stats = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))  # görev -> tier -> metrik -> değerler
+    for (index, attempt, tier), row in results.items():
+        fixture = fixtures[index]
+        _, _, _, rules = tasks[fixture["task"]]
+        task_stats = stats[fixture["task"]][tier]
+        task_stats["valid"].append(row["valid"])
+        task_stats["latency"].append(row["latency_ms"])
+        task_stats["cost"].append(tracker.cost_try(row["model"], *row["tokens"]))
+        task_stats["tokens"].append(sum(row["tokens"]))
+        if row["valid"] and "expected" in fixture:
+            task_stats["accuracy"].append(matches(row["output"], fixture["expected"], rules))
+        if tier == "economy" and rules:
+            reference = results[(index, attempt, "premium")]
+            if row["valid"] and reference["valid"]:
+                task_stats["agreement"].append(matches(row["output"], {f: reference["output"].get(f) for f in rules}, rules))
+
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    def pct(value):
+        return "-" if value is None else f"{value:.0%}"
+
+    print("-" * 118)
+    print(f"{'görev':<24} {'tier':<8} {'geçerli':>8} {'doğruluk':>9} {'uyuşma':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'token':>7} {'TRY/çağrı':>10}   öneri")
+    for task in sorted(stats):
+        for tier in ("premium", "economy"):
+            s = stats[task][tier]
+            recommendation = ""
+            if tier == "economy":
+                p = stats[task]["premium"]
+                accuracy_loss = (mean(p["accuracy"]) or 0) - (mean(s["accuracy"]) or 0) if s["accuracy"] else 0
+                agreement = mean(s["agreement"])
+                ok = (mean(s["valid"]) >= mean(p["valid"]) - args.tolerance and accuracy_loss <= args.tolerance
+                      and (agreement is None or agreement >= 1 - 2 * args.tolerance))
+                latency_delta = percentile(s["latency"], 0.5) / max(percentile(p["latency"], 0.5), 1e-9) - 1
+                cost_delta = (mean(s["cost"]) or 0) / max(mean(p["cost"]) or 0, 1e-12) - 1
+                recommendation = f"{'economy' if ok else 'premium'} (p50 {latency_delta:+.0%}, maliyet {cost_delta:+.0%})"
+            print(f"{task:<24} {tier:<8} {pct(mean(s['valid'])):>8} {pct(mean(s['accuracy'])):>9} "
+                  f"{pct(mean(s['agreement'])):>7} {percentile(s['latency'], 0.5):>8.0f} {percentile(s['latency'], 0.95):>8.0f} "
+                  f"{mean(s['tokens']):>7.0f} {mean(s['cost']):>10.4f}   {recommendation}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Expired-session cleanup benchmark'ı (100k session)
+
+Karşılaştırılan yöntemler:
+- legacy:  glob + her dosyayı unpickle edip last_message_at kontrolü (eski cleanup_expired)
+- sweep:   glob + her dosyada stat (mtime) kontrolü
+- index:   FileSessionStore expiry heap'i - sadece süresi dolanlara dokunur
+
+Her turda sessions'ın --expired-ratio kadarı süresi dolmuş hale getirilir.
+
+Kullanım:
+    python bench_session_cleanup.py --sessions 100000 --expired-ratio 0.01
+"""
+import argparse
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from models.session_store import FileSessionStore
+
+TTL_SECONDS = 30 * 60
+
+
+def populate(store: FileSessionStore, count: int):
+    """count adet session; içerik eski pickle formatına benzer (legacy sweep için)"""
+    now = datetime.now()
+    for i in range(count):
+        payload = {"user_id": f"user-{i}", "last_message_at": now, "conversation_history": []}
+        store.set(f"user-{i}", pickle.dumps(payload))
+
+
+def expire(store: FileSessionStore, count: int, ratio: float, round_no: int) -> int:
+    """ratio kadar session'ı süresi dolmuş yap (mtime + içerik geriye alınır)"""
+    old = time.time() - TTL_SECONDS - 60
+    old_dt = datetime.now() - timedelta(seconds=TTL_SECONDS + 60)
+    step = max(1, int(1 / ratio))
+    expired = 0
+    for i in range(round_no, count, step):
+        path = store.path_for(f"user-{i}")
+        if not path.exists():
+            continue
+        payload = {"user_id": f"user-{i}", "last_message_at": old_dt, "conversation_history": []}
+        path.write_bytes(pickle.dumps(payload))
+        os.utime(path, (old, old))
+        # Gerçek kullanımda index set() ile güncellenir; burada mtime dışarıdan geri alındı
+        store._track(path.name, old + TTL_SECONDS)
+        expired += 1
+    return expired
+
+
+def legacy_cleanup(persist_dir: Path) -> int:
+    removed = 0
+    cutoff = datetime.now() - timedelta(seconds=TTL_SECONDS)
+    for path in persist_dir.glob("session_*.pkl"):
+        with open(path, "rb") as f:
+            session = pickle.load(f)
+        if session["last_message_at"] < cutoff:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def sweep_cleanup(persist_dir: Path) -> int:
+    removed = 0
+    now = time.time()
+    for path in persist_dir.glob("session_*.pkl"):
+        if path.stat().st_mtime + TTL_SECONDS <= now:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def run(count: int, ratio: float):
+    base = Path(tempfile.mkdtemp(prefix="bench_sessions_"))
+    try:
+        print("SESSION CLEANUP BENCHMARK")
+        print(f"sessions={count}, expired per round={ratio:.1%}")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        # index_rebuild_every büyük: ölçülen purge'lerde tam tarama olmasın
+        store = FileSessionStore(persist_dir=str(base), ttl_seconds=TTL_SECONDS, index_rebuild_every=10**9)
+        populate(store, count)
+        print(f"populate: {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        store.rebuild_index()
+        print(f"index rebuild (startup scan): {(time.perf_counter() - start) * 1000:.1f} ms")
+        print("-" * 60)
+
+        for round_no, (name, cleanup) in enumerate([
+            ("legacy (unpickle all)", lambda: legacy_cleanup(base)),
+            ("sweep (stat all)", lambda: sweep_cleanup(base)),
+            ("index (heap)", store.purge_expired),
+        ]):
+            expired = expire(store, count, ratio, round_no)
+            start = time.perf_counter()
+            removed = cleanup()
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{name:<24} removed={removed:>6} (expected {expired:>6})  {elapsed:>10.1f} ms")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--expired-ratio", type=float, default=0.01)
+    args = parser.parse_args()
+    run(args.sessions, args.expired_ratio)
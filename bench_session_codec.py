@@ -0,0 +1,73 @@
+"""
+Session serialization benchmark'ı: pickle vs session_codec
+
+10 / 100 / 1000 mesajlık session'lar için serialize/deserialize süresi
+ve diskteki byte boyutu karşılaştırılır.
+
+Kullanım:
+    python bench_session_codec.py --repeat 200
+"""
+import argparse
+import pickle
+import time
+
+from models import session_codec
+from models.conversation_state import SessionState, ConversationStage, UserIntent
+
+SIZES = [10, 100, 1000]
+
+
+def build_session(message_count: int) -> SessionState:
+    """Tipik bir WhatsApp ilan konuşmasına benzeyen session"""
+    session = SessionState(user_id="bench-user", platform="whatsapp")
+    session.stage = ConversationStage.PREVIEW
+    session.intent = UserIntent.LISTING
+    session.product_info = {"product_type": "Araba", "brand": "Mercedes", "model": "C180", "year": 2018}
+    session.pricing = {"min_price": 850000, "max_price": 950000, "suggested_price": 900000}
+    session.listing_draft = {"title": "Sahibinden temiz Mercedes C180", "price": 900000}
+    for i in range(message_count):
+        role = "user" if i % 2 == 0 else "assistant"
+        session.add_message(role, f"Mesaj {i}: aracın kilometresi ve hasar kaydı hakkında bilgi verir misiniz?")
+    return session
+
+
+def timed(func, repeat: int) -> float:
+    """Ortalama süre (ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(repeat: int):
+    print("SESSION CODEC BENCHMARK")
+    print(f"json backend: {'orjson' if session_codec.orjson else 'json'}")
+    print("=" * 78)
+    print(f"{'messages':>8} | {'format':>7} | {'bytes':>9} | {'serialize ms':>12} | {'deserialize ms':>14}")
+    print("-" * 78)
+
+    for size in SIZES:
+        session = build_session(size)
+        reps = max(1, repeat // (size // 10 or 1))
+
+        pickled = pickle.dumps(session)
+        encoded = session_codec.encode(session.model_dump(mode="json"))
+
+        rows = [
+            ("pickle", pickled,
+             lambda: pickle.dumps(session),
+             lambda: pickle.loads(pickled)),
+            ("codec", encoded,
+             lambda: session_codec.encode(session.model_dump(mode="json")),
+             lambda: SessionState.model_validate(session_codec.decode(encoded))),
+        ]
+        for name, data, ser, de in rows:
+            print(f"{size:>8} | {name:>7} | {len(data):>9} | {timed(ser, reps):>12.3f} | {timed(de, reps):>14.3f}")
+        print("-" * 78)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.repeat)
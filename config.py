@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # OpenAI
@@ -19,6 +19,77 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", alias='HOST')
     port: int = Field(default=8000, alias='PORT')
     debug: bool = Field(default=True, alias='DEBUG')
+    # Sync agent/Supabase işleri için thread pool (event loop'u bloklamamak için)
+    agent_thread_pool_size: int = Field(default=200, alias='AGENT_THREAD_POOL_SIZE')
+    
+    # Session storage (file | memory | redis)
+    session_backend: str = Field(default="file", alias='SESSION_BACKEND')
+    session_dir: str = Field(default="sessions", alias='SESSION_DIR')
+    session_ttl_minutes: int = Field(default=30, alias='SESSION_TTL_MINUTES')
+    redis_url: Optional[str] = Field(default=None, alias='REDIS_URL')
+    session_cache_max_entries: int = Field(default=10000, alias='SESSION_CACHE_MAX_ENTRIES')
+    session_cache_max_mb: int = Field(default=256, alias='SESSION_CACHE_MAX_MB')
+    
+    # Aynı kullanıcıdan bu pencere içinde gelen mesajlar tek turn'de birleştirilir (0 = kapalı)
+    conversation_coalesce_window_ms: int = Field(default=0, alias='CONVERSATION_COALESCE_WINDOW_MS')
+    
+    # LLM response cache (temperature=0 prompt'lar; memory LRU + SQLite)
+    llm_cache_enabled: bool = Field(default=True, alias='LLM_CACHE_ENABLED')
+    llm_cache_path: str = Field(default="cache/llm_cache.sqlite", alias='LLM_CACHE_PATH')
+    llm_cache_memory_entries: int = Field(default=2048, alias='LLM_CACHE_MEMORY_ENTRIES')
+    
+    # Embedding cache + batching
+    embedding_cache_path: str = Field(default="cache/embeddings.sqlite", alias='EMBEDDING_CACHE_PATH')
+    embedding_cache_memory_entries: int = Field(default=10000, alias='EMBEDDING_CACHE_MEMORY_ENTRIES')
+    embedding_cache_codec: str = Field(default="float16", alias='EMBEDDING_CACHE_CODEC')  # float16 | int8
+    embedding_batch_window_ms: int = Field(default=10, alias='EMBEDDING_BATCH_WINDOW_MS')
+    
+    # Process içi ANN index (product_embeddings; kapalıyken her arama match_products RPC'ye gider)
+    vector_index_enabled: bool = Field(default=False, alias='VECTOR_INDEX_ENABLED')
+    vector_index_nprobe: int = Field(default=8, alias='VECTOR_INDEX_NPROBE')
+    vector_index_refresh_minutes: int = Field(default=15, alias='VECTOR_INDEX_REFRESH_MINUTES')
+    
+    # Span tracing (none | console | file | otel) - bkz. utils/tracing.py
+    tracing_exporter: str = Field(default="none", alias='TRACING_EXPORTER')
+    tracing_file_path: str = Field(default="logs/traces.jsonl", alias='TRACING_FILE_PATH')
+    
+    # Prometheus /metrics (route, agent, LLM, Supabase histogramları)
+    metrics_enabled: bool = Field(default=True, alias='METRICS_ENABLED')
+    
+    # Token/maliyet muhasebesi (/metrics/costs) - periyodik flush COST_LOG_PATH'e JSONL
+    cost_tracking_enabled: bool = Field(default=True, alias='COST_TRACKING_ENABLED')
+    usd_try_rate: float = Field(default=41.0, alias='USD_TRY_RATE')
+    cost_log_path: str = Field(default="logs/costs.jsonl", alias='COST_LOG_PATH')
+    cost_flush_minutes: int = Field(default=5, alias='COST_FLUSH_MINUTES')
+    cost_max_users: int = Field(default=10000, alias='COST_MAX_USERS')
+    
+    # Yerel intent modeli (utils/intent_model.py) - eşik altı tahminler LLM'e gider
+    intent_model_enabled: bool = Field(default=True, alias='INTENT_MODEL_ENABLED')
+    intent_model_path: str = Field(default="cache/intent_model.npz", alias='INTENT_MODEL_PATH')
+    intent_model_threshold: float = Field(default=0.6, alias='INTENT_MODEL_THRESHOLD')
+    
+    # Prompt'taki konuşma geçmişi: son N mesaj aynen + kayan özet, agent başına token bütçesi
+    history_verbatim_messages: int = Field(default=8, alias='HISTORY_VERBATIM_MESSAGES')
+    history_token_budget: int = Field(default=1200, alias='HISTORY_TOKEN_BUDGET')
+    history_token_budgets: Dict[str, int] = Field(default={"gathering_info": 600}, alias='HISTORY_TOKEN_BUDGETS')
+    history_summary_enabled: bool = Field(default=True, alias='HISTORY_SUMMARY_ENABLED')
+    history_summary_model: str = Field(default="gpt-4o-mini", alias='HISTORY_SUMMARY_MODEL')
+    history_summary_batch: int = Field(default=8, alias='HISTORY_SUMMARY_BATCH')
+
+    # LLM JSON çıktıları (utils/structured_output.py): json_schema | json_object | off
+    structured_output_mode: str = Field(default="json_schema", alias='STRUCTURED_OUTPUT_MODE')
+    structured_output_repair_enabled: bool = Field(default=True, alias='STRUCTURED_OUTPUT_REPAIR_ENABLED')
+    structured_output_repair_model: str = Field(default="gpt-4o-mini", alias='STRUCTURED_OUTPUT_REPAIR_MODEL')
+
+    # Model tiering (utils/model_policy.py): agent/görev karmaşıklığı + yük seviyesine göre model
+    model_policy_enabled: bool = Field(default=True, alias='MODEL_POLICY_ENABLED')
+    model_tier_premium: str = Field(default="gpt-4o", alias='MODEL_TIER_PREMIUM')
+    model_tier_economy: str = Field(default="gpt-4o-mini", alias='MODEL_TIER_ECONOMY')
+    model_policy_level: str = Field(default="auto", alias='MODEL_POLICY_LEVEL')
+    model_policy_elevated_inflight: int = Field(default=16, alias='MODEL_POLICY_ELEVATED_INFLIGHT')
+    model_policy_high_inflight: int = Field(default=48, alias='MODEL_POLICY_HIGH_INFLIGHT')
+    model_policy_hourly_budget_try: float = Field(default=0.0, alias='MODEL_POLICY_HOURLY_BUDGET_TRY')
+    model_policy_overrides: Dict[str, str] = Field(default={}, alias='MODEL_POLICY_OVERRIDES')
     
     # n8n (Zorunlu - WhatsApp bridge için)
     n8n_webhook_url: Optional[str] = Field(default=None, alias='N8N_WEBHOOK_URL')
@@ -0,0 +1,91 @@
+"""
+Yerel intent modeli değerlendirmesi (utils/intent_model.py)
+
+data/intent_training.json üzerinde stratified k-fold cross-validation:
+- eşik başına kapsama (yerelde cevaplanan turn oranı) ve kapsanan turn doğruluğu
+- etiket başına precision / recall (eşiksiz)
+- tahmin gecikmesi (p50 / p99) - referans: gpt-4o router çağrısı ~1-2 sn
+
+Kullanım:
+    python eval_intent_model.py
+    python eval_intent_model.py --folds 10 --thresholds 0.5 0.6 0.7
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from utils.intent_model import TRAINING_DATA, IntentModel, load_examples
+
+
+def stratified_folds(labels, k, seed):
+    by_label = defaultdict(list)
+    for index, label in enumerate(labels):
+        by_label[label].append(index)
+    rng = random.Random(seed)
+    folds = [[] for _ in range(k)]
+    position = 0
+    for label in sorted(by_label):
+        indices = by_label[label]
+        rng.shuffle(indices)
+        for index in indices:
+            folds[position % k].append(index)
+            position += 1
+    return folds
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=TRAINING_DATA)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 0.4, 0.5, 0.6, 0.7, 0.8])
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    texts = [row["text"] for row in examples]
+    labels = [row["intent"] for row in examples]
+
+    results = []  # (gerçek, tahmin)
+    latencies = []
+    train_ms = []
+    for fold in stratified_folds(labels, args.folds, args.seed):
+        held_out = set(fold)
+        train = [i for i in range(len(texts)) if i not in held_out]
+        started = time.perf_counter()
+        model = IntentModel.train([texts[i] for i in train], [labels[i] for i in train])
+        train_ms.append((time.perf_counter() - started) * 1000)
+        for index in fold:
+            started = time.perf_counter()
+            prediction = model.predict(texts[index])
+            latencies.append((time.perf_counter() - started) * 1e6)
+            results.append((labels[index], prediction))
+
+    print(f"{len(examples)} örnek, {args.folds}-fold CV, fold başına eğitim {sum(train_ms) / len(train_ms):.0f} ms")
+    print("-" * 60)
+    print(f"{'eşik':>6} {'kapsama':>9} {'doğruluk':>9}   (altı LLM'e gider)")
+    for threshold in args.thresholds:
+        covered = [(gold, p) for gold, p in results if p.confidence >= threshold]
+        accuracy = sum(gold == p.label for gold, p in covered) / max(1, len(covered))
+        print(f"{threshold:>6.2f} {len(covered) / len(results):>9.1%} {accuracy:>9.1%}")
+
+    print("-" * 60)
+    print(f"{'etiket':<22} {'precision':>9} {'recall':>8} {'n':>5}")
+    for label in sorted(set(labels)):
+        predicted = [gold for gold, p in results if p.label == label]
+        actual = [p for gold, p in results if gold == label]
+        precision = sum(gold == label for gold in predicted) / max(1, len(predicted))
+        recall = sum(p.label == label for p in actual) / max(1, len(actual))
+        print(f"{label:<22} {precision:>9.1%} {recall:>8.1%} {len(actual):>5}")
+
+    print("-" * 60)
+    print(f"tahmin gecikmesi: p50 {percentile(latencies, 0.5):.0f} µs, p99 {percentile(latencies, 0.99):.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
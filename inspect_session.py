@@ -1,6 +1,7 @@
-import pickle
+from models.conversation_state import SessionManager
 
-s = pickle.load(open('sessions/session__905551234567.pkl', 'rb'))
+manager = SessionManager()
+s = manager.get_session('+905551234567')
 print('Stage:', s.stage)
 print('Intent:', s.intent)
 print('Product:', s.product_info)
@@ -1,10 +1,23 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from models.schemas import ListingRequest, AgentResponse, SearchRequest
 from workflows.listing_flow_enhanced import create_enhanced_listing_workflow
+from agents.registry import (
+    get_conversation_agent,
+    get_help_agent,
+    get_search_agent,
+    get_order_agent
+)
 from utils.logger import setup_logger
+from utils.conversation_gate import get_conversation_gate
+from utils import tracing, cost_tracker, metrics, token_stream, intent_engine
+from starlette.routing import Match
 from config import get_settings
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 import uvicorn
 
 # Settings ve logger
@@ -31,6 +44,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """
+    Her isteğe request id (X-Request-ID ya da yeni uuid) ata; workflow node, LLM ve
+    Supabase span'ları bu id ile ilişkilendirilir. Id response header'ında döner.
+    Route bazlı latency/hata metrikleri de burada kaydedilir.
+    """
+    request_id = request.headers.get("x-request-id") or tracing.new_request_id()
+    token = tracing.set_request_id(request_id)
+    route = route_template(request)
+    cost_tokens = cost_tracker.bind(endpoint=route)
+    started = time.perf_counter()
+    status = 500
+    try:
+        with tracing.span(f"http {request.method} {request.url.path}", **{"http.method": request.method}) as root:
+            response = await call_next(request)
+            status = response.status_code
+            if root is not None:
+                root.set_attributes(**{"http.status_code": status})
+    finally:
+        cost_tracker.reset(cost_tokens)
+        tracing.reset_request_id(token)
+        if settings.metrics_enabled:
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - started, route, request.method, status)
+            if status >= 500:
+                metrics.HTTP_ERRORS.inc(route)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+def route_template(request: Request) -> str:
+    """/api/listings/123/images -> /api/listings/{listing_id}/images (metrik kardinalitesi için)"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+def _live_sessions() -> int:
+    from models.conversation_state import session_manager
+    return len(session_manager.sessions)
+
+def _vector_index_size():
+    from utils.vector_index import get_vector_index
+    index = get_vector_index()
+    return len(index) if index is not None else None
+
+def _model_policy_level() -> int:
+    from utils.model_policy import LEVELS, get_model_policy
+    return LEVELS.index(get_model_policy().load_level())
+
+# Scrape anında hesaplanan gauge'lar
+metrics.REGISTRY.gauge("megapazar_sessions_live", "Sessions resident in the memory cache", _live_sessions)
+metrics.REGISTRY.gauge("megapazar_conversations_active_users", "Users with an in-flight /conversation turn",
+                       lambda: get_conversation_gate().active_users())
+metrics.REGISTRY.gauge("megapazar_vector_index_size", "Vectors in the local ANN index", _vector_index_size)
+metrics.REGISTRY.gauge("megapazar_model_policy_level", "Model tiering load level (0 normal, 1 elevated, 2 high)", _model_policy_level)
+
 # Enhanced Workflow başlat
 try:
     listing_workflow = create_enhanced_listing_workflow()
@@ -48,12 +118,34 @@ try:
 except Exception as e:
     logger.warning(f"⚠️ Background tasks initialization failed: {str(e)}")
 
+@app.on_event("startup")
+async def startup_event():
+    """Sync agent'lar için geniş thread pool (asyncio.to_thread varsayılanı ~32 worker)"""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(
+        max_workers=settings.agent_thread_pool_size,
+        thread_name_prefix="agent"
+    ))
+    logger.info(f"✅ Agent thread pool: {settings.agent_thread_pool_size} workers")
+    
+    # Vector index'i arka planda ısıt (hazır olana kadar aramalar RPC'ye düşer)
+    if settings.vector_index_enabled:
+        from utils.background_tasks import refresh_vector_index
+        loop.run_in_executor(None, refresh_vector_index)
+    
+    # Yerel intent modeli (kayıtlı model yoksa burada eğitilir, ilk turn beklemesin)
+    if settings.intent_model_enabled:
+        from utils.intent_model import get_intent_model
+        loop.run_in_executor(None, get_intent_model)
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Uygulama kapanırken cleanup"""
     if scheduler:
         scheduler.shutdown()
         logger.info("Background tasks stopped")
+    if settings.cost_tracking_enabled:
+        cost_tracker.get_cost_tracker().flush()
 
 @app.get("/")
 async def root():
@@ -85,10 +177,7 @@ async def test_simple_endpoint(request: dict):
         user_id = request.get("user_id", "unknown")
         message = request.get("message", "")
         
-        msg_lower = message.lower()
-        listing_keywords = ["ilan ver", "ilan vereceğim", "satmak istiyorum", "satacağım", "satış yap"]
-        
-        if any(keyword in msg_lower for keyword in listing_keywords):
+        if intent_engine.match(message).has("listing_phrase"):
             return {
                 "message": "✅ Intent: LISTING detected!",
                 "intent": "listing",
@@ -108,15 +197,65 @@ async def test_simple_endpoint(request: dict):
 async def clear_session(user_id: str):
     """Debug endpoint to clear a session"""
     from models.conversation_state import session_manager
-    session_file = session_manager._get_session_file(user_id)
-    if session_file.exists():
-        session_file.unlink()
-    if user_id in session_manager.sessions:
-        del session_manager.sessions[user_id]
+    session_manager.delete_session(user_id)
     return {"message": f"Session cleared for {user_id}"}
 
+@app.get("/debug/session-cache")
+def session_cache_stats():
+    """Session memory cache metrikleri (hits, misses, evictions, resident bytes)"""
+    from models.conversation_state import session_manager
+    return session_manager.sessions.stats()
+
+@app.get("/debug/llm-cache")
+def llm_cache_stats():
+    """LLM response cache metrikleri (namespace bazlı hit/miss, hit rate)"""
+    from utils.llm_cache import get_llm_cache_backend
+    return get_llm_cache_backend().stats()
+
+@app.get("/debug/embedding-cache")
+def embedding_cache_stats():
+    """Embedding servisi metrikleri (API çağrıları, cache hit/miss)"""
+    from utils.embeddings import get_embedding_service
+    return get_embedding_service().stats()
+
+@app.get("/debug/history-summary")
+def history_summary_stats():
+    """Konuşma geçmişi özetleyicisi (bekleyen/hazır özetler, üretilen/başarısız)"""
+    from utils.history_manager import get_history_manager
+    return get_history_manager().stats()
+
+@app.get("/debug/model-policy")
+def model_policy_state():
+    """Model tiering: yük seviyesi, sinyaller ve agent/görev başına seçilen model"""
+    from utils.model_policy import get_model_policy
+    return get_model_policy().describe()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text format: route/agent/LLM/Supabase histogramları, hata ve fallback sayaçları, gauge'lar"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/costs")
+def cost_metrics(top: int = Query(20, ge=1, le=500)):
+    """Token/maliyet muhasebesi: agent, endpoint, user_id ve model bazlı (maliyete göre ilk `top`)"""
+    return cost_tracker.get_cost_tracker().snapshot(top=top)
+
+@app.get("/debug/vector-index")
+def vector_index_stats():
+    """Yerel ANN index durumu (ready, boyut, IVF küme sayısı)"""
+    from utils.vector_index import get_vector_index
+    vector_index = get_vector_index()
+    return vector_index.stats() if vector_index is not None else {"enabled": False}
+
 @app.post("/conversation", response_class=UTF8JSONResponse)
-async def conversation_endpoint(request: dict):
+async def conversation_endpoint(
+    request: dict,
+    conversation_agent=Depends(get_conversation_agent),
+    help_agent=Depends(get_help_agent),
+    search_agent=Depends(get_search_agent)
+):
     """
     n8n WhatsApp Bridge endpoint
     Multi-turn conversation handler with session persistence
@@ -130,185 +269,182 @@ async def conversation_endpoint(request: dict):
         user_id = request.get("user_id", "unknown")
         message = request.get("message", "")
         platform = request.get("platform", "whatsapp")
-        
-        logger.info(f"📞 Conversation from {user_id}: {message[:50]}...")
-        
-        try:
-            # Enhanced Conversation Agent kullan (multi-turn + session management)
-            from agents.conversation_enhanced import EnhancedConversationAgent
-            from agents.help import HelpAgent
-            from models.conversation_state import session_manager, ConversationStage, UserIntent
-            logger.info("✅ Imports successful")
-        except Exception as import_error:
-            logger.error(f"❌ Import error: {str(import_error)}")
-            logger.exception(import_error)
-            raise
-        
-        # Session kontrolü
-        logger.info("🔄 Getting or creating session...")
-        session = session_manager.get_or_create_session(user_id, platform)
-        logger.info(f"📋 Session stage: {session.stage}, Intent: {session.intent}")
-        logger.info(f"📜 Conversation history: {len(session.conversation_history)} messages")
-        
-        # BASIT INTENT DETECTION (agent çağırmadan önce)
-        msg_lower = message.lower()
-        detected_intent = "unknown"
-        
-        listing_keywords = ["ilan ver", "ilan vereceğim", "satmak istiyorum", "satacağım", "satış yap"]
-        if any(keyword in msg_lower for keyword in listing_keywords):
-            detected_intent = "listing"
-            logger.info(f"🎯 Quick intent detection: LISTING")
-        
-        # State hazırla (session'dan tüm bilgileri aktar)
-        conv_state = {
-            "user_id": user_id,
-            "message": message,
-            "platform": platform,
-            "image_url": session.image_url or "",
-            "intent": detected_intent,  # Basit intent detection sonucu
-            "response_type": "",
-            "session_state": session.dict(),
-            "conversation_history": session.conversation_history,  # GEÇMİŞ MESAJLAR
-            "product_info": session.product_info or {},
-            "internal_stats": session.internal_stats or {},
-            "external_stats": session.external_stats or {},
-            "pricing": session.pricing or {},
-            "listing_draft": session.listing_draft or {},
-            "user_price": session.user_price_preference or 0.0,
-            "edit_field": "",
-            "ai_response": "",
-            "missing_fields": session.missing_fields or []
-        }
-        
-        # EnhancedConversationAgent çalıştır
-        logger.info("🤖 Calling EnhancedConversationAgent...")
-        conversation_agent = EnhancedConversationAgent()
-        logger.info("✅ Agent created, invoking...")
-        result = conversation_agent(conv_state)
-        logger.info(f"✅ Agent returned - response_type: {result.get('response_type')}, intent: {result.get('intent')}")
-        
-        response_type = result.get("response_type", "conversation")
-        intent = result.get("intent", "unknown")
-        ai_response = result.get("ai_response", "")
-        
-        logger.info(f"🎯 Response type: {response_type}, Intent: {intent}")
-        
-        # Response type'a göre işlem yap
-        if response_type == "start_listing_flow":
-            # Workflow'a yönlendir
-            if not listing_workflow:
-                raise HTTPException(status_code=500, detail="Workflow not initialized")
+        tracing.set_attributes(**{"user_id": user_id, "platform": platform})
+        cost_tracker.bind(user_id=user_id)
+
+        # Aynı kullanıcının üst üste gelen mesajları sırayla işlenir (opsiyonel: tek turn'de birleştirilir)
+        async with get_conversation_gate().turn(user_id, message) as user_turn:
+            if user_turn.coalesced:
+                logger.info(f"🧩 Message from {user_id} merged into the pending turn")
+                return {
+                    "message": "",
+                    "intent": "coalesced",
+                    "response_type": "coalesced"
+                }
+            message = user_turn.message
             
-            logger.info("🚀 Starting listing workflow...")
+            # Turn boyunca session yazımları biriktirilir, sonunda tek seferde flush edilir
+            from models.conversation_state import session_manager
+            async with session_manager.aturn():
+                logger.info(f"📞 Conversation from {user_id}: {message[:50]}...")
+
+                # Session kontrolü
+                logger.info("🔄 Getting or creating session...")
+                session = await asyncio.to_thread(session_manager.get_or_create_session, user_id, platform)
+                logger.info(f"📋 Session stage: {session.stage}, Intent: {session.intent}")
+                logger.info(f"📜 Conversation history: {len(session.conversation_history)} messages")
+        
+                # BASIT INTENT DETECTION (agent çağırmadan önce)
+                detected_intent = "unknown"
+        
+                if intent_engine.match(message).has("listing_phrase"):
+                    detected_intent = "listing"
+                    logger.info(f"🎯 Quick intent detection: LISTING")
+        
+                # State hazırla (session'dan tüm bilgileri aktar)
+                conv_state = {
+                    "user_id": user_id,
+                    "message": message,
+                    "platform": platform,
+                    "image_url": session.image_url or "",
+                    "intent": detected_intent,  # Basit intent detection sonucu
+                    "response_type": "",
+                    "session_state": session.dict(),
+                    "conversation_history": session.conversation_history,  # GEÇMİŞ MESAJLAR
+                    "product_info": session.product_info or {},
+                    "internal_stats": session.internal_stats or {},
+                    "external_stats": session.external_stats or {},
+                    "pricing": session.pricing or {},
+                    "listing_draft": session.listing_draft or {},
+                    "user_price": session.user_price_preference or 0.0,
+                    "edit_field": "",
+                    "ai_response": "",
+                    "missing_fields": session.missing_fields or []
+                }
+        
+                # EnhancedConversationAgent çalıştır (registry'den paylaşılan instance)
+                logger.info("🤖 Calling EnhancedConversationAgent...")
+                result = await conversation_agent.acall(conv_state)
+                logger.info(f"✅ Agent returned - response_type: {result.get('response_type')}, intent: {result.get('intent')}")
+        
+                response_type = result.get("response_type", "conversation")
+                intent = result.get("intent", "unknown")
+                ai_response = result.get("ai_response", "")
+        
+                logger.info(f"🎯 Response type: {response_type}, Intent: {intent}")
+        
+                # Response type'a göre işlem yap
+                if response_type == "start_listing_flow":
+                    # Workflow'a yönlendir
+                    if not listing_workflow:
+                        raise HTTPException(status_code=500, detail="Workflow not initialized")
             
-            # Workflow state
-            workflow_state = {
-                "user_id": user_id,
-                "message": message,
-                "image_url": "",
-                "platform": platform,
-                "user_location": "",
-                "intent": intent,
-                "response_type": "",
-                "session_state": result.get("session_state", {}),
-                "conversation_history": result.get("conversation_history", []),
-                "product_info": result.get("product_info", {}),
-                "internal_stats": {},
-                "external_stats": {},
-                "pricing": {},
-                "listing_draft": {},
-                "user_price": 0.0,
-                "edit_field": "",
-                "ai_response": ""
-            }
+                    logger.info("🚀 Starting listing workflow...")
             
-            # Workflow çalıştır
-            workflow_result = listing_workflow.invoke(workflow_state)
+                    # Workflow state
+                    workflow_state = {
+                        "user_id": user_id,
+                        "message": message,
+                        "image_url": "",
+                        "platform": platform,
+                        "user_location": "",
+                        "intent": intent,
+                        "response_type": "",
+                        "session_state": result.get("session_state", {}),
+                        "conversation_history": result.get("conversation_history", []),
+                        "product_info": result.get("product_info", {}),
+                        "internal_stats": {},
+                        "external_stats": {},
+                        "pricing": {},
+                        "listing_draft": {},
+                        "user_price": 0.0,
+                        "edit_field": "",
+                        "ai_response": ""
+                    }
             
-            return {
-                "message": workflow_result.get("ai_response", "İlan hazırlanıyor..."),
-                "intent": intent,
-                "response_type": workflow_result.get("response_type"),
-                "data": workflow_result.get("listing_draft")
-            }
-        
-        elif response_type == "start_search_flow":
-            # Search agent
-            from agents.buyer_search import BuyerSearchAgent
+                    # Workflow çalıştır
+                    workflow_result = await listing_workflow.ainvoke(workflow_state)
             
-            search_agent = BuyerSearchAgent()
-            search_state = {
-                "search_query": message,
-                "search_filters": {}
-            }
+                    return {
+                        "message": workflow_result.get("ai_response", "İlan hazırlanıyor..."),
+                        "intent": intent,
+                        "response_type": workflow_result.get("response_type"),
+                        "data": workflow_result.get("listing_draft")
+                    }
+        
+                elif response_type == "start_search_flow":
+                    # Search agent
+                    search_state = {
+                        "search_query": message,
+                        "search_filters": {}
+                    }
             
-            search_result = search_agent(search_state)
-            response_message = search_agent.format_results(search_result.get("search_results", []))
+                    search_result = await search_agent.acall(search_state)
+                    response_message = search_agent.format_results(search_result.get("search_results", []))
             
-            return {
-                "message": response_message,
-                "intent": "search",
-                "count": search_result.get("search_count", 0)
-            }
-        
-        elif response_type == "question_response":
-            # Soru cevabı - HelpAgent kullan
-            help_agent = HelpAgent()
-            help_result = help_agent(result)
+                    return {
+                        "message": response_message,
+                        "intent": "search",
+                        "count": search_result.get("search_count", 0)
+                    }
+        
+                elif response_type == "question_response":
+                    # Soru cevabı - HelpAgent kullan
+                    help_result = await help_agent.acall(result)
             
-            return {
-                "message": help_result.get("ai_response"),
-                "intent": "help"
-            }
-        
-        elif response_type == "ready_to_confirm":
-            # İlan onay aşaması
-            return {
-                "message": ai_response,
-                "intent": "confirming",
-                "data": result.get("listing_draft")
-            }
-        
-        elif response_type == "reprice_listing":
-            # Fiyat değişikliği - workflow'a git
-            if not listing_workflow:
-                raise HTTPException(status_code=500, detail="Workflow not initialized")
+                    return {
+                        "message": help_result.get("ai_response"),
+                        "intent": "help"
+                    }
+        
+                elif response_type == "ready_to_confirm":
+                    # İlan onay aşaması
+                    return {
+                        "message": ai_response,
+                        "intent": "confirming",
+                        "data": result.get("listing_draft")
+                    }
+        
+                elif response_type == "reprice_listing":
+                    # Fiyat değişikliği - workflow'a git
+                    if not listing_workflow:
+                        raise HTTPException(status_code=500, detail="Workflow not initialized")
             
-            workflow_state = {
-                "user_id": user_id,
-                "message": message,
-                "image_url": "",
-                "platform": platform,
-                "user_location": "",
-                "intent": "listing",
-                "response_type": "reprice_listing",
-                "session_state": result.get("session_state", {}),
-                "conversation_history": result.get("conversation_history", []),
-                "product_info": result.get("product_info", {}),
-                "internal_stats": result.get("internal_stats", {}),
-                "external_stats": result.get("external_stats", {}),
-                "pricing": result.get("pricing", {}),
-                "listing_draft": result.get("listing_draft", {}),
-                "user_price": result.get("user_price", 0.0),
-                "edit_field": "",
-                "ai_response": ""
-            }
+                    workflow_state = {
+                        "user_id": user_id,
+                        "message": message,
+                        "image_url": "",
+                        "platform": platform,
+                        "user_location": "",
+                        "intent": "listing",
+                        "response_type": "reprice_listing",
+                        "session_state": result.get("session_state", {}),
+                        "conversation_history": result.get("conversation_history", []),
+                        "product_info": result.get("product_info", {}),
+                        "internal_stats": result.get("internal_stats", {}),
+                        "external_stats": result.get("external_stats", {}),
+                        "pricing": result.get("pricing", {}),
+                        "listing_draft": result.get("listing_draft", {}),
+                        "user_price": result.get("user_price", 0.0),
+                        "edit_field": "",
+                        "ai_response": ""
+                    }
             
-            workflow_result = listing_workflow.invoke(workflow_state)
+                    workflow_result = await listing_workflow.ainvoke(workflow_state)
             
-            return {
-                "message": workflow_result.get("ai_response"),
-                "intent": "listing",
-                "data": workflow_result.get("listing_draft")
-            }
-        
-        else:
-            # Normal conversation response
-            return {
-                "message": ai_response,
-                "intent": intent,
-                "response_type": response_type
-            }
+                    return {
+                        "message": workflow_result.get("ai_response"),
+                        "intent": "listing",
+                        "data": workflow_result.get("listing_draft")
+                    }
+        
+                else:
+                    # Normal conversation response
+                    return {
+                        "message": ai_response,
+                        "intent": intent,
+                        "response_type": response_type
+                    }
         
     except Exception as e:
         logger.error(f"❌ Conversation error: {str(e)}")
@@ -331,55 +467,110 @@ async def start_listing(request: ListingRequest):
     - user_location: Opsiyonel konum
     """
     try:
-        logger.info(f"📝 New listing request from user: {request.user_id}")
-        logger.info(f"💬 Message: {request.message}")
-        
-        if not listing_workflow:
-            raise HTTPException(status_code=500, detail="Workflow not initialized")
-        
-        # Initial state (enhanced)
-        initial_state = {
-            "user_id": request.user_id,
-            "message": request.message,
-            "image_url": request.image_url or "",
-            "platform": request.platform,
-            "user_location": request.user_location or "",
-            "intent": "",
-            "response_type": "",
-            "session_state": {},
-            "conversation_history": [],
-            "product_info": {},
-            "internal_stats": {},
-            "external_stats": {},
-            "pricing": {},
-            "listing_draft": {},
-            "user_price": 0.0,
-            "edit_field": "",
-            "ai_response": ""
-        }
-        
-        # Workflow çalıştır
-        logger.info("🚀 Running enhanced listing workflow...")
-        result = listing_workflow.invoke(initial_state)
-        
-        # Response oluştur
-        response = AgentResponse(
-            type=result.get("response_type", "conversation"),
-            message=result.get("ai_response", ""),
-            data=result.get("listing_draft") if result.get("listing_draft") else None,
-            next_action="await_user_input"
-        )
-        
-        logger.info(f"✅ Listing flow completed: {response.type}")
-        return response
+        async with get_conversation_gate().turn(request.user_id, request.message, coalesce=False):
+            from models.conversation_state import session_manager
+            async with session_manager.aturn():
+                logger.info(f"📝 New listing request from user: {request.user_id}")
+                logger.info(f"💬 Message: {request.message}")
+        
+                if not listing_workflow:
+                    raise HTTPException(status_code=500, detail="Workflow not initialized")
+        
+                # Initial state (enhanced)
+                initial_state = {
+                    "user_id": request.user_id,
+                    "message": request.message,
+                    "image_url": request.image_url or "",
+                    "platform": request.platform,
+                    "user_location": request.user_location or "",
+                    "intent": "",
+                    "response_type": "",
+                    "session_state": {},
+                    "conversation_history": [],
+                    "product_info": {},
+                    "internal_stats": {},
+                    "external_stats": {},
+                    "pricing": {},
+                    "listing_draft": {},
+                    "user_price": 0.0,
+                    "edit_field": "",
+                    "ai_response": ""
+                }
+        
+                # Workflow çalıştır
+                logger.info("🚀 Running enhanced listing workflow...")
+                result = await listing_workflow.ainvoke(initial_state)
+        
+                # Response oluştur
+                response = AgentResponse(
+                    type=result.get("response_type", "conversation"),
+                    message=result.get("ai_response", ""),
+                    data=result.get("listing_draft") if result.get("listing_draft") else None,
+                    next_action="await_user_input"
+                )
+        
+                logger.info(f"✅ Listing flow completed: {response.type}")
+                return response
         
     except Exception as e:
         logger.error(f"❌ Listing flow error: {str(e)}")
         logger.exception(e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_response(run) -> StreamingResponse:
+    """
+    run() coroutine'ini TokenStream bağlı bir task'ta başlat ve SSE olarak aktar:
+    start -> token* (writer / conversation LLM) -> done (normal endpoint cevabı) | error.
+    Client bağlantıyı kesse de task tamamlanır (draft session'a yine kaydedilir).
+    """
+    stream = token_stream.TokenStream()
+    request_id = tracing.get_request_id()
+    context_token = token_stream.bind(stream)
+    try:
+        task = asyncio.create_task(run())
+    finally:
+        token_stream.reset(context_token)
+    task.add_done_callback(lambda _: stream.close())
+    
+    async def body():
+        yield token_stream.format_sse("start", {"request_id": request_id})
+        async for event, data in stream.events():
+            yield token_stream.format_sse(event, data)
+        try:
+            result = task.result()
+        except HTTPException as e:
+            yield token_stream.format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"❌ Stream error: {str(e)}")
+            yield token_stream.format_sse("error", {"status_code": 500, "detail": str(e)})
+        else:
+            yield token_stream.format_sse("done", jsonable_encoder(result))
+    
+    return StreamingResponse(body(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # proxy buffering kapalı (nginx)
+    })
+
+@app.post("/conversation/stream")
+async def conversation_stream_endpoint(
+    request: dict,
+    conversation_agent=Depends(get_conversation_agent),
+    help_agent=Depends(get_help_agent),
+    search_agent=Depends(get_search_agent)
+):
+    """
+    /conversation'ın SSE varyantı (web platformu): conversation ve ilan yazımı
+    LLM token'ları geldikçe gönderilir, son event /conversation cevabıdır.
+    """
+    return sse_response(lambda: conversation_endpoint(request, conversation_agent, help_agent, search_agent))
+
+@app.post("/api/listing/start/stream")
+async def start_listing_stream(request: ListingRequest):
+    """/api/listing/start'ın SSE varyantı: başlık/açıklama yazılırken stream edilir"""
+    return sse_response(lambda: start_listing(request))
+
 @app.post("/api/listing/confirm")
-async def confirm_listing(listing_data: dict):
+def confirm_listing(listing_data: dict):
     """
     İlanı onayla ve Supabase'e kaydet
     
@@ -425,17 +616,11 @@ async def confirm_listing(listing_data: dict):
         
         # Embedding oluştur ve kaydet
         try:
-            from utils.openai_client import get_openai_client
+            from utils.embeddings import get_embedding_service
             
             # Title + description ile embedding oluştur
             text_for_embedding = f"{listing_info.get('title')} {listing_info.get('description')}"
-            client = get_openai_client()
-            
-            embedding_response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text_for_embedding
-            )
-            embedding = embedding_response.data[0].embedding
+            embedding = get_embedding_service().embed(text_for_embedding)
             
             # product_embeddings tablosuna kaydet
             supabase.table('product_embeddings').insert({
@@ -443,6 +628,12 @@ async def confirm_listing(listing_data: dict):
                 "embedding": embedding
             }).execute()
             
+            # Yerel ANN index'e de ekle (açıksa; diğer replica'lar periyodik refresh ile alır)
+            from utils.vector_index import get_vector_index
+            vector_index = get_vector_index()
+            if vector_index is not None:
+                vector_index.upsert(listing_id, embedding)
+            
             logger.info(f"✅ Embedding created for listing {listing_id}")
         except Exception as e:
             logger.warning(f"⚠️ Failed to create embedding: {str(e)}")
@@ -478,7 +669,7 @@ async def test_agents():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/listings/{listing_id}/images")
-async def get_listing_images_endpoint(listing_id: str):
+def get_listing_images_endpoint(listing_id: str):
     """
     İlanın resimlerini getir
     """
@@ -498,7 +689,7 @@ async def get_listing_images_endpoint(listing_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/listings/{listing_id}/images/upload-from-url")
-async def upload_image_endpoint(listing_id: str, image_url: str, is_primary: bool = False):
+def upload_image_endpoint(listing_id: str, image_url: str, is_primary: bool = False):
     """
     URL'den resim yükle
     
@@ -531,7 +722,7 @@ async def upload_image_endpoint(listing_id: str, image_url: str, is_primary: boo
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/listing/{listing_id}")
-async def update_listing(listing_id: str, request: dict):
+def update_listing(listing_id: str, request: dict):
     """
     İlan güncelle
     
@@ -594,7 +785,7 @@ async def update_listing(listing_id: str, request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/listing/{listing_id}")
-async def delete_listing(listing_id: str, user_id: str):
+def delete_listing(listing_id: str, user_id: str):
     """
     İlan sil (soft delete)
     
@@ -622,6 +813,11 @@ async def delete_listing(listing_id: str, user_id: str):
             'updated_at': 'now()'
         }).eq('id', listing_id).execute()
         
+        from utils.vector_index import get_vector_index
+        vector_index = get_vector_index()
+        if vector_index is not None:
+            vector_index.remove(listing_id)
+        
         logger.info(f"✅ Listing {listing_id} deleted (soft delete)")
         
         return {
@@ -638,7 +834,7 @@ async def delete_listing(listing_id: str, user_id: str):
 
 
 @app.get("/api/listings/my")
-async def get_my_listings(
+def get_my_listings(
     user_id: str = Query(..., description="User ID"),
     status: str = Query("active", description="Status filter: active/inactive/all")
 ):
@@ -682,7 +878,7 @@ async def get_my_listings(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/notifications")
-async def get_notifications(
+def get_notifications(
     user_id: str = Query(..., description="User ID"),
     unread_only: bool = Query(False, description="Only unread notifications"),
     limit: int = Query(50, description="Maximum number of notifications")
@@ -721,7 +917,7 @@ async def get_notifications(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/notifications/{notification_id}/mark-read")
-async def mark_notification_read(
+def mark_notification_read(
     notification_id: str,
     user_id: str = Query(..., description="User ID for ownership validation")
 ):
@@ -761,7 +957,7 @@ async def mark_notification_read(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/admin/check-prices")
-async def trigger_price_check():
+def trigger_price_check():
     """
     Manually trigger price check (admin endpoint)
     In production, add authentication
@@ -778,20 +974,22 @@ async def trigger_price_check():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/search")
-async def search_products(request: dict):
+async def search_products(request: dict, search_agent=Depends(get_search_agent)):
     """
     Search for products
     Request body:
         - user_id: str
         - query: str (e.g., "laptop 5000 TL altı")
         - filters: dict (optional, e.g., {"category": "Elektronik", "max_price": 5000})
+        - page: int (optional, 0'dan başlar)
+        - page_size: int (optional, varsayılan 20)
     """
     try:
-        from agents.buyer_search import BuyerSearchAgent
-        
         user_id = request.get("user_id")
         query = request.get("query", "")
         filters = request.get("filters", {})
+        page = max(int(request.get("page", 0)), 0)
+        page_size = min(max(int(request.get("page_size", 20)), 1), 50)
         
         if not query:
             raise HTTPException(status_code=400, detail="Query is required")
@@ -799,13 +997,14 @@ async def search_products(request: dict):
         logger.info(f"🔍 Search request from {user_id}: {query}")
         
         # Run search agent
-        search_agent = BuyerSearchAgent()
         state = {
             "search_query": query,
-            "search_filters": filters
+            "search_filters": filters,
+            "search_offset": page * page_size,
+            "search_limit": page_size
         }
         
-        result = search_agent(state)
+        result = await search_agent.acall(state)
         
         # Format response
         response_message = search_agent.format_results(result.get("search_results", []))
@@ -816,6 +1015,8 @@ async def search_products(request: dict):
             "filters": filters,
             "count": result.get("search_count", 0),
             "results": result.get("search_results", [])[:10],  # Top 10
+            "page": page,
+            "has_more": result.get("search_has_more", False),
             "message": response_message
         }
         
@@ -826,7 +1027,7 @@ async def search_products(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/order/create")
-async def create_order(request: dict):
+async def create_order(request: dict, order_agent=Depends(get_order_agent)):
     """
     Create an order
     Request body:
@@ -835,8 +1036,6 @@ async def create_order(request: dict):
         - quantity: int (optional, default: 1)
     """
     try:
-        from agents.order import OrderAgent
-        
         buyer_id = request.get("buyer_id")
         listing_id = request.get("listing_id")
         quantity = request.get("quantity", 1)
@@ -847,14 +1046,13 @@ async def create_order(request: dict):
         logger.info(f"📦 Order request: buyer={buyer_id}, listing={listing_id}, qty={quantity}")
         
         # Run order agent
-        order_agent = OrderAgent()
         state = {
             "buyer_id": buyer_id,
             "listing_id": listing_id,
             "quantity": quantity
         }
         
-        result = order_agent(state)
+        result = await order_agent.acall(state)
         
         if result.get("order_status") == "success":
             return {
@@ -876,12 +1074,13 @@ async def create_order(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/order/{order_id}")
-async def get_order(order_id: str, user_id: str = Query(..., description="User ID for auth")):
+def get_order(
+    order_id: str,
+    user_id: str = Query(..., description="User ID for auth"),
+    order_agent=Depends(get_order_agent)
+):
     """Get order details"""
     try:
-        from agents.order import OrderAgent
-        
-        order_agent = OrderAgent()
         order_data = order_agent.get_order_status(order_id)
         
         if not order_data:
@@ -0,0 +1,84 @@
+-- Create lexical search function (full-text + trigram) for hybrid search
+-- Model numaraları ("S23 Ultra", "C180") embedding'lerde zayıf eşleşir; bu fonksiyon
+-- başlık/açıklama üzerinde token ve trigram eşleşmesi yapar. BuyerSearchAgent
+-- sonuçları search_listings (vector) ile Reciprocal Rank Fusion ile birleştirir.
+--
+-- 'simple' config: Türkçe stemming yok, model numaraları olduğu gibi token'lanır.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_listings_fts
+    ON listings
+    USING gin (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')));
+
+CREATE INDEX IF NOT EXISTS idx_listings_title_trgm
+    ON listings
+    USING gin (title gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION search_listings_lexical(
+    query_text text,
+    match_count int DEFAULT 20,
+    match_offset int DEFAULT 0,
+    filter_category text DEFAULT NULL,
+    min_price numeric DEFAULT NULL,
+    max_price numeric DEFAULT NULL,
+    filter_location text DEFAULT NULL,
+    filter_condition text DEFAULT NULL
+)
+RETURNS TABLE (
+    id uuid,
+    user_id uuid,
+    title text,
+    description text,
+    category text,
+    price numeric,
+    stock int,
+    location text,
+    condition text,
+    image_url text,
+    status text,
+    created_at timestamp,
+    rank float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        l.id,
+        l.user_id,
+        l.title,
+        l.description,
+        l.category::text,
+        l.price::numeric,
+        l.stock,
+        l.location::text,
+        l.condition::text,
+        l.image_url,
+        l.status::text,
+        l.created_at,
+        (
+            ts_rank_cd(
+                to_tsvector('simple', coalesce(l.title, '') || ' ' || coalesce(l.description, '')),
+                websearch_to_tsquery('simple', query_text)
+            )
+            + word_similarity(query_text, l.title)
+        )::float AS rank
+    FROM listings l
+    WHERE l.status = 'active'
+      AND (
+          to_tsvector('simple', coalesce(l.title, '') || ' ' || coalesce(l.description, ''))
+              @@ websearch_to_tsquery('simple', query_text)
+          OR query_text <% l.title
+      )
+      AND (filter_category IS NULL OR l.category = filter_category)
+      AND (min_price IS NULL OR l.price >= min_price)
+      AND (max_price IS NULL OR l.price <= max_price)
+      AND (filter_location IS NULL OR l.location ILIKE '%' || filter_location || '%')
+      AND (filter_condition IS NULL OR l.condition = filter_condition)
+    ORDER BY rank DESC
+    LIMIT match_count
+    OFFSET match_offset;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION search_listings_lexical IS 'Full-text + trigram search over active listings (lexical side of hybrid search)';
@@ -0,0 +1,68 @@
+-- Create filtered vector search function (single round trip)
+-- match_products'tan farkı: listings join'i, status/kategori/fiyat/konum/durum
+-- filtreleri ve sayfalama aynı sorguda uygulanır. Filtreler top-k kesiminden
+-- ÖNCE uygulandığı için filtreli aramalarda sonuç sayısı eksik kalmaz.
+--
+-- Not: HNSW index varsayılan olarak hnsw.ef_search (40) aday döndürür; seçici
+-- filtrelerde pgvector >= 0.8 için oturumda hnsw.iterative_scan = relaxed_order
+-- açılması önerilir.
+
+CREATE OR REPLACE FUNCTION search_listings(
+    query_embedding vector(1536),
+    match_threshold float DEFAULT 0.3,
+    match_count int DEFAULT 20,
+    match_offset int DEFAULT 0,
+    filter_category text DEFAULT NULL,
+    min_price numeric DEFAULT NULL,
+    max_price numeric DEFAULT NULL,
+    filter_location text DEFAULT NULL,
+    filter_condition text DEFAULT NULL
+)
+RETURNS TABLE (
+    id uuid,
+    user_id uuid,
+    title text,
+    description text,
+    category text,
+    price numeric,
+    stock int,
+    location text,
+    condition text,
+    image_url text,
+    status text,
+    created_at timestamp,
+    similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        l.id,
+        l.user_id,
+        l.title,
+        l.description,
+        l.category::text,
+        l.price::numeric,
+        l.stock,
+        l.location::text,
+        l.condition::text,
+        l.image_url,
+        l.status::text,
+        l.created_at,
+        1 - (pe.embedding <=> query_embedding) AS similarity
+    FROM product_embeddings pe
+    JOIN listings l ON l.id = pe.listing_id
+    WHERE l.status = 'active'
+      AND 1 - (pe.embedding <=> query_embedding) > match_threshold
+      AND (filter_category IS NULL OR l.category = filter_category)
+      AND (min_price IS NULL OR l.price >= min_price)
+      AND (max_price IS NULL OR l.price <= max_price)
+      AND (filter_location IS NULL OR l.location ILIKE '%' || filter_location || '%')
+      AND (filter_condition IS NULL OR l.condition = filter_condition)
+    ORDER BY pe.embedding <=> query_embedding
+    LIMIT match_count
+    OFFSET match_offset;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION search_listings IS 'Filtered, paginated vector search over active listings (joins product_embeddings and listings)';
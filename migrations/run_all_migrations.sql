@@ -54,6 +54,146 @@ $$;
 
 COMMENT ON FUNCTION match_products IS 'Performs vector similarity search on product embeddings using cosine distance';
 
+-- MIGRATION 3: Create filtered search function (listings join + filtreler + sayfalama)
+-- ========================================
+CREATE OR REPLACE FUNCTION search_listings(
+    query_embedding vector(1536),
+    match_threshold float DEFAULT 0.3,
+    match_count int DEFAULT 20,
+    match_offset int DEFAULT 0,
+    filter_category text DEFAULT NULL,
+    min_price numeric DEFAULT NULL,
+    max_price numeric DEFAULT NULL,
+    filter_location text DEFAULT NULL,
+    filter_condition text DEFAULT NULL
+)
+RETURNS TABLE (
+    id uuid,
+    user_id uuid,
+    title text,
+    description text,
+    category text,
+    price numeric,
+    stock int,
+    location text,
+    condition text,
+    image_url text,
+    status text,
+    created_at timestamp,
+    similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        l.id,
+        l.user_id,
+        l.title,
+        l.description,
+        l.category::text,
+        l.price::numeric,
+        l.stock,
+        l.location::text,
+        l.condition::text,
+        l.image_url,
+        l.status::text,
+        l.created_at,
+        1 - (pe.embedding <=> query_embedding) AS similarity
+    FROM product_embeddings pe
+    JOIN listings l ON l.id = pe.listing_id
+    WHERE l.status = 'active'
+      AND 1 - (pe.embedding <=> query_embedding) > match_threshold
+      AND (filter_category IS NULL OR l.category = filter_category)
+      AND (min_price IS NULL OR l.price >= min_price)
+      AND (max_price IS NULL OR l.price <= max_price)
+      AND (filter_location IS NULL OR l.location ILIKE '%' || filter_location || '%')
+      AND (filter_condition IS NULL OR l.condition = filter_condition)
+    ORDER BY pe.embedding <=> query_embedding
+    LIMIT match_count
+    OFFSET match_offset;
+$$;
+
+COMMENT ON FUNCTION search_listings IS 'Filtered, paginated vector search over active listings (joins product_embeddings and listings)';
+
+-- MIGRATION 4: Create lexical search function (hybrid search: full-text + trigram)
+-- ========================================
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_listings_fts
+    ON listings
+    USING gin (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')));
+
+CREATE INDEX IF NOT EXISTS idx_listings_title_trgm
+    ON listings
+    USING gin (title gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION search_listings_lexical(
+    query_text text,
+    match_count int DEFAULT 20,
+    match_offset int DEFAULT 0,
+    filter_category text DEFAULT NULL,
+    min_price numeric DEFAULT NULL,
+    max_price numeric DEFAULT NULL,
+    filter_location text DEFAULT NULL,
+    filter_condition text DEFAULT NULL
+)
+RETURNS TABLE (
+    id uuid,
+    user_id uuid,
+    title text,
+    description text,
+    category text,
+    price numeric,
+    stock int,
+    location text,
+    condition text,
+    image_url text,
+    status text,
+    created_at timestamp,
+    rank float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        l.id,
+        l.user_id,
+        l.title,
+        l.description,
+        l.category::text,
+        l.price::numeric,
+        l.stock,
+        l.location::text,
+        l.condition::text,
+        l.image_url,
+        l.status::text,
+        l.created_at,
+        (
+            ts_rank_cd(
+                to_tsvector('simple', coalesce(l.title, '') || ' ' || coalesce(l.description, '')),
+                websearch_to_tsquery('simple', query_text)
+            )
+            + word_similarity(query_text, l.title)
+        )::float AS rank
+    FROM listings l
+    WHERE l.status = 'active'
+      AND (
+          to_tsvector('simple', coalesce(l.title, '') || ' ' || coalesce(l.description, ''))
+              @@ websearch_to_tsquery('simple', query_text)
+          OR query_text <% l.title
+      )
+      AND (filter_category IS NULL OR l.category = filter_category)
+      AND (min_price IS NULL OR l.price >= min_price)
+      AND (max_price IS NULL OR l.price <= max_price)
+      AND (filter_location IS NULL OR l.location ILIKE '%' || filter_location || '%')
+      AND (filter_condition IS NULL OR l.condition = filter_condition)
+    ORDER BY rank DESC
+    LIMIT match_count
+    OFFSET match_offset;
+$$;
+
+COMMENT ON FUNCTION search_listings_lexical IS 'Full-text + trigram search over active listings (lexical side of hybrid search)';
+
 -- ========================================
 -- Verify migrations
 -- ========================================
@@ -72,3 +212,19 @@ SELECT
         FROM pg_proc 
         WHERE proname='match_products'
     ) as exists;
+
+SELECT 
+    'search_listings' as function_name,
+    EXISTS (
+        SELECT 1 
+        FROM pg_proc 
+        WHERE proname='search_listings'
+    ) as exists;
+
+SELECT 
+    'search_listings_lexical' as function_name,
+    EXISTS (
+        SELECT 1 
+        FROM pg_proc 
+        WHERE proname='search_listings_lexical'
+    ) as exists;
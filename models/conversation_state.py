@@ -2,14 +2,20 @@
 Conversation State Management
 Kullanıcı oturumlarını ve conversation akışını yöneten state modeli
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from pydantic import BaseModel
 from enum import Enum
 from datetime import datetime
 import uuid
 import pickle
-import os
+import asyncio
 from pathlib import Path
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from models import session_codec
+from models.session_cache import SessionCache
+from models.session_store import SessionStore, FileSessionStore, create_session_store, safe_key
+from utils.history_manager import forget_session
 
 class ConversationStage(str, Enum):
     """Konuşma aşamaları"""
@@ -48,6 +54,9 @@ class SessionState(BaseModel):
     stage: ConversationStage = ConversationStage.INITIAL
     intent: UserIntent = UserIntent.UNKNOWN
     conversation_history: List[Dict[str, Any]] = []
+    # Prompt'a giden kayan özet: conversation_history[:summary_message_count] (bkz. utils/history_manager.py)
+    history_summary: str = ""
+    summary_message_count: int = 0
     
     # Product information
     product_info: Optional[Dict[str, Any]] = None
@@ -148,127 +157,293 @@ class SessionState(BaseModel):
         # conversation_history saklanır (geçmişi görmek için)
         self.updated_at = datetime.now()
 
+class SessionTurn:
+    """
+    Tek bir conversation turn'ü (request) için unit-of-work.
+    Turn boyunca update_session çağrıları sadece session'ı "dirty" işaretler,
+    turn sonunda her session bir kez yazılır.
+    """
+    def __init__(self):
+        self.dirty: Dict[str, SessionState] = {}
+        self.update_calls = 0
+
+# Aktif turn (request context'i; asyncio task'ları ve to_thread ile taşınır)
+_current_turn: ContextVar[Optional[SessionTurn]] = ContextVar("session_turn", default=None)
+
 class SessionManager:
     """
     Session yönetimi
-    Memory + File-based persistence (pickle)
+    Sınırlı LRU memory cache + pluggable SessionStore (file / memory / redis)
+    Expiry store tarafından yönetilir (TTL)
+    
+    Session header'ı (history hariç her şey) her kayıtta yeniden yazılır,
+    conversation_history ise append-only log'a sadece yeni mesajlar olarak eklenir.
     """
-    def __init__(self, persist_dir: str = "sessions"):
-        self.sessions: Dict[str, SessionState] = {}
+    def __init__(
+        self,
+        persist_dir: str = "sessions",
+        store: Optional[SessionStore] = None,
+        ttl_minutes: int = 30,
+        cache_max_entries: int = 10000,
+        cache_max_bytes: int = 256 * 1024 * 1024
+    ):
+        self.sessions = SessionCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
+        # user_id -> (log'daki geçerli mesaj sayısı, son kaydın byte'ları, log'un toplam byte'ı)
+        self._history_state: Dict[str, Tuple[int, bytes, int]] = {}
         self.persist_dir = Path(persist_dir)
-        self.persist_dir.mkdir(exist_ok=True)
+        self.store = store or FileSessionStore(persist_dir=persist_dir, ttl_seconds=ttl_minutes * 60)
     
     def _get_session_file(self, user_id: str) -> Path:
-        """Session dosya yolunu döndür"""
-        # Güvenli dosya adı (user_id'deki özel karakterleri temizle)
-        safe_id = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in user_id)
-        return self.persist_dir / f"session_{safe_id}.pkl"
-    
-    def _load_from_disk(self, user_id: str) -> Optional[SessionState]:
-        """Disk'ten session yükle"""
-        session_file = self._get_session_file(user_id)
-        if session_file.exists():
+        """Session dosya yolunu döndür (file backend)"""
+        if isinstance(self.store, FileSessionStore):
+            return self.store.path_for(user_id)
+        return self.persist_dir / f"session_{safe_key(user_id)}.pkl"
+    
+    def _serialize(self, session: SessionState) -> bytes:
+        """Session header'ı (conversation_history log'da tutulur)"""
+        header = session.model_dump(mode="json", exclude={"conversation_history"})
+        header["history_count"] = len(session.conversation_history)
+        return session_codec.encode(header)
+    
+    def _decode(self, data: bytes) -> Tuple[SessionState, Optional[int]]:
+        """(session, history_count) - eski formatlarda history header içindedir, count None"""
+        if session_codec.is_legacy_pickle(data):
+            # Eski pickle dosyaları okunur, bir sonraki kayıtta yeni formata geçer
+            return pickle.loads(data), None
+        payload = session_codec.decode(data)
+        history_count = payload.pop("history_count", None)
+        # model_validate __init__'i çağırmaz, timestamp'ler korunur
+        return SessionState.model_validate(payload), history_count
+    
+    def _deserialize(self, data: bytes) -> SessionState:
+        return self._decode(data)[0]
+    
+    def _load_history(self, user_id: str, history_count: int) -> List[Dict[str, Any]]:
+        """Log'dan ilk history_count mesajı oku (header'dan sonra yazılmış fazlalıklar atılır)"""
+        all_records = self.store.load_history(user_id)
+        records = all_records[:history_count]
+        history = []
+        for record in records:
             try:
-                with open(session_file, 'rb') as f:
-                    session = pickle.load(f)
-                
-                # Expired kontrolü
-                if session.is_expired():
-                    # Dosyayı sil
-                    session_file.unlink(missing_ok=True)
-                    return None
-                
-                return session
-            except Exception as e:
-                # Corrupt file, sil
-                session_file.unlink(missing_ok=True)
-                return None
-        return None
-    
-    def _save_to_disk(self, session: SessionState):
-        """Session'ı disk'e kaydet"""
-        session_file = self._get_session_file(session.user_id)
+                history.append(session_codec.decode_record(record))
+            except Exception:
+                # Yarım yazılmış kayıt: buradan sonrası geçersiz
+                break
+        
+        if len(history) == history_count and len(all_records) == history_count:
+            history_bytes = sum(len(record) for record in records)
+            self._history_state[user_id] = (history_count, records[-1] if records else b"", history_bytes)
+        else:
+            # Log header ile uyuşmuyor, bir sonraki kayıtta compaction yapılır
+            self._history_state.pop(user_id, None)
+        return history
+    
+    def _load(self, user_id: str) -> Optional[SessionState]:
+        """Store'dan session yükle ve cache'e koy (süresi dolmuşsa store None döner)"""
+        try:
+            data = self.store.get(user_id)
+        except Exception:
+            return None
+        if data is None:
+            return None
+        try:
+            session, history_count = self._decode(data)
+            if history_count is None:
+                # Eski format: history header içinde, ilk kayıtta log'a taşınır
+                self._history_state.pop(user_id, None)
+            else:
+                session.conversation_history = self._load_history(user_id, history_count)
+        except Exception:
+            # Corrupt kayıt, sil
+            self.store.delete(user_id)
+            self._history_state.pop(user_id, None)
+            return None
+        
+        self.sessions.put(user_id, session, size=len(data) + self._history_bytes(user_id))
+        return session
+    
+    def _history_bytes(self, user_id: str) -> int:
+        persisted = self._history_state.get(user_id)
+        return persisted[2] if persisted else 0
+    
+    def _save_history(self, session: SessionState):
+        """Sadece yeni mesajları log'a ekle; geçmiş değiştiyse log'u baştan yaz"""
+        user_id = session.user_id
+        history = session.conversation_history
+        persisted = self._history_state.get(user_id)
+        
+        appendable = (
+            persisted is not None
+            and persisted[0] <= len(history)
+            and (persisted[0] == 0 or session_codec.encode_record(history[persisted[0] - 1]) == persisted[1])
+        )
+        if appendable:
+            records = [session_codec.encode_record(message) for message in history[persisted[0]:]]
+            self.store.append_history(user_id, records)
+            last_record = records[-1] if records else persisted[1]
+            history_bytes = persisted[2] + sum(len(record) for record in records)
+        else:
+            records = [session_codec.encode_record(message) for message in history]
+            self.store.rewrite_history(user_id, records)
+            last_record = records[-1] if records else b""
+            history_bytes = sum(len(record) for record in records)
+        self._history_state[user_id] = (len(history), last_record, history_bytes)
+    
+    def compact_history(self, user_id: str):
+        """History log'unu mevcut session'dan baştan yaz (fazlalık/yarım kayıtları temizler)"""
+        session = self.get_session(user_id)
+        if session is None:
+            return
+        self._history_state.pop(user_id, None)
+        self._save(session)
+    
+    def _save(self, session: SessionState):
+        """Session'ı store'a kaydet: önce history log'u, sonra header (commit noktası)"""
         try:
-            with open(session_file, 'wb') as f:
-                pickle.dump(session, f)
-        except Exception as e:
+            self._save_history(session)
+            header = self._serialize(session)
+            self.store.set(session.user_id, header)
+            # Cache boyutu = serialize edilmiş boyut (header + history log)
+            if session.user_id in self.sessions:
+                self.sessions.put(session.user_id, session, size=len(header) + self._history_bytes(session.user_id))
+        except Exception:
             # Logging yapılabilir
-            pass
+            self._history_state.pop(session.user_id, None)
+    
+    def _save_or_defer(self, session: SessionState):
+        """Aktif turn varsa dirty işaretle, yoksa hemen kaydet"""
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.dirty[session.user_id] = session
+            turn.update_calls += 1
+            return
+        self._save(session)
+    
+    def flush(self, turn: SessionTurn):
+        """Turn içindeki dirty session'ları tek seferde yaz"""
+        for session in turn.dirty.values():
+            self._save(session)
+        turn.dirty.clear()
+    
+    @contextmanager
+    def turn(self):
+        """
+        Write coalescing context'i:
+        
+            with session_manager.turn():
+                ...  # update_session çağrıları biriktirilir
+            # burada her session bir kez yazılır
+        
+        İç içe kullanımda dıştaki turn flush eder.
+        """
+        if _current_turn.get() is not None:
+            yield _current_turn.get()
+            return
+        turn = SessionTurn()
+        token = _current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            _current_turn.reset(token)
+            self.flush(turn)
+    
+    @asynccontextmanager
+    async def aturn(self):
+        """turn() ile aynı, flush event loop dışında (thread'de) yapılır"""
+        if _current_turn.get() is not None:
+            yield _current_turn.get()
+            return
+        turn = SessionTurn()
+        token = _current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            _current_turn.reset(token)
+            await asyncio.to_thread(self.flush, turn)
     
     def get_or_create_session(self, user_id: str, platform: str = "web") -> SessionState:
-        """Session getir veya yeni oluştur (disk'ten otomatik yükleme)"""
-        # Önce memory'de var mı?
-        if user_id in self.sessions:
-            session = self.sessions[user_id]
-            # Expired mı kontrol et
-            if session.is_expired():
-                # Memory'den sil
-                del self.sessions[user_id]
-                # Disk'ten de sil
-                self._get_session_file(user_id).unlink(missing_ok=True)
-                # Yeni session oluştur
-                session = SessionState(user_id=user_id, platform=platform)
-                self.sessions[user_id] = session
-                self._save_to_disk(session)
-            return session
+        """Session getir veya yeni oluştur (store'dan otomatik yükleme)"""
+        # Aktif turn'de henüz flush edilmemiş hali store'dakinden yenidir
+        turn = _current_turn.get()
+        if turn is not None and user_id in turn.dirty:
+            return turn.dirty[user_id]
+        
+        # Memory cache sadece paylaşımsız store'larda geçerli (replica'lar arası tutarlılık)
+        if not self.store.shared:
+            session = self.sessions.get(user_id)
+            if session is not None and self.store.exists(user_id):
+                return session
         
-        # Memory'de yok, disk'ten yükle
-        session = self._load_from_disk(user_id)
+        # Store'dan yükle
+        session = self._load(user_id)
         if session:
-            self.sessions[user_id] = session
             return session
         
-        # Hiç yok, yeni oluştur
+        # Hiç yok veya süresi dolmuş, yeni oluştur
         session = SessionState(user_id=user_id, platform=platform)
-        self.sessions[user_id] = session
-        self._save_to_disk(session)
+        self.sessions.put(user_id, session)
+        self._save_or_defer(session)
         return session
     
     def get_session(self, user_id: str) -> Optional[SessionState]:
-        """Session getir (disk'ten otomatik yükleme)"""
+        """Session getir (store'dan otomatik yükleme)"""
+        turn = _current_turn.get()
+        if turn is not None and user_id in turn.dirty:
+            return turn.dirty[user_id]
+        
         # Memory'de var mı?
-        if user_id in self.sessions:
-            return self.sessions[user_id]
+        session = self.sessions.get(user_id)
+        if session is not None:
+            return session
         
-        # Disk'ten yükle
-        session = self._load_from_disk(user_id)
-        if session:
-            self.sessions[user_id] = session
-        return session
+        # Store'dan yükle
+        return self._load(user_id)
     
     def update_session(self, session: SessionState):
-        """Session'ı güncelle ve disk'e kaydet"""
-        self.sessions[session.user_id] = session
-        self._save_to_disk(session)
+        """Session'ı güncelle ve store'a kaydet (aktif turn varsa turn sonunda)"""
+        self.sessions.put(session.user_id, session)
+        self._save_or_defer(session)
     
     def delete_session(self, user_id: str):
-        """Session'ı sil (memory + disk)"""
-        if user_id in self.sessions:
-            del self.sessions[user_id]
-        # Disk'ten de sil
-        self._get_session_file(user_id).unlink(missing_ok=True)
+        """Session'ı sil (memory + store)"""
+        self.sessions.pop(user_id, None)
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.dirty.pop(user_id, None)
+        self._history_state.pop(user_id, None)
+        forget_session(user_id)
+        self.store.delete(user_id)
     
     def cleanup_expired(self):
-        """Süresi dolmuş session'ları temizle (memory + disk)"""
-        # Memory'den temizle
-        expired_users = [
-            user_id for user_id, session in self.sessions.items()
-            if session.is_expired()
-        ]
-        for user_id in expired_users:
-            del self.sessions[user_id]
-            self._get_session_file(user_id).unlink(missing_ok=True)
+        """Süresi dolmuş session'ları temizle (store + memory cache)"""
+        purged = set(self.store.purge_expired_keys())
         
-        # Disk'teki tüm session dosyalarını kontrol et
-        for session_file in self.persist_dir.glob("session_*.pkl"):
-            try:
-                with open(session_file, 'rb') as f:
-                    session = pickle.load(f)
-                if session.is_expired():
-                    session_file.unlink(missing_ok=True)
-            except:
-                # Corrupt file, sil
-                session_file.unlink(missing_ok=True)
+        # Store'da artık olmayanları memory'den at
+        if self.store.shared:
+            # TTL'i store yönetiyor (Redis), silinenler bilinmiyor
+            stale_users = [user_id for user_id in list(self.sessions) if not self.store.exists(user_id)]
+        else:
+            stale_users = [user_id for user_id in list(self.sessions) if safe_key(user_id) in purged]
+        for user_id in stale_users:
+            self.sessions.pop(user_id, None)
+            self._history_state.pop(user_id, None)
+            forget_session(user_id)
+
+def _create_default_manager() -> SessionManager:
+    from config import get_settings
+    settings = get_settings()
+    store = create_session_store(
+        backend=settings.session_backend,
+        persist_dir=settings.session_dir,
+        ttl_seconds=settings.session_ttl_minutes * 60,
+        redis_url=settings.redis_url
+    )
+    return SessionManager(
+        persist_dir=settings.session_dir,
+        store=store,
+        cache_max_entries=settings.session_cache_max_entries,
+        cache_max_bytes=settings.session_cache_max_mb * 1024 * 1024
+    )
 
 # Global session manager
-session_manager = SessionManager()
+session_manager = _create_default_manager()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any, Literal, Union
 from datetime import datetime
 
 class ListingRequest(BaseModel):
@@ -101,3 +101,96 @@ class MegapazarState(BaseModel):
     
     class Config:
         arbitrary_types_allowed = True
+
+
+# ---------------------------------------------------------------------------
+# LLM çıktı şemaları (structured output, bkz. utils/structured_output.py)
+# Alanlar prompt'lardaki JSON formatlarıyla aynı; model null dönebileceği için
+# çoğu Optional. Serbest anahtarlı çıktılar extra="allow" ile korunur.
+# ---------------------------------------------------------------------------
+
+class RouterDecision(BaseModel):
+    """RouterAgent: intent + alan çıkarımı"""
+    intent: Literal[
+        "product_search", "create_listing", "get_listing_details",
+        "listing_management", "help", "small_talk", "unknown",
+    ] = "unknown"
+    query: Optional[str] = None
+    listing_reference: Dict[str, Any] = {}
+    create_listing: Dict[str, Any] = {}
+    missing_fields: List[str] = []
+    meta: Dict[str, Any] = {}
+
+class ProductExtraction(BaseModel):
+    """Vision / TextParser: ürün bilgisi"""
+    model_config = ConfigDict(extra="allow")
+
+    product_type: Optional[str] = None
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    condition: Optional[str] = None
+    quantity: Optional[int] = None
+    estimated_attributes: Dict[str, Any] = {}
+    extra_notes: Optional[str] = None
+
+class PricingSuggestion(BaseModel):
+    """PricingAgent: fiyat önerisi"""
+    suggested_price: float
+    min_reasonable_price: Optional[float] = None
+    max_reasonable_price: Optional[float] = None
+    reason: str = ""
+
+class PriceValidation(BaseModel):
+    """PricingAgent: kullanıcı fiyatı kontrolü"""
+    action: Literal["accept", "suggest"]
+    given_price: Optional[float] = None
+    suggested_price: Optional[float] = None
+    reason: str = ""
+
+class MarketPriceEstimate(BaseModel):
+    """PricingAgent.get_market_price (fiyat takibi)"""
+    suggested_price: float
+    reason: str = ""
+
+class ExternalPriceStats(BaseModel):
+    """MarketSearchAgent: dış piyasa fiyatları"""
+    external_avg_price: float = 0
+    external_min_price: float = 0
+    external_max_price: float = 0
+    sources_checked: List[str] = []
+
+class ListingCopy(BaseModel):
+    """ListingWriterAgent: ilan metni"""
+    title: str
+    description: str
+    short_summary: str = ""
+
+class SearchFilters(BaseModel):
+    """BuyerSearchAgent: arama filtreleri"""
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    location: Optional[str] = None
+    condition: Optional[str] = None
+
+class ListingInfoExtraction(BaseModel):
+    """Conversation: geçmişten ürün bilgisi"""
+    product_info: Dict[str, Any] = {}
+    missing_fields: List[str] = []
+
+class GatheringExtraction(BaseModel):
+    """Conversation: eksik bilgi toplama"""
+    extracted: Dict[str, Any] = {}
+    still_missing: List[str] = []
+    next_question: Optional[str] = None
+
+class EditInstruction(BaseModel):
+    """Conversation: ilan düzenleme talebi"""
+    field: Optional[Literal["title", "description", "price", "category"]] = None
+    change_description: Optional[str] = None
+    new_value: Optional[Union[str, float]] = None
+
+class CriticalFieldsCheck(BaseModel):
+    """Workflow: ürün için eksik kritik alanlar"""
+    critical_missing: List[str] = []
+    reason: str = ""
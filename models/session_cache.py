@@ -0,0 +1,120 @@
+"""
+Session Cache
+SessionManager'ın store önündeki memory cache'i: kayıt sayısı ve byte ile sınırlı LRU.
+
+Byte hesabı session'ın serialize edilmiş boyutudur (header + history log kayıtları);
+SessionManager bu boyutu kayıt/yükleme sırasında zaten hesapladığı için ek maliyet yoktur.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+import threading
+
+# Boyutu henüz bilinmeyen (hiç kaydedilmemiş) session için tahmin
+DEFAULT_ENTRY_BYTES = 2048
+
+class SessionCache:
+    """
+    Thread-safe LRU cache (dict arayüzü ile - `in`, `[]`, `del`, `pop`, `clear`)
+
+    max_entries / max_bytes aşılınca en az kullanılan kayıtlar atılır.
+    Atılan session store'da durduğu için bir sonraki istekte store'dan yüklenir.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Kaydı getir (hit/miss sayılır, LRU sırası güncellenir)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: Optional[int] = None):
+        """
+        Kaydı ekle/güncelle. size verilmezse mevcut boyut korunur
+        (turn içinde henüz serialize edilmemiş güncellemeler için).
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if size is None:
+                size = previous[1] if previous else DEFAULT_ENTRY_BYTES
+            if previous:
+                self.resident_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.resident_bytes += size
+            self._evict()
+
+    def _evict(self):
+        # En yeni kayıt her zaman tutulur (tek başına limiti aşsa bile)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.resident_bytes > self.max_bytes
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.resident_bytes -= size
+            self.evictions += 1
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.resident_bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache metrikleri"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    # dict uyumluluğu (mevcut `session_manager.sessions[...]` kullanımları için)
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.put(key, value)
+
+    def __delitem__(self, key: str):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+_MISSING = object()
@@ -0,0 +1,115 @@
+"""
+Session Codec
+Session'ları pickle yerine versiyonlu, kompakt JSON formatında serialize eder.
+
+Format:
+    [3 byte magic "MPS"][1 byte flags][2 byte schema version][JSON body]
+
+- JSON body orjson ile (kuruluysa) üretilir, yoksa stdlib json
+- Büyük body'ler (conversation history uzadıkça) zlib ile sıkıştırılır
+- Eski schema version'lar decode sırasında migration zinciriyle güncellenir
+
+Conversation history mesajları header'dan ayrı, append-only log kayıtları olarak
+encode_record() ile yazılır (bkz. models/session_store.py).
+"""
+from typing import Any, Callable, Dict
+import json
+import struct
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson opsiyonel
+    orjson = None
+
+MAGIC = b"MPS"
+SCHEMA_VERSION = 1
+
+FLAG_ZLIB = 0x01
+
+# Bu boyutun üstündeki body'ler sıkıştırılır
+COMPRESS_THRESHOLD = 4096
+
+_HEADER = struct.Struct(">3sBH")
+
+# from_version -> (payload -> from_version + 1 payload)
+_MIGRATIONS: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+class SessionCodecError(ValueError):
+    """Decode edilemeyen / desteklenmeyen session verisi"""
+
+
+def register_migration(from_version: int):
+    """
+    Schema migration kaydı (from_version -> from_version + 1)
+
+        @register_migration(1)
+        def _v1_to_v2(payload):
+            payload["new_field"] = payload.pop("old_field", None)
+            return payload
+    """
+    def decorator(func: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        _MIGRATIONS[from_version] = func
+        return func
+    return decorator
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _loads(body: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def encode(payload: Dict[str, Any], version: int = SCHEMA_VERSION) -> bytes:
+    """JSON-uyumlu dict'i (ör. SessionState.model_dump(mode="json")) byte'a çevir"""
+    body = _dumps(payload)
+    flags = 0
+    if len(body) > COMPRESS_THRESHOLD:
+        body = zlib.compress(body, 1)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(MAGIC, flags, version) + body
+
+
+def migrate(payload: Dict[str, Any], version: int) -> Dict[str, Any]:
+    """Payload'ı mevcut SCHEMA_VERSION'a taşı"""
+    while version < SCHEMA_VERSION:
+        migration = _MIGRATIONS.get(version)
+        if migration is None:
+            raise SessionCodecError(f"No migration registered for session schema v{version}")
+        payload = migration(payload)
+        version += 1
+    return payload
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """encode() çıktısını dict'e çevir (gerekirse migration uygular)"""
+    if len(data) < _HEADER.size or not data.startswith(MAGIC):
+        raise SessionCodecError("Not a session codec payload")
+    _, flags, version = _HEADER.unpack_from(data)
+    if version > SCHEMA_VERSION:
+        raise SessionCodecError(f"Session schema v{version} is newer than supported v{SCHEMA_VERSION}")
+    body = data[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return migrate(_loads(body), version)
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """History log kaydı (tek mesaj) - header'sız, tek satırlık JSON"""
+    return _dumps(record)
+
+
+def decode_record(data: bytes) -> Dict[str, Any]:
+    return _loads(data)
+
+
+def is_legacy_pickle(data: bytes) -> bool:
+    """Eski pickle formatındaki session dosyası mı? (protocol 2+ 0x80 ile başlar)"""
+    return data[:1] == b"\x80"
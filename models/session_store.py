@@ -0,0 +1,393 @@
+"""
+Session Store
+SessionManager'ın kullandığı pluggable persistence katmanı.
+Store'lar serialize edilmiş session byte'larını tutar; TTL (expiry) store'un sorumluluğundadır.
+
+Her session iki parçadan oluşur:
+- header: küçük, değişken kısım (stage, intent, product_info, pricing...) - her kayıtta yeniden yazılır
+- history: conversation mesajlarının append-only log'u - her turn sadece yeni mesajlar eklenir
+
+Backend'ler:
+- MemorySessionStore: tek process, test/dev
+- FileSessionStore: disk (tek replica)
+- RedisSessionStore: Redis protokolü (çoklu worker / replica)
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import heapq
+import os
+import threading
+import time
+
+def safe_key(user_id: str) -> str:
+    """Dosya/key için güvenli id (user_id'deki özel karakterleri temizle)"""
+    return "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in user_id)
+
+class SessionStore(ABC):
+    """Session persistence interface"""
+    
+    # Birden fazla process/replica aynı veriyi görüyor mu?
+    shared: bool = False
+    
+    def __init__(self, ttl_seconds: int = 30 * 60):
+        self.ttl_seconds = ttl_seconds
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Session verisini getir (yok veya süresi dolmuşsa None)"""
+    
+    @abstractmethod
+    def set(self, key: str, data: bytes):
+        """Session verisini yaz ve TTL'i yenile"""
+    
+    @abstractmethod
+    def delete(self, key: str):
+        """Session'ı sil"""
+    
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Session var ve süresi dolmamış mı? (deserialize etmeden)"""
+    
+    @abstractmethod
+    def append_history(self, key: str, records: List[bytes]):
+        """History log'una kayıt ekle (boş liste: sadece TTL yenile)"""
+    
+    @abstractmethod
+    def load_history(self, key: str) -> List[bytes]:
+        """History log'undaki tüm kayıtlar (eklenme sırasıyla)"""
+    
+    @abstractmethod
+    def rewrite_history(self, key: str, records: List[bytes]):
+        """History log'unu verilen kayıtlarla değiştir (compaction)"""
+    
+    def purge_expired(self) -> int:
+        """Süresi dolmuş kayıtları temizle, silinen kayıt sayısını döndür"""
+        return len(self.purge_expired_keys())
+    
+    def purge_expired_keys(self) -> List[str]:
+        """
+        Süresi dolmuş kayıtları temizle, silinenlerin safe_key'lerini döndür.
+        TTL'i kendisi yöneten backend'lerde no-op.
+        """
+        return []
+
+class MemorySessionStore(SessionStore):
+    """Process içi store (dict + expiry zamanı)"""
+    
+    def __init__(self, ttl_seconds: int = 30 * 60):
+        super().__init__(ttl_seconds)
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+        self._history: Dict[str, List[bytes]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= time.time():
+            self.delete(key)
+            return None
+        return data
+    
+    def set(self, key: str, data: bytes):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl_seconds, data)
+    
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+            self._history.pop(key, None)
+    
+    def exists(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+    
+    def append_history(self, key: str, records: List[bytes]):
+        if not records:
+            return
+        with self._lock:
+            self._history.setdefault(key, []).extend(records)
+    
+    def load_history(self, key: str) -> List[bytes]:
+        return list(self._history.get(key, []))
+    
+    def rewrite_history(self, key: str, records: List[bytes]):
+        with self._lock:
+            self._history[key] = list(records)
+    
+    def purge_expired_keys(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+                self._history.pop(key, None)
+        return [safe_key(key) for key in expired]
+
+class FileSessionStore(SessionStore):
+    """
+    Dosya tabanlı store - kullanıcı başına bir header dosyası + bir history log'u.
+    Expiry: header dosyasının mtime'ı + TTL (dosya açılmadan kontrol edilir).
+    History log'u satır başına bir kayıt (newline-delimited), append modda yazılır.
+    
+    Cleanup için expiry index tutulur: (expires_at, dosya adı) min-heap'i.
+    purge_expired sadece süresi dolmuş kayıtlara dokunur; dizin taraması sadece
+    açılışta ve her index_rebuild_every purge'de bir yapılır (başka process'lerin
+    yazdığı dosyaları da yakalamak için).
+    """
+    
+    def __init__(
+        self,
+        persist_dir: str = "sessions",
+        ttl_seconds: int = 30 * 60,
+        suffix: str = ".pkl",
+        index_rebuild_every: int = 6
+    ):
+        super().__init__(ttl_seconds)
+        self.persist_dir = Path(persist_dir)
+        self.persist_dir.mkdir(exist_ok=True)
+        self.suffix = suffix
+        self.index_rebuild_every = index_rebuild_every
+        
+        # Expiry index: heap'teki eski kayıtlar lazy olarak atlanır (_expiry_index ile eşleşmeyenler)
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._expiry_index: Dict[str, float] = {}
+        self._index_lock = threading.Lock()
+        self._purges_since_rebuild = 0
+        self.rebuild_index()
+    
+    def path_for(self, key: str) -> Path:
+        """Session dosya yolunu döndür"""
+        return self.persist_dir / f"session_{safe_key(key)}{self.suffix}"
+    
+    def history_path_for(self, key: str) -> Path:
+        """History log dosya yolunu döndür"""
+        return self.persist_dir / f"history_{safe_key(key)}.log"
+    
+    def _atomic_write(self, path: Path, data: bytes):
+        # Crash-safe yazım: geçici dosyaya yaz, sonra atomik rename
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    
+    def _track(self, name: str, expires_at: float):
+        with self._index_lock:
+            self._expiry_index[name] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, name))
+    
+    def _untrack(self, name: str):
+        with self._index_lock:
+            self._expiry_index.pop(name, None)
+    
+    def _key_from_name(self, name: str) -> str:
+        """session_<safe_key><suffix> -> safe_key"""
+        return name[len("session_"):len(name) - len(self.suffix)]
+    
+    def rebuild_index(self):
+        """Dizini tarayıp expiry index'ini baştan kur (sadece stat, dosya açılmaz)"""
+        entries: List[Tuple[float, str]] = []
+        history_logs: List[str] = []
+        with os.scandir(self.persist_dir) as it:
+            for entry in it:
+                if entry.name.startswith("session_") and entry.name.endswith(self.suffix):
+                    try:
+                        entries.append((entry.stat().st_mtime + self.ttl_seconds, entry.name))
+                    except FileNotFoundError:
+                        continue
+                elif entry.name.startswith("history_") and entry.name.endswith(".log"):
+                    history_logs.append(entry.name)
+        
+        heapq.heapify(entries)
+        with self._index_lock:
+            self._expiry_heap = entries
+            self._expiry_index = {name: expires_at for expires_at, name in entries}
+            self._purges_since_rebuild = 0
+            live_keys = {self._key_from_name(name) for name in self._expiry_index}
+        
+        # Header'ı olmayan history log'ları. _save önce log'u sonra header'ı yazar:
+        # header'sız ama yeni yazılmış log bir kaydın ortasında olabilir, sadece
+        # TTL'den uzun süredir dokunulmamışlar silinir (mtime silmeden hemen önce okunur)
+        stale_before = time.time() - self.ttl_seconds
+        for name in history_logs:
+            key = name[len("history_"):-len(".log")]
+            if key in live_keys:
+                continue
+            path = self.persist_dir / name
+            try:
+                if path.stat().st_mtime > stale_before or (self.persist_dir / f"session_{key}{self.suffix}").exists():
+                    continue
+            except FileNotFoundError:
+                continue
+            path.unlink(missing_ok=True)
+    
+    def _is_expired(self, path: Path) -> bool:
+        try:
+            return path.stat().st_mtime + self.ttl_seconds <= time.time()
+        except FileNotFoundError:
+            return True
+    
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        if self._is_expired(path):
+            path.unlink(missing_ok=True)
+            self._untrack(path.name)
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+    
+    def set(self, key: str, data: bytes):
+        path = self.path_for(key)
+        self._atomic_write(path, data)
+        self._track(path.name, time.time() + self.ttl_seconds)
+    
+    def delete(self, key: str):
+        path = self.path_for(key)
+        path.unlink(missing_ok=True)
+        self._untrack(path.name)
+        self.history_path_for(key).unlink(missing_ok=True)
+    
+    def exists(self, key: str) -> bool:
+        return not self._is_expired(self.path_for(key))
+    
+    def append_history(self, key: str, records: List[bytes]):
+        if not records:
+            return
+        with open(self.history_path_for(key), 'ab') as f:
+            f.write(b"".join(record + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def load_history(self, key: str) -> List[bytes]:
+        try:
+            data = self.history_path_for(key).read_bytes()
+        except FileNotFoundError:
+            return []
+        return [line for line in data.split(b"\n") if line]
+    
+    def rewrite_history(self, key: str, records: List[bytes]):
+        self._atomic_write(self.history_path_for(key), b"".join(record + b"\n" for record in records))
+    
+    def purge_expired_keys(self) -> List[str]:
+        self._purges_since_rebuild += 1
+        if self._purges_since_rebuild >= self.index_rebuild_every:
+            self.rebuild_index()
+        
+        now = time.time()
+        purged = []
+        while True:
+            with self._index_lock:
+                if not self._expiry_heap or self._expiry_heap[0][0] > now:
+                    break
+                expires_at, name = heapq.heappop(self._expiry_heap)
+                if self._expiry_index.get(name) != expires_at:
+                    # Sonradan güncellenmiş/silinmiş kaydın eski heap girdisi
+                    continue
+                del self._expiry_index[name]
+            
+            path = self.persist_dir / name
+            try:
+                actual_expires_at = path.stat().st_mtime + self.ttl_seconds
+            except FileNotFoundError:
+                continue
+            if actual_expires_at > now:
+                # Başka bir process tarafından yenilenmiş
+                self._track(name, actual_expires_at)
+                continue
+            
+            key = self._key_from_name(name)
+            path.unlink(missing_ok=True)
+            (self.persist_dir / f"history_{key}.log").unlink(missing_ok=True)
+            purged.append(key)
+        return purged
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis protokolü üzerinden store - replica'lar arası paylaşılır.
+    Expiry Redis'in kendi TTL'i ile (SET ... EX) yönetilir.
+    
+    client: redis.Redis uyumlu herhangi bir client (fakeredis dahil).
+    """
+    
+    shared = True
+    
+    def __init__(
+        self,
+        client=None,
+        url: Optional[str] = None,
+        ttl_seconds: int = 30 * 60,
+        prefix: str = "megapazar:session:"
+    ):
+        super().__init__(ttl_seconds)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("Redis session backend requires the 'redis' package") from e
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+    
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{safe_key(key)}"
+    
+    def _history_key(self, key: str) -> str:
+        return f"{self.prefix}{safe_key(key)}:history"
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(key))
+    
+    def set(self, key: str, data: bytes):
+        self.client.set(self._key(key), data, ex=self.ttl_seconds)
+    
+    def delete(self, key: str):
+        self.client.delete(self._key(key), self._history_key(key))
+    
+    def exists(self, key: str) -> bool:
+        return bool(self.client.exists(self._key(key)))
+    
+    def append_history(self, key: str, records: List[bytes]):
+        # History TTL'i header ile birlikte yenilenir (yeni mesaj olmasa da)
+        history_key = self._history_key(key)
+        pipe = self.client.pipeline()
+        if records:
+            pipe.rpush(history_key, *records)
+        pipe.expire(history_key, self.ttl_seconds)
+        pipe.execute()
+    
+    def load_history(self, key: str) -> List[bytes]:
+        return list(self.client.lrange(self._history_key(key), 0, -1))
+    
+    def rewrite_history(self, key: str, records: List[bytes]):
+        history_key = self._history_key(key)
+        pipe = self.client.pipeline()
+        pipe.delete(history_key)
+        if records:
+            pipe.rpush(history_key, *records)
+            pipe.expire(history_key, self.ttl_seconds)
+        pipe.execute()
+
+def create_session_store(
+    backend: str = "file",
+    persist_dir: str = "sessions",
+    ttl_seconds: int = 30 * 60,
+    redis_url: Optional[str] = None
+) -> SessionStore:
+    """Config'e göre session store oluştur"""
+    backend = (backend or "file").lower()
+    if backend == "memory":
+        return MemorySessionStore(ttl_seconds=ttl_seconds)
+    if backend == "redis":
+        return RedisSessionStore(url=redis_url, ttl_seconds=ttl_seconds)
+    if backend == "file":
+        return FileSessionStore(persist_dir=persist_dir, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown session backend: {backend}")
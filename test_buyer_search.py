@@ -0,0 +1,262 @@
+"""
+Test BuyerSearchAgent -> search_listings (vector) + search_listings_lexical, RRF füzyonu
+Filtreler iki RPC'ye de gönderilir, sayfalama füzyondan sonra yapılır.
+Supabase ve embedding yerine stand-in kullanılır.
+"""
+import asyncio
+from agents.base import BaseAgent
+from agents.buyer_search import BuyerSearchAgent, PAGE_SIZE
+from tools.hybrid_search import reciprocal_rank_fusion, ndcg_at_k, trigram_similarity
+import agents.buyer_search as buyer_search
+from utils import cost_tracker, metrics
+import threading
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class StandInQuery:
+    def __init__(self, client, name, params=None):
+        self.client = client
+        self.name = name
+        self.params = params
+        self.filters = []
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(("in", column, tuple(values)))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def execute(self):
+        with self.client.lock:
+            self.client.calls.append((self.name, self.params, self.filters))
+        response = self.client.responses.get(self.name, [])
+        if isinstance(response, Exception):
+            raise response
+        return _Result([dict(row) for row in response])
+
+
+class StandInSupabase:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def rpc(self, name, params):
+        return StandInQuery(self, name, params)
+
+    def table(self, name):
+        return StandInQuery(self, name)
+
+
+class StandInAsyncQuery(StandInQuery):
+    async def execute(self):
+        return StandInQuery.execute(self)
+
+
+class StandInAsyncSupabase(StandInSupabase):
+    def rpc(self, name, params):
+        return StandInAsyncQuery(self, name, params)
+
+    def table(self, name):
+        return StandInAsyncQuery(self, name)
+
+
+def make_agent(supabase):
+    agent = BuyerSearchAgent.__new__(BuyerSearchAgent)
+    BaseAgent.__init__(agent, "BuyerSearchAgent")
+    agent.supabase = supabase
+    agent._get_embedding = lambda text: [0.1, 0.2]
+    return agent
+
+
+def rows(count, prefix="l"):
+    return [{"id": f"{prefix}{i}", "title": f"Ürün {i}", "price": 100 + i, "similarity": 0.9 - i * 0.01} for i in range(count)]
+
+
+def calls_by_name(supabase):
+    return {name: params for name, params, _ in supabase.calls}
+
+
+def test_filters_sent_to_rpc():
+    print("\nTest 1: Filtreler her iki RPC'ye gider, sayfalama füzyondan sonra")
+    supabase = StandInSupabase({"search_listings": rows(3), "search_listings_lexical": []})
+    agent = make_agent(supabase)
+    state = agent({
+        "search_query": "laptop",
+        "search_filters": {"category": "Elektronik", "max_price": 5000, "location": "İstanbul", "condition": "damaged"},
+        "search_offset": 20
+    })
+
+    calls = calls_by_name(supabase)
+    assert set(calls) == {"search_listings", "search_listings_lexical"}
+    for params in calls.values():
+        assert params["filter_category"] == "Elektronik"
+        assert params["max_price"] == 5000 and params["min_price"] is None
+        assert params["filter_location"] == "İstanbul"
+        assert params["filter_condition"] is None, "listings.condition'da olmayan değer gönderilmez"
+        assert params["match_offset"] == 0 and params["match_count"] == 20 + PAGE_SIZE + 1
+    assert calls["search_listings_lexical"]["query_text"] == "laptop"
+
+    # offset 20, sadece 3 sonuç -> boş sayfa
+    assert state["search_count"] == 0 and state["search_has_more"] is False
+
+
+def test_rrf_fusion_order():
+    print("\nTest 1b: Her iki listede üst sıradaki kayıt öne çıkar; lexical-only kayıt da gelir")
+    vector = [{"id": "a", "title": "A", "similarity": 0.9}, {"id": "b", "title": "B", "similarity": 0.8}]
+    lexical = [{"id": "b", "title": "B", "rank": 1.5}, {"id": "c", "title": "C", "rank": 1.0}]
+    supabase = StandInSupabase({"search_listings": vector, "search_listings_lexical": lexical})
+    agent = make_agent(supabase)
+    state = agent({"search_query": "S23 Ultra", "search_filters": {"category": "Elektronik"}})
+
+    assert [r["id"] for r in state["search_results"]] == ["b", "a", "c"]
+    assert state["search_results"][0]["similarity_score"] == 0.8
+    assert state["search_results"][2]["similarity_score"] == 0
+    assert "rank" not in state["search_results"][0] and "similarity" not in state["search_results"][0]
+    assert state["search_results"][0]["rrf_score"] > state["search_results"][1]["rrf_score"]
+
+
+def test_lexical_failure_falls_back_to_vector():
+    print("\nTest 1c: Lexical RPC hata verirse vector sonuçları kullanılır")
+    supabase = StandInSupabase({"search_listings": rows(2), "search_listings_lexical": RuntimeError("function does not exist")})
+    agent = make_agent(supabase)
+    state = agent({"search_query": "C180", "search_filters": {"category": "Otomotiv"}})
+    assert [r["id"] for r in state["search_results"]] == ["l0", "l1"]
+
+
+def test_has_more():
+    print("\nTest 2: Fazladan dönen satır has_more olarak işaretlenir")
+    supabase = StandInSupabase({"search_listings": rows(6), "search_listings_lexical": []})
+    agent = make_agent(supabase)
+    state = agent({"search_query": "telefon", "search_filters": {"category": "Elektronik"}, "search_limit": 5})
+    assert calls_by_name(supabase)["search_listings"]["match_count"] == 6
+    assert state["search_count"] == 5 and state["search_has_more"] is True
+
+    supabase = StandInSupabase({"search_listings": rows(6), "search_listings_lexical": []})
+    state = make_agent(supabase)({
+        "search_query": "telefon", "search_filters": {"category": "Elektronik"}, "search_limit": 5, "search_offset": 5
+    })
+    assert [r["id"] for r in state["search_results"]] == ["l5"] and state["search_has_more"] is False
+
+
+def test_local_index_path_without_filters():
+    print("\nTest 3: Filtresiz aramada yerel index + lexical + eksik listing'ler tek sorguda")
+    supabase = StandInSupabase({
+        "listings": [{"id": "b", "title": "B", "price": 5}, {"id": "a", "title": "A", "price": 10}],
+        "search_listings_lexical": [{"id": "z", "title": "Z", "rank": 1.0}]
+    })
+    agent = make_agent(supabase)
+    agent._extract_filters = lambda query: {}
+    original = buyer_search.local_vector_search
+    buyer_search.local_vector_search = lambda embedding, k, threshold: [
+        {"listing_id": "a", "similarity": 0.8}, {"listing_id": "b", "similarity": 0.6}
+    ]
+    try:
+        state = agent({"search_query": "bisiklet", "search_filters": {}})
+    finally:
+        buyer_search.local_vector_search = original
+
+    assert sorted(c[0] for c in supabase.calls) == ["listings", "search_listings_lexical"]
+    listings_call = [c for c in supabase.calls if c[0] == "listings"][0]
+    assert ("eq", "status", "active") in listings_call[2]
+    assert ("in", "id", ("a", "b")) in listings_call[2], "sadece eksik id'ler çekilir"
+    assert [r["id"] for r in state["search_results"]] == ["a", "z", "b"]
+    assert state["search_results"][0]["title"] == "A"
+
+
+def test_async_path():
+    print("\nTest 4: Async arama aynı RPC'yi kullanır")
+    supabase = StandInAsyncSupabase({"search_listings": rows(2), "search_listings_lexical": rows(1, prefix="x")})
+    agent = make_agent(None)
+
+    async def embedding(text):
+        return [0.1, 0.2]
+
+    async def client():
+        return supabase
+
+    agent._aget_embedding = embedding
+    original = buyer_search.get_supabase_admin_async
+    buyer_search.get_supabase_admin_async = client
+    try:
+        state = asyncio.run(agent.acall({"search_query": "masa", "search_filters": {"min_price": 100}}))
+    finally:
+        buyer_search.get_supabase_admin_async = original
+
+    calls = calls_by_name(supabase)
+    assert calls["search_listings"]["min_price"] == 100
+    assert calls["search_listings_lexical"]["min_price"] == 100
+    assert state["search_count"] == 3
+
+
+class FailingLLM:
+    def invoke(self, prompt):
+        raise AssertionError("LLM çağrılmamalı")
+
+
+def test_rule_based_filters_skip_llm():
+    print("\nTest 4b: Kural tabanlı parser emin olduğunda LLM çağrılmaz")
+    supabase = StandInSupabase({"search_listings": rows(1), "search_listings_lexical": []})
+    agent = make_agent(supabase)
+    agent.llm = FailingLLM()
+    before = metrics.FILTER_EXTRACTION.value("rule_based")
+    agent({"search_query": "İstanbul'da 5000 TL altı ikinci el laptop", "search_filters": {}})
+
+    params = calls_by_name(supabase)["search_listings"]
+    assert params["max_price"] == 5000 and params["filter_location"] == "İstanbul"
+    assert params["filter_condition"] == "used"
+    assert metrics.FILTER_EXTRACTION.value("rule_based") == before + 1
+
+
+def test_lexical_thread_keeps_request_context():
+    print("\nTest 4c: Lexical RPC thread'i request context'ini (cost/trace atfı) taşır")
+
+    class ContextSupabase(StandInSupabase):
+        def rpc(self, name, params):
+            self.seen[name] = cost_tracker.current_agent()
+            return StandInSupabase.rpc(self, name, params)
+
+    supabase = ContextSupabase({"search_listings": rows(1), "search_listings_lexical": []})
+    supabase.seen = {}
+    agent = make_agent(supabase)
+    tokens = cost_tracker.bind(agent="BuyerSearchAgent", endpoint="/search")
+    try:
+        agent({"search_query": "laptop", "search_filters": {"category": "Elektronik"}})
+    finally:
+        cost_tracker.reset(tokens)
+    assert supabase.seen["search_listings_lexical"] == supabase.seen["search_listings"] == "BuyerSearchAgent"
+
+
+def test_metrics_helpers():
+    print("\nTest 5: NDCG ve pg_trgm yaklaşığı")
+    assert ndcg_at_k(["a", "b"], {"a": 3, "b": 1}) == 1.0
+    assert ndcg_at_k(["b", "a"], {"a": 3, "b": 1}) < 1.0
+    assert ndcg_at_k(["x"], {}) == 0.0
+    assert trigram_similarity("S23 Ultra", "Samsung Galaxy S23 Ultra 256GB") > trigram_similarity("S23 Ultra", "iPhone 13")
+    fused = reciprocal_rank_fusion([[{"id": 1}], [{"id": 1}, {"id": 2}]])
+    assert [r["id"] for r in fused] == [1, 2]
+
+
+if __name__ == "__main__":
+    print("BUYER SEARCH TEST")
+    print("=" * 60)
+    test_filters_sent_to_rpc()
+    test_rrf_fusion_order()
+    test_lexical_failure_falls_back_to_vector()
+    test_has_more()
+    test_local_index_path_without_filters()
+    test_async_path()
+    test_rule_based_filters_skip_llm()
+    test_lexical_thread_keeps_request_context()
+    test_metrics_helpers()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,102 @@
+"""
+Test ConversationGate (kullanıcı başına kilit + mesaj birleştirme)
+"""
+import asyncio
+from utils.conversation_gate import ConversationGate
+
+
+async def fake_turn(gate, user_id, message, state, log, delay=0.05):
+    """Session'ı okuyup-değiştirip-yazan /conversation turn'ü simülasyonu"""
+    async with gate.turn(user_id, message) as user_turn:
+        if user_turn.coalesced:
+            log.append(("coalesced", message))
+            return
+        history = list(state.get(user_id, []))  # read
+        await asyncio.sleep(delay)               # LLM çağrısı
+        history.append(user_turn.message)         # mutate
+        state[user_id] = history                  # write
+        log.append(("processed", user_turn.message))
+
+
+def test_lock_prevents_lost_updates():
+    print("\nTest 1: Aynı kullanıcının turn'leri sırayla işlenir")
+
+    async def run():
+        gate = ConversationGate()
+        state, log = {}, []
+        await asyncio.gather(*[fake_turn(gate, "user-a", f"m{i}", state, log) for i in range(5)])
+        return gate, state, log
+
+    gate, state, log = asyncio.run(run())
+    print(f"   history: {state['user-a']}")
+    assert state["user-a"] == ["m0", "m1", "m2", "m3", "m4"], "Lost update!"
+    assert gate.active_users() == 0, "Kilit temizlenmedi"
+
+
+def test_users_run_in_parallel():
+    print("\nTest 2: Farklı kullanıcılar birbirini beklemez")
+
+    async def run():
+        gate = ConversationGate()
+        state, log = {}, []
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*[fake_turn(gate, f"user-{i}", "merhaba", state, log, delay=0.1) for i in range(10)])
+        return loop.time() - start
+
+    elapsed = asyncio.run(run())
+    print(f"   10 kullanıcı: {elapsed:.2f}s")
+    assert elapsed < 0.5
+
+
+def test_coalescing_window():
+    print("\nTest 3: Pencere içindeki mesajlar tek turn'de birleştirilir")
+
+    async def run():
+        gate = ConversationGate(coalesce_window=0.1)
+        state, log = {}, []
+        tasks = [asyncio.create_task(fake_turn(gate, "user-b", "iPhone 13", state, log))]
+        await asyncio.sleep(0.02)
+        tasks.append(asyncio.create_task(fake_turn(gate, "user-b", "128 GB", state, log)))
+        await asyncio.sleep(0.02)
+        tasks.append(asyncio.create_task(fake_turn(gate, "user-b", "az kullanılmış", state, log)))
+        await asyncio.gather(*tasks)
+
+        # Pencere kapandıktan sonra gelen mesaj yeni turn
+        await fake_turn(gate, "user-b", "fiyat ne olur?", state, log)
+        return gate, state, log
+
+    gate, state, log = asyncio.run(run())
+    print(f"   log: {log}")
+    assert state["user-b"] == ["iPhone 13\n128 GB\naz kullanılmış", "fiyat ne olur?"]
+    assert [kind for kind, _ in log].count("coalesced") == 2
+    assert gate.coalesced_messages == 2
+
+
+def test_coalesce_disabled_per_call():
+    print("\nTest 4: coalesce=False sadece kilitler")
+
+    async def run():
+        gate = ConversationGate(coalesce_window=0.1)
+        results = []
+
+        async def call(message):
+            async with gate.turn("user-c", message, coalesce=False) as user_turn:
+                results.append((user_turn.message, user_turn.coalesced))
+
+        await asyncio.gather(call("a"), call("b"))
+        return results
+
+    results = asyncio.run(run())
+    assert results == [("a", False), ("b", False)]
+
+
+if __name__ == "__main__":
+    print("CONVERSATION GATE TEST")
+    print("=" * 60)
+    test_lock_prevents_lost_updates()
+    test_users_run_in_parallel()
+    test_coalescing_window()
+    test_coalesce_disabled_per_call()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
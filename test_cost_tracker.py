@@ -0,0 +1,133 @@
+"""
+Test token/maliyet muhasebesi (utils/cost_tracker.py)
+Fiyatlandırma, agent/endpoint/user atfı (BaseAgent sarmalayıcısı), cache hit'lerin
+ücretsiz sayılması, kullanıcı limiti ve periyodik flush.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from agents.base import BaseAgent
+from utils import cost_tracker
+from utils.cost_tracker import CostTracker, CostTrackingHandler, model_price
+
+
+def openai_result(prompt_tokens, completion_tokens, model="gpt-4o-2024-08-06"):
+    return LLMResult(
+        generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+        llm_output={"token_usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}, "model_name": model}
+    )
+
+
+class LLMAgent(BaseAgent):
+    """handler'a doğrudan sahte bir OpenAI cevabı bildiren agent"""
+
+    def __init__(self, handler, model="gpt-4o"):
+        super().__init__("LLMAgent")
+        self.handler = handler
+        self.model = model
+
+    def __call__(self, state):
+        run_id = object()
+        self.handler.on_chat_model_start({}, [[]], run_id=run_id, invocation_params={"model": self.model})
+        self.handler.on_llm_end(openai_result(1000, 500), run_id=run_id)
+        return state
+
+    async def acall(self, state):
+        return self(state)
+
+
+class ThreadedAgent(LLMAgent):
+    """acall'ı override etmeyen agent: BaseAgent.acall -> to_thread(__call__)"""
+    acall = BaseAgent.acall
+
+
+def test_pricing():
+    print("\nTest 1: Model fiyatı prefix ile bulunur, TRY'ye çevrilir")
+    assert model_price("gpt-4o-mini-2024-07-18") == (0.15, 0.60)
+    assert model_price("gpt-4o-2024-08-06") == (2.50, 10.00)
+    assert model_price("claude-x") is None
+    tracker = CostTracker(usd_try_rate=40.0)
+    # 1M input + 1M output gpt-4o = 12.5 USD
+    assert abs(tracker.cost_try("gpt-4o", 1_000_000, 1_000_000) - 500.0) < 1e-9
+    assert tracker.cost_try("unknown-model", 1000, 1000) == 0.0
+
+
+def test_agent_endpoint_user_attribution():
+    print("\nTest 2: Maliyet agent, endpoint ve state'teki user_id'ye yazılır")
+    tracker = CostTracker(usd_try_rate=40.0)
+    handler = CostTrackingHandler(tracker)
+    tokens = cost_tracker.bind(endpoint="/conversation")
+    try:
+        LLMAgent(handler)({"user_id": "905550000001"})
+        asyncio.run(ThreadedAgent(handler, model="gpt-4o-mini").acall({"user_id": "905550000002"}))
+    finally:
+        cost_tracker.reset(tokens)
+
+    snapshot = tracker.snapshot()
+    assert snapshot["by_agent"]["LLMAgent"]["prompt_tokens"] == 1000
+    assert snapshot["by_agent"]["ThreadedAgent"]["completion_tokens"] == 500
+    assert snapshot["by_endpoint"]["/conversation"]["calls"] == 2
+    assert set(snapshot["by_user"]) == {"905550000001", "905550000002"}
+    # gpt-4o: (1000*2.5 + 500*10)/1M USD * 40
+    assert abs(snapshot["by_model"]["gpt-4o"]["cost_try"] - 0.3) < 1e-6
+    assert list(snapshot["by_agent"])[0] == "LLMAgent", "maliyete göre sıralı"
+    assert cost_tracker._agent.get() is None and cost_tracker._endpoint.get() is None
+
+
+def test_cache_hits_are_free():
+    print("\nTest 3: LLM cache'ten dönen cevap maliyet üretmez")
+    tracker = CostTracker(usd_try_rate=40.0)
+    handler = CostTrackingHandler(tracker)
+    handler.on_chat_model_start({}, [[]], run_id="r1", invocation_params={"model": "gpt-4o"})
+    cached = AIMessage(content="ok", usage_metadata={"input_tokens": 900, "output_tokens": 40, "total_tokens": 940, "total_cost": 0})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=cached)]]), run_id="r1")
+    usage = tracker.snapshot()["total"]
+    assert usage["calls"] == 1 and usage["cache_hits"] == 1 and usage["cost_try"] == 0
+
+    # Fake model üzerinden gerçek callback akışı (llm_output yok, usage yok -> cache hit gibi sayılır)
+    llm = FakeListChatModel(responses=["x"], callbacks=[handler])
+    llm.invoke("merhaba")
+    assert tracker.snapshot()["total"]["calls"] == 2
+
+
+def test_user_limit():
+    print("\nTest 4: Kullanıcı sayısı sınırı aşılınca _other altında toplanır")
+    tracker = CostTracker(usd_try_rate=40.0, max_users=2)
+    for user in ["a", "b", "c", "d"]:
+        tracker.record("gpt-4o-mini", 100, 10, user_id=user)
+    tracker.record("gpt-4o-mini", 100, 10, user_id="a")
+    by_user = tracker.snapshot()["by_user"]
+    assert set(by_user) == {"a", "b", cost_tracker.OTHER_USERS}
+    assert by_user[cost_tracker.OTHER_USERS]["calls"] == 2 and by_user["a"]["calls"] == 2
+
+
+def test_flush_window():
+    print("\nTest 5: Flush pencereyi JSONL'e yazar, toplamlar korunur")
+    path = os.path.join(tempfile.mkdtemp(), "logs", "costs.jsonl")
+    tracker = CostTracker(usd_try_rate=40.0, log_path=path)
+    assert tracker.flush() is None, "boş pencere yazılmaz"
+    tracker.record("text-embedding-3-small", 5000, agent="BuyerSearchAgent")
+    entry = tracker.flush()
+    assert entry["by_agent"]["BuyerSearchAgent"]["prompt_tokens"] == 5000
+    tracker.record("gpt-4o", 10, 10)
+    tracker.flush()
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 2 and lines[1]["total"]["calls"] == 1
+    assert tracker.snapshot()["total"]["calls"] == 2
+
+
+if __name__ == "__main__":
+    print("COST TRACKER TEST")
+    print("=" * 60)
+    test_pricing()
+    test_agent_endpoint_user_attribution()
+    test_cache_hits_are_free()
+    test_user_limit()
+    test_flush_window()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,183 @@
+"""
+Test EmbeddingService (cache + batching + sıkıştırma)
+OpenAI client yerine çağrıları sayan basit bir stand-in kullanılır.
+"""
+import asyncio
+import math
+import os
+import tempfile
+import threading
+from utils.embeddings import EmbeddingService, pack_vector, unpack_vector, text_key
+from utils.tiered_cache import TieredCache
+
+
+class _Item:
+    def __init__(self, index, embedding):
+        self.index = index
+        self.embedding = embedding
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+def fake_vector(text):
+    """Metne göre deterministik vektör"""
+    seed = sum(ord(c) for c in text)
+    return [math.sin(seed + i) for i in range(16)]
+
+
+class StandInEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(list(input))
+        return _Response([_Item(i, fake_vector(text)) for i, text in enumerate(input)])
+
+
+class StandInAsyncEmbeddings(StandInEmbeddings):
+    async def create(self, model, input):
+        await asyncio.sleep(0)
+        return StandInEmbeddings.create(self, model, input)
+
+
+class StandInClient:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    return dot / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+
+def test_codecs():
+    print("\nTest 1: float16 / int8 sıkıştırma")
+    vector = fake_vector("iphone 13")
+    for codec, max_bytes in [("float16", 1 + 2 * 16), ("int8", 1 + 4 + 16)]:
+        data = pack_vector(vector, codec)
+        assert len(data) == max_bytes
+        restored = unpack_vector(data)
+        print(f"   {codec}: {len(data)} bytes, cosine={cosine(vector, restored):.6f}")
+        assert cosine(vector, restored) > 0.999
+
+
+def test_cache_and_normalization():
+    print("\nTest 2: Aynı (normalize) sorgu ikinci kez API'a gitmez")
+    embeddings = StandInEmbeddings()
+    service = EmbeddingService(client_factory=lambda: StandInClient(embeddings), batch_window=0)
+
+    first = service.embed("iPhone 13  2.el")
+    second = service.embed("  iphone 13 2.el ")
+    assert len(embeddings.calls) == 1
+    assert cosine(first, second) > 0.999
+    assert text_key("iPhone 13  2.el") == text_key("iphone 13 2.el")
+    print(f"   {service.stats()}")
+
+
+def test_embed_many_batches_misses():
+    print("\nTest 3: embed_many sadece cache'te olmayanları tek çağrıda gönderir")
+    embeddings = StandInEmbeddings()
+    service = EmbeddingService(client_factory=lambda: StandInClient(embeddings), batch_window=0)
+    service.embed("araba")
+    vectors = service.embed_many(["araba", "telefon", "bisiklet", "telefon"])
+    assert len(vectors) == 4
+    assert embeddings.calls[-1] == ["telefon", "bisiklet"]
+    assert len(embeddings.calls) == 2
+
+
+def test_sync_batching_across_threads():
+    print("\nTest 4: Eşzamanlı thread istekleri tek çağrıda birleştirilir")
+    embeddings = StandInEmbeddings()
+    service = EmbeddingService(client_factory=lambda: StandInClient(embeddings), batch_window=0.05)
+    results = {}
+
+    def worker(text):
+        results[text] = service.embed(text)
+
+    threads = [threading.Thread(target=worker, args=(f"ürün {i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"   API calls: {len(embeddings.calls)}")
+    assert len(results) == 8
+    assert len(embeddings.calls) == 1
+    assert sorted(embeddings.calls[0]) == sorted(f"ürün {i}" for i in range(8))
+    for text, vector in results.items():
+        assert cosine(vector, fake_vector(text)) > 0.999
+
+
+def test_async_batching():
+    print("\nTest 5: Async istekler pencere içinde birleştirilir (aynı metin tekrar edilmez)")
+    embeddings = StandInAsyncEmbeddings()
+    service = EmbeddingService(
+        client_factory=lambda: StandInClient(embeddings),
+        async_client_factory=lambda: StandInClient(embeddings),
+        batch_window=0.02
+    )
+
+    async def run():
+        texts = ["laptop", "tablet", "laptop", "kulaklık"]
+        return await service.aembed_many(texts)
+
+    vectors = asyncio.run(run())
+    assert len(vectors) == 4
+    assert len(embeddings.calls) == 1
+    assert sorted(embeddings.calls[0]) == ["kulaklık", "laptop", "tablet"]
+    assert vectors[0] == vectors[2]
+
+
+def test_async_sqlite_off_loop():
+    print("\nTest 6: Async yolda SQLite okuma/yazması event loop thread'inde yapılmaz, batch tek yazım")
+    embeddings = StandInAsyncEmbeddings()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TieredCache(sqlite_path=os.path.join(tmp, "cache.db"))
+        sqlite_threads = []
+        for name in ("get", "set", "set_many"):
+            original = getattr(cache, name)
+
+            def recorded(*args, _original=original, _name=name, **kwargs):
+                sqlite_threads.append((_name, threading.current_thread()))
+                return _original(*args, **kwargs)
+            setattr(cache, name, recorded)
+        service = EmbeddingService(
+            client_factory=lambda: StandInClient(embeddings),
+            async_client_factory=lambda: StandInClient(embeddings),
+            cache=cache,
+            batch_window=0.02
+        )
+
+        async def run():
+            first = await service.aembed_many(["laptop", "tablet"])
+            second = await service.aembed_many(["laptop", "tablet"])  # memory hit, thread'e gitmez
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert len(embeddings.calls) == 1
+        assert all(cosine(a, b) > 0.999 for a, b in zip(first, second))
+        assert [name for name, _ in sqlite_threads] == ["get", "get", "set_many"]
+        assert all(thread is not threading.main_thread() for _, thread in sqlite_threads)
+        assert cache.stats()["embeddings"]["misses"] == 2 and cache.stats()["embeddings"]["memory_hits"] == 2
+
+        # restart sonrası SQLite'tan okunur
+        reopened = EmbeddingService(client_factory=lambda: StandInClient(embeddings),
+                                    async_client_factory=lambda: StandInClient(embeddings),
+                                    cache=TieredCache(sqlite_path=os.path.join(tmp, "cache.db")))
+        assert asyncio.run(reopened.aembed("laptop")) == second[0] and len(embeddings.calls) == 1
+
+
+if __name__ == "__main__":
+    print("EMBEDDING SERVICE TEST")
+    print("=" * 60)
+    test_codecs()
+    test_cache_and_normalization()
+    test_embed_many_batches_misses()
+    test_sync_batching_across_threads()
+    test_async_batching()
+    test_async_sqlite_off_loop()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
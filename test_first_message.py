@@ -25,9 +25,8 @@ else:
 
 print("\n--- Checking session file ---")
 if os.path.exists(session_file):
-    import pickle
-    with open(session_file, 'rb') as f:
-        session = pickle.load(f)
+    from models.conversation_state import SessionManager
+    session = SessionManager().get_session("+905551234567")
     print(f"Stage: {session.stage}")
     print(f"Intent: {session.intent}")
     print(f"Product Info: {session.product_info}")
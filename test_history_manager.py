@@ -0,0 +1,158 @@
+"""
+Test konuşma geçmişi yöneticisi (utils/history_manager.py)
+Pencere, token bütçesi, arka planda özet (request yolunu beklemez, bir sonraki
+turn'de session'a yazılır), geçersiz özetin sıfırlanması ve session kaydı.
+"""
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from models.conversation_state import SessionManager, SessionState  # noqa: E402
+from models.session_store import MemorySessionStore  # noqa: E402
+from utils.history_manager import HistoryManager, count_tokens, get_history_manager  # noqa: E402
+
+
+def make_session(messages, user_id="u1"):
+    session = SessionState(user_id=user_id)
+    for index in range(messages):
+        session.add_message("user" if index % 2 == 0 else "assistant", f"mesaj {index} iPhone 13 128GB temiz kutulu")
+    return session
+
+
+def test_window_without_summary():
+    print("\nTest 1: Özet kapalı: son mesajlar, bütçe içinde, son mesaj hariç")
+    manager = HistoryManager(verbatim_messages=4, default_budget=10000, summarize=None)
+    session = make_session(21)
+    text = manager.build_context(session)
+    assert "mesaj 19 " in text and "mesaj 20 " not in text
+    # özet yokken özetlenmemiş eski mesajlar da bütçe izin verdikçe eklenir
+    assert "mesaj 0 " in text
+
+    manager = HistoryManager(verbatim_messages=4, default_budget=60, budgets={"gathering_info": 30}, summarize=None)
+    text = manager.build_context(session)
+    assert count_tokens(text) <= 60 and "mesaj 19 " in text and "mesaj 0 " not in text
+    assert count_tokens(manager.build_context(session, agent="gathering_info")) <= 30
+
+
+def test_long_single_message_truncated():
+    print("\nTest 2: Bütçeden uzun tek mesaj kırpılır")
+    manager = HistoryManager(default_budget=50, summarize=None)
+    session = SessionState(user_id="u2")
+    session.add_message("user", "çok uzun mesaj " * 200)
+    session.add_message("user", "yeni")
+    text = manager.build_context(session)
+    assert text.startswith("Kullanıcı: çok uzun") and count_tokens(text) <= 50
+
+
+def test_summary_runs_off_request_path():
+    print("\nTest 3: Özet arka planda üretilir, sonraki turn'de kullanılır")
+    release = threading.Event()
+    calls = []
+
+    def slow_summarize(previous, messages):
+        calls.append((previous, len(messages)))
+        release.wait(5)
+        return f"özet({previous}|{len(messages)})"
+
+    manager = HistoryManager(verbatim_messages=4, default_budget=10000, summary_batch=6, summarize=slow_summarize)
+    session = make_session(13)
+    # request yolu özet çağrısını beklemez
+    text = manager.build_context(session)
+    assert "ÖZET" not in text and session.summary_message_count == 0
+    assert manager.stats()["in_flight"] == 1
+    release.set()
+    manager.wait(5)
+    assert calls == [("", 8)]
+
+    session.add_message("assistant", "cevap")
+    session.add_message("user", "yeni mesaj")
+    text = manager.build_context(session)
+    assert session.summary_message_count == 8 and session.history_summary == "özet(|8)"
+    assert text.startswith("ÖZET (önceki konuşma): özet(|8)")
+    assert "mesaj 7 " not in text and "mesaj 8 " in text
+
+    # kayan özet: önceki özet + yeni mesajlar
+    for index in range(8):
+        session.add_message("user", f"ek {index}")
+    manager.build_context(session)
+    manager.wait(5)
+    assert calls[-1] == ("özet(|8)", 10)
+
+
+def test_stale_summary_reset_and_persisted():
+    print("\nTest 4: History kısalırsa özet sıfırlanır; özet session header'ında saklanır")
+    manager = HistoryManager(summarize=None)
+    session = make_session(3)
+    session.history_summary, session.summary_message_count = "eski özet", 40
+    assert "eski özet" not in manager.build_context(session)
+    assert session.summary_message_count == 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemorySessionStore()
+        sessions = SessionManager(persist_dir=tmp, store=store)
+        session = sessions.get_or_create_session("u4")
+        session.add_message("user", "merhaba")
+        session.history_summary, session.summary_message_count = "kullanıcı iPhone satıyor", 1
+        sessions.update_session(session)
+        sessions.sessions.clear()
+        loaded = sessions.get_or_create_session("u4")
+        assert loaded.history_summary == "kullanıcı iPhone satıyor" and loaded.summary_message_count == 1
+
+
+def test_summary_not_applied_to_new_session():
+    print("\nTest 5: Silinen/süresi dolan session'ın özeti yeni session'a uygulanmaz; bekleyenler sınırlı")
+    manager = HistoryManager(verbatim_messages=4, default_budget=10000, summary_batch=6,
+                             summarize=lambda previous, messages: "ESKİ SESSION özeti")
+    old = make_session(13)
+    manager.build_context(old)
+    manager.wait(5)
+    assert manager.stats()["ready"] == 1
+
+    # aynı kullanıcı, yeni session (ör. expire sonrası), özetin kapsadığı uzunluğa ulaşıyor
+    new = make_session(13)
+    assert new.session_id != old.session_id
+    text = manager.build_context(new)
+    assert "ESKİ SESSION" not in text and new.summary_message_count == 0 and "mesaj 0 " in text
+    manager.wait(5)
+
+    manager.forget("u1")
+    assert manager.stats()["ready"] == 0
+
+    # SessionManager.delete_session bekleyen özeti de atar
+    shared = get_history_manager()
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions = SessionManager(persist_dir=tmp, store=MemorySessionStore())
+        session = sessions.get_or_create_session("u5")
+        shared._ready["u5"] = (session.session_id, "özet", 1, time.monotonic())
+        sessions.delete_session("u5")
+        assert "u5" not in shared._ready
+
+    # uygulanmayan özetler üst sınır ve TTL ile atılır
+    manager = HistoryManager(verbatim_messages=4, default_budget=10000, summary_batch=6, max_ready=2,
+                             summarize=lambda previous, messages: "özet")
+    for user in ("a", "b", "c"):
+        manager.build_context(make_session(13, user_id=user))
+        manager.wait(5)
+    assert manager.stats()["ready"] == 2
+    manager.ready_ttl = 0
+    manager.build_context(make_session(13, user_id="d"))
+    manager.wait(5)
+    assert manager.stats()["ready"] == 1
+
+
+if __name__ == "__main__":
+    print("HISTORY MANAGER TEST")
+    print("=" * 60)
+    test_window_without_summary()
+    test_long_single_message_truncated()
+    test_summary_runs_off_request_path()
+    test_stale_summary_reset_and_persisted()
+    test_summary_not_applied_to_new_session()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
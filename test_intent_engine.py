@@ -0,0 +1,123 @@
+"""
+Test intent engine (utils/intent_engine.py)
+Aho-Corasick otomatının naif alt-dizi taramasıyla aynı sonucu vermesi,
+Türkçe İ/I/ı küçültme, fiyat regex'leri ve entry point kararları.
+"""
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from agents.base import BaseAgent  # noqa: E402
+from agents.conversation_enhanced import EnhancedConversationAgent  # noqa: E402
+from agents.router import RouterAgent  # noqa: E402
+from models.conversation_state import ConversationStage, UserIntent  # noqa: E402
+from utils import intent_engine  # noqa: E402
+from utils.intent_engine import IntentEngine, normalize  # noqa: E402
+from utils.query_parser import fold  # noqa: E402
+
+
+def naive_signals(tables, message):
+    text = normalize(message)
+    return {
+        name for name, keywords in tables.items()
+        if any(variant in text for keyword in keywords for variant in {normalize(keyword), fold(keyword)})
+    }
+
+
+def test_automaton_matches_naive_scan():
+    print("\nTest 1: Otomat, örtüşen anahtar kelimelerde naif taramayla aynı")
+    tables = {
+        "a": ["he", "she", "his", "hers"],
+        "b": ["sat", "satmak", "satmak istiyorum"],
+        "c": ["ara", "ara bana", "arıyorum"],
+        "d": ["ne", "ne kadar"],
+    }
+    engine = IntentEngine(tables)
+    messages = [
+        "ushers", "ahishers", "satmak istiyorum", "ara bana sat", "ne kadar", "yeni", "",
+        "arıyorum", "ariyorum", "ARA BANA", "hersatmak", "shehe",
+    ]
+    for message in messages:
+        assert set(engine.match(message).names()) == naive_signals(tables, message), message
+
+    with open("data/whatsapp_messages.json", encoding="utf-8") as f:
+        corpus = [row["text"] for row in json.load(f)]
+    engine = intent_engine.get_intent_engine()
+    for message in corpus:
+        found = set(engine.match(message).names()) - set(intent_engine.REGEX_SIGNALS)
+        assert found == naive_signals(intent_engine.KEYWORD_SIGNALS, message), message
+    print(f"   {len(corpus)} mesaj eşit")
+
+
+def test_turkish_case_folding():
+    print("\nTest 2: İ/I büyük harf ve ASCII yazım")
+    assert normalize("İPTAL") == "iptal" and normalize("IPHONE") == "iphone"
+    assert intent_engine.match("İPTAL").has("cancel")
+    assert intent_engine.match("BIRAK şimdilik").has("cancel")
+    assert intent_engine.match("SATMAK İSTİYORUM").has("listing_phrase")
+    assert intent_engine.match("samsung s22 ariyorum").has("search_explicit")
+    # metin ASCII'ye indirilmez: "takımı" içinde "kim" yok
+    assert not intent_engine.match("koltuk takımı").has("question_word")
+
+
+def test_price_regex():
+    print("\nTest 3: Fiyat tutarı sinyali ve değer çıkarımı")
+    assert intent_engine.match("2000 TL olsun").has("price_amount")
+    assert intent_engine.match("fiyatı 3500 yap").has("price_amount")
+    assert not intent_engine.match("fiyatı düşür").has("price_amount")
+
+    agent = EnhancedConversationAgent.__new__(EnhancedConversationAgent)
+    BaseAgent.__init__(agent, "EnhancedConversationAgent")
+    assert agent._extract_price("Fiyatı 1.500 TL yap") == 1500
+    assert agent._extract_price("FİYATI 2750 olsun") == 2750
+    assert agent._extract_price("olmaz") is None
+
+
+class Session:
+    def __init__(self, stage=ConversationStage.INITIAL, image_url=None):
+        self.stage = stage
+        self.image_url = image_url
+
+
+def test_entry_point_decisions():
+    print("\nTest 4: Agent ve router kararları")
+    agent = EnhancedConversationAgent.__new__(EnhancedConversationAgent)
+    BaseAgent.__init__(agent, "EnhancedConversationAgent")
+    cases = [
+        ("Bir adet Samsung S23 Ultra, 12GB RAM", Session(), UserIntent.LISTING),
+        ("2000 TL olsun", Session(ConversationStage.PREVIEW), UserIntent.NEGOTIATING),
+        ("biraz pahalı", Session(ConversationStage.PREVIEW), UserIntent.NEGOTIATING),
+        ("İPTAL", Session(), UserIntent.CANCELLING),
+        ("Onayla", Session(), UserIntent.CONFIRMING),
+        ("Düzenle", Session(), UserIntent.EDITING),
+        ("laptop satmak istiyorum", Session(), UserIntent.LISTING),
+        ("iphone 13 kaç para eder", Session(), UserIntent.LISTING),
+        ("ikinci el laptop arıyorum", Session(), UserIntent.SEARCHING),
+        ("kargo nasıl oluyor", Session(), UserIntent.QUESTION),
+        ("siyah renk", Session(), UserIntent.UNKNOWN),
+        ("siyah renk", Session(image_url="https://x/1.jpg"), UserIntent.LISTING),
+    ]
+    for message, session, expected in cases:
+        assert agent._detect_intent(message, session) == expected, (message, expected)
+
+    router = RouterAgent.__new__(RouterAgent)
+    assert router._simple_intent_detection("ilan vermek istiyorum", False) == "create_listing"
+    assert router._simple_intent_detection("bisiklet var mı", False) == "product_search"
+    assert router._simple_intent_detection("yardım lazım", False) == "help"
+    assert router._simple_intent_detection("Günaydın", False) == "small_talk"
+    assert router._simple_intent_detection("siyah", True) == "create_listing"
+
+
+if __name__ == "__main__":
+    print("INTENT ENGINE TEST")
+    print("=" * 60)
+    test_automaton_matches_naive_scan()
+    test_turkish_case_folding()
+    test_price_regex()
+    test_entry_point_decisions()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,141 @@
+"""
+Test yerel intent modeli (utils/intent_model.py)
+Eğitim/tahmin, kaydet-yükle, eşik ve izinli etiketler, RouterAgent'ın emin
+olduğu turn'lerde LLM çağırmaması ve conversation agent fallback'leri.
+"""
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+import numpy as np  # noqa: E402
+from agents.base import BaseAgent  # noqa: E402
+from agents.conversation_enhanced import EnhancedConversationAgent, SMALL_TALK_REPLY  # noqa: E402
+from agents.router import RouterAgent  # noqa: E402
+from models.conversation_state import ConversationStage, UserIntent  # noqa: E402
+from utils import intent_model, metrics  # noqa: E402
+from utils.intent_model import IntentModel  # noqa: E402
+
+
+class ExplodingLLM:
+    calls = 0
+
+    def bind(self, **kwargs):
+        return self
+
+    def invoke(self, prompt):
+        ExplodingLLM.calls += 1
+        raise RuntimeError("LLM should not be called")
+
+
+def test_train_predict_roundtrip():
+    print("\nTest 1: Eğitim, tahmin, kaydet/yükle")
+    started = time.perf_counter()
+    model = intent_model.train_from_file()
+    print(f"   eğitim: {(time.perf_counter() - started) * 1000:.0f} ms")
+    for text, label in [
+        ("selam", "small_talk"), ("ilanlarımı göster", "listing_management"),
+        ("ikinci el telefon arıyorum", "product_search"), ("nasıl çalışıyor", "help"),
+        ("kameramı satacağım", "create_listing"),
+    ]:
+        prediction = model.predict(text)
+        assert prediction.label == label, (text, prediction)
+        assert abs(sum(prediction.scores.values()) - 1.0) < 1e-4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "intent_model.npz")
+        model.save(path)
+        loaded = IntentModel.load(path)
+    assert loaded.labels == model.labels
+    assert np.allclose(loaded.predict("ps5 var mı").confidence, model.predict("ps5 var mı").confidence)
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        model.predict("Merhaba, ikinci el bir bisiklet arıyorum İzmir'de")
+    per_call_us = (time.perf_counter() - started) / 1000 * 1e6
+    print(f"   tahmin: {per_call_us:.0f} µs")
+    assert per_call_us < 2000
+
+
+def test_classify_threshold_and_allowed():
+    print("\nTest 2: Eşik altı ve izinli olmayan etiket None")
+    assert intent_model.classify("") is None
+    assert intent_model.classify("selam").label == "small_talk"
+    assert intent_model.classify("selam", allowed=("help",)) is None
+    assert intent_model.classify("asdf qwerty zxcv") is None
+
+
+def test_router_answers_locally():
+    print("\nTest 3: RouterAgent emin olduğunda gpt-4o çağırmaz")
+    router = RouterAgent.__new__(RouterAgent)
+    BaseAgent.__init__(router, "RouterAgent")
+    router.llm = ExplodingLLM()
+    before = metrics.INTENT_ROUTING.value("router", "local")
+
+    state = router({"message": "ikinci el telefon arıyorum"})
+    assert state["intent"] == "product_search" and state["query"] == "ikinci el telefon arıyorum"
+    assert state["router_meta"]["source"] == "local_model"
+    state = router({"message": "selam"})
+    assert state["intent"] == "small_talk"
+    assert ExplodingLLM.calls == 0
+    assert metrics.INTENT_ROUTING.value("router", "local") == before + 2
+
+    # create_listing alan çıkarımı ister -> LLM (burada patlar, keyword fallback'e düşer)
+    state = router({"message": "kameramı satacağım"})
+    assert ExplodingLLM.calls == 1 and state["intent"] == "create_listing"
+
+    # listing_management ilan referansı ("1. ürün", "2500 TL olan ürün") için LLM'e gider
+    state = router({"message": "ilanlarımı göster"})
+    assert ExplodingLLM.calls == 2 and state.get("router_meta", {}).get("source") != "local_model"
+
+
+class Session:
+    def __init__(self, stage=ConversationStage.INITIAL):
+        self.stage = stage
+        self.image_url = None
+
+
+def test_conversation_fallbacks():
+    print("\nTest 4: Conversation agent: anahtar kelime yoksa model, small talk LLM'siz")
+    agent = EnhancedConversationAgent.__new__(EnhancedConversationAgent)
+    BaseAgent.__init__(agent, "EnhancedConversationAgent")
+    agent.llm = ExplodingLLM()
+    calls = ExplodingLLM.calls
+
+    # keyword tablolarında olmayan ifadeler
+    assert agent._detect_intent("bana bir laptop lazım", Session()) == UserIntent.SEARCHING
+    assert agent._detect_intent("siyah renk", Session()) == UserIntent.UNKNOWN
+
+    class HistorySession(Session):
+        user_id = "u1"
+        intent = UserIntent.UNKNOWN
+        history_summary = ""
+        summary_message_count = 0
+        conversation_history = [
+            {"role": "user", "content": "merhaba"},
+            {"role": "assistant", "content": "Merhaba! 👋"},
+            {"role": "user", "content": "teşekkür ederim"},
+        ]
+
+        def set_stage(self, stage):
+            self.stage = stage
+
+    state = {}
+    assert agent._handle_initial("teşekkür ederim", HistorySession(), state) == SMALL_TALK_REPLY
+    assert state["response_type"] == "conversation"
+    assert ExplodingLLM.calls == calls
+
+
+if __name__ == "__main__":
+    print("INTENT MODEL TEST")
+    print("=" * 60)
+    test_train_predict_roundtrip()
+    test_classify_threshold_and_allowed()
+    test_router_answers_locally()
+    test_conversation_fallbacks()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,87 @@
+"""
+Test LLM response cache katmanları (utils/tiered_cache.py)
+LangChain adapter'ı (utils/llm_cache.py) kuruluysa onunla da roundtrip yapılır.
+"""
+import os
+import shutil
+import time
+from utils.tiered_cache import TieredCache
+
+TEST_DIR = "test_llm_cache_dir"
+
+
+def test_memory_tier():
+    print("\nTest 1: Memory LRU + TTL")
+    cache = TieredCache(memory_entries=2)
+    cache.set("a", "A", ttl_seconds=60, namespace="pricing")
+    assert cache.get("a", "pricing") == "A"
+    assert cache.get("missing", "pricing") is None
+
+    cache.set("b", "B", ttl_seconds=60)
+    cache.set("c", "C", ttl_seconds=60)
+    assert cache.get("a") is None, "LRU sınırı aşıldı"
+
+    cache.set("short", "S", ttl_seconds=0.2)
+    time.sleep(0.3)
+    assert cache.get("short") is None, "TTL uygulanmadı"
+
+    stats = cache.stats()["pricing"]
+    print(f"   {stats}")
+    assert stats["memory_hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_sqlite_tier():
+    print("\nTest 2: SQLite katmanı restart sonrası da hit verir")
+    if os.path.exists(TEST_DIR):
+        shutil.rmtree(TEST_DIR)
+    path = os.path.join(TEST_DIR, "llm_cache.sqlite")
+
+    first = TieredCache(sqlite_path=path)
+    first.set("prompt-key", '{"price": 25000}', ttl_seconds=60, namespace="pricing")
+    first.set("old-key", "old", ttl_seconds=0.1, namespace="pricing")
+
+    # Yeni process: memory boş, SQLite'tan okunur ve memory'ye alınır
+    second = TieredCache(sqlite_path=path)
+    assert second.get("prompt-key", "pricing") == '{"price": 25000}'
+    assert second.get("prompt-key", "pricing") == '{"price": 25000}'
+    stats = second.stats()["pricing"]
+    assert stats["sqlite_hits"] == 1 and stats["memory_hits"] == 1
+
+    time.sleep(0.2)
+    assert second.purge_expired() == 1
+    assert second.get("old-key", "pricing") is None
+    shutil.rmtree(TEST_DIR)
+
+
+def test_langchain_adapter():
+    print("\nTest 3: LangChain BaseCache adapter")
+    try:
+        from langchain_core.outputs import ChatGeneration
+        from langchain_core.messages import AIMessage
+        from utils.llm_cache import LLMResponseCache
+    except ImportError:
+        print("   langchain_core yok, atlandı")
+        return
+
+    cache = LLMResponseCache(TieredCache(), namespace="text_parser")
+    llm_string = "model=gpt-4o,temperature=0"
+    assert cache.lookup("iPhone 13 2.el", llm_string) is None
+
+    cache.update("iPhone 13 2.el", llm_string, [ChatGeneration(message=AIMessage(content='{"brand": "Apple"}'))])
+    cached = cache.lookup("iPhone 13 2.el", llm_string)
+    assert cached[0].message.content == '{"brand": "Apple"}'
+
+    # Farklı model config'i ayrı key
+    assert cache.lookup("iPhone 13 2.el", "model=gpt-4o,temperature=0.7") is None
+    assert cache.ttl_seconds == 24 * 3600
+
+
+if __name__ == "__main__":
+    print("LLM CACHE TEST")
+    print("=" * 60)
+    test_memory_tier()
+    test_sqlite_tier()
+    test_langchain_adapter()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
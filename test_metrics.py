@@ -0,0 +1,155 @@
+"""
+Test Prometheus metrikleri (utils/metrics.py)
+Thread shard'lı sayaç/histogram doğruluğu, text exposition formatı, agent
+sarmalayıcısı, LLM callback'i, Supabase hook'ları ve fallback sayaçları.
+"""
+import asyncio
+import threading
+import time
+import httpx
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from agents.base import BaseAgent
+from agents.pricing import PricingAgent
+from utils import metrics
+from utils.metrics import Counter, Histogram, Registry
+
+
+def test_sharded_counter_is_exact():
+    print("\nTest 1: 8 thread x 20k artış kaybolmadan toplanır")
+    counter = Counter("test_hits", "test", ("route",))
+
+    def work():
+        for _ in range(20000):
+            counter.inc("/conversation")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value("/conversation") == 160000
+    assert len(counter._shards) == 8
+
+
+def test_histogram_render():
+    print("\nTest 2: Histogram kümülatif bucket, _sum, _count ve label escape")
+    registry = Registry()
+    histogram = registry.register(Histogram("test_latency_seconds", "test", ("target",), buckets=(0.1, 1.0)))
+    for value in [0.05, 0.5, 0.5, 3.0]:
+        histogram.observe(value, 'rpc:"x"')
+    registry.gauge("test_sessions", "test", lambda: 3)
+    registry.gauge("test_missing", "test", lambda: None)
+    text = registry.render()
+
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{target="rpc:\\"x\\"",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{target="rpc:\\"x\\"",le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{target="rpc:\\"x\\"",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{target="rpc:\\"x\\""} 4' in text
+    assert 'test_latency_seconds_sum{target="rpc:\\"x\\""} 4.05' in text
+    assert "test_sessions 3.0" in text and "test_missing" not in text
+
+
+class SlowAgent(BaseAgent):
+    def __init__(self):
+        super().__init__("SlowAgent")
+
+    def __call__(self, state):
+        if state.get("fail"):
+            raise RuntimeError("boom")
+        time.sleep(0.02)
+        return state
+
+    async def acall(self, state):
+        # Sync implementasyona düşen acall iç içe sayılmaz
+        return await asyncio.to_thread(self, state)
+
+
+def test_agent_wrapper_metrics():
+    print("\nTest 3: Agent çağrıları bir kez ölçülür, hatalar sayılır")
+    before = metrics.AGENT_LATENCY.count("SlowAgent")
+    agent = SlowAgent()
+    agent({})
+    asyncio.run(agent.acall({}))
+    try:
+        agent({"fail": True})
+    except RuntimeError:
+        pass
+    assert metrics.AGENT_LATENCY.count("SlowAgent") == before + 3
+    assert metrics.AGENT_ERRORS.value("SlowAgent") == 1
+    _, total = metrics.AGENT_LATENCY.snapshot()[("SlowAgent",)]
+    assert total >= 0.04
+
+
+def test_llm_handler():
+    print("\nTest 4: LLM latency ve token sayaçları model bazlı")
+    handler = metrics.LLMMetricsHandler()
+    handler.on_chat_model_start({}, [[]], run_id="r1", invocation_params={"model": "gpt-4o-mini"})
+    handler.on_llm_end(LLMResult(
+        generations=[[ChatGeneration(message=AIMessage(content="{}"))]],
+        llm_output={"token_usage": {"prompt_tokens": 200, "completion_tokens": 20}}
+    ), run_id="r1")
+    handler.on_chat_model_start({}, [[]], run_id="r2", invocation_params={"model": "gpt-4o-mini"})
+    handler.on_llm_error(TimeoutError(), run_id="r2")
+    assert metrics.LLM_LATENCY.count("gpt-4o-mini") >= 1
+    assert metrics.LLM_TOKENS.value("gpt-4o-mini", "prompt") >= 200
+    assert metrics.LLM_ERRORS.value("gpt-4o-mini") >= 1
+
+
+def test_supabase_hooks():
+    print("\nTest 5: PostgREST istekleri tablo/rpc bazlı ölçülür")
+
+    def handler(request):
+        return httpx.Response(500 if "broken" in request.url.path else 200, json=[])
+
+    class Client:
+        class postgrest:
+            session = httpx.Client(base_url="https://x.supabase.co/rest/v1", transport=httpx.MockTransport(handler))
+
+    client = Client()
+    metrics.instrument_supabase(client)
+    metrics.instrument_supabase(client)
+    client.postgrest.session.post("/rpc/search_listings", json={})
+    client.postgrest.session.get("/listings")
+    client.postgrest.session.get("/broken_table")
+    assert metrics.DB_LATENCY.count("rpc:search_listings", "POST") == 1
+    assert metrics.DB_LATENCY.count("listings", "GET") == 1
+    assert metrics.DB_ERRORS.value("broken_table") == 1
+
+
+def test_pricing_fallback_counter():
+    print("\nTest 6: PricingAgent 1000 TL fallback'i sayılır")
+    agent = PricingAgent.__new__(PricingAgent)
+    BaseAgent.__init__(agent, "PricingAgent")
+    before = metrics.FALLBACKS.value("pricing", "default_price")
+    state = {}
+    agent._apply_fallback(state)
+    assert state["pricing"]["suggested_price"] == 1000
+    assert metrics.FALLBACKS.value("pricing", "default_price") == before + 1
+    assert 'megapazar_fallbacks_total{component="pricing",reason="default_price"}' in metrics.REGISTRY.render()
+
+
+def test_hot_path_overhead():
+    print("\nTest 7: Hot path maliyeti (lock yok)")
+    histogram = Histogram("test_overhead_seconds", "test", ("route",))
+    start = time.perf_counter()
+    for _ in range(100000):
+        histogram.observe(0.012, "/conversation")
+    per_call_us = (time.perf_counter() - start) / 100000 * 1e6
+    print(f"   observe: {per_call_us:.2f} µs")
+    assert per_call_us < 20
+
+
+if __name__ == "__main__":
+    print("METRICS TEST")
+    print("=" * 60)
+    test_sharded_counter_is_exact()
+    test_histogram_render()
+    test_agent_wrapper_metrics()
+    test_llm_handler()
+    test_supabase_hooks()
+    test_pricing_fallback_counter()
+    test_hot_path_overhead()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,130 @@
+"""
+Test model tiering politikası (utils/model_policy.py)
+Karmaşıklık tablosu ve override'lar, yük/bütçe sinyallerinden seviye, normal
+yükte bugünkü modellerin korunması, TieredLLM'in her çağrıda yeniden seçmesi.
+"""
+import asyncio
+import os
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from agents.pricing import PricingAgent  # noqa: E402
+from agents.router import RouterAgent  # noqa: E402
+from utils import metrics, model_policy, openai_client  # noqa: E402
+from utils.cost_tracker import CostTracker  # noqa: E402
+from utils.metrics import LLMMetricsHandler  # noqa: E402
+from utils.model_policy import ModelPolicy, TieredLLM  # noqa: E402
+
+TIERS = {"premium": "gpt-4o", "economy": "gpt-4o-mini"}
+
+
+def test_complexity_and_overrides():
+    print("\nTest 1: Görev karmaşıklığı, override'lar ve bilinmeyen agent")
+    policy = ModelPolicy(TIERS, overrides={"pricing.validation": "simple", "router": "complex", "help": "yok"})
+    assert policy.complexity("pricing") == "complex"
+    assert policy.complexity("pricing", "validation") == "simple"
+    assert policy.complexity("pricing", "bilinmeyen") == "complex"
+    assert policy.complexity("router") == "complex"
+    assert policy.complexity("help") == "trivial"  # geçersiz override yok sayılır
+    assert policy.complexity("yeni_agent") == "standard"
+
+
+def test_load_levels():
+    print("\nTest 2: Devam eden çağrı sayısı ve saatlik bütçeden yük seviyesi")
+    state = {"in_flight": 0, "cost": 0.0}
+    policy = ModelPolicy(TIERS, elevated_inflight=10, high_inflight=30, hourly_budget_try=100.0,
+                         in_flight=lambda: state["in_flight"], recent_cost=lambda: state["cost"])
+    assert policy.load_level() == "normal"
+    state["in_flight"] = 10
+    assert policy.load_level() == "elevated"
+    state["in_flight"] = 30
+    assert policy.load_level() == "high"
+    state["in_flight"], state["cost"] = 0, 85.0
+    assert policy.load_level() == "elevated"
+    state["cost"] = 120.0
+    assert policy.load_level() == "high"
+
+    assert ModelPolicy(TIERS, level="high").load_level() == "high"
+    assert ModelPolicy(TIERS, enabled=False, level="high", in_flight=lambda: 99).load_level() == "normal"
+
+
+def test_routes_per_level():
+    print("\nTest 3: Normal yükte bugünkü modeller, yük arttıkça kademeli downshift")
+    policy = ModelPolicy(TIERS)
+    normal = {route: model for route, model in policy.describe()["routes"].items()}
+    assert normal["buyer_search.default"] == normal["help.default"] == "gpt-4o-mini"
+    assert all(model == "gpt-4o" for route, model in normal.items() if not route.startswith(("buyer_search", "help")))
+
+    assert policy.tier_for("market_search", "estimate", "elevated") == "economy"
+    assert policy.tier_for("router", level="elevated") == "premium"
+    assert policy.tier_for("router", level="high") == "economy"
+    for level in ("normal", "elevated", "high"):
+        assert policy.tier_for("vision", level=level) == "premium"
+        assert policy.tier_for("listing_writer", level=level) == "premium"
+
+
+def test_tiered_llm_resolves_per_call():
+    print("\nTest 4: TieredLLM her çağrıda modeli yeniden seçer")
+    state = {"in_flight": 0}
+    policy = ModelPolicy(TIERS, elevated_inflight=5, high_inflight=10, in_flight=lambda: state["in_flight"])
+    requested = []
+
+    def fake_get_llm(model="gpt-4o", temperature=0.7, cache_namespace=None):
+        requested.append((model, temperature, cache_namespace))
+        return GenericFakeChatModel(messages=iter([AIMessage(content=model)]))
+
+    original_policy, original_get_llm = model_policy.get_model_policy, openai_client.get_llm
+    model_policy.get_model_policy, openai_client.get_llm = (lambda: policy), fake_get_llm
+    try:
+        llm = TieredLLM("router", temperature=0.3)
+        before = metrics.MODEL_SELECTIONS.value("router", "gpt-4o-mini", "high")
+        assert llm.invoke("x").content == "gpt-4o"
+        state["in_flight"] = 12
+        assert llm.invoke("x").content == "gpt-4o-mini"
+        assert asyncio.run(llm.ainvoke("x")).content == "gpt-4o-mini"
+        assert "".join(chunk.content for chunk in llm.stream("x")) == "gpt-4o-mini"
+        assert requested[0] == ("gpt-4o", 0.3, None)
+        assert metrics.MODEL_SELECTIONS.value("router", "gpt-4o-mini", "high") == before + 3
+    finally:
+        model_policy.get_model_policy, openai_client.get_llm = original_policy, original_get_llm
+
+
+def test_signals_and_agent_wiring():
+    print("\nTest 5: Sinyal kaynakları (in-flight, saatlik maliyet) ve agent'ların görevleri")
+    handler = LLMMetricsHandler()
+    run_ids = [uuid.uuid4() for _ in range(3)]
+    for run_id in run_ids:
+        handler.on_chat_model_start({}, [], run_id=run_id, invocation_params={"model": "gpt-4o"})
+    assert handler.in_flight() == 3
+    handler.on_llm_error(RuntimeError(), run_id=run_ids[0])
+    assert handler.in_flight() == 2
+    assert handler.in_flight(max_age=0) == 0 and handler.in_flight() == 0  # kayıp run'lar temizlenir
+
+    tracker = CostTracker(usd_try_rate=40.0)
+    tracker.record("gpt-4o", prompt_tokens=1_000_000, agent="PricingAgent")
+    assert abs(tracker.recent_cost_try(3600) - 100.0) < 1e-6
+    tracker.reset()
+    assert tracker.recent_cost_try(3600) == 0
+
+    pricing = PricingAgent()
+    assert (pricing.llm.agent, pricing.llm.task, pricing.llm.cache_namespace) == ("pricing", "default", "pricing")
+    assert pricing.validation_llm.task == "validation" and pricing.market_price_llm.task == "market_price"
+    assert RouterAgent().llm.temperature == 0.3
+
+
+if __name__ == "__main__":
+    print("MODEL POLICY TEST")
+    print("=" * 60)
+    test_complexity_and_overrides()
+    test_load_levels()
+    test_routes_per_level()
+    test_tiered_llm_resolves_per_call()
+    test_signals_and_agent_wiring()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,108 @@
+"""
+Test kural tabanlı arama filtresi parser'ı (utils/query_parser.py)
+Etiketli korpus (data/search_filter_corpus.json) üzerinde kapsama, doğruluk ve
+kurtarılan LLM çağrısı sayısı ölçülür.
+"""
+import json
+import time
+from utils.query_parser import parse_search_query, fold, PROVINCES
+
+CORPUS = "data/search_filter_corpus.json"
+
+
+def test_price_patterns():
+    print("\nTest 1: Fiyat kalıpları")
+    cases = {
+        "5000 TL altı": {"max_price": 5000},
+        "5.000 tl altında": {"max_price": 5000},
+        "1000-5000 TL arası": {"min_price": 1000, "max_price": 5000},
+        "1-5 bin arası": {"min_price": 1000, "max_price": 5000},
+        "500 ile 1500 TL arasında": {"min_price": 500, "max_price": 1500},
+        "en fazla 3 bin lira": {"max_price": 3000},
+        "10k üstü": {"min_price": 10000},
+        "2,5 bin TL'den ucuz": {"max_price": 2500},
+        "2 bin civarı": {"min_price": 1600, "max_price": 2400},
+        "1.5 milyon TL altı": {"max_price": 1500000},
+    }
+    for query, expected in cases.items():
+        parsed = parse_search_query(query)
+        assert parsed.confident, (query, parsed)
+        assert parsed.filters == expected, (query, parsed.filters)
+
+
+def test_numbers_that_are_not_prices():
+    print("\nTest 2: Model numarası / birim / yıl fiyat sayılmaz")
+    for query in ["iphone 13 ve 14", "S23 Ultra 256 GB", "Mercedes C180 2015", "15 kW motor", "100000 km altı araba"]:
+        parsed = parse_search_query(query)
+        assert parsed.confident, (query, parsed)
+        assert "min_price" not in parsed.filters and "max_price" not in parsed.filters, (query, parsed.filters)
+
+
+def test_location_and_condition():
+    print("\nTest 3: 81 il, ekler, kısa adlar ve durum")
+    assert len(PROVINCES) == 81 and len(set(PROVINCES)) == 81
+    assert parse_search_query("İstanbul'da laptop").filters["location"] == "İstanbul"
+    assert parse_search_query("izmirde masa").filters["location"] == "İzmir"
+    assert parse_search_query("ISPARTA kanepe").filters["location"] == "Isparta"
+    assert parse_search_query("antep telefon").filters["location"] == "Gaziantep"
+    assert "location" not in parse_search_query("paslanmaz vana").filters, "vana != Van"
+    assert parse_search_query("2.el telefon").filters["condition"] == "used"
+    assert parse_search_query("sıfır ayarında telefon").filters["condition"] == "used"
+    assert parse_search_query("kutusu açılmamış kulaklık").filters["condition"] == "new"
+    assert fold("İĞDIR") == "igdir"
+
+
+def test_low_confidence_escalates():
+    print("\nTest 4: Belirsiz sorgular LLM'e düşer")
+    for query in ["5000 TL laptop", "ankara veya izmir koltuk", "hasarlı ya da sıfır telefon", "beşiktaş'ta bisiklet"]:
+        parsed = parse_search_query(query)
+        assert not parsed.confident, (query, parsed)
+        assert parsed.ambiguities
+
+
+def test_corpus_coverage():
+    print("\nTest 5: Etiketli korpus - kapsama ve doğruluk")
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    handled = correct = 0
+    for case in corpus:
+        parsed = parse_search_query(case["query"])
+        if parsed.confident:
+            handled += 1
+            if parsed.filters == case["filters"]:
+                correct += 1
+            else:
+                print(f"   ✗ {case['query']}: {parsed.filters} (beklenen {case['filters']})")
+
+    coverage = handled / len(corpus)
+    accuracy = correct / handled
+    print(f"   sorgu: {len(corpus)}, kural tabanlı: {handled} ({coverage:.1%}), doğru: {correct} ({accuracy:.1%})")
+    print(f"   kurtarılan LLM çağrısı: {handled}/{len(corpus)}")
+    assert coverage >= 0.75
+    assert accuracy >= 0.95
+
+
+def test_latency():
+    print("\nTest 6: Sorgu başına gecikme")
+    queries = ["İstanbul'da 1000-5000 TL arası ikinci el laptop", "S23 Ultra", "en fazla 3 bin lira masa"]
+    start = time.perf_counter()
+    for _ in range(1000):
+        for query in queries:
+            parse_search_query(query)
+    per_query_us = (time.perf_counter() - start) / 3000 * 1e6
+    print(f"   {per_query_us:.0f} µs/sorgu")
+    assert per_query_us < 2000
+
+
+if __name__ == "__main__":
+    print("QUERY PARSER TEST")
+    print("=" * 60)
+    test_price_patterns()
+    test_numbers_that_are_not_prices()
+    test_location_and_condition()
+    test_low_confidence_escalates()
+    test_corpus_coverage()
+    test_latency()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,81 @@
+"""
+Test SessionCache (kayıt sayısı + byte sınırlı LRU)
+"""
+from models.session_cache import SessionCache
+
+
+def test_entry_limit():
+    print("\nTest 1: max_entries aşılınca en eski kayıt atılır")
+    cache = SessionCache(max_entries=3)
+    for user_id in ["a", "b", "c"]:
+        cache.put(user_id, user_id.upper(), size=10)
+
+    assert cache.get("a") == "A"  # a artık en yeni
+    cache.put("d", "D", size=10)
+
+    assert "b" not in cache, "LRU kaydı atılmalıydı"
+    assert list(cache) == ["c", "a", "d"]
+    assert cache.evictions == 1
+    assert cache.resident_bytes == 30
+
+
+def test_byte_limit():
+    print("\nTest 2: max_bytes aşılınca kayıt atılır")
+    cache = SessionCache(max_entries=100, max_bytes=100)
+    cache.put("a", "A", size=40)
+    cache.put("b", "B", size=40)
+    cache.put("c", "C", size=40)
+    assert "a" not in cache
+    assert cache.resident_bytes == 80
+
+    # Boyut güncellemesi (kayıt sonrası gerçek boyut) byte hesabını düzeltir
+    cache.put("b", "B2", size=90)
+    assert list(cache) == ["b"]
+    assert cache.resident_bytes == 90
+
+    # Tek başına limiti aşan kayıt yine de tutulur
+    cache.put("huge", "H", size=500)
+    assert list(cache) == ["huge"]
+
+
+def test_size_preserved_without_new_size():
+    print("\nTest 3: size verilmeyen put mevcut boyutu korur")
+    cache = SessionCache()
+    cache.put("a", "A", size=123)
+    cache.put("a", "A2")
+    assert cache.resident_bytes == 123
+    assert cache["a"] == "A2"
+
+
+def test_dict_interface_and_stats():
+    print("\nTest 4: dict arayüzü ve metrikler")
+    cache = SessionCache()
+    cache["a"] = "A"
+    assert "a" in cache and len(cache) == 1
+    assert cache.get("missing") is None
+    del cache["a"]
+    assert "a" not in cache
+    assert cache.resident_bytes == 0
+    try:
+        cache["a"]
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("KeyError bekleniyordu")
+
+    stats = cache.stats()
+    print(f"   {stats}")
+    assert stats["hits"] == 0
+    assert stats["misses"] == 2
+    assert stats["entries"] == 0
+
+
+if __name__ == "__main__":
+    print("SESSION CACHE TEST")
+    print("=" * 60)
+    test_entry_limit()
+    test_byte_limit()
+    test_size_preserved_without_new_size()
+    test_dict_interface_and_stats()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
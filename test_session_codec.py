@@ -0,0 +1,88 @@
+"""
+Test session codec (versiyonlu JSON serialization + migration)
+"""
+import pickle
+from models import session_codec
+
+
+def sample_payload(message_count: int = 3) -> dict:
+    return {
+        "user_id": "test-user",
+        "stage": "gathering_info",
+        "product_info": {"product_type": "Araba", "brand": "Mercedes"},
+        "conversation_history": [
+            {"role": "user", "content": f"Mesaj {i} - çğıöşü", "metadata": {}}
+            for i in range(message_count)
+        ],
+        "last_message_at": "2024-01-01T12:00:00",
+    }
+
+
+def test_roundtrip():
+    print("\nTest 1: encode/decode roundtrip")
+    payload = sample_payload()
+    data = session_codec.encode(payload)
+    assert data.startswith(session_codec.MAGIC)
+    assert session_codec.decode(data) == payload
+    print(f"   {len(data)} bytes")
+
+
+def test_compression():
+    print("\nTest 2: Büyük history sıkıştırılır")
+    payload = sample_payload(1000)
+    data = session_codec.encode(payload)
+    flags = data[len(session_codec.MAGIC)]
+    assert flags & session_codec.FLAG_ZLIB
+    assert session_codec.decode(data) == payload
+    assert len(data) < len(pickle.dumps(payload))
+    print(f"   codec={len(data)} bytes, pickle={len(pickle.dumps(payload))} bytes")
+
+
+def test_migration():
+    print("\nTest 3: Eski schema version migration ile güncellenir")
+    original_version = session_codec.SCHEMA_VERSION
+    original_migrations = dict(session_codec._MIGRATIONS)
+    try:
+        session_codec.SCHEMA_VERSION = original_version + 1
+
+        @session_codec.register_migration(original_version)
+        def _rename_stage(payload):
+            payload["conversation_stage"] = payload.pop("stage")
+            return payload
+
+        old_data = session_codec.encode(sample_payload(), version=original_version)
+        migrated = session_codec.decode(old_data)
+        assert "stage" not in migrated
+        assert migrated["conversation_stage"] == "gathering_info"
+    finally:
+        session_codec.SCHEMA_VERSION = original_version
+        session_codec._MIGRATIONS.clear()
+        session_codec._MIGRATIONS.update(original_migrations)
+
+
+def test_rejects_unknown_data():
+    print("\nTest 4: Tanınmayan / yeni version veriler reddedilir")
+    for bad in [b"", b"garbage", session_codec.encode({}, version=session_codec.SCHEMA_VERSION + 1)]:
+        try:
+            session_codec.decode(bad)
+        except session_codec.SessionCodecError:
+            continue
+        raise AssertionError(f"decode should fail for {bad!r}")
+
+
+def test_legacy_pickle_detection():
+    print("\nTest 5: Eski pickle dosyaları tanınır")
+    assert session_codec.is_legacy_pickle(pickle.dumps(sample_payload()))
+    assert not session_codec.is_legacy_pickle(session_codec.encode(sample_payload()))
+
+
+if __name__ == "__main__":
+    print("SESSION CODEC TEST")
+    print("=" * 60)
+    test_roundtrip()
+    test_compression()
+    test_migration()
+    test_rejects_unknown_data()
+    test_legacy_pickle_detection()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
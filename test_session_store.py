@@ -0,0 +1,162 @@
+"""
+Test SessionStore backends (memory, file, redis protocol)
+Redis testi fakeredis varsa onunla, yoksa basit bir stand-in ile çalışır.
+"""
+from models.session_store import MemorySessionStore, FileSessionStore, RedisSessionStore
+import os
+import shutil
+import time
+
+class StandInPipeline:
+    """Komutları biriktirip execute() ile sırayla çalıştırır"""
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+    
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+class StandInRedis:
+    """Minimal Redis stand-in (GET / SET EX / DELETE / EXISTS / RPUSH / LRANGE / EXPIRE)"""
+    def __init__(self):
+        self.data = {}
+    
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or entry[0] <= time.time():
+            self.data.pop(key, None)
+            return None
+        return entry[1]
+    
+    def set(self, key, value, ex=None):
+        self.data[key] = (time.time() + (ex or 10**9), value)
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+    
+    def exists(self, key):
+        return 1 if self.get(key) is not None else 0
+    
+    def rpush(self, key, *values):
+        entry = self.data.get(key)
+        expires_at, items = entry if entry else (time.time() + 10**9, [])
+        items.extend(values)
+        self.data[key] = (expires_at, items)
+        return len(items)
+    
+    def lrange(self, key, start, end):
+        items = self.get(key) or []
+        return items[start:] if end == -1 else items[start:end + 1]
+    
+    def expire(self, key, seconds):
+        if key in self.data:
+            self.data[key] = (time.time() + seconds, self.data[key][1])
+    
+    def pipeline(self):
+        return StandInPipeline(self)
+
+def make_redis_client():
+    try:
+        import fakeredis
+        return fakeredis.FakeRedis()
+    except ImportError:
+        return StandInRedis()
+
+def check_store(name, store, expire_store):
+    print(f"\n{name}")
+    
+    # Set / get
+    store.set("+905551234567", b"payload-1")
+    assert store.get("+905551234567") == b"payload-1", "Data mismatch!"
+    assert store.exists("+905551234567"), "Session should exist!"
+    print("OK set/get/exists")
+    
+    # Overwrite
+    store.set("+905551234567", b"payload-2")
+    assert store.get("+905551234567") == b"payload-2", "Overwrite failed!"
+    print("OK overwrite")
+    
+    # Delete
+    store.delete("+905551234567")
+    assert store.get("+905551234567") is None, "Delete failed!"
+    assert not store.exists("+905551234567"), "Deleted session still exists!"
+    print("OK delete")
+    
+    # History log: append-only + rewrite (compaction)
+    store.set("user-log", b"header")
+    store.append_history("user-log", [b'{"n":1}', b'{"n":2}'])
+    store.append_history("user-log", [])
+    store.append_history("user-log", [b'{"n":3}'])
+    assert store.load_history("user-log") == [b'{"n":1}', b'{"n":2}', b'{"n":3}'], "History append failed!"
+    store.rewrite_history("user-log", [b'{"n":9}'])
+    assert store.load_history("user-log") == [b'{"n":9}'], "History rewrite failed!"
+    store.delete("user-log")
+    assert store.load_history("user-log") == [], "History not deleted with session!"
+    print("OK history append/rewrite/delete")
+    
+    # TTL expiry (store tarafında)
+    expire_store.set("user-ttl", b"short-lived")
+    time.sleep(1.2)
+    assert expire_store.get("user-ttl") is None, "TTL not enforced!"
+    assert not expire_store.exists("user-ttl"), "Expired session still exists!"
+    print("OK TTL expiry")
+
+def test_session_store():
+    print("SESSION STORE TEST")
+    print("=" * 60)
+    
+    check_store("Memory store", MemorySessionStore(), MemorySessionStore(ttl_seconds=1))
+    
+    test_dir = "test_session_store_dir"
+    if os.path.exists(test_dir):
+        shutil.rmtree(test_dir)
+    file_store = FileSessionStore(persist_dir=test_dir)
+    check_store("File store", file_store, FileSessionStore(persist_dir=test_dir, ttl_seconds=1))
+    
+    # Purge: sadece süresi dolanlar silinir
+    short_store = FileSessionStore(persist_dir=test_dir, ttl_seconds=1)
+    short_store.set("old-user", b"old")
+    short_store.append_history("old-user", [b"old-message"])
+    time.sleep(1.2)
+    short_store.set("new-user", b"new")
+    removed = short_store.purge_expired()
+    assert removed == 1, f"Expected 1 purged session, got {removed}"
+    assert short_store.get("new-user") == b"new", "Live session purged!"
+    assert not short_store.history_path_for("old-user").exists(), "Orphan history log not purged!"
+    print("OK purge_expired")
+    
+    # Header'ı henüz yazılmamış (kayıt ortasındaki) history log'u rebuild'de silinmemeli
+    short_store.append_history("first-save", [b"first-message"])
+    short_store.rebuild_index()
+    assert short_store.load_history("first-save") == [b"first-message"], "In-flight history log deleted!"
+    time.sleep(1.2)
+    short_store.rebuild_index()
+    assert not short_store.history_path_for("first-save").exists(), "Stale orphan history log not removed!"
+    print("OK rebuild_index keeps fresh orphan logs")
+    
+    # Başka process'in yenilediği session index'ten silinmemeli
+    other_process = FileSessionStore(persist_dir=test_dir, ttl_seconds=1)
+    short_store.set("shared-user", b"v1")
+    time.sleep(1.2)
+    other_process.set("shared-user", b"v2")
+    short_store.purge_expired()
+    assert short_store.get("shared-user") == b"v2", "Refreshed session purged!"
+    print("OK expiry index re-checks mtime")
+    shutil.rmtree(test_dir)
+    
+    client = make_redis_client()
+    check_store(
+        f"Redis store ({type(client).__name__})",
+        RedisSessionStore(client=client),
+        RedisSessionStore(client=client, ttl_seconds=1)
+    )
+    
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
+
+if __name__ == "__main__":
+    test_session_store()
@@ -0,0 +1,124 @@
+"""
+Test session write coalescing (SessionManager.turn / aturn)
+"""
+import asyncio
+from models.conversation_state import SessionManager, ConversationStage
+from models.session_store import MemorySessionStore
+
+
+class CountingStore(MemorySessionStore):
+    """Kaç kez yazıldığını sayan memory store"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_calls = 0
+
+    def set(self, key, data):
+        self.set_calls += 1
+        super().set(key, data)
+
+
+def simulate_turn(manager, user_id):
+    """Bir /conversation turn'ündeki tipik update_session çağrıları"""
+    session = manager.get_or_create_session(user_id)
+    session.add_message("user", "Araba satmak istiyorum")
+    manager.update_session(session)  # intent detection
+    session.set_stage(ConversationStage.GATHERING_INFO)
+    manager.update_session(session)  # stage handler
+    session.update_product_info({"product_type": "Araba"})
+    manager.update_session(session)  # text_parser_node
+    session.add_message("assistant", "Hangi marka?")
+    manager.update_session(session)  # assistant mesajı
+
+
+def test_without_turn():
+    print("\nTest 1: Turn olmadan her update yazılır")
+    store = CountingStore()
+    manager = SessionManager(store=store)
+    simulate_turn(manager, "user-a")
+    print(f"   Writes: {store.set_calls}")
+    assert store.set_calls == 5
+
+
+def test_sync_turn():
+    print("\nTest 2: turn() içinde tek yazım")
+    store = CountingStore()
+    manager = SessionManager(store=store)
+    with manager.turn() as turn:
+        simulate_turn(manager, "user-b")
+        assert store.set_calls == 0
+        assert turn.update_calls == 5
+        # Turn içinde tekrar okuma flush edilmemiş hali döndürmeli
+        assert manager.get_or_create_session("user-b") is turn.dirty["user-b"]
+    print(f"   Writes: {store.set_calls}")
+    assert store.set_calls == 1
+
+    # Flush edilen veri store'dan okunabilmeli
+    manager.sessions.clear()
+    loaded = manager.get_session("user-b")
+    assert loaded is not None
+    assert len(loaded.conversation_history) == 2
+    assert loaded.product_info.get("product_type") == "Araba"
+
+
+def test_nested_turn():
+    print("\nTest 3: İç içe turn'de dıştaki flush eder")
+    store = CountingStore()
+    manager = SessionManager(store=store)
+    with manager.turn():
+        with manager.turn():
+            simulate_turn(manager, "user-c")
+        assert store.set_calls == 0
+    assert store.set_calls == 1
+
+
+def test_delete_in_turn():
+    print("\nTest 4: Turn içinde silinen session flush edilmez")
+    store = CountingStore()
+    manager = SessionManager(store=store)
+    with manager.turn():
+        simulate_turn(manager, "user-d")
+        manager.delete_session("user-d")
+    assert store.set_calls == 0
+    assert not store.exists("user-d")
+
+
+def test_turn_flushes_on_error():
+    print("\nTest 5: Hata durumunda da biriken yazımlar flush edilir")
+    store = CountingStore()
+    manager = SessionManager(store=store)
+    try:
+        with manager.turn():
+            simulate_turn(manager, "user-e")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert store.set_calls == 1
+
+
+def test_async_turn():
+    print("\nTest 6: aturn() + to_thread içindeki update'ler")
+    store = CountingStore()
+    manager = SessionManager(store=store)
+
+    async def run():
+        async with manager.aturn():
+            # Agent'lar to_thread içinde çalışır, context taşınır
+            await asyncio.to_thread(simulate_turn, manager, "user-f")
+            assert store.set_calls == 0
+
+    asyncio.run(run())
+    print(f"   Writes: {store.set_calls}")
+    assert store.set_calls == 1
+
+
+if __name__ == "__main__":
+    print("SESSION TURN (WRITE COALESCING) TEST")
+    print("=" * 60)
+    test_without_turn()
+    test_sync_turn()
+    test_nested_turn()
+    test_delete_in_turn()
+    test_turn_flushes_on_error()
+    test_async_turn()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,191 @@
+"""
+Test ortak structured output katmanı (utils/structured_output.py)
+JSON çıkarımı, pydantic şemasından response_format, tek seferde doğrulama,
+bozuk çıktının ucuz modelle onarılması ve PricingAgent'ın sabit fiyata düşmemesi.
+"""
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from agents.base import BaseAgent  # noqa: E402
+from agents.pricing import PricingAgent  # noqa: E402
+from models.schemas import PriceValidation, PricingSuggestion, SearchFilters  # noqa: E402
+from utils import metrics, openai_client  # noqa: E402
+from utils.llm_cache import LLMResponseCache  # noqa: E402
+from utils.openai_client import get_llm  # noqa: E402
+from utils.tiered_cache import TieredCache  # noqa: E402
+from utils.structured_output import (  # noqa: E402
+    StructuredOutputError, ainvoke_structured, extract_json, invoke_structured, response_format, with_response_format,
+)
+
+
+def fake_llm(*contents):
+    return GenericFakeChatModel(messages=iter([AIMessage(content=content) for content in contents]))
+
+
+class RepairLLM:
+    """get_llm yerine geçer; onarım çağrılarını kaydeder"""
+
+    def __init__(self, *contents):
+        self.llm = fake_llm(*contents)
+        self.requests = []
+
+    def __call__(self, model="gpt-4o", temperature=0.7, cache_namespace=None):
+        self.requests.append(model)
+        return self.llm
+
+
+def with_repair_llm(repair, func):
+    original = openai_client.get_llm
+    openai_client.get_llm = repair
+    try:
+        return func()
+    finally:
+        openai_client.get_llm = original
+
+
+def test_extract_json():
+    print("\nTest 1: Çit, baştaki/sondaki metin tolere edilir")
+    expected = {"suggested_price": 2750, "reason": "ok"}
+    for raw in [
+        '{"suggested_price": 2750, "reason": "ok"}',
+        '```json\n{"suggested_price": 2750, "reason": "ok"}\n```',
+        '```\n{"suggested_price": 2750, "reason": "ok"}\n```',
+        'İşte sonuç:\n```json\n{"suggested_price": 2750, "reason": "ok"}\n```\nBaşka sorunuz var mı?',
+        'Sonuç: {"suggested_price": 2750, "reason": "ok"} umarım yardımcı olur',
+    ]:
+        assert extract_json(raw) == expected, raw
+    for raw in ["", "fiyat hesaplanamadı", '{"suggested_price": 27']:
+        try:
+            extract_json(raw)
+            assert False, raw
+        except ValueError:
+            pass
+
+
+def test_response_format_from_schema():
+    print("\nTest 2: response_format pydantic şemasından türetilir ve OpenAI payload'ına geçer")
+    fmt = response_format(PricingSuggestion, "json_schema")
+    assert fmt["type"] == "json_schema" and fmt["json_schema"]["name"] == "PricingSuggestion"
+    assert fmt["json_schema"]["schema"]["required"] == ["suggested_price"]
+    assert response_format(PricingSuggestion, "json_object") == {"type": "json_object"}
+
+    bound = with_response_format(get_llm(model="gpt-4o", temperature=0), PricingSuggestion)
+    payload = bound.bound._get_request_payload([HumanMessage(content="JSON döndür")], **bound.kwargs)
+    assert payload["response_format"]["json_schema"]["schema"]["properties"]["suggested_price"]["type"] == "number"
+
+
+def test_valid_output_single_call():
+    print("\nTest 3: Geçerli çıktı tek çağrıda doğrulanır, onarım yok")
+    repair = RepairLLM()
+    before = metrics.STRUCTURED_OUTPUT.value("SearchFilters", "ok")
+    result = with_repair_llm(repair, lambda: invoke_structured(
+        fake_llm('```json\n{"category": "Elektronik", "max_price": "5000", "location": null}\n```'), "x", SearchFilters))
+    assert result.max_price == 5000.0 and result.model_dump(exclude_none=True) == {"category": "Elektronik", "max_price": 5000.0}
+    assert repair.requests == []
+    assert metrics.STRUCTURED_OUTPUT.value("SearchFilters", "ok") == before + 1
+
+
+def test_invalid_output_repaired_cheaply():
+    print("\nTest 4: Şemaya uymayan çıktı asıl model tekrar çağrılmadan mini modelle onarılır")
+    repair = RepairLLM('{"action": "suggest", "given_price": 5, "suggested_price": 18000, "reason": "çok düşük"}')
+    before = metrics.STRUCTURED_OUTPUT.value("PriceValidation", "repaired")
+    main_llm = fake_llm('{"action": "öner", "given_price": 5, "suggested_price": "18.000 TL"}')
+    result = with_repair_llm(repair, lambda: invoke_structured(main_llm, "x", PriceValidation))
+    assert result.action == "suggest" and result.suggested_price == 18000
+    assert repair.requests == ["gpt-4o-mini"]
+    assert metrics.STRUCTURED_OUTPUT.value("PriceValidation", "repaired") == before + 1
+
+    # async yol
+    repair = RepairLLM('{"suggested_price": 2750}')
+    result = with_repair_llm(repair, lambda: asyncio.run(
+        ainvoke_structured(fake_llm("Önerim 2750 TL civarı."), "x", PricingSuggestion)))
+    assert result.suggested_price == 2750 and len(repair.requests) == 1
+
+
+def test_unrepairable_output_raises():
+    print("\nTest 5: Onarım da başarısızsa StructuredOutputError (boş cevap onarılmaz)")
+    before = metrics.STRUCTURED_OUTPUT.value("PricingSuggestion", "failed")
+    repair = RepairLLM("hala json değil")
+    try:
+        with_repair_llm(repair, lambda: invoke_structured(fake_llm("bilmiyorum"), "x", PricingSuggestion))
+        assert False
+    except StructuredOutputError as e:
+        assert e.content == "bilmiyorum"
+
+    repair = RepairLLM()
+    try:
+        with_repair_llm(repair, lambda: invoke_structured(fake_llm(""), "x", PricingSuggestion))
+        assert False
+    except StructuredOutputError:
+        pass
+    assert repair.requests == []
+    assert metrics.STRUCTURED_OUTPUT.value("PricingSuggestion", "failed") == before + 2
+
+
+def test_pricing_agent_uses_repaired_price():
+    print("\nTest 6: PricingAgent bozuk JSON'da 1000 TL fallback'ine düşmez")
+    agent = PricingAgent.__new__(PricingAgent)
+    BaseAgent.__init__(agent, "PricingAgent")
+    state = {"product_info": {"product_type": "iPhone 13"}}
+    agent.llm = fake_llm('{"suggested_price": 21.500, "min_reasonable_price": 19000,, "reason": "piyasa"}')
+    repair = RepairLLM('{"suggested_price": 21500, "min_reasonable_price": 19000, "reason": "piyasa"}')
+    fallbacks = metrics.FALLBACKS.value("pricing", "default_price")
+    with_repair_llm(repair, lambda: agent(state))
+    assert state["pricing"] == {"suggested_price": 21500, "min_reasonable_price": 19000, "reason": "piyasa", "action": "accept"}
+    assert metrics.FALLBACKS.value("pricing", "default_price") == fallbacks
+
+    state = {"product_info": {"product_type": "iPhone 13"}}
+    agent.llm = fake_llm("Fiyat bilgisi bulunamadı.")
+    with_repair_llm(RepairLLM("yok"), lambda: agent(state))
+    assert state["pricing"]["suggested_price"] == 1000
+    assert metrics.FALLBACKS.value("pricing", "default_price") == fallbacks + 1
+
+
+def test_invalid_output_evicted_from_llm_cache():
+    print("\nTest 7: Şemaya uymayan cevap LLM cache'inden silinir, tekrar eden prompt onarım ödemez")
+    backend = TieredCache()
+    llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content="Önerim 2750 TL civarı."), AIMessage(content='{"suggested_price": 2800}')]),
+        cache=LLMResponseCache(backend, namespace="pricing"),
+    )
+    repair = RepairLLM('{"suggested_price": 2750}')
+    assert with_repair_llm(repair, lambda: invoke_structured(llm, "iPhone 13 fiyat", PricingSuggestion)).suggested_price == 2750
+    assert backend.stats()["pricing"]["writes"] == 1
+
+    # cache'te bozuk cevap kalmadı: ikinci çağrı modele gider, geçerli cevap cache'lenir ve onarım yok
+    repair = RepairLLM()
+    assert with_repair_llm(repair, lambda: invoke_structured(llm, "iPhone 13 fiyat", PricingSuggestion)).suggested_price == 2800
+    assert repair.requests == []
+    assert with_repair_llm(repair, lambda: invoke_structured(llm, "iPhone 13 fiyat", PricingSuggestion)).suggested_price == 2800
+    assert backend.stats()["pricing"]["memory_hits"] == 1
+
+    # async yol
+    llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content="bilmiyorum"), AIMessage(content='{"suggested_price": 900}')]),
+        cache=LLMResponseCache(backend, namespace="pricing"),
+    )
+    repair = RepairLLM('{"suggested_price": 950}')
+    assert with_repair_llm(repair, lambda: asyncio.run(
+        ainvoke_structured(llm, "kulaklık fiyat", PricingSuggestion))).suggested_price == 950
+    assert asyncio.run(ainvoke_structured(llm, "kulaklık fiyat", PricingSuggestion)).suggested_price == 900
+
+
+if __name__ == "__main__":
+    print("STRUCTURED OUTPUT TEST")
+    print("=" * 60)
+    test_extract_json()
+    test_response_format_from_schema()
+    test_valid_output_single_call()
+    test_invalid_output_repaired_cheaply()
+    test_unrepairable_output_raises()
+    test_pricing_agent_uses_repaired_price()
+    test_invalid_output_evicted_from_llm_cache()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,163 @@
+"""
+Test LLM token streaming (utils/token_stream.py + SSE endpoint'leri)
+JSON alan çıkarıcı, stream_llm (sync/thread ve async), ListingWriter'ın draft'ı
+yine state'e yazması ve SSE event sırası / ilk byte süresi.
+"""
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-key")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from agents.base import BaseAgent  # noqa: E402
+from agents.listing_writer import ListingWriterAgent  # noqa: E402
+from utils import token_stream  # noqa: E402
+from utils.token_stream import JsonFieldStreamer, TokenStream, stream_llm  # noqa: E402
+
+DRAFT = {
+    "title": "Apple iPhone 13 128GB \"temiz\"",
+    "description": "Kutulu, faturalı.\nEkranda çizik yok; pil sağlığı %89.\n\nİstanbul içi elden teslim.",
+    "short_summary": "Temiz iPhone 13",
+}
+
+
+def fake_llm(content):
+    return GenericFakeChatModel(messages=iter([AIMessage(content=content)]))
+
+
+def collect(stream):
+    events = []
+    while not stream.queue.empty():
+        events.append(stream.queue.get_nowait())
+    return events
+
+
+def test_json_field_streamer():
+    print("\nTest 1: JSON parça parça gelirken sadece seçili alanlar, escape'ler çözülmüş")
+    raw = "```json\n" + json.dumps(DRAFT, ensure_ascii=True, indent=2) + "\n```"
+    for size in [1, 2, 3, 7, 50]:
+        parser = JsonFieldStreamer(["title", "description"])
+        fields = {}
+        for start in range(0, len(raw), size):
+            for field, text in parser.feed(raw[start:start + size]):
+                fields[field] = fields.get(field, "") + text
+        assert fields == {"title": DRAFT["title"], "description": DRAFT["description"]}, (size, fields)
+
+
+def test_stream_llm_without_stream_invokes():
+    print("\nTest 2: Stream bağlı değilse normal invoke")
+    assert token_stream.active() is None
+    assert stream_llm(fake_llm("merhaba dünya"), "selam", source="conversation").content == "merhaba dünya"
+
+
+def test_stream_llm_from_thread():
+    print("\nTest 3: Thread'deki sync agent token'ları event loop'taki stream'e yazar")
+
+    async def run():
+        stream = TokenStream()
+        token_stream.bind(stream)
+        message = await asyncio.to_thread(stream_llm, fake_llm("Size nasıl yardımcı olabilirim?"), "selam", "conversation")
+        await asyncio.sleep(0)
+        return message, collect(stream)
+
+    message, events = asyncio.run(run())
+    assert message.content == "Size nasıl yardımcı olabilirim?"
+    assert len(events) > 1, "tek seferde değil parça parça"
+    assert "".join(data["text"] for _, data in events) == message.content
+    assert all(event == "token" and data["source"] == "conversation" for event, data in events)
+
+
+def test_writer_streams_and_keeps_draft():
+    print("\nTest 4: ListingWriter açıklamayı stream eder, draft yine state'e yazılır")
+    agent = ListingWriterAgent.__new__(ListingWriterAgent)
+    BaseAgent.__init__(agent, "ListingWriterAgent")
+    agent.llm = fake_llm(json.dumps(DRAFT, ensure_ascii=False))
+    state = {"product_info": {"category": "Elektronik"}, "pricing": {"suggested_price": 21000}}
+
+    async def run():
+        stream = TokenStream()
+        token_stream.bind(stream)
+        result = await agent.acall(state)
+        await asyncio.sleep(0)
+        return result, collect(stream)
+
+    result, events = asyncio.run(run())
+    assert result["listing_draft"]["description"] == DRAFT["description"]
+    assert result["listing_draft"]["price"] == 21000
+    streamed = {}
+    for _, data in events:
+        streamed[data["field"]] = streamed.get(data["field"], "") + data["text"]
+    assert streamed == {"title": DRAFT["title"], "description": DRAFT["description"]}
+
+
+def test_sse_response_order_and_first_byte():
+    print("\nTest 5: SSE: start hemen gelir, token'lar, sonra done (ya da error)")
+    import main
+    app = FastAPI()
+
+    async def turn():
+        await asyncio.sleep(0.3)  # pipeline'ın LLM öncesi kısmı
+        message = await asyncio.to_thread(stream_llm, fake_llm("ilanınız hazır"), "x", "listing_writer")
+        return {"message": message.content, "intent": "listing"}
+
+    async def failing_turn():
+        raise main.HTTPException(status_code=500, detail="Workflow not initialized")
+
+    @app.post("/ok")
+    async def ok():
+        return main.sse_response(turn)
+
+    @app.post("/fail")
+    async def fail():
+        return main.sse_response(failing_turn)
+
+    client = TestClient(app)
+    events = []
+    with client.stream("POST", "/ok") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                events.append(line[7:])
+            elif line.startswith("data: ") and events[-1] == "done":
+                done = json.loads(line[6:])
+    print(f"   event'ler: {events}")
+    assert events[0] == "start" and events[-1] == "done" and "token" in events
+    assert done == {"message": "ilanınız hazır", "intent": "listing"}
+
+    # TestClient body'yi tamponladığı için ilk chunk süresi generator'dan ölçülür
+    async def first_chunk_ms():
+        started = time.perf_counter()
+        response = main.sse_response(turn)
+        chunks = response.body_iterator
+        first = await chunks.__anext__()
+        elapsed = (time.perf_counter() - started) * 1000
+        rest = [chunk async for chunk in chunks]
+        return first, elapsed, rest
+
+    first, elapsed, rest = asyncio.run(first_chunk_ms())
+    print(f"   ilk chunk: {elapsed:.1f} ms (pipeline 300+ ms)")
+    assert first.startswith("event: start") and rest[-1].startswith("event: done")
+    assert elapsed < 100, "ilk byte pipeline'ı beklemez"
+
+    body = client.post("/fail").text
+    assert "event: error" in body and "Workflow not initialized" in body
+
+
+if __name__ == "__main__":
+    print("TOKEN STREAM TEST")
+    print("=" * 60)
+    test_json_field_streamer()
+    test_stream_llm_without_stream_invokes()
+    test_stream_llm_from_thread()
+    test_writer_streams_and_keeps_draft()
+    test_sse_response_order_and_first_byte()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,191 @@
+"""
+Test span tracing (utils/tracing.py)
+Span hiyerarşisi, request id yayılımı (thread + paralel task), LLM callback'i,
+Supabase httpx hook'ları ve workflow node span'ları. Exporter yerine bellek içi liste.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import httpx
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage
+from utils import tracing
+from workflows.listing_flow_enhanced import timed_node
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def named(self, name):
+        return [s for s in self.spans if s["name"] == name][0]
+
+
+def install_exporter():
+    exporter = MemoryExporter()
+    tracing.get_exporter = lambda: exporter
+    return exporter
+
+
+def test_nested_spans_share_request_id():
+    print("\nTest 1: İç içe span'lar aynı request id ile parent/child")
+    exporter = install_exporter()
+    token = tracing.set_request_id("req-1")
+    try:
+        with tracing.span("http POST /conversation") as root:
+            tracing.set_attributes(user_id="905551112233")
+            with tracing.span("node.pricing"):
+                pass
+    finally:
+        tracing.reset_request_id(token)
+
+    root_dict, child = exporter.named("http POST /conversation"), exporter.named("node.pricing")
+    assert root_dict["trace_id"] == child["trace_id"] == "req-1"
+    assert child["parent_id"] == root.span_id and root_dict["parent_id"] is None
+    assert root_dict["attributes"]["user_id"] == "905551112233"
+    assert child["duration_ms"] >= 0 and child["end_time_unix_nano"] >= child["start_time_unix_nano"]
+    assert tracing.current_span() is None
+
+
+def test_error_status():
+    print("\nTest 2: Exception span'a ERROR olarak işlenir")
+    exporter = install_exporter()
+    try:
+        with tracing.span("node.market_search"):
+            raise RuntimeError("tavily down")
+    except RuntimeError:
+        pass
+    failed = exporter.named("node.market_search")
+    assert failed["status"] == "ERROR" and failed["attributes"]["error.type"] == "RuntimeError"
+
+
+def test_context_crosses_threads_and_tasks():
+    print("\nTest 3: Request id to_thread ve paralel task'lara taşınır")
+    exporter = install_exporter()
+
+    def sync_work():
+        with tracing.span("supabase.rpc search_listings"):
+            pass
+
+    async def branch(name):
+        with tracing.span(name):
+            await asyncio.to_thread(sync_work)
+
+    async def request():
+        tracing.set_request_id("req-2")
+        with tracing.span("http POST /conversation"):
+            await asyncio.gather(branch("node.product_match"), branch("node.market_search"))
+
+    asyncio.run(request())
+    assert {s["trace_id"] for s in exporter.spans} == {"req-2"}
+    branch_ids = {exporter.named(n)["span_id"] for n in ["node.product_match", "node.market_search"]}
+    rpc_parents = {s["parent_id"] for s in exporter.spans if s["name"] == "supabase.rpc search_listings"}
+    assert rpc_parents == branch_ids, "her RPC kendi branch'inin child'ı"
+
+
+def test_disabled_tracing_is_noop():
+    print("\nTest 4: Exporter yokken span üretilmez")
+    tracing.get_exporter = lambda: None
+    with tracing.span("node.pricing") as current:
+        assert current is None
+    assert tracing.start_span("llm.gpt-4o") is None
+
+
+def test_llm_callback_records_tokens():
+    print("\nTest 5: LLM callback model, token ve gecikme kaydeder")
+    exporter = install_exporter()
+    handler = tracing.LLMTracingHandler()
+    llm = FakeListChatModel(responses=["tamam"], callbacks=[handler])
+    with tracing.span("node.listing_writer") as parent:
+        assert llm.invoke("ilan yaz").content == "tamam"
+    llm_span = [s for s in exporter.spans if s["name"].startswith("llm.")][0]
+    assert llm_span["parent_id"] == parent.span_id
+
+    # OpenAI cevabı: llm_output.token_usage
+    handler.on_chat_model_start({}, [[]], run_id="r1", invocation_params={"model": "gpt-4o-mini", "temperature": 0})
+    handler.on_llm_end(LLMResult(
+        generations=[[ChatGeneration(message=AIMessage(content="{}"))]],
+        llm_output={"token_usage": {"prompt_tokens": 120, "completion_tokens": 30}, "model_name": "gpt-4o-mini-2024-07-18"}
+    ), run_id="r1")
+    recorded = exporter.named("llm.gpt-4o-mini")["attributes"]
+    assert recorded["llm.model"] == "gpt-4o-mini" and recorded["llm.temperature"] == 0
+    assert recorded["llm.prompt_tokens"] == 120 and recorded["llm.completion_tokens"] == 30
+
+    # llm_output olmadan: usage_metadata
+    handler.on_chat_model_start({}, [[]], run_id="r2", invocation_params={"model": "gpt-4o"})
+    message = AIMessage(content="x", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id="r2")
+    assert exporter.named("llm.gpt-4o")["attributes"]["llm.prompt_tokens"] == 7
+
+
+def test_supabase_hooks():
+    print("\nTest 6: PostgREST istekleri span alır (rpc + tablo)")
+    exporter = install_exporter()
+
+    def handler(request):
+        return httpx.Response(404 if "missing" in request.url.path else 200, json=[])
+
+    class Client:
+        class postgrest:
+            session = httpx.Client(base_url="https://x.supabase.co/rest/v1", transport=httpx.MockTransport(handler))
+
+    client = Client()
+    tracing.instrument_supabase(client)
+    tracing.instrument_supabase(client)  # idempotent
+    assert len(client.postgrest.session.event_hooks["request"]) == 1
+
+    with tracing.span("node.product_match") as parent:
+        client.postgrest.session.post("/rpc/match_products", json={})
+        client.postgrest.session.get("/listings", params={"id": "eq.1"})
+        client.postgrest.session.get("/missing")
+
+    rpc = exporter.named("supabase.rpc match_products")
+    assert rpc["parent_id"] == parent.span_id and rpc["attributes"]["http.status_code"] == 200
+    assert exporter.named("supabase.get listings")["attributes"]["db.operation"] == "listings"
+    assert exporter.named("supabase.get missing")["status"] == "ERROR"
+
+
+def test_timed_node_span():
+    print("\nTest 7: Workflow node'ları node.<ad> span'ı alır")
+    exporter = install_exporter()
+    node = timed_node("pricing", lambda state: {"pricing": {}}, None)
+    result = node.invoke({"user_id": "u1"})
+    assert "pricing" in result["node_timings"]
+    assert exporter.named("node.pricing")["attributes"]["workflow.user_id"] == "u1"
+
+
+def test_file_exporter():
+    print("\nTest 8: File exporter JSONL yazar (arka plan thread'inde, sırayı koruyarak)")
+    path = os.path.join(tempfile.mkdtemp(), "traces", "spans.jsonl")
+    exporter = tracing.FileExporter(path)
+    tracing.get_exporter = lambda: exporter
+    with tracing.span("node.edit"):
+        pass
+    for index in range(50):
+        with tracing.span(f"node.batch.{index}"):
+            pass
+    exporter.flush()  # yazım arka plan thread'inde
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["name"] == "node.edit"
+    assert [line["name"] for line in lines[1:]] == [f"node.batch.{index}" for index in range(50)]
+
+
+if __name__ == "__main__":
+    print("TRACING TEST")
+    print("=" * 60)
+    test_nested_spans_share_request_id()
+    test_error_status()
+    test_context_crosses_threads_and_tasks()
+    test_disabled_tracing_is_noop()
+    test_llm_callback_records_tokens()
+    test_supabase_hooks()
+    test_timed_node_span()
+    test_file_exporter()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
@@ -0,0 +1,141 @@
+"""
+Test VectorIndex (yerel ANN index)
+Brute-force referansıyla karşılaştırma, upsert/remove senkronu, cold fallback.
+"""
+import json
+import numpy as np
+from utils.vector_index import VectorIndex
+
+
+def clustered_vectors(count, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return centers[rng.integers(0, clusters, count)] + 0.3 * rng.standard_normal((count, dim)), rng
+
+
+def brute_force(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return [f"l{i}" for i in np.argsort(-scores)[:k]]
+
+
+def test_cold_index_returns_none():
+    print("\nTest 1: Yüklenmemiş index None döner (RPC fallback)")
+    index = VectorIndex()
+    assert index.search([1.0, 0.0], k=5) is None
+    assert index.stats()["ready"] is False
+
+
+def test_brute_force_matches_reference():
+    print("\nTest 2: Küçük koleksiyonda sonuçlar brute-force ile birebir aynı")
+    vectors, rng = clustered_vectors(500)
+    index = VectorIndex()
+    index.build([f"l{i}" for i in range(500)], vectors)
+    assert index.stats()["ivf"] is False
+
+    query = rng.standard_normal(32)
+    results = index.search(query, k=10, threshold=-1.0)
+    assert [r["listing_id"] for r in results] == brute_force(vectors, query, 10)
+    assert all(results[i]["similarity"] >= results[i + 1]["similarity"] for i in range(9))
+
+
+def test_ivf_recall():
+    print("\nTest 3: IVF recall@10 yüksek")
+    vectors, rng = clustered_vectors(6000)
+    index = VectorIndex(ivf_min_size=1000, nprobe=8)
+    index.build([f"l{i}" for i in range(6000)], vectors)
+    assert index.stats()["ivf"] is True
+
+    recalls = []
+    for _ in range(50):
+        query = vectors[rng.integers(0, 6000)] + 0.1 * rng.standard_normal(32)
+        found = {r["listing_id"] for r in index.search(query, k=10, threshold=-1.0)}
+        recalls.append(len(found & set(brute_force(vectors, query, 10))) / 10)
+    print(f"   recall@10 = {np.mean(recalls):.3f}")
+    assert np.mean(recalls) >= 0.9
+
+
+def test_threshold_and_result_shape():
+    print("\nTest 4: threshold filtresi ve match_products formatı")
+    index = VectorIndex()
+    index.build(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    results = index.search([1.0, 0.1], k=5, threshold=0.5)
+    assert [r["listing_id"] for r in results] == ["a"]
+    assert set(results[0]) == {"listing_id", "similarity"}
+
+
+def test_upsert_and_remove():
+    print("\nTest 5: upsert/remove aramaya anında yansır, compact sonrası da korunur")
+    index = VectorIndex(rebuild_threshold=3)
+    index.build(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]])
+
+    index.upsert("d", [1.0, 0.05])
+    index.upsert("b", [0.99, 0.0])  # güncellenen vektör eski satırı gölgeler
+    top = [r["listing_id"] for r in index.search([1.0, 0.0], k=3)]
+    assert top[:2] == ["b", "a"] or top[:2] == ["a", "b"]
+    assert "d" in top
+
+    index.remove("a")
+    top = [r["listing_id"] for r in index.search([1.0, 0.0], k=4)]
+    assert "a" not in top
+    assert len(index) == 3
+
+    index.upsert("e", [0.0, -1.0])  # buffer eşiği -> compact
+    assert index.stats()["buffered"] == 0
+    assert len(index) == 4
+    assert "a" not in [r["listing_id"] for r in index.search([1.0, 0.0], k=10, threshold=-1.0)]
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class StandInTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self.ranges = []
+
+    def select(self, columns):
+        return self
+
+    def range(self, start, end):
+        self.ranges.append((start, end))
+        self._slice = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        return _Result(self._slice)
+
+
+class StandInSupabase:
+    def __init__(self, rows):
+        self.products = StandInTable(rows)
+
+    def table(self, name):
+        assert name == "product_embeddings"
+        return self.products
+
+
+def test_load_from_supabase_pages():
+    print("\nTest 6: product_embeddings sayfalı yüklenir (pgvector string formatı)")
+    rows = [{"listing_id": f"l{i}", "embedding": json.dumps([float(i), 1.0])} for i in range(25)]
+    supabase = StandInSupabase(rows)
+    index = VectorIndex()
+    index.load_from_supabase(supabase, page_size=10)
+    assert supabase.products.ranges == [(0, 9), (10, 19), (20, 29)]
+    assert index.ready and len(index) == 25
+    assert index.search([1.0, 0.0], k=1)[0]["listing_id"] == "l24"
+
+
+if __name__ == "__main__":
+    print("VECTOR INDEX TEST")
+    print("=" * 60)
+    test_cold_index_returns_none()
+    test_brute_force_matches_reference()
+    test_ivf_recall()
+    test_threshold_and_result_shape()
+    test_upsert_and_remove()
+    test_load_from_supabase_pages()
+    print("\n" + "=" * 60)
+    print("ALL TESTS PASSED!")
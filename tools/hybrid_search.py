@@ -0,0 +1,103 @@
+"""
+Hybrid search yardımcıları
+Lexical (full-text + trigram) ve vector sonuçlarını Reciprocal Rank Fusion ile birleştirir.
+
+RRF: score(d) = Σ 1 / (k + rank_i(d))   (rank 1'den başlar, k=60 literatür varsayılanı)
+Skorlar yerine sıralar birleştirildiği için cosine ve ts_rank ölçeklerinin
+kalibre edilmesi gerekmez.
+
+Offline benchmark için (bench_hybrid_search.py) pg_trgm / 'simple' tsvector
+davranışının Python yaklaşıkları ve NDCG de buradadır.
+"""
+from typing import Any, Dict, Iterable, List, Sequence
+import math
+import re
+
+RRF_K = 60
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Dict[str, Any]]],
+    key: str = "id",
+    k: int = RRF_K
+) -> List[Dict[str, Any]]:
+    """
+    Birden fazla sıralı sonuç listesini RRF ile birleştir.
+    Aynı kayıt birden fazla listede varsa alanları birleştirilir (ilk gelen öncelikli).
+    Dönen satırlara rrf_score eklenir, azalan sırada.
+    """
+    scores: Dict[Any, float] = {}
+    rows: Dict[Any, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, 1):
+            row_id = row[key]
+            scores[row_id] = scores.get(row_id, 0.0) + 1.0 / (k + rank)
+            if row_id in rows:
+                for field, value in row.items():
+                    rows[row_id].setdefault(field, value)
+            else:
+                rows[row_id] = dict(row)
+
+    fused = sorted(rows.values(), key=lambda r: scores[r[key]], reverse=True)
+    for row in fused:
+        row["rrf_score"] = round(scores[row[key]], 6)
+    return fused
+
+# ---------------------------------------------------------------------------
+# Offline yaklaşıklar (SQL tarafı: migrations/create_lexical_search_function.sql)
+# ---------------------------------------------------------------------------
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """'simple' text search config'e yakın: küçük harf + alfanümerik token"""
+    return _TOKEN.findall((text or "").replace("I", "ı").replace("İ", "i").lower())
+
+def trigrams(text: str) -> set:
+    """pg_trgm: her kelime "  kelime " şeklinde pad'lenir, 3'lü parçalar alınır"""
+    result = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+def trigram_similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(): ortak trigram / birleşim"""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+def word_similarity(query: str, text: str) -> float:
+    """pg_trgm word_similarity() yaklaşığı: sorgu trigramlarının metinde bulunma oranı"""
+    tq = trigrams(query)
+    if not tq:
+        return 0.0
+    return len(tq & trigrams(text)) / len(tq)
+
+def lexical_rank(query: str, documents: Iterable[Dict[str, Any]], limit: int = 50, min_word_similarity: float = 0.6) -> List[Dict[str, Any]]:
+    """
+    search_listings_lexical'in Python karşılığı:
+    tüm sorgu token'ları geçiyorsa (websearch_to_tsquery AND) veya başlık
+    word_similarity eşiğini geçiyorsa aday; skor = token kapsamı + word_similarity
+    """
+    query_tokens = set(tokenize(query))
+    ranked = []
+    for doc in documents:
+        text = f"{doc.get('title', '')} {doc.get('description', '')}"
+        doc_tokens = set(tokenize(text))
+        coverage = len(query_tokens & doc_tokens) / len(query_tokens) if query_tokens else 0.0
+        similarity = word_similarity(query, doc.get("title", ""))
+        if coverage == 1.0 or similarity >= min_word_similarity:
+            ranked.append({**doc, "rank": coverage + similarity})
+    ranked.sort(key=lambda r: r["rank"], reverse=True)
+    return ranked[:limit]
+
+def ndcg_at_k(ranked_ids: Sequence[Any], relevance: Dict[Any, float], k: int = 10) -> float:
+    """Graded relevance ile NDCG@k (gain = 2^rel - 1)"""
+    dcg = sum(
+        (2 ** relevance.get(doc_id, 0) - 1) / math.log2(i + 2)
+        for i, doc_id in enumerate(ranked_ids[:k])
+    )
+    ideal = sorted(relevance.values(), reverse=True)[:k]
+    idcg = sum((2 ** rel - 1) / math.log2(i + 2) for i, rel in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
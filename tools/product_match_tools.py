@@ -5,7 +5,8 @@ Vector search and product comparison tools
 
 from typing import Dict, Any, List
 from utils.supabase_client import get_supabase_admin
-from utils.openai_client import get_openai_client
+from utils.embeddings import get_embedding_service
+from utils.vector_index import local_vector_search
 from utils.logger import setup_logger
 
 logger = setup_logger("product_match_tools")
@@ -38,25 +39,22 @@ def search_similar_products(
         logger.info(f"🔍 Vector search: {query_text}")
         
         # 1. Embedding oluştur
-        client = get_openai_client()
-        embedding_response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=query_text
-        )
-        embedding = embedding_response.data[0].embedding
-        
-        # 2. Vector search
+        embedding = get_embedding_service().embed(query_text)
+        
+        # 2. Vector search (yerel index hazırsa onu, değilse match_products RPC)
         supabase = get_supabase_admin()
-        results = supabase.rpc(
-            'match_products',
-            {
-                'query_embedding': embedding,
-                'match_threshold': threshold,
-                'match_count': limit
-            }
-        ).execute()
+        matches = local_vector_search(embedding, k=limit, threshold=threshold)
+        if matches is None:
+            matches = supabase.rpc(
+                'match_products',
+                {
+                    'query_embedding': embedding,
+                    'match_threshold': threshold,
+                    'match_count': limit
+                }
+            ).execute().data
         
-        if not results.data or len(results.data) == 0:
+        if not matches:
             logger.info("No similar products found")
             return {
                 "similar_products": [],
@@ -69,7 +67,7 @@ def search_similar_products(
             }
         
         # 3. Listing detaylarını getir
-        listing_ids = [r['listing_id'] for r in results.data]
+        listing_ids = [r['listing_id'] for r in matches]
         listings = supabase.table('listings') \
             .select('id, title, price, category, stock, created_at') \
             .in_('id', listing_ids) \
@@ -0,0 +1,47 @@
+"""
+Yerel intent modelini eğit ve kaydet (utils/intent_model.py)
+
+data/intent_training.json'daki etiketli mesajlarla modeli eğitir ve
+INTENT_MODEL_PATH'e (varsayılan cache/intent_model.npz) yazar. Dosya yoksa
+uygulama ilk kullanımda aynı veriyle eğitir; kaydetmek sadece başlangıç
+süresini ve farklı veriyle eğitilmiş modeli sabitlemek içindir.
+
+Kullanım:
+    python train_intent_model.py
+    python train_intent_model.py --data data/intent_training.json --out cache/intent_model.npz
+"""
+import argparse
+import time
+from collections import Counter
+
+from utils.intent_model import TRAINING_DATA, IntentModel, load_examples
+
+
+def main():
+    from config import get_settings
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=TRAINING_DATA)
+    parser.add_argument("--out", default=get_settings().intent_model_path)
+    parser.add_argument("--epochs", type=int, default=600)
+    parser.add_argument("--lr", type=float, default=4.0)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    texts = [row["text"] for row in examples]
+    labels = [row["intent"] for row in examples]
+    print(f"{len(examples)} örnek: {dict(Counter(labels))}")
+
+    started = time.perf_counter()
+    model = IntentModel.train(texts, labels, epochs=args.epochs, lr=args.lr, l2=args.l2)
+    print(f"eğitim: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    train_accuracy = sum(model.predict(text).label == label for text, label in zip(texts, labels)) / len(texts)
+    print(f"eğitim doğruluğu: {train_accuracy:.3f} (genelleme için: python eval_intent_model.py)")
+
+    model.save(args.out)
+    print(f"kaydedildi: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
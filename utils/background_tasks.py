@@ -16,6 +16,40 @@ def cleanup_expired_sessions():
     except Exception as e:
         logger.error(f"Session cleanup failed: {str(e)}")
 
+def purge_caches():
+    """LLM ve embedding cache'lerinin süresi dolmuş kayıtlarını sil"""
+    try:
+        from utils.llm_cache import get_llm_cache_backend
+        from utils.embeddings import get_embedding_service
+        removed = get_llm_cache_backend().purge_expired()
+        removed += get_embedding_service().cache.purge_expired()
+        logger.info(f"Cache purge completed: {removed} entries removed")
+    except Exception as e:
+        logger.error(f"Cache purge failed: {str(e)}")
+
+def refresh_vector_index():
+    """Yerel ANN index'i product_embeddings'ten yeniden yükle"""
+    try:
+        from utils import vector_index
+        vector_index.refresh_vector_index()
+        index = vector_index.get_vector_index()
+        if index is not None:
+            logger.info(f"Vector index refreshed: {len(index)} vectors")
+    except Exception as e:
+        logger.error(f"Vector index refresh failed: {str(e)}")
+
+def flush_costs():
+    """Son flush'tan beri biriken token/maliyet penceresini COST_LOG_PATH'e yaz"""
+    try:
+        from utils.cost_tracker import get_cost_tracker
+        entry = get_cost_tracker().flush()
+        if entry:
+            top_agent = max(entry["by_agent"].items(), key=lambda item: item[1]["cost_try"])
+            logger.info(f"Cost flush: {entry['total']['cost_try']:.2f} TRY, {entry['total']['calls']} calls, "
+                        f"top agent {top_agent[0]} ({top_agent[1]['cost_try']:.2f} TRY)")
+    except Exception as e:
+        logger.error(f"Cost flush failed: {str(e)}")
+
 def check_listing_prices():
     """Aktif ilanların piyasa fiyatlarını kontrol et"""
     try:
@@ -39,6 +73,37 @@ def start_background_tasks():
         replace_existing=True
     )
     
+    # Saatte bir süresi dolmuş LLM/embedding cache kayıtlarını temizle
+    scheduler.add_job(
+        purge_caches,
+        'interval',
+        hours=1,
+        id='cache_purge',
+        replace_existing=True
+    )
+    
+    # Yerel vector index açıksa periyodik yeniden yükleme (diğer replica'ların ilanları)
+    from config import get_settings
+    settings = get_settings()
+    if settings.vector_index_enabled:
+        scheduler.add_job(
+            refresh_vector_index,
+            'interval',
+            minutes=settings.vector_index_refresh_minutes,
+            id='vector_index_refresh',
+            replace_existing=True
+        )
+    
+    # Token/maliyet penceresini periyodik olarak diske yaz
+    if settings.cost_tracking_enabled:
+        scheduler.add_job(
+            flush_costs,
+            'interval',
+            minutes=settings.cost_flush_minutes,
+            id='cost_flush',
+            replace_existing=True
+        )
+    
     # Her gün saat 09:00'da fiyat kontrolü
     scheduler.add_job(
         check_listing_prices,
@@ -0,0 +1,102 @@
+"""
+Conversation Gate
+Aynı kullanıcıdan üst üste gelen mesajlar için concurrency kontrolü.
+
+- Kullanıcı başına asyncio.Lock: bir kullanıcının turn'leri sırayla işlenir,
+  session'ı aynı anda iki request okuyup yazamaz (last-writer-wins yok)
+- Opsiyonel coalescing penceresi: pencere içinde (veya önceki turn sürerken) gelen
+  mesajlar tek bir agent turn'ünde birleştirilir. Birleştirilen mesajların
+  request'leri "coalesced" olarak döner, cevap ilk request'ten gider.
+
+Not: Kilitler process içidir. Birden fazla worker/replica'da aynı kullanıcının
+mesajları aynı worker'a yönlendirilmelidir (n8n tarafında sticky routing).
+"""
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List
+import asyncio
+
+class UserTurn:
+    """Gate'ten geçen turn"""
+    def __init__(self, message: str, coalesced: bool = False, merged_count: int = 1):
+        self.message = message
+        self.coalesced = coalesced  # True: mesaj başka bir turn'e eklendi, işlenmeyecek
+        self.merged_count = merged_count
+
+class _PendingBatch:
+    def __init__(self, messages: List[str]):
+        self.messages = messages
+        self.closed = False
+
+class ConversationGate:
+    """Kullanıcı başına kilit + mesaj birleştirme"""
+
+    def __init__(self, coalesce_window: float = 0.0):
+        self.coalesce_window = coalesce_window
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refs: Dict[str, int] = {}
+        self._pending: Dict[str, _PendingBatch] = {}
+        self.coalesced_messages = 0
+
+    @asynccontextmanager
+    async def _user_lock(self, user_id: str) -> AsyncIterator[None]:
+        # Bekleyen kimse kalmayınca kilit silinir (dict sınırsız büyümez)
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        self._refs[user_id] = self._refs.get(user_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._refs[user_id] -= 1
+            if self._refs[user_id] == 0:
+                del self._refs[user_id]
+                del self._locks[user_id]
+
+    def active_users(self) -> int:
+        """Kilidi tutulan veya bekleyen kullanıcı sayısı"""
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def turn(self, user_id: str, message: str, coalesce: bool = True) -> AsyncIterator[UserTurn]:
+        """
+        Kullanıcının turn'ü:
+
+            async with gate.turn(user_id, message) as user_turn:
+                if user_turn.coalesced:
+                    return ...  # mesaj önceki turn'e eklendi
+                process(user_turn.message)
+        """
+        if not coalesce or self.coalesce_window <= 0:
+            async with self._user_lock(user_id):
+                yield UserTurn(message=message)
+            return
+
+        batch = self._pending.get(user_id)
+        if batch is not None and not batch.closed:
+            # Açık bir batch var: mesajı ona ekle, bu request işlenmez
+            batch.messages.append(message)
+            self.coalesced_messages += 1
+            yield UserTurn(message=message, coalesced=True)
+            return
+
+        batch = _PendingBatch(messages=[message])
+        self._pending[user_id] = batch
+        try:
+            await asyncio.sleep(self.coalesce_window)
+            async with self._user_lock(user_id):
+                # Önceki turn bitene kadar gelen mesajlar da bu batch'e girer
+                batch.closed = True
+                if self._pending.get(user_id) is batch:
+                    del self._pending[user_id]
+                yield UserTurn(message="\n".join(batch.messages), merged_count=len(batch.messages))
+        finally:
+            batch.closed = True
+            if self._pending.get(user_id) is batch:
+                del self._pending[user_id]
+
+@lru_cache()
+def get_conversation_gate() -> ConversationGate:
+    """Process genelinde tek gate (config'ten coalescing penceresi)"""
+    from config import get_settings
+    settings = get_settings()
+    return ConversationGate(coalesce_window=settings.conversation_coalesce_window_ms / 1000)
@@ -0,0 +1,290 @@
+"""
+Token ve maliyet muhasebesi (agent / endpoint / user_id / model bazlı)
+
+- LLM çağrıları: get_llm'e eklenen LangChain callback'i (CostTrackingHandler)
+  llm_output.token_usage'ı kaydeder; LLM cache hit'leri ücretsiz sayılır.
+- Embedding çağrıları: EmbeddingService API'a gittiğinde response.usage.
+- Atıf contextvar'larla yapılır: endpoint HTTP middleware'inde, agent ve
+  user_id BaseAgent.__call__/acall sarmalayıcısında set edilir (bkz. agents/base.py).
+  Batch'lenen embedding çağrıları batch'i gönderen isteğe yazılır.
+
+Toplamlar bellekte tutulur (/metrics/costs); son flush'tan beri biriken pencere
+periyodik olarak COST_LOG_PATH'e JSONL satırı olarak yazılır.
+"""
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from utils.logger import setup_logger
+import json
+import os
+import threading
+import time
+
+logger = setup_logger("cost_tracker")
+
+# USD / 1M token (input, output) - en uzun prefix eşleşir (gpt-4o-mini-2024-07-18 -> gpt-4o-mini)
+MODEL_PRICES_USD = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+DIMENSIONS = ("agent", "endpoint", "user", "model")
+UNATTRIBUTED = "-"
+RECENT_MINUTES = 60
+OTHER_USERS = "_other"
+
+_agent: ContextVar[Optional[str]] = ContextVar("cost_agent", default=None)
+_endpoint: ContextVar[Optional[str]] = ContextVar("cost_endpoint", default=None)
+_user_id: ContextVar[Optional[str]] = ContextVar("cost_user_id", default=None)
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    for prefix in sorted(MODEL_PRICES_USD, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_PRICES_USD[prefix]
+    return None
+
+
+class Usage:
+    __slots__ = ("calls", "cache_hits", "prompt_tokens", "completion_tokens", "cost_try")
+
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_try = 0.0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost_try: float, cache_hit: bool):
+        self.calls += 1
+        self.cache_hits += int(cache_hit)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_try += cost_try
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_try": round(self.cost_try, 4),
+        }
+
+
+class CostTracker:
+    """
+    Bellek içi toplayıcı. Her kayıt 4 boyuta (agent, endpoint, user, model)
+    birden yazılır. max_users aşılınca yeni kullanıcılar "_other" altında toplanır.
+    """
+
+    def __init__(self, usd_try_rate: float, max_users: int = 10000, log_path: Optional[str] = None):
+        self.usd_try_rate = usd_try_rate
+        self.max_users = max_users
+        self.log_path = log_path
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, Usage]] = {d: {} for d in DIMENSIONS}
+        self._window: Dict[str, Dict[str, Usage]] = {d: {} for d in DIMENSIONS}
+        self._window_started = time.time()
+        self._unpriced = set()
+        self._minutes: Dict[int, float] = {}  # dakika -> TRY (son RECENT_MINUTES, bütçe baskısı için)
+
+    def cost_try(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        price = model_price(model)
+        if price is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"No price for model {model}, cost counted as 0")
+            return 0.0
+        usd = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+        return usd * self.usd_try_rate
+
+    def record(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0, cache_hit: bool = False,
+               agent: Optional[str] = None, endpoint: Optional[str] = None, user_id: Optional[str] = None):
+        """Bir çağrıyı kaydet; agent/endpoint/user verilmezse context'ten alınır"""
+        cost = 0.0 if cache_hit else self.cost_try(model, prompt_tokens, completion_tokens)
+        keys = {
+            "agent": agent or _agent.get() or UNATTRIBUTED,
+            "endpoint": endpoint or _endpoint.get() or UNATTRIBUTED,
+            "user": user_id or _user_id.get() or UNATTRIBUTED,
+            "model": model,
+        }
+        with self._lock:
+            minute = int(time.time() // 60)
+            if minute not in self._minutes:
+                for old in [m for m in self._minutes if m <= minute - RECENT_MINUTES]:
+                    del self._minutes[old]
+            self._minutes[minute] = self._minutes.get(minute, 0.0) + cost
+            users = self._totals["user"]
+            if keys["user"] not in users and len(users) >= self.max_users:
+                keys["user"] = OTHER_USERS
+            for table in (self._totals, self._window):
+                for dimension, key in keys.items():
+                    usage = table[dimension].get(key)
+                    if usage is None:
+                        usage = table[dimension][key] = Usage()
+                    usage.add(prompt_tokens, completion_tokens, cost, cache_hit)
+
+    def recent_cost_try(self, seconds: int = 3600) -> float:
+        """Son `seconds` saniyede (dakika çözünürlüğünde, en fazla RECENT_MINUTES) harcanan TRY"""
+        since = int(time.time() // 60) - min(RECENT_MINUTES, seconds // 60) + 1
+        with self._lock:
+            return sum(cost for minute, cost in self._minutes.items() if minute >= since)
+
+    def snapshot(self, top: int = 20) -> Dict[str, Any]:
+        """/metrics/costs için: boyut başına maliyete göre sıralı ilk `top` kayıt"""
+        with self._lock:
+            result = {
+                "since": self.started_at,
+                "usd_try_rate": self.usd_try_rate,
+                "total": self._sum(self._totals["model"]).to_dict(),
+            }
+            for dimension in DIMENSIONS:
+                ranked = sorted(self._totals[dimension].items(), key=lambda item: item[1].cost_try, reverse=True)
+                result[f"by_{dimension}"] = {key: usage.to_dict() for key, usage in ranked[:top]}
+            result["tracked_users"] = len(self._totals["user"])
+        return result
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Son flush'tan beri biriken pencereyi log'a/dosyaya yaz ve sıfırla"""
+        with self._lock:
+            window, started = self._window, self._window_started
+            self._window = {d: {} for d in DIMENSIONS}
+            self._window_started = time.time()
+        if not window["model"]:
+            return None
+        entry = {
+            "window_start": started,
+            "window_end": time.time(),
+            "total": self._sum(window["model"]).to_dict(),
+            **{f"by_{d}": {k: u.to_dict() for k, u in window[d].items()} for d in DIMENSIONS},
+        }
+        if self.log_path:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def reset(self):
+        with self._lock:
+            self._totals = {d: {} for d in DIMENSIONS}
+            self._window = {d: {} for d in DIMENSIONS}
+            self._minutes = {}
+            self.started_at = self._window_started = time.time()
+
+    @staticmethod
+    def _sum(usages: Dict[str, Usage]) -> Usage:
+        total = Usage()
+        for usage in usages.values():
+            total.calls += usage.calls
+            total.cache_hits += usage.cache_hits
+            total.prompt_tokens += usage.prompt_tokens
+            total.completion_tokens += usage.completion_tokens
+            total.cost_try += usage.cost_try
+        return total
+
+
+@lru_cache()
+def get_cost_tracker() -> CostTracker:
+    from config import get_settings
+    settings = get_settings()
+    return CostTracker(
+        usd_try_rate=settings.usd_try_rate,
+        max_users=settings.cost_max_users,
+        log_path=settings.cost_log_path or None
+    )
+
+
+# ---------------------------------------------------------------------------
+# Atıf (contextvar)
+# ---------------------------------------------------------------------------
+
+def bind(agent: Optional[str] = None, endpoint: Optional[str] = None, user_id: Optional[str] = None) -> list:
+    """Verilen alanları context'e yaz; reset() için token listesi döner"""
+    tokens = []
+    if agent is not None:
+        tokens.append(_agent.set(agent))
+    if endpoint is not None:
+        tokens.append(_endpoint.set(endpoint))
+    if user_id:
+        tokens.append(_user_id.set(str(user_id)))
+    return tokens
+
+
+def current_agent() -> Optional[str]:
+    return _agent.get()
+
+
+def reset(tokens: list):
+    for token in reversed(tokens):
+        token.var.reset(token)
+
+
+def record_embedding_usage(model: str, prompt_tokens: int):
+    from config import get_settings
+    if get_settings().cost_tracking_enabled:
+        get_cost_tracker().record(model, prompt_tokens=prompt_tokens)
+
+
+# ---------------------------------------------------------------------------
+# LLM çağrıları (LangChain callback)
+# ---------------------------------------------------------------------------
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # pragma: no cover
+    BaseCallbackHandler = object
+
+
+class CostTrackingHandler(BaseCallbackHandler):
+    """
+    Chat model çağrısı bitince token'ları kaydeder. Cache'ten dönen cevaplarda
+    llm_output olmaz (usage_metadata'da total_cost=0) -> cache hit, maliyet 0.
+    """
+    run_inline = True
+
+    def __init__(self, tracker: Optional[CostTracker] = None):
+        self._tracker = tracker
+        self._models: Dict[Any, str] = {}
+
+    @property
+    def tracker(self) -> CostTracker:
+        return self._tracker or get_cost_tracker()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        self._models[run_id] = params.get("model") or params.get("model_name") or metadata.get("ls_model_name") or "unknown"
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model = self._models.pop(run_id, "unknown")
+        usage = (response.llm_output or {}).get("token_usage")
+        if usage:
+            self.tracker.record(model, usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+            return
+        prompt_tokens = completion_tokens = 0
+        cache_hit = True
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if metadata and "total_cost" not in metadata:
+                    # llm_output taşımayan gerçek çağrı (ör. streaming)
+                    cache_hit = False
+                    prompt_tokens += metadata.get("input_tokens") or 0
+                    completion_tokens += metadata.get("output_tokens") or 0
+        self.tracker.record(model, prompt_tokens, completion_tokens, cache_hit=cache_hit)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._models.pop(run_id, None)
+
+
+@lru_cache()
+def get_cost_tracking_handler() -> CostTrackingHandler:
+    return CostTrackingHandler()
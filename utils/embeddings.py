@@ -0,0 +1,274 @@
+"""
+Embedding Service
+Tüm embedding çağrıları için paylaşılan servis:
+- Cache: normalize edilmiş metnin hash'i -> vektör (memory LRU + SQLite, float16/int8 sıkıştırılmış)
+- Batching: kısa bir pencere içinde gelen istekler tek `embeddings.create(input=[...])` çağrısında
+- Tek (paylaşılan) OpenAI client
+
+Popüler arama sorguları cache'ten döner, API'a hiç gitmez.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import asyncio
+import hashlib
+import struct
+import threading
+import time
+
+from utils.tiered_cache import TieredCache
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_TTL = 30 * 24 * 3600
+CACHE_NAMESPACE = "embeddings"
+
+def normalize_text(text: str) -> str:
+    """Cache key için: küçük harf + tek boşluk"""
+    return " ".join(text.lower().split())
+
+def text_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+def pack_vector(vector: Sequence[float], codec: str = "float16") -> bytes:
+    """
+    Vektörü sıkıştır:
+    - float16: 2 byte/boyut (cosine'e etkisi ~1e-4)
+    - int8: 1 byte/boyut + float32 scale
+    """
+    if codec == "float16":
+        return b"h" + struct.pack(f"<{len(vector)}e", *vector)
+    if codec == "int8":
+        scale = max((abs(v) for v in vector), default=0.0) / 127 or 1.0
+        return b"b" + struct.pack("<f", scale) + struct.pack(f"<{len(vector)}b", *(round(v / scale) for v in vector))
+    raise ValueError(f"Unknown embedding codec: {codec}")
+
+def unpack_vector(data: bytes) -> List[float]:
+    kind, body = data[:1], data[1:]
+    if kind == b"h":
+        return list(struct.unpack(f"<{len(body) // 2}e", body))
+    if kind == b"b":
+        (scale,) = struct.unpack_from("<f", body)
+        values = body[4:]
+        return [v * scale for v in struct.unpack(f"<{len(values)}b", values)]
+    raise ValueError("Unknown embedding payload")
+
+class _SyncBatch:
+    """Thread'ler arası biriken sync istekler"""
+    def __init__(self):
+        self.texts: Dict[str, str] = {}
+        self.results: Dict[str, List[float]] = {}
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+class EmbeddingService:
+    """Cache'li + batch'li embedding client'ı"""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        async_client_factory: Optional[Callable[[], Any]] = None,
+        model: str = EMBEDDING_MODEL,
+        cache: Optional[TieredCache] = None,
+        codec: str = "float16",
+        batch_window: float = 0.01,
+        max_batch: int = 128
+    ):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self.model = model
+        self.cache = cache or TieredCache()
+        self.codec = codec
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self._lock = threading.Lock()
+        self._sync_batch: Optional[_SyncBatch] = None
+        self._async_pending: Dict[str, "asyncio.Future[List[float]]"] = {}
+        self._async_texts: Dict[str, str] = {}
+        self._async_flush: Optional[asyncio.Task] = None
+
+        self.api_calls = 0
+        self.texts_embedded = 0
+
+    # Cache
+    def _cached(self, key: str) -> Optional[List[float]]:
+        data = self.cache.get(key, CACHE_NAMESPACE)
+        return unpack_vector(data) if data is not None else None
+
+    def _store(self, key: str, vector: List[float]):
+        self.cache.set(key, pack_vector(vector, self.codec), EMBEDDING_TTL, CACHE_NAMESPACE)
+
+    async def _acached(self, key: str) -> Optional[List[float]]:
+        # Event loop'ta sadece memory; SQLite okuması thread'de
+        data = self.cache.get_memory(key, CACHE_NAMESPACE)
+        if data is None:
+            if self.cache.persistent:
+                data = await asyncio.to_thread(self.cache.get, key, CACHE_NAMESPACE)
+            else:
+                data = self.cache.get(key, CACHE_NAMESPACE)
+        return unpack_vector(data) if data is not None else None
+
+    async def _astore_many(self, vectors: Dict[str, List[float]]):
+        # Batch başına tek SQLite transaction'ı, thread'de
+        items = [(key, pack_vector(vector, self.codec)) for key, vector in vectors.items()]
+        if self.cache.persistent:
+            await asyncio.to_thread(self.cache.set_many, items, EMBEDDING_TTL, CACHE_NAMESPACE)
+        else:
+            self.cache.set_many(items, EMBEDDING_TTL, CACHE_NAMESPACE)
+
+    def _record_call(self, count: int, response: Any = None):
+        with self._lock:
+            self.api_calls += 1
+            self.texts_embedded += count
+        prompt_tokens = getattr(getattr(response, "usage", None), "prompt_tokens", None)
+        if prompt_tokens:
+            from utils.cost_tracker import record_embedding_usage
+            record_embedding_usage(self.model, prompt_tokens)
+
+    # Sync
+    def _create(self, texts: List[str]) -> List[List[float]]:
+        response = self._client_factory().embeddings.create(model=self.model, input=texts)
+        self._record_call(len(texts), response)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Tek metin. Cache'te yoksa batch_window boyunca diğer thread'lerin
+        istekleriyle birleştirilip tek API çağrısında gönderilir.
+        """
+        key = text_key(text, self.model)
+        vector = self._cached(key)
+        if vector is not None:
+            return vector
+
+        with self._lock:
+            batch = self._sync_batch
+            leader = batch is None
+            if leader:
+                batch = self._sync_batch = _SyncBatch()
+            batch.texts.setdefault(key, text)
+            full = len(batch.texts) >= self.max_batch
+            if full and self._sync_batch is batch:
+                self._sync_batch = None
+
+        if not leader:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return batch.results[key]
+
+        if not full and self.batch_window > 0:
+            time.sleep(self.batch_window)
+        with self._lock:
+            if self._sync_batch is batch:
+                self._sync_batch = None
+
+        try:
+            keys = list(batch.texts)
+            vectors = self._create([batch.texts[k] for k in keys])
+            for k, v in zip(keys, vectors):
+                batch.results[k] = v
+                self._store(k, v)
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+        return batch.results[key]
+
+    def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        """Birden fazla metin: cache'te olmayanlar tek çağrıda"""
+        keys = [text_key(text, self.model) for text in texts]
+        results: Dict[str, List[float]] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            vector = self._cached(key)
+            if vector is not None:
+                results[key] = vector
+            else:
+                missing.setdefault(key, text)
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.max_batch):
+            chunk = missing_keys[start:start + self.max_batch]
+            for k, v in zip(chunk, self._create([missing[k] for k in chunk])):
+                results[k] = v
+                self._store(k, v)
+        return [results[key] for key in keys]
+
+    # Async
+    async def _acreate(self, texts: List[str]) -> List[List[float]]:
+        if self._async_client_factory is None:
+            return await asyncio.to_thread(self._create, texts)
+        response = await self._async_client_factory().embeddings.create(model=self.model, input=texts)
+        self._record_call(len(texts), response)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def _aflush(self, delay: float):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pending, texts = self._async_pending, self._async_texts
+        self._async_pending, self._async_texts = {}, {}
+        self._async_flush = None
+        if not pending:
+            return
+
+        keys = list(pending)
+        try:
+            vectors = await self._acreate([texts[k] for k in keys])
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        try:
+            # Sonuçtan önce cache'e (SQLite thread'de): aynı metnin sonraki isteği API'a gitmesin
+            await self._astore_many(dict(zip(keys, vectors)))
+        finally:
+            for k, v in zip(keys, vectors):
+                if not pending[k].done():
+                    pending[k].set_result(v)
+
+    async def aembed(self, text: str) -> List[float]:
+        """Tek metin (async). Aynı pencere içindeki istekler tek çağrıda gönderilir."""
+        key = text_key(text, self.model)
+        vector = await self._acached(key)
+        if vector is not None:
+            return vector
+
+        future = self._async_pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._async_pending[key] = future
+            self._async_texts[key] = text
+            if len(self._async_pending) >= self.max_batch:
+                if self._async_flush is not None:
+                    self._async_flush.cancel()
+                self._async_flush = asyncio.create_task(self._aflush(0))
+            elif self._async_flush is None:
+                self._async_flush = asyncio.create_task(self._aflush(self.batch_window))
+        # shield: bir çağıranın iptali batch'teki diğerlerini etkilemesin
+        return await asyncio.shield(future)
+
+    async def aembed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        return list(await asyncio.gather(*(self.aembed(text) for text in texts)))
+
+    def stats(self) -> Dict[str, Any]:
+        cache_stats = self.cache.stats().get(CACHE_NAMESPACE, {})
+        return {"api_calls": self.api_calls, "texts_embedded": self.texts_embedded, **cache_stats}
+
+@lru_cache()
+def get_embedding_service() -> EmbeddingService:
+    """Process genelinde tek embedding servisi (paylaşılan OpenAI client'ları)"""
+    from config import get_settings
+    from utils.openai_client import get_openai_client, get_async_openai_client
+    settings = get_settings()
+    return EmbeddingService(
+        client_factory=get_openai_client,
+        async_client_factory=get_async_openai_client,
+        cache=TieredCache(
+            sqlite_path=settings.embedding_cache_path or None,
+            memory_entries=settings.embedding_cache_memory_entries
+        ),
+        codec=settings.embedding_cache_codec,
+        batch_window=settings.embedding_batch_window_ms / 1000
+    )
@@ -0,0 +1,256 @@
+"""
+Conversation History Manager
+Prompt'a giden konuşma geçmişini pencereler ve token bütçesiyle sınırlar.
+
+_handle_initial tüm conversation_history'yi prompt'a ekliyordu; uzun
+session'larda prompt token'ı (ve gecikme) her mesajla lineer büyüyordu. Burada:
+
+- Son HISTORY_VERBATIM_MESSAGES mesaj aynen
+- Daha eskiler session.history_summary'de tutulan kayan özet (gpt-4o-mini).
+  Özet request yolunda üretilmez: eşik aşılınca arka plan thread'inde hazırlanır,
+  bir sonraki turn'de session'a yazılır (session'ı sadece turn'ün kendisi kaydeder,
+  arka plan işi session store'a dokunmaz). Hazır özet session_id ile etiketlenir;
+  session silinir/süresi dolarsa yeni session'a uygulanmaz, bekleyenler TTL ve
+  üst sınırla temizlenir
+- Özet henüz hazır değilse aradaki mesajlar da aynen eklenir; hepsi agent başına
+  kesin token bütçesine (HISTORY_TOKEN_BUDGETS) sığacak şekilde eskiden yeniye kırpılır
+
+Token sayımı tiktoken ile (yoksa ~4 karakter/token tahmini).
+"""
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+from utils.logger import setup_logger
+
+logger = setup_logger("history_manager")
+
+SUMMARY_PROMPT = """Aşağıdaki pazaryeri asistanı konuşmasını kısa bir özet haline getir.
+
+Korunması gerekenler: kullanıcının niyeti (satış/arama/soru), ürün bilgileri (marka,
+model, durum, adet, fiyat beklentisi, konum), kullanıcının tercihleri ve açık kalan sorular.
+Selamlaşma ve tekrarları at. En fazla 80 kelime, düz metin, Türkçe.
+
+ÖNCEKİ ÖZET:
+{summary}
+
+YENİ MESAJLAR:
+{messages}
+
+ÖZET:"""
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Metnin ilk max_tokens token'ı"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens]) + "…"
+
+
+def format_message(message: Dict[str, Any]) -> str:
+    return f"{'Kullanıcı' if message.get('role') == 'user' else 'Asistan'}: {message.get('content', '')}"
+
+
+def llm_summarize(previous_summary: str, messages: List[Dict[str, Any]]) -> str:
+    """Önceki özet + yeni mesajlardan güncel özet (gpt-4o-mini)"""
+    from config import get_settings
+    from utils import cost_tracker
+    from utils.openai_client import get_llm
+    prompt = SUMMARY_PROMPT.format(
+        summary=previous_summary or "(yok)",
+        messages="\n".join(format_message(message) for message in messages),
+    )
+    tokens = cost_tracker.bind(agent="HistorySummarizer")
+    try:
+        return get_llm(model=get_settings().history_summary_model, temperature=0).invoke(prompt).content.strip()
+    finally:
+        cost_tracker.reset(tokens)
+
+
+class HistoryManager:
+    """Pencere + kayan özet + agent başına token bütçesi"""
+
+    def __init__(
+        self,
+        verbatim_messages: int = 8,
+        default_budget: int = 1200,
+        budgets: Optional[Dict[str, int]] = None,
+        summary_batch: int = 8,
+        summarize: Optional[Callable[[str, List[Dict[str, Any]]], str]] = llm_summarize,
+        max_workers: int = 2,
+        ready_ttl: float = 3600.0,
+        max_ready: int = 10000,
+    ):
+        self.verbatim_messages = verbatim_messages
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self.summary_batch = summary_batch
+        self.summarize = summarize  # None: özet kapalı, sadece pencere + bütçe
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="history-summary") if summarize else None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        # user_id -> (session_id, özet, kapsadığı mesaj sayısı, hazır olduğu an); eskiden yeniye
+        self._ready: "OrderedDict[str, Tuple[str, str, int, float]]" = OrderedDict()
+        self.ready_ttl = ready_ttl
+        self.max_ready = max_ready
+        self.summaries_built = 0
+        self.summary_failures = 0
+
+    def budget_for(self, agent: str) -> int:
+        return self.budgets.get(agent, self.default_budget)
+
+    def build_context(self, session, agent: str = "conversation", exclude_last: bool = True) -> str:
+        """
+        Prompt'a eklenecek geçmiş metni (özet + son mesajlar), agent bütçesi içinde.
+        exclude_last: son mesaj (yeni kullanıcı mesajı) prompt'a ayrıca ekleniyorsa True
+        """
+        history = session.conversation_history[:-1] if exclude_last else session.conversation_history
+        if not history:
+            return ""
+        self._apply_ready(session, len(history))
+
+        budget = self.budget_for(agent)
+        covered = session.summary_message_count if session.history_summary else 0
+        window_start = max(0, len(history) - self.verbatim_messages)
+
+        lines: List[str] = []
+        if covered:
+            lines.append("ÖZET (önceki konuşma): " + truncate_tokens(session.history_summary, budget // 3))
+        remaining = budget - sum(count_tokens(line) + 1 for line in lines)
+
+        # Yeniden eskiye: pencere + (özet yetişmediyse) özetlenmemiş eski mesajlar
+        recent: List[str] = []
+        for message in reversed(history[covered:]):
+            line = format_message(message)
+            cost = count_tokens(line) + 1
+            if cost > remaining:
+                if not recent:
+                    # En son mesaj tek başına bütçeyi aşıyor: kırpılmış hali
+                    recent.append(truncate_tokens(line, remaining - 1))
+                break
+            recent.append(line)
+            remaining -= cost
+
+        if self.summarize and window_start - covered >= self.summary_batch:
+            self._schedule(session.user_id, _session_identity(session), session.history_summary if covered else "",
+                           history[covered:window_start], window_start)
+
+        return "\n".join(lines + recent[::-1])
+
+    def _apply_ready(self, session, history_len: int):
+        """Arka planda hazırlanan özeti session'a yaz (turn sonunda session ile kaydedilir)"""
+        if session.summary_message_count > history_len:
+            # History silinmiş/kısalmış: özet geçersiz
+            session.history_summary, session.summary_message_count = "", 0
+        with self._lock:
+            ready = self._ready_for(session.user_id, _session_identity(session))
+            if ready is None or ready[2] > history_len:
+                return
+            del self._ready[session.user_id]
+        _, summary, upto, _ = ready
+        if upto > session.summary_message_count:
+            session.history_summary, session.summary_message_count = summary, upto
+
+    def _ready_for(self, user_id: str, session_id: str) -> Optional[Tuple[str, str, int, float]]:
+        """Bu session'a ait, süresi dolmamış hazır özet; başka session'ınki ya da eskiyse atılır (lock altında)"""
+        ready = self._ready.get(user_id)
+        if ready is not None and (ready[0] != session_id or time.monotonic() - ready[3] > self.ready_ttl):
+            del self._ready[user_id]
+            return None
+        return ready
+
+    def _schedule(self, user_id: str, session_id: str, previous_summary: str, messages: List[Dict[str, Any]], upto: int):
+        with self._lock:
+            ready = self._ready_for(user_id, session_id)
+            if user_id in self._in_flight or (ready is not None and ready[2] >= upto):
+                return
+            self._in_flight[user_id] = self._executor.submit(self._run, user_id, session_id, previous_summary, list(messages), upto)
+
+    def _run(self, user_id: str, session_id: str, previous_summary: str, messages: List[Dict[str, Any]], upto: int):
+        try:
+            summary = self.summarize(previous_summary, messages)
+            now = time.monotonic()
+            with self._lock:
+                self._ready[user_id] = (session_id, summary, upto, now)
+                self._ready.move_to_end(user_id)
+                # Uygulanmadan kalanlar (turn'ü hiç gelmeyen kullanıcılar): TTL + üst sınır
+                while self._ready:
+                    oldest = next(iter(self._ready.values()))
+                    if len(self._ready) <= self.max_ready and now - oldest[3] <= self.ready_ttl:
+                        break
+                    self._ready.popitem(last=False)
+            self.summaries_built += 1
+        except Exception as e:
+            self.summary_failures += 1
+            logger.warning(f"History summary failed for {user_id}: {e}")
+            from utils.metrics import record_fallback
+            record_fallback("history_summary", "llm_failed")
+        finally:
+            with self._lock:
+                self._in_flight.pop(user_id, None)
+
+    def forget(self, user_id: str):
+        """Session silindi/süresi doldu: bekleyen özet atılır (devam eden iş session_id uyuşmazlığıyla atılır)"""
+        with self._lock:
+            self._ready.pop(user_id, None)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Bekleyen özet işlerini bekle (test/benchmark)"""
+        with self._lock:
+            futures = list(self._in_flight.values())
+        wait(futures, timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "ready": len(self._ready),
+                "summaries_built": self.summaries_built,
+                "summary_failures": self.summary_failures,
+            }
+
+
+def _session_identity(session) -> str:
+    return getattr(session, "session_id", "") or ""
+
+
+def forget_session(user_id: str):
+    """SessionManager silme/expire yolları için; manager hiç oluşmadıysa bir şey yapmaz"""
+    if get_history_manager.cache_info().currsize:
+        get_history_manager().forget(user_id)
+
+
+@lru_cache(maxsize=1)
+def get_history_manager() -> HistoryManager:
+    from config import get_settings
+    settings = get_settings()
+    return HistoryManager(
+        verbatim_messages=settings.history_verbatim_messages,
+        default_budget=settings.history_token_budget,
+        budgets=settings.history_token_budgets,
+        summary_batch=settings.history_summary_batch,
+        summarize=llm_summarize if settings.history_summary_enabled else None,
+    )
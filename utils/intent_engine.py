@@ -0,0 +1,187 @@
+"""
+Intent Engine
+Niyet tespiti için tek geçişli, derlenmiş anahtar kelime eşleştirici.
+
+Conversation endpoint'i, EnhancedConversationAgent, ConversationAgent,
+RouterAgent fallback'i ve /test-simple aynı mesajı ayrı ayrı lower() edip
+onlarca `any(k in msg for k in [...])` taraması yapıyordu. Burada bütün
+anahtar kelime tabloları tek bir Aho-Corasick otomatına derlenir:
+
+- Metin Türkçe'ye uygun küçültülür (normalize: İ/I -> i; str.lower() "İ"yi
+  "i̇" yapıyordu). Anahtar kelimeler hem aslı hem ASCII katlanmış haliyle
+  (query_parser.fold) otomata eklenir: "ariyorum", "IPTAL", "BIRAK" de eşleşir.
+  Metnin kendisi ASCII'ye indirilmez: "takımı" içinde "kim" aranmaz
+- Otomat DFA'ya açılmıştır (failure link'ler tabloya gömülü), karakter başına
+  tek dict lookup; eşleşen sinyaller bitmask olarak birikir
+- Regex sinyalleri (fiyat tutarı gibi) modül yüklenirken derlenir
+
+match(text) tüm sinyalleri tek geçişte döndürür; karar mantığı (stage, öncelik
+sırası) çağıranlarda kalır. Anahtar kelimeler alt-dizi olarak eşleşir (önceki
+`k in msg` davranışıyla aynı).
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+import re
+
+from utils.query_parser import fold
+
+# Sinyal adı -> anahtar kelimeler (katlanmadan yazılır, derlenirken katlanır)
+KEYWORD_SIGNALS: Dict[str, List[str]] = {
+    # EnhancedConversationAgent
+    "brand": ["iphone", "samsung", "hp", "dell", "lenovo", "mercedes", "bmw"],
+    "model_code": ["s23", "c180"],
+    "technical": ["snapdragon", "ram", "gb", "işlemci", "ekran", "kamera", "mp", "amoled", "ssd"],
+    "price_word": ["düşük mü", "çok mu", "kaç", "fiyat", "tl", "lira"],
+    "negotiate": ["pahalı", "ucuz", "indirim", "düşür"],
+    "cancel": ["iptal", "vazgeç", "bırak", "kapat"],
+    "confirm": ["onayla", "tamam", "kabul", "evet", "olur", "onay"],
+    "edit": ["düzenle", "değiştir", "güncelle", "edit"],
+    "listing_phrase": ["ilan ver", "ilan vereceğim", "satmak istiyorum", "satacağım", "satış yap"],
+    "listing_phrase_ext": [
+        "satmayı düşünüyorum", "satmak istiyordum", "ilan oluştur",
+        "kurtulmak istiyorum", "satabilirim", "fiyat öğrenmem lazım",
+    ],
+    "search_explicit": ["arıyorum", "bul", "ara bana", "listele"],
+    "question_word": ["nasıl", "neden", "nedir", "ne", "kim", "kategori", "premium"],
+    "question_mark": ["?"],
+    "product_mention": ["telefon", "laptop", "iphone", "samsung", "bilgisayar", "araba", "ev", "kanepe"],
+    "device_mention": ["telefon", "laptop", "bilgisayar", "iphone", "samsung"],
+    "phone_mention": ["iphone", "telefon"],
+    "computer_mention": ["laptop", "bilgisayar"],
+    "sell_verb": ["satacak", "satmak", "satacağım", "satmayı"],
+    "help_category": ["kategori", "premium"],
+    "help_howto": ["nasıl", "nedir"],
+    "unsure": ["unuttum", "karışık", "galiba", "muydu"],
+    # RouterAgent fallback
+    "router_listing": ["ilan", "sat", "satmak", "satacağım", "ürün ver", "ekle"],
+    "router_search": ["ara", "bul", "arıyorum", "var mı"],
+    "router_help": ["nasıl", "yardım", "ne yapmalıyım"],
+    "greeting": ["merhaba", "selam", "hey", "günaydın"],
+    # ConversationAgent (listing_flow)
+    "chat_listing": ["ilan", "sat", "satmak", "satacağım", "ürün ver", "ekle", "yükle"],
+    "chat_search": ["ara", "bul", "arıyorum", "fiyat", "kaç para", "ne kadar", "var mı"],
+    "chat_order": ["satın al", "sipariş", "almak istiyorum", "sepet", "siparişimi"],
+}
+
+# Sinyal adı -> normalize edilmiş metin üzerinde çalışan regex
+REGEX_SIGNALS: Dict[str, str] = {
+    # "2000 TL", "1.500 lira", "fiyat 2000"
+    "price_amount": r"\d+[.,]?\d*\s*(?:tl|lira)|fiyat.*\d",
+}
+
+# Mesajdan fiyat değeri çıkarmak için (normalize edilmiş metin; grup 1 = sayı)
+PRICE_VALUE_PATTERNS = [
+    re.compile(r"(\d+[.,]?\d*)\s*tl"),
+    re.compile(r"(\d+[.,]?\d*)\s*lira"),
+    re.compile(r"fiyat[ıi]?\s*(\d+[.,]?\d*)"),
+]
+
+_UPPER_I = str.maketrans({"İ": "i", "I": "i"})
+
+
+def normalize(text: str) -> str:
+    """Türkçe büyük İ/I'yı i'ye indirip küçült (ı, ş, ğ... korunur)"""
+    return (text or "").translate(_UPPER_I).lower()
+
+
+class IntentSignals:
+    """Bir mesajda eşleşen sinyaller (bitmask)"""
+
+    __slots__ = ("engine", "mask")
+
+    def __init__(self, engine: "IntentEngine", mask: int):
+        self.engine = engine
+        self.mask = mask
+
+    def has(self, *names: str) -> bool:
+        """Verilen sinyallerden herhangi biri eşleşti mi"""
+        bits = self.engine.bits
+        return any(self.mask & bits[name] for name in names)
+
+    def names(self) -> List[str]:
+        return [name for name, bit in self.engine.bits.items() if self.mask & bit]
+
+    def __repr__(self):
+        return f"IntentSignals({self.names()})"
+
+
+class IntentEngine:
+    """Anahtar kelime tablolarından derlenmiş Aho-Corasick otomatı + regex sinyalleri"""
+
+    def __init__(self, keyword_signals: Dict[str, Iterable[str]], regex_signals: Dict[str, str] = None):
+        regex_signals = regex_signals or {}
+        names = list(keyword_signals) + [name for name in regex_signals if name not in keyword_signals]
+        self.bits: Dict[str, int] = {name: 1 << index for index, name in enumerate(names)}
+        self.regexes: List[Tuple[re.Pattern, int]] = [
+            (re.compile(pattern), self.bits[name]) for name, pattern in regex_signals.items()
+        ]
+        self.keyword_count = 0
+        self._build(keyword_signals)
+
+    def _build(self, keyword_signals: Dict[str, Iterable[str]]):
+        # Trie
+        goto: List[Dict[str, int]] = [{}]
+        output: List[int] = [0]
+        for name, keywords in keyword_signals.items():
+            bit = self.bits[name]
+            for keyword in keywords:
+                self.keyword_count += 1
+                for variant in {normalize(keyword), fold(keyword)}:
+                    state = 0
+                    for ch in variant:
+                        nxt = goto[state].get(ch)
+                        if nxt is None:
+                            nxt = len(goto)
+                            goto[state][ch] = nxt
+                            goto.append({})
+                            output.append(0)
+                        state = nxt
+                    output[state] |= bit
+
+        # BFS ile failure link'ler; geçişler DFA olarak tam tabloya açılır
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            output[state] |= output[fail[state]]
+            table = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                table[ch] = nxt
+                queue.append(nxt)
+            delta[state] = table
+        self._delta = delta
+        self._output = output
+        self.state_count = len(goto)
+
+    def match(self, text: str) -> IntentSignals:
+        """Metindeki tüm sinyaller, tek geçişte"""
+        text = normalize(text)
+        delta = self._delta
+        output = self._output
+        state = 0
+        mask = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            mask |= output[state]
+        for pattern, bit in self.regexes:
+            if not mask & bit and pattern.search(text):
+                mask |= bit
+        return IntentSignals(self, mask)
+
+
+@lru_cache(maxsize=1)
+def get_intent_engine() -> IntentEngine:
+    return IntentEngine(KEYWORD_SIGNALS, REGEX_SIGNALS)
+
+
+@lru_cache(maxsize=2048)
+def match(text: str) -> IntentSignals:
+    """
+    Paylaşılan engine ile eşleştir. Aynı mesaj bir turn içinde endpoint, agent
+    ve handler'larda tekrar sorulduğu için sonuç cache'lenir (IntentSignals değişmez).
+    """
+    return get_intent_engine().match(text or "")
@@ -0,0 +1,204 @@
+"""
+Local Intent Model
+LLM'e gitmeden niyet sınıflandırma için CPU'da çalışan hafif model.
+
+RouterAgent her mesaj için gpt-4o'yu sadece 7 etiketten birini seçmek için
+çağırıyordu; EnhancedConversationAgent de niyeti belirsiz turn'lerde gpt-4o ile
+sohbet ediyordu. Bu model:
+
+- Özellikler: ASCII'ye katlanmış metinden karakter 2-4 gram'ları + kelimeler,
+  hashing trick ile DIM boyuta indirilir, sublinear TF-IDF, L2 normalize
+- Sınıflandırıcı: multinomial lojistik regresyon (numpy, full-batch gradient descent)
+- Çıktı: etiket + softmax olasılığı (confidence). Eşik altı tahminler None gibi
+  ele alınır ve çağıran LLM'e düşer
+
+Model data/intent_training.json'dan saniyenin altında eğitilir. INTENT_MODEL_PATH'te
+kayıtlı model varsa (train_intent_model.py) o yüklenir, yoksa ilk kullanımda
+bundled veriyle eğitilir. Değerlendirme: eval_intent_model.py.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+import json
+import os
+import zlib
+
+import numpy as np
+
+from utils.intent_engine import normalize
+from utils.query_parser import fold
+from utils.logger import setup_logger
+
+logger = setup_logger("intent_model")
+
+TRAINING_DATA = "data/intent_training.json"
+
+# RouterAgent'ın etiketleri
+LABELS = (
+    "product_search", "create_listing", "get_listing_details", "listing_management",
+    "help", "small_talk", "unknown",
+)
+
+DIM = 1 << 14
+NGRAM_RANGE = (2, 4)
+
+
+def tokenize(text: str) -> List[str]:
+    """Hash'lenecek özellikler: kelimeler ve kelime sınırlı karakter n-gram'ları"""
+    words = fold(normalize(text)).split()
+    features = ["w:" + word for word in words]
+    low, high = NGRAM_RANGE
+    for word in words:
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for start in range(len(padded) - n + 1):
+                features.append(padded[start:start + n])
+    return features
+
+
+def hashed_counts(text: str, dim: int = DIM) -> Dict[int, float]:
+    counts: Dict[int, float] = {}
+    for feature in tokenize(text):
+        index = zlib.crc32(feature.encode("utf-8")) % dim
+        counts[index] = counts.get(index, 0.0) + 1.0
+    return counts
+
+
+class IntentPrediction:
+    __slots__ = ("label", "confidence", "scores")
+
+    def __init__(self, label: str, confidence: float, scores: Dict[str, float]):
+        self.label = label
+        self.confidence = confidence
+        self.scores = scores
+
+    def __repr__(self):
+        return f"IntentPrediction({self.label}, {self.confidence:.2f})"
+
+
+class IntentModel:
+    """Hashed TF-IDF + softmax regresyon"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, idf: np.ndarray, labels: Sequence[str]):
+        self.weights = weights.astype(np.float32)  # (dim, sınıf)
+        self.bias = bias.astype(np.float32)
+        self.idf = idf.astype(np.float32)
+        self.labels = list(labels)
+        self.dim = len(idf)
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], dim: int = DIM,
+              epochs: int = 600, lr: float = 4.0, l2: float = 1e-4) -> "IntentModel":
+        classes = sorted(set(labels), key=lambda label: LABELS.index(label) if label in LABELS else len(LABELS))
+        rows = [hashed_counts(text, dim) for text in texts]
+
+        df = np.zeros(dim, dtype=np.float64)
+        for counts in rows:
+            df[list(counts)] += 1
+        idf = np.log((1 + len(rows)) / (1 + df)) + 1.0
+
+        # Sadece eğitimde görülen bucket'lar üzerinde çalış (DIM'in küçük bir kısmı)
+        used = np.flatnonzero(df)
+        column = np.zeros(dim, dtype=np.int64)
+        column[used] = np.arange(len(used))
+        features = np.zeros((len(rows), len(used)), dtype=np.float32)
+        for row, counts in enumerate(rows):
+            index = np.fromiter(counts, dtype=np.int64)
+            values = np.fromiter(counts.values(), dtype=np.float64)
+            features[row, column[index]] = _weigh(values, idf[index])
+
+        target = np.zeros((len(rows), len(classes)), dtype=np.float32)
+        target[np.arange(len(rows)), [classes.index(label) for label in labels]] = 1.0
+
+        compact = np.zeros((len(used), len(classes)), dtype=np.float32)
+        bias = np.zeros(len(classes), dtype=np.float32)
+        for _ in range(epochs):
+            probs = _softmax(features @ compact + bias)
+            grad = (probs - target) / len(rows)
+            compact -= lr * (features.T @ grad + l2 * compact)
+            bias -= lr * grad.sum(axis=0)
+
+        weights = np.zeros((dim, len(classes)), dtype=np.float32)
+        weights[used] = compact
+        return cls(weights, bias, idf, classes)
+
+    def predict(self, text: str) -> IntentPrediction:
+        counts = hashed_counts(text, self.dim)
+        if counts:
+            index = np.fromiter(counts, dtype=np.int64)
+            values = _weigh(np.fromiter(counts.values(), dtype=np.float32), self.idf[index])
+            logits = values @ self.weights[index] + self.bias
+        else:
+            logits = self.bias
+        probs = _softmax(logits[None, :])[0]
+        best = int(probs.argmax())
+        return IntentPrediction(
+            self.labels[best], float(probs[best]),
+            {label: float(prob) for label, prob in zip(self.labels, probs)},
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, idf=self.idf, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        data = np.load(path)
+        return cls(data["weights"], data["bias"], data["idf"], [str(label) for label in data["labels"]])
+
+
+def _weigh(counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """Sublinear tf * idf, L2 normalize"""
+    values = (1.0 + np.log(counts)) * idf
+    norm = np.linalg.norm(values)
+    return values / norm if norm else values
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_examples(path: str = TRAINING_DATA) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def train_from_file(path: str = TRAINING_DATA, **kwargs) -> IntentModel:
+    examples = load_examples(path)
+    return IntentModel.train([row["text"] for row in examples], [row["intent"] for row in examples], **kwargs)
+
+
+@lru_cache(maxsize=1)
+def get_intent_model() -> Optional[IntentModel]:
+    """Kayıtlı model, yoksa bundled veriyle eğitilmiş model; kapalıysa/başarısızsa None"""
+    from config import get_settings
+    settings = get_settings()
+    if not settings.intent_model_enabled:
+        return None
+    try:
+        if os.path.exists(settings.intent_model_path):
+            return IntentModel.load(settings.intent_model_path)
+        model = train_from_file()
+        logger.info(f"Intent model trained from {TRAINING_DATA} ({settings.intent_model_path} not found)")
+        return model
+    except Exception as e:
+        logger.warning(f"Intent model unavailable: {e}")
+        return None
+
+
+def classify(text: str, allowed: Optional[Iterable[str]] = None) -> Optional[IntentPrediction]:
+    """
+    Eşiği geçen tahmin; model yoksa, eşik altındaysa veya etiket allowed
+    dışındaysa None (çağıran LLM'e düşer)
+    """
+    model = get_intent_model()
+    if model is None or not (text or "").strip():
+        return None
+    from config import get_settings
+    prediction = model.predict(text)
+    if prediction.confidence < get_settings().intent_model_threshold:
+        return None
+    if allowed is not None and prediction.label not in allowed:
+        return None
+    return prediction
@@ -0,0 +1,111 @@
+"""
+LLM Response Cache
+Deterministik (temperature=0) prompt'ların cevaplarını cache'ler; aynı prompt TTL içinde
+OpenAI'a ikinci kez gitmez ("iPhone 13 2.el" gibi kullanıcılar arası tekrar eden istekler).
+
+Key: namespace + model config (llm_string: model, temperature, ...) + prompt
+Katmanlar: memory LRU + SQLite (utils/tiered_cache.py)
+
+Kullanım: get_llm(model="gpt-4o", temperature=0, cache_namespace="pricing")
+
+Şemaya uymayan cevap TTL boyunca tekrar tekrar dönmesin diye structured output
+katmanı parse hatasında evict_response çağırır; bunun için son yazılan/dönen
+cevapların içeriği -> cache key eşlemesi (sınırlı) tutulur.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+import hashlib
+import json
+import threading
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from utils.tiered_cache import TieredCache
+
+# Agent (namespace) bazlı TTL - fiyatlar gün içinde değişebilir, parse sonuçları değişmez
+LLM_CACHE_TTLS = {
+    "pricing": 6 * 3600,
+    "market_search": 6 * 3600,
+    "text_parser": 24 * 3600,
+    "search_filters": 24 * 3600,
+    "product_check": 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+# içerik hash'i -> (backend, key): son update/lookup'lar, evict_response için
+_RECENT_MAX = 1024
+_recent: "OrderedDict[str, Tuple[TieredCache, str]]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _remember(return_val: RETURN_VAL_TYPE, backend: TieredCache, key: str):
+    with _recent_lock:
+        for generation in return_val:
+            digest = _content_hash(generation.text)
+            _recent[digest] = (backend, key)
+            _recent.move_to_end(digest)
+        while len(_recent) > _RECENT_MAX:
+            _recent.popitem(last=False)
+
+def evict_response(content: str) -> bool:
+    """Parse/doğrulamadan geçmeyen cevabı cache'ten sil (bkz. utils/structured_output.py)"""
+    with _recent_lock:
+        entry = _recent.pop(_content_hash(content), None)
+    if entry is None:
+        return False
+    backend, key = entry
+    backend.delete(key)
+    return True
+
+class LLMResponseCache(BaseCache):
+    """LangChain BaseCache implementasyonu (ChatOpenAI(cache=...) ile instance başına)"""
+
+    def __init__(self, backend: TieredCache, namespace: str, ttl_seconds: Optional[int] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds or LLM_CACHE_TTLS.get(namespace, DEFAULT_TTL)
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        raw = f"{self.namespace}\x00{llm_string}\x00{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        value = self.backend.get(key, self.namespace)
+        if value is None:
+            return None
+        try:
+            generations = [loads(generation) for generation in json.loads(value)]
+        except Exception:
+            # Eski/uyumsuz kayıt: cache miss gibi davran
+            return None
+        _remember(generations, self.backend, key)
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        value = json.dumps([dumps(generation) for generation in return_val])
+        self.backend.set(key, value, self.ttl_seconds, self.namespace)
+        _remember(return_val, self.backend, key)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.backend.clear()
+
+@lru_cache()
+def get_llm_cache_backend() -> TieredCache:
+    """Process genelinde tek cache backend'i (SQLite dosyası worker'lar arası paylaşılır)"""
+    from config import get_settings
+    settings = get_settings()
+    return TieredCache(
+        sqlite_path=settings.llm_cache_path or None,
+        memory_entries=settings.llm_cache_memory_entries
+    )
+
+@lru_cache(maxsize=None)
+def get_llm_cache(namespace: str) -> LLMResponseCache:
+    """Namespace (agent) başına cache"""
+    return LLMResponseCache(get_llm_cache_backend(), namespace)
@@ -0,0 +1,366 @@
+"""
+Prometheus metrikleri (/metrics, text exposition format 0.0.4)
+
+Hot path'te lock yok: her metrik thread başına bir shard tutar, bir shard'a
+sadece sahibi olan thread yazar (event loop tek thread -> tek shard). Scrape
+sırasında shard'lar toplanır; o anda yazılmakta olan tek bir gözlem bir sonraki
+scrape'e kalabilir. Lock sadece bir thread'in ilk yazışında (shard kaydı) alınır.
+
+Gauge'lar callback'tir: değer scrape anında hesaplanır.
+"""
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.logger import setup_logger
+import threading
+import time
+
+logger = setup_logger("metrics")
+
+# Saniye; HTTP/agent/LLM/DB için ortak (Supabase ~10ms, LLM ~10s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """Thread başına shard (dict) tutan metrik tabanı"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple, Any]] = []
+        self._register_lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple, Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._register_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels: Tuple) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def value(self, *labels) -> float:
+        return self.values().get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}_total{_labels(self.labelnames, key)} {_format(value)}")
+        return lines
+
+
+class Histogram(_ShardedMetric):
+    """
+    Shard'da label başına [bucket sayıları..., +Inf sayısı, toplam]; bucket'lar
+    kümülatif değil, render sırasında kümülatife çevrilir.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        key = self._key(labels)
+        slots = shard.get(key)
+        if slots is None:
+            slots = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-1] += value
+
+    def time(self, *labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def snapshot(self) -> Dict[Tuple, Tuple[List[int], float]]:
+        """label -> (kümülatif bucket sayıları (+Inf dahil), toplam)"""
+        merged: Dict[Tuple, List[float]] = {}
+        for shard in list(self._shards):
+            for key, slots in list(shard.items()):
+                target = merged.setdefault(key, [0] * len(slots))
+                for i, value in enumerate(list(slots)):
+                    target[i] += value
+        result = {}
+        for key, slots in merged.items():
+            cumulative, running = [], 0
+            for count in slots[:-1]:
+                running += count
+                cumulative.append(running)
+            result[key] = (cumulative, slots[-1])
+        return result
+
+    def count(self, *labels) -> int:
+        counts, _ = self.snapshot().get(self._key(labels), ([0], 0.0))
+        return counts[-1]
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = [_format(b) for b in self.buckets] + ["+Inf"]
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            for bound, count in zip(bounds, counts):
+                le = 'le="' + bound + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format(float(total))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class Gauge:
+    """Scrape anında callback ile hesaplanan gauge (hata verirse atlanır)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, func: Callable[[], Optional[float]]):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+
+    def render(self) -> List[str]:
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.warning(f"Gauge {self.name} failed: {str(e)}")
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format(float(value))}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, documentation: str, func: Callable[[], Optional[float]]) -> Gauge:
+        return self.register(Gauge(name, documentation, func))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------------------------------------------------------------------------
+# Uygulama metrikleri
+# ---------------------------------------------------------------------------
+
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "megapazar_http_request_duration_seconds", "HTTP request latency by route template", ("route", "method", "status")))
+HTTP_ERRORS = REGISTRY.register(Counter(
+    "megapazar_http_errors", "HTTP 5xx responses and unhandled exceptions", ("route",)))
+
+AGENT_LATENCY = REGISTRY.register(Histogram(
+    "megapazar_agent_call_duration_seconds", "Agent __call__/acall latency", ("agent",)))
+AGENT_ERRORS = REGISTRY.register(Counter(
+    "megapazar_agent_errors", "Exceptions raised out of agent calls", ("agent",)))
+
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "megapazar_llm_request_duration_seconds", "Chat model call latency (cache hits included)", ("model",)))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "megapazar_llm_tokens", "Tokens reported by the model", ("model", "type")))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "megapazar_llm_errors", "Chat model calls that raised", ("model",)))
+
+DB_LATENCY = REGISTRY.register(Histogram(
+    "megapazar_supabase_request_duration_seconds", "PostgREST request latency by table or rpc", ("target", "method")))
+DB_ERRORS = REGISTRY.register(Counter(
+    "megapazar_supabase_errors", "PostgREST responses with status >= 400", ("target",)))
+
+FALLBACKS = REGISTRY.register(Counter(
+    "megapazar_fallbacks", "Degraded paths taken (default price, RPC instead of local index, ...)", ("component", "reason")))
+
+FILTER_EXTRACTION = REGISTRY.register(Counter(
+    "megapazar_filter_extraction", "Search filter extraction solved by the rule-based parser or sent to the LLM", ("route",)))
+INTENT_ROUTING = REGISTRY.register(Counter(
+    "megapazar_intent_routing", "Intent decisions answered by the local model or escalated to the LLM", ("component", "route")))
+MODEL_SELECTIONS = REGISTRY.register(Counter(
+    "megapazar_model_selections", "Models picked by the tiering policy per agent and load level", ("agent", "model", "level")))
+STRUCTURED_OUTPUT = REGISTRY.register(Counter(
+    "megapazar_structured_output", "LLM JSON outputs by schema: valid, repaired by the retry call, or failed", ("schema", "outcome")))
+
+
+def record_fallback(component: str, reason: str):
+    FALLBACKS.inc(component, reason)
+
+
+def metrics_enabled() -> bool:
+    from config import get_settings
+    return get_settings().metrics_enabled
+
+
+# ---------------------------------------------------------------------------
+# LLM çağrıları (LangChain callback)
+# ---------------------------------------------------------------------------
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # pragma: no cover
+    BaseCallbackHandler = object
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Model bazlı latency histogramı + token sayaçları"""
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[Any, Tuple[str, float]] = {}
+
+    def in_flight(self, max_age: float = 120.0) -> int:
+        """Devam eden LLM çağrıları (model tiering yük sinyali); max_age'den eskiler iptal/kayıp sayılır"""
+        now = time.perf_counter()
+        runs = list(self._runs.items())
+        for run_id, (_, started) in runs:
+            if now - started > max_age:
+                self._runs.pop(run_id, None)
+        return sum(1 for _, (_, started) in runs if now - started <= max_age)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        model = params.get("model") or params.get("model_name") or metadata.get("ls_model_name") or "unknown"
+        self._runs[run_id] = (model, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        model, started = run
+        LLM_LATENCY.observe(time.perf_counter() - started, model)
+        usage = (response.llm_output or {}).get("token_usage") or _streamed_usage(response)
+        if usage.get("prompt_tokens"):
+            LLM_TOKENS.inc(model, "prompt", amount=usage["prompt_tokens"])
+        if usage.get("completion_tokens"):
+            LLM_TOKENS.inc(model, "completion", amount=usage["completion_tokens"])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            LLM_ERRORS.inc(run[0])
+
+
+def _streamed_usage(response) -> Dict[str, int]:
+    """Streaming cevaplarda llm_output yok: usage_metadata (cache hit'lerde total_cost=0 işaretli, sayılmaz)"""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            if metadata and "total_cost" not in metadata:
+                usage["prompt_tokens"] += metadata.get("input_tokens") or 0
+                usage["completion_tokens"] += metadata.get("output_tokens") or 0
+    return usage
+
+
+@lru_cache()
+def get_llm_metrics_handler() -> LLMMetricsHandler:
+    return LLMMetricsHandler()
+
+
+# ---------------------------------------------------------------------------
+# Supabase (PostgREST httpx session event hook'ları)
+# ---------------------------------------------------------------------------
+
+def supabase_target(request) -> str:
+    """/rest/v1/rpc/search_listings -> "rpc:search_listings", /rest/v1/listings -> "listings" """
+    parts = [p for p in request.url.path.split("/") if p]
+    if "rpc" in parts and parts.index("rpc") + 1 < len(parts):
+        return f"rpc:{parts[parts.index('rpc') + 1]}"
+    return parts[-1] if parts else ""
+
+
+def _on_request(request):
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+def _on_response(response):
+    started = response.request.extensions.get("metrics_started")
+    if started is None:
+        return
+    target = supabase_target(response.request)
+    DB_LATENCY.observe(time.perf_counter() - started, target, response.request.method)
+    if response.status_code >= 400:
+        DB_ERRORS.inc(target)
+
+
+async def _aon_request(request):
+    _on_request(request)
+
+
+async def _aon_response(response):
+    _on_response(response)
+
+
+def instrument_supabase(client, is_async: bool = False):
+    """Client'ın PostgREST session'ına latency hook'larını ekle (idempotent)"""
+    session = client.postgrest.session
+    if getattr(session, "_megapazar_metrics", False):
+        return client
+    hooks = session.event_hooks
+    hooks["request"].append(_aon_request if is_async else _on_request)
+    hooks["response"].append(_aon_response if is_async else _on_response)
+    session.event_hooks = hooks
+    session._megapazar_metrics = True
+    return client
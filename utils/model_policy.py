@@ -0,0 +1,189 @@
+"""
+Model Tiering Policy
+Agent'ların hangi modeli kullanacağı tek, bildirimsel bir tablodan seçilir.
+
+Agent'lar gpt-4o'yu sabit kodluyordu; yük ya da bütçe baskısında ucuz modele
+inmenin yolu yoktu. Burada:
+
+- AGENT_TASKS: her agent/görev bir karmaşıklık sınıfında
+  (trivial / simple / standard / complex)
+- TIER_TABLE: karmaşıklık x yük seviyesi -> tier (premium / economy).
+  Normal yükte bugünkü modeller korunur; elevated'da simple görevler,
+  high'da standard görevler de economy'ye iner; complex hiç inmez
+- Yük seviyesi (MODEL_POLICY_LEVEL=auto): devam eden LLM çağrısı sayısı
+  (metrics handler) ve son 1 saatin harcaması / MODEL_POLICY_HOURLY_BUDGET_TRY
+  (cost tracker); ikisinden yüksek olanı
+- Seçim her çağrıda yapılır (TieredLLM); client'lar get_llm cache'inden paylaşılır
+
+Karmaşıklık sınıfları MODEL_POLICY_OVERRIDES ile deploy'suz değiştirilebilir
+({"pricing.validation": "simple"}). Karar öncesi A/B: bench_model_tiers.py.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+LEVELS = ("normal", "elevated", "high")
+
+# karmaşıklık -> yük seviyesi -> tier
+TIER_TABLE = {
+    "trivial": {"normal": "economy", "elevated": "economy", "high": "economy"},
+    "simple": {"normal": "premium", "elevated": "economy", "high": "economy"},
+    "standard": {"normal": "premium", "elevated": "premium", "high": "economy"},
+    "complex": {"normal": "premium", "elevated": "premium", "high": "premium"},
+}
+
+# agent -> görev -> karmaşıklık ("default": agent'ın ana çağrısı)
+AGENT_TASKS = {
+    "router": {"default": "standard"},
+    "vision": {"default": "complex"},
+    "text_parser": {"default": "standard"},
+    "pricing": {"default": "complex", "validation": "standard", "market_price": "simple"},
+    "market_search": {"default": "standard", "estimate": "simple"},
+    "listing_writer": {"default": "complex"},
+    "conversation": {"default": "standard"},
+    "product_check": {"default": "simple"},
+    "listing_edit": {"default": "standard"},
+    "buyer_search": {"default": "trivial"},
+    "help": {"default": "trivial"},
+}
+DEFAULT_COMPLEXITY = "standard"
+
+
+class ModelPolicy:
+    """Agent/görev + yük seviyesi -> model"""
+
+    def __init__(
+        self,
+        tiers: Dict[str, str],
+        tasks: Optional[Dict[str, Dict[str, str]]] = None,
+        overrides: Optional[Dict[str, str]] = None,
+        enabled: bool = True,
+        level: str = "auto",
+        elevated_inflight: int = 16,
+        high_inflight: int = 48,
+        hourly_budget_try: float = 0.0,
+        in_flight: Optional[Callable[[], int]] = None,
+        recent_cost: Optional[Callable[[], float]] = None,
+    ):
+        self.tiers = tiers
+        self.tasks = tasks if tasks is not None else AGENT_TASKS
+        self.overrides = overrides or {}
+        self.enabled = enabled
+        self.level = level
+        self.elevated_inflight = elevated_inflight
+        self.high_inflight = high_inflight
+        self.hourly_budget_try = hourly_budget_try
+        self.in_flight = in_flight or (lambda: 0)
+        self.recent_cost = recent_cost or (lambda: 0.0)
+
+    def complexity(self, agent: str, task: str = "default") -> str:
+        override = self.overrides.get(f"{agent}.{task}") or self.overrides.get(agent)
+        if override in TIER_TABLE:
+            return override
+        tasks = self.tasks.get(agent, {})
+        return tasks.get(task) or tasks.get("default") or DEFAULT_COMPLEXITY
+
+    def load_level(self) -> str:
+        if not self.enabled:
+            return "normal"
+        if self.level in LEVELS:
+            return self.level
+        in_flight = self.in_flight()
+        level = 2 if in_flight >= self.high_inflight else 1 if in_flight >= self.elevated_inflight else 0
+        if self.hourly_budget_try > 0:
+            spent = self.recent_cost() / self.hourly_budget_try
+            level = max(level, 2 if spent >= 1.0 else 1 if spent >= 0.8 else 0)
+        return LEVELS[level]
+
+    def tier_for(self, agent: str, task: str = "default", level: Optional[str] = None) -> str:
+        return TIER_TABLE[self.complexity(agent, task)][level or self.load_level()]
+
+    def model_for(self, agent: str, task: str = "default") -> str:
+        from utils.metrics import MODEL_SELECTIONS
+        level = self.load_level()
+        model = self.tiers[self.tier_for(agent, task, level)]
+        MODEL_SELECTIONS.inc(agent, model, level)
+        return model
+
+    def describe(self) -> Dict[str, Any]:
+        """/debug/model-policy: mevcut seviye, sinyaller ve agent/görev -> model"""
+        level = self.load_level()
+        return {
+            "enabled": self.enabled,
+            "level": level,
+            "level_setting": self.level,
+            "in_flight_llm_calls": self.in_flight(),
+            "hourly_cost_try": round(self.recent_cost(), 4),
+            "hourly_budget_try": self.hourly_budget_try,
+            "tiers": self.tiers,
+            "routes": {
+                f"{agent}.{task}": self.tiers[self.tier_for(agent, task, level)]
+                for agent, tasks in self.tasks.items() for task in tasks
+            },
+        }
+
+
+class TieredLLM:
+    """
+    Agent'ın LLM'i: her invoke/stream'de politikadan model seçer.
+    ChatOpenAI yerine kullanılır (invoke/ainvoke/stream/astream/bind).
+    """
+
+    def __init__(self, agent: str, temperature: float = 0.7, cache_namespace: Optional[str] = None, task: str = "default"):
+        self.agent = agent
+        self.task = task
+        self.temperature = temperature
+        self.cache_namespace = cache_namespace
+
+    def resolve(self):
+        from utils.openai_client import get_llm
+        model = get_model_policy().model_for(self.agent, self.task)
+        return get_llm(model=model, temperature=self.temperature, cache_namespace=self.cache_namespace)
+
+    def invoke(self, *args, **kwargs):
+        return self.resolve().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        return await self.resolve().ainvoke(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        return self.resolve().stream(*args, **kwargs)
+
+    def astream(self, *args, **kwargs):
+        return self.resolve().astream(*args, **kwargs)
+
+    def bind(self, **kwargs):
+        return self.resolve().bind(**kwargs)
+
+
+def tiered_llm(agent: str, temperature: float = 0.7, cache_namespace: Optional[str] = None, task: str = "default") -> TieredLLM:
+    return TieredLLM(agent, temperature=temperature, cache_namespace=cache_namespace, task=task)
+
+
+def _in_flight_llm_calls() -> int:
+    from utils.metrics import get_llm_metrics_handler, metrics_enabled
+    return get_llm_metrics_handler().in_flight() if metrics_enabled() else 0
+
+
+def _hourly_cost_try() -> float:
+    from config import get_settings
+    if not get_settings().cost_tracking_enabled:
+        return 0.0
+    from utils.cost_tracker import get_cost_tracker
+    return get_cost_tracker().recent_cost_try(3600)
+
+
+@lru_cache(maxsize=1)
+def get_model_policy() -> ModelPolicy:
+    from config import get_settings
+    settings = get_settings()
+    return ModelPolicy(
+        tiers={"premium": settings.model_tier_premium, "economy": settings.model_tier_economy},
+        overrides=settings.model_policy_overrides,
+        enabled=settings.model_policy_enabled,
+        level=settings.model_policy_level,
+        elevated_inflight=settings.model_policy_elevated_inflight,
+        high_inflight=settings.model_policy_high_inflight,
+        hourly_budget_try=settings.model_policy_hourly_budget_try,
+        in_flight=_in_flight_llm_calls,
+        recent_cost=_hourly_cost_try,
+    )
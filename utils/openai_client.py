@@ -1,19 +1,65 @@
 from langchain_openai import ChatOpenAI
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from config import get_settings
+from functools import lru_cache
+from typing import Optional
+import httpx
 
+# Tüm OpenAI çağrıları aynı connection pool'u kullanır (TLS handshake tekrar edilmez)
+HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+@lru_cache()
+def get_http_client() -> httpx.Client:
+    """Paylaşılan sync HTTP client (keep-alive pool)"""
+    return httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+@lru_cache()
+def get_async_http_client() -> httpx.AsyncClient:
+    """Paylaşılan async HTTP client (keep-alive pool)"""
+    return httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+@lru_cache()
 def get_openai_client() -> OpenAI:
     """Raw OpenAI client (embeddings için)"""
     settings = get_settings()
-    return OpenAI(api_key=settings.openai_api_key)
+    return OpenAI(api_key=settings.openai_api_key, http_client=get_http_client())
+
+@lru_cache()
+def get_async_openai_client() -> AsyncOpenAI:
+    """Async raw OpenAI client (async embeddings için)"""
+    settings = get_settings()
+    return AsyncOpenAI(api_key=settings.openai_api_key, http_client=get_async_http_client())
 
-def get_llm(model: str = "gpt-4o", temperature: float = 0.7) -> ChatOpenAI:
-    """OpenAI LLM client oluştur"""
+@lru_cache(maxsize=None)
+def get_llm(model: str = "gpt-4o", temperature: float = 0.7, cache_namespace: Optional[str] = None) -> ChatOpenAI:
+    """
+    OpenAI LLM client - model config başına tek instance (paylaşılan HTTP pool)
+    
+    cache_namespace: temperature=0 çağrılarda cevaplar bu namespace'in TTL'i ile
+    cache'lenir (bkz. utils/llm_cache.py)
+    """
     settings = get_settings()
+    cache = None
+    if cache_namespace and temperature == 0 and settings.llm_cache_enabled:
+        from utils.llm_cache import get_llm_cache
+        cache = get_llm_cache(cache_namespace)
+    from utils.tracing import tracing_enabled, get_llm_tracing_handler
+    callbacks = [get_llm_tracing_handler()] if tracing_enabled() else []
+    if settings.cost_tracking_enabled:
+        from utils.cost_tracker import get_cost_tracking_handler
+        callbacks.append(get_cost_tracking_handler())
+    if settings.metrics_enabled:
+        from utils.metrics import get_llm_metrics_handler
+        callbacks.append(get_llm_metrics_handler())
     return ChatOpenAI(
         model=model,
         temperature=temperature,
-        api_key=settings.openai_api_key
+        api_key=settings.openai_api_key,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        cache=cache,
+        callbacks=callbacks or None
     )
 
 def get_vision_llm() -> ChatOpenAI:
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from supabase import create_client
-from agents.pricing import PricingAgent
+from agents.registry import get_pricing_agent
 from utils.logger import setup_logger
 
 # Load environment variables
@@ -21,7 +21,7 @@ class PriceMonitor:
             os.getenv("SUPABASE_URL"),
             os.getenv("SUPABASE_SERVICE_KEY")
         )
-        self.pricing_agent = PricingAgent()
+        self.pricing_agent = get_pricing_agent()
         self.threshold_percent = 20  # ±20%
     
     def check_all_active_listings(self):
@@ -0,0 +1,281 @@
+"""
+Query Parser
+Arama sorgularından filtre çıkarımı için kural tabanlı Türkçe parser.
+
+BuyerSearchAgent her filtresiz aramada gpt-4o-mini'yi sadece fiyat aralığı,
+şehir ve durum çıkarmak için çağırıyordu. Sık görülen kalıplar burada
+deterministik olarak (mikrosaniyeler içinde) çözülür:
+
+- Fiyat: "5000 TL altı", "1000-5000 TL arası", "en fazla 3 bin", "10k üstü", "2 bin civarı"
+- Konum: 81 il (+ yaygın kısa adlar: Antep, Urfa, Maraş, Afyon), "İstanbul'da", "izmirde"
+- Durum: "ikinci el" / "2. el" / "sıfır" / "hasarlı"
+- Kategori: anahtar kelime sözlüğü (tek kategori eşleşirse)
+
+Yorumlanamayan bir fiyat ipucu (niteleyicisiz "5000 TL", tanınmayan sayı),
+çelişkili durum/şehir varsa confidence düşer ve çağıran LLM'e düşer.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+CONFIDENCE_THRESHOLD = 0.75
+
+_FOLD = str.maketrans({
+    "ı": "i", "İ": "i", "I": "i", "ş": "s", "Ş": "s", "ç": "c", "Ç": "c",
+    "ğ": "g", "Ğ": "g", "ö": "o", "Ö": "o", "ü": "u", "Ü": "u",
+    "â": "a", "î": "i", "û": "u", "'": " ", "’": " ", "`": " ",
+})
+
+def fold(text: str) -> str:
+    """Türkçe karakterleri ASCII'ye indir, küçük harfe çevir (İ/I doğru ele alınır)"""
+    return (text or "").translate(_FOLD).lower()
+
+PROVINCES = [
+    "Adana", "Adıyaman", "Afyonkarahisar", "Ağrı", "Amasya", "Ankara", "Antalya", "Artvin",
+    "Aydın", "Balıkesir", "Bilecik", "Bingöl", "Bitlis", "Bolu", "Burdur", "Bursa",
+    "Çanakkale", "Çankırı", "Çorum", "Denizli", "Diyarbakır", "Edirne", "Elazığ", "Erzincan",
+    "Erzurum", "Eskişehir", "Gaziantep", "Giresun", "Gümüşhane", "Hakkari", "Hatay", "Isparta",
+    "Mersin", "İstanbul", "İzmir", "Kars", "Kastamonu", "Kayseri", "Kırklareli", "Kırşehir",
+    "Kocaeli", "Konya", "Kütahya", "Malatya", "Manisa", "Kahramanmaraş", "Mardin", "Muğla",
+    "Muş", "Nevşehir", "Niğde", "Ordu", "Rize", "Sakarya", "Samsun", "Siirt",
+    "Sinop", "Sivas", "Tekirdağ", "Tokat", "Trabzon", "Tunceli", "Şanlıurfa", "Uşak",
+    "Van", "Yozgat", "Zonguldak", "Aksaray", "Bayburt", "Karaman", "Kırıkkale", "Batman",
+    "Şırnak", "Bartın", "Ardahan", "Iğdır", "Yalova", "Karabük", "Kilis", "Osmaniye",
+    "Düzce",
+]
+
+_PROVINCE_ALIASES = {
+    "antep": "Gaziantep", "urfa": "Şanlıurfa", "maras": "Kahramanmaraş", "afyon": "Afyonkarahisar",
+    "icel": "Mersin", "izmit": "Kocaeli", "adapazari": "Sakarya", "antakya": "Hatay",
+}
+
+_PROVINCE_LOOKUP = {fold(name): name for name in PROVINCES}
+_PROVINCE_LOOKUP.update(_PROVINCE_ALIASES)
+
+# "istanbulda", "ankaradan", "izmirdeki" gibi ek almış formlar
+# (tek harfli ekler yok: "vana" -> "Van" gibi yanlış eşleşmeler olmasın)
+_LOCATION_SUFFIXES = ("", "da", "de", "ta", "te", "dan", "den", "tan", "ten", "daki", "deki", "taki", "teki")
+
+_CONDITION_PATTERNS = [
+    # sıra önemli: "sıfır ayarında" kullanılmıştır
+    (re.compile(r"\bsifir ayarinda\b|\bsifir gibi\b|\b(?:ikinci|2\.?) ?el\b|\bkullanilmis\b|\baz kullanilmis\b"), "used"),
+    (re.compile(r"\bhasarli\b|\barizali\b|\bbozuk\b|\bcalismayan\b"), "damaged"),
+    (re.compile(r"\bsifir\b|\byeni\b|\bkutusu acilmamis\b|\bambalajinda\b|\bhic kullanilmamis\b"), "new"),
+]
+
+CATEGORY_KEYWORDS = {
+    "Elektronik": [
+        "telefon", "iphone", "samsung", "xiaomi", "huawei", "laptop", "dizustu", "notebook", "bilgisayar",
+        "tablet", "ipad", "macbook", "kulaklik", "televizyon", "tv", "monitor", "playstation", "ps5", "ps4",
+        "xbox", "konsol", "kamera", "fotograf makinesi", "airpods", "akilli saat",
+    ],
+    "Mobilya": [
+        "koltuk", "kanepe", "masa", "sandalye", "dolap", "yatak", "gardirop", "komodin", "sehpa",
+        "kitaplik", "berjer", "yemek odasi", "yatak odasi", "calisma masasi",
+    ],
+    "Otomotiv": [
+        "araba", "otomobil", "arac", "lastik", "jant", "motosiklet", "far", "tampon", "aku",
+    ],
+    "Endüstriyel Malzemeler": [
+        "rotor", "elektrik motoru", "pompa", "kompresor", "invertor", "vana", "rulman", "reduktor",
+        "jenerator", "forklift", "cnc", "torna", "hidrolik", "endustriyel",
+    ],
+}
+
+_CATEGORY_PATTERNS = [
+    (category, re.compile(r"\b(?:" + "|".join(re.escape(fold(k)) for k in keywords) + r")(?:lar|ler|u|i|si|su)?\b"))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+]
+
+# ---------------------------------------------------------------------------
+# Fiyat kalıpları (fold edilmiş metin üzerinde)
+# ---------------------------------------------------------------------------
+
+_AMOUNT = r"(\d+(?:[.,]\d+)*)\s*(bin|k|milyon)?"
+_CURRENCY = r"(?:\s*(?:tl|lira|try|₺))?"
+_CASE = r"(?:\s*(?:ye|ya|e|a|den|dan|ten|tan|de|da|te|ta|lik|luk)\b)?"
+
+_RANGE = re.compile(
+    r"(?P<low>\d+(?:[.,]\d+)*)\s*(?P<low_mult>bin|k|milyon)?(?P<low_cur>\s*(?:tl|lira|try|₺))?"
+    r"\s*(?P<sep>-|–|ile|ila|ve)\s*"
+    r"(?P<high>\d+(?:[.,]\d+)*)\s*(?P<high_mult>bin|k|milyon)?(?P<high_cur>\s*(?:tl|lira|try|₺))?"
+    rf"{_CASE}\s*(?P<between>arasi\w*|araliginda|araligi)?"
+)
+_MAX_AFTER = re.compile(
+    rf"{_AMOUNT}{_CURRENCY}{_CASE}\s*(?:alti\w*|kadar|ucuz\w*|asmayan|gecmeyen|ve alti)\b"
+)
+_MAX_BEFORE = re.compile(rf"(?:en fazla|en cok|max(?:imum)?|maksimum|butcem|butce)\s*{_AMOUNT}{_CURRENCY}")
+_MIN_AFTER = re.compile(
+    rf"{_AMOUNT}{_CURRENCY}{_CASE}\s*(?:ustu\w*|uzeri\w*|fazla\w*|pahali\w*|ve uzeri)\b"
+)
+_MIN_BEFORE = re.compile(rf"(?:en az|min(?:imum)?|minimum)\s*{_AMOUNT}{_CURRENCY}")
+_AROUND = re.compile(rf"{_AMOUNT}{_CURRENCY}{_CASE}\s*(?:civari\w*|dolaylari\w*|gibi)\b")
+
+# Fiyat olmayan sayılar: "256 GB", "15 kW", "2015 model", "4 adet"
+_UNIT_AFTER_NUMBER = re.compile(
+    r"^\s*(?:gb|tb|mb|ghz|hz|kw|w|watt|v|volt|cm|mm|m|metre|inc|inch|km|cc|hp|beygir|kg|gr|lt|litre|"
+    r"adet|tane|model|yil|yillik|kisilik|jant|nesil|numara|no|kapi|ay|gun|kat|oda|x)\b"
+)
+_LEFTOVER_NUMBER = re.compile(r"(?<![\w.,])(\d+(?:[.,]\d+)*)\s*(bin|k|milyon)?(?![\w.,])")
+_CURRENCY_WORD = re.compile(r"\b(?:tl|lira|try)\b|₺")
+
+AROUND_MARGIN = 0.2
+
+def _to_number(raw: str, multiplier: Optional[str]) -> float:
+    """"5.000" -> 5000, "2,5" + bin -> 2500, "1.5" + milyon -> 1500000"""
+    parts = re.split(r"[.,]", raw)
+    if len(parts) > 1 and all(len(p) == 3 for p in parts[1:]):
+        value = float("".join(parts))  # binlik ayırıcı
+    elif len(parts) == 2:
+        value = float(f"{parts[0]}.{parts[1]}")  # ondalık
+    else:
+        value = float("".join(parts))
+    factor = {"bin": 1_000, "k": 1_000, "milyon": 1_000_000}.get(multiplier or "", 1)
+    return value * factor
+
+def _clean(value: float):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+class ParsedQuery:
+    """Kural tabanlı parse sonucu"""
+
+    def __init__(self, filters: Dict[str, Any], confidence: float, ambiguities: List[str]):
+        self.filters = filters
+        self.confidence = confidence
+        self.ambiguities = ambiguities
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= CONFIDENCE_THRESHOLD
+
+    def __repr__(self) -> str:
+        return f"ParsedQuery(filters={self.filters}, confidence={self.confidence}, ambiguities={self.ambiguities})"
+
+def _parse_price(text: str, filters: Dict[str, Any], ambiguities: List[str]) -> str:
+    """Fiyat kalıplarını uygula; eşleşen kısımları metinden çıkar (kalan metin döner)"""
+    spans: List[Tuple[int, int]] = []
+
+    def consume(pattern, handler):
+        for match in pattern.finditer(text):
+            if any(start < match.end() and match.start() < end for start, end in spans):
+                continue
+            if handler(match) is not False:
+                spans.append(match.span())
+
+    def set_bound(key: str, value: float):
+        if key in filters and filters[key] != _clean(value):
+            ambiguities.append(f"conflicting {key}")
+        filters[key] = _clean(value)
+
+    def on_range(m):
+        # "iphone 13 ve 14" fiyat aralığı değildir: "arası" ya da "-" + para birimi/çarpan gerekir
+        priced = m.group("low_cur") or m.group("high_cur") or m.group("low_mult") or m.group("high_mult")
+        if not (m.group("between") or (m.group("sep") in "-–" and priced)):
+            return False
+        low_raw, low_mult = m.group("low"), m.group("low_mult")
+        high_raw, high_mult = m.group("high"), m.group("high_mult")
+        high = _to_number(high_raw, high_mult)
+        low = _to_number(low_raw, low_mult)
+        # "1-5 bin" -> 1000-5000
+        if not low_mult and high_mult and _to_number(low_raw, high_mult) <= high:
+            low = _to_number(low_raw, high_mult)
+        if low > high:
+            low, high = high, low
+        set_bound("min_price", low)
+        set_bound("max_price", high)
+
+    def on_around(m):
+        value = _to_number(m.group(1), m.group(2))
+        set_bound("min_price", value * (1 - AROUND_MARGIN))
+        set_bound("max_price", value * (1 + AROUND_MARGIN))
+
+    consume(_RANGE, on_range)
+    consume(_MAX_AFTER, lambda m: set_bound("max_price", _to_number(m.group(1), m.group(2))))
+    consume(_MAX_BEFORE, lambda m: set_bound("max_price", _to_number(m.group(1), m.group(2))))
+    consume(_MIN_AFTER, lambda m: set_bound("min_price", _to_number(m.group(1), m.group(2))))
+    consume(_MIN_BEFORE, lambda m: set_bound("min_price", _to_number(m.group(1), m.group(2))))
+    consume(_AROUND, on_around)
+
+    remaining = text
+    for start, end in sorted(spans, reverse=True):
+        remaining = remaining[:start] + " " + remaining[end:]
+
+    if "min_price" in filters and "max_price" in filters and filters["min_price"] > filters["max_price"]:
+        ambiguities.append("min_price > max_price")
+    return remaining
+
+def _check_leftover_numbers(remaining: str, ambiguities: List[str]):
+    """Tüketilmemiş fiyat benzeri sayı veya para birimi varsa belirsiz"""
+    if _CURRENCY_WORD.search(remaining):
+        ambiguities.append("unqualified price")
+        return
+    for match in _LEFTOVER_NUMBER.finditer(remaining):
+        value = _to_number(match.group(1), match.group(2))
+        if match.group(2):
+            ambiguities.append(f"unqualified amount {match.group(0).strip()}")
+            continue
+        if _UNIT_AFTER_NUMBER.match(remaining[match.end():]):
+            continue
+        if value < 100 or 1950 <= value <= 2035:
+            continue  # model numarası / yıl
+        ambiguities.append(f"bare number {match.group(1)}")
+
+# Kesme işaretli bulunma/ayrılma eki özel isim işaretidir: "Beşiktaş'ta", "Kadıköy'den"
+_PROPER_LOCATIVE = re.compile(r"(\w+)['’](?:da|de|ta|te|dan|den|tan|ten|daki|deki|taki|teki)\b")
+
+def _parse_location(text: str, filters: Dict[str, Any], ambiguities: List[str], original: str = ""):
+    for match in _PROPER_LOCATIVE.finditer(original):
+        stem = fold(match.group(1))
+        if stem not in _PROVINCE_LOOKUP and not stem.isdigit() and stem not in ("tl", "lira"):
+            ambiguities.append(f"unknown place {match.group(1)}")
+    found = []
+    for token in re.findall(r"[a-z]+", text):
+        for suffix in _LOCATION_SUFFIXES:
+            stem = token[:len(token) - len(suffix)] if suffix else token
+            if suffix and not token.endswith(suffix):
+                continue
+            province = _PROVINCE_LOOKUP.get(stem)
+            if province:
+                if province not in found:
+                    found.append(province)
+                break
+    if len(found) == 1:
+        filters["location"] = found[0]
+    elif len(found) > 1:
+        ambiguities.append(f"multiple provinces {found}")
+
+def _parse_condition(text: str, filters: Dict[str, Any], ambiguities: List[str]):
+    found = []
+    remaining = text
+    for pattern, condition in _CONDITION_PATTERNS:
+        if pattern.search(remaining):
+            found.append(condition)
+            remaining = pattern.sub(" ", remaining)
+    if len(set(found)) == 1:
+        filters["condition"] = found[0]
+    elif len(set(found)) > 1:
+        ambiguities.append(f"conflicting condition {found}")
+
+def _parse_category(text: str, filters: Dict[str, Any]):
+    """Kategori best-effort: sadece tek kategori eşleşirse (eşleşmezse hybrid search yeterli)"""
+    matches = {category for category, pattern in _CATEGORY_PATTERNS if pattern.search(text)}
+    if len(matches) == 1:
+        filters["category"] = matches.pop()
+
+def parse_search_query(query: str) -> ParsedQuery:
+    """
+    Sorgudan filtreleri çıkar.
+    Dönen filters, LLM çıkarımıyla aynı anahtarları kullanır
+    (category, min_price, max_price, location, condition); bulunamayanlar yoktur.
+    """
+    text = " ".join(fold(query).split())
+    filters: Dict[str, Any] = {}
+    ambiguities: List[str] = []
+
+    remaining = _parse_price(text, filters, ambiguities)
+    _check_leftover_numbers(remaining, ambiguities)
+    _parse_condition(text, filters, ambiguities)
+    _parse_location(text, filters, ambiguities, query or "")
+    _parse_category(text, filters)
+
+    confidence = max(0.0, 1.0 - 0.5 * len(ambiguities))
+    return ParsedQuery(filters, confidence, ambiguities)
@@ -0,0 +1,187 @@
+"""
+Structured Output
+Agent'ların JSON çıktıları için ortak katman.
+
+Her agent aynı "```json çitini sil + json.loads" bloğunu tekrarlıyordu; parse
+hatası tüm LLM çağrısını boşa harcayıp fallback'e düşürüyordu (PricingAgent'ta
+sabit 1000 TL gibi). Burada:
+
+- İstek, models/schemas.py'deki pydantic modelinden türetilen response_format ile
+  yapılır (STRUCTURED_OUTPUT_MODE: json_schema | json_object | off)
+- Cevap tek yerde parse + validate edilir (çit, baştaki/sondaki metin tolere edilir)
+- Şemaya uymayan çıktı asıl çağrı tekrarlanmadan, sadece bozuk çıktı + hata ile
+  ucuz modele (gpt-4o-mini) bir kez onartılır; o da olmazsa StructuredOutputError
+- Bozuk çıktı LLM cache'indeyse silinir (TTL boyunca her hit'te onarım ödenmesin)
+"""
+from functools import lru_cache
+from typing import Any, Dict, Type, TypeVar
+import asyncio
+import json
+import re
+
+from pydantic import BaseModel
+
+from utils.llm_cache import evict_response
+from utils.logger import setup_logger
+
+logger = setup_logger("structured_output")
+
+T = TypeVar("T", bound=BaseModel)
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+MAX_REPAIR_INPUT = 8000
+
+REPAIR_PROMPT = """Aşağıdaki çıktı beklenen JSON şemasına uymuyor. Çıktıyı şemaya uyan geçerli JSON'a dönüştür.
+İçeriği değiştirme, bilgi uydurma; sadece biçimi düzelt. Bilinmeyen alanları null bırak.
+
+ŞEMA:
+{schema}
+
+HATA:
+{error}
+
+ÇIKTI:
+{content}
+
+SADECE JSON DÖNDÜR:"""
+
+
+class StructuredOutputError(ValueError):
+    """LLM çıktısı onarımdan sonra da şemaya uymadı"""
+
+    def __init__(self, schema: Type[BaseModel], content: str, error: Exception):
+        super().__init__(f"{schema.__name__}: {error}")
+        self.schema = schema
+        self.content = content
+        self.error = error
+
+
+def extract_json(content: str) -> Any:
+    """Model cevabındaki JSON değeri (markdown çiti ve etrafındaki metin tolere edilir)"""
+    text = content.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        error = e
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = text.find("{")
+    if start != -1:
+        try:
+            return json.JSONDecoder().raw_decode(text, start)[0]
+        except json.JSONDecodeError as e:
+            error = e
+    raise error
+
+
+def parse_json(content: str, schema: Type[T]) -> T:
+    """Tek seferde parse + validate (ValueError / ValidationError fırlatır)"""
+    return schema.model_validate(extract_json(content))
+
+
+@lru_cache(maxsize=None)
+def _schema_text(schema: Type[BaseModel]) -> str:
+    return json.dumps(schema.model_json_schema(), ensure_ascii=False)
+
+
+@lru_cache(maxsize=None)
+def response_format(schema: Type[BaseModel], mode: str) -> Dict[str, Any]:
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema(), "strict": False},
+    }
+
+
+def with_response_format(llm, schema: Type[BaseModel]):
+    """LLM'i şemanın response_format'ı ile bağla (stream_llm ile de kullanılabilir)"""
+    from config import get_settings
+    mode = get_settings().structured_output_mode
+    if mode == "off":
+        return llm
+    return llm.bind(response_format=response_format(schema, mode))
+
+
+def _record(schema: Type[BaseModel], outcome: str):
+    from utils.metrics import STRUCTURED_OUTPUT
+    STRUCTURED_OUTPUT.inc(schema.__name__, outcome)
+
+
+def _repair_request(schema: Type[BaseModel], content: str, error: Exception):
+    """Onarım çağrısı (llm, prompt) - kapalıysa ya da onarılacak içerik yoksa None"""
+    from config import get_settings
+    from utils.openai_client import get_llm
+    settings = get_settings()
+    if not settings.structured_output_repair_enabled or not content.strip():
+        return None
+    prompt = REPAIR_PROMPT.format(
+        schema=_schema_text(schema),
+        error=str(error)[:500],
+        content=content[:MAX_REPAIR_INPUT],
+    )
+    return with_response_format(get_llm(model=settings.structured_output_repair_model, temperature=0), schema), prompt
+
+
+def _finish_repair(schema: Type[T], content: str, repaired: str) -> T:
+    try:
+        result = parse_json(repaired, schema)
+    except ValueError as e:
+        _record(schema, "failed")
+        raise StructuredOutputError(schema, content, e) from e
+    _record(schema, "repaired")
+    return result
+
+
+def parse_structured(content: str, schema: Type[T]) -> T:
+    """Cevabı şemaya göre doğrula; uymazsa bir kez ucuz modelle onar"""
+    try:
+        result = parse_json(content, schema)
+    except ValueError as e:
+        logger.warning(f"{schema.__name__} output invalid, repairing: {e}")
+        evict_response(content)
+        request = _repair_request(schema, content, e)
+        if request is None:
+            _record(schema, "failed")
+            raise StructuredOutputError(schema, content, e) from e
+        llm, prompt = request
+        try:
+            repaired = llm.invoke(prompt).content
+        except Exception as repair_error:
+            _record(schema, "failed")
+            raise StructuredOutputError(schema, content, e) from repair_error
+        return _finish_repair(schema, content, repaired)
+    _record(schema, "ok")
+    return result
+
+
+async def aparse_structured(content: str, schema: Type[T]) -> T:
+    """parse_structured (async onarım çağrısı)"""
+    try:
+        result = parse_json(content, schema)
+    except ValueError as e:
+        logger.warning(f"{schema.__name__} output invalid, repairing: {e}")
+        await asyncio.to_thread(evict_response, content)
+        request = _repair_request(schema, content, e)
+        if request is None:
+            _record(schema, "failed")
+            raise StructuredOutputError(schema, content, e) from e
+        llm, prompt = request
+        try:
+            repaired = (await llm.ainvoke(prompt)).content
+        except Exception as repair_error:
+            _record(schema, "failed")
+            raise StructuredOutputError(schema, content, e) from repair_error
+        return _finish_repair(schema, content, repaired)
+    _record(schema, "ok")
+    return result
+
+
+def invoke_structured(llm, prompt, schema: Type[T]) -> T:
+    """llm.invoke + response_format + parse/validate/onarım"""
+    return parse_structured(with_response_format(llm, schema).invoke(prompt).content, schema)
+
+
+async def ainvoke_structured(llm, prompt, schema: Type[T]) -> T:
+    return await aparse_structured((await with_response_format(llm, schema).ainvoke(prompt)).content, schema)
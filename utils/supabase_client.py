@@ -1,15 +1,35 @@
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
 from config import get_settings
 from functools import lru_cache
+from typing import Optional
+from utils import metrics, tracing
+
+def _instrumented(client, is_async: bool = False):
+    """PostgREST isteklerine span (tracing açıksa) ve latency (metrics açıksa) hook'ları ekle"""
+    if tracing.tracing_enabled():
+        tracing.instrument_supabase(client, is_async=is_async)
+    if metrics.metrics_enabled():
+        metrics.instrument_supabase(client, is_async=is_async)
+    return client
 
 @lru_cache()
 def get_supabase() -> Client:
     """Normal Supabase client (anon key)"""
     settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_key)
+    return _instrumented(create_client(settings.supabase_url, settings.supabase_key))
 
 @lru_cache()
 def get_supabase_admin() -> Client:
     """Admin Supabase client (service key)"""
     settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_service_key)
+    return _instrumented(create_client(settings.supabase_url, settings.supabase_service_key))
+
+_async_admin: Optional[AsyncClient] = None
+
+async def get_supabase_admin_async() -> AsyncClient:
+    """Async admin Supabase client (service key) - process başına tek instance"""
+    global _async_admin
+    if _async_admin is None:
+        settings = get_settings()
+        _async_admin = _instrumented(await acreate_client(settings.supabase_url, settings.supabase_service_key), is_async=True)
+    return _async_admin
@@ -0,0 +1,155 @@
+"""
+Tiered Cache
+İki katmanlı, TTL'li key-value cache:
+- L1: process içi LRU (OrderedDict)
+- L2: SQLite dosyası (restart'lar ve worker'lar arası paylaşılır)
+
+Değerler str veya bytes'tır; serialize etmek çağıranın sorumluluğundadır
+(bkz. utils/llm_cache.py, utils/embeddings.py).
+
+SQLite erişimi bloklar: event loop'taki çağıranlar get_memory ile sadece L1'e
+bakar, L2 okuma/yazmalarını asyncio.to_thread ile yapar (persistent True ise).
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import sqlite3
+import threading
+import time
+
+class TieredCache:
+    """Memory LRU + opsiyonel SQLite, namespace bazlı hit/miss metrikleri ile"""
+
+    def __init__(self, sqlite_path: Optional[str] = None, memory_entries: int = 2048):
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[float, Union[str, bytes]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @property
+    def persistent(self) -> bool:
+        """L2 (SQLite) var mı, yani get/set disk I/O yapabilir mi"""
+        return self._db is not None
+
+    def _count(self, namespace: str, field: str):
+        stats = self._stats.setdefault(namespace, {"memory_hits": 0, "sqlite_hits": 0, "misses": 0, "writes": 0})
+        stats[field] += 1
+
+    def _remember(self, key: str, expires_at: float, value: Union[str, bytes]):
+        # self._lock altında çağrılır
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str, namespace: str = "default") -> Optional[Union[str, bytes]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._count(namespace, "memory_hits")
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._remember(key, expires_at, value)
+                        self._count(namespace, "sqlite_hits")
+                        return value
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+            self._count(namespace, "misses")
+            return None
+
+    def get_memory(self, key: str, namespace: str = "default") -> Optional[Union[str, bytes]]:
+        """Sadece L1 (event loop'ta güvenli). Miss sayılmaz: çağıran get ile devam eder."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or entry[0] <= now:
+                return None
+            self._memory.move_to_end(key)
+            self._count(namespace, "memory_hits")
+            return entry[1]
+
+    def set(self, key: str, value: Union[str, bytes], ttl_seconds: float, namespace: str = "default"):
+        expires_at = time.time() + ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+            self._count(namespace, "writes")
+
+    def set_many(self, items: List[Tuple[str, Union[str, bytes]]], ttl_seconds: float, namespace: str = "default"):
+        """Birden fazla kayıt, SQLite'a tek transaction'da"""
+        if not items:
+            return
+        expires_at = time.time() + ttl_seconds
+        with self._lock:
+            for key, value in items:
+                self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        [(key, value, expires_at) for key, value in items]
+                    )
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+            for _ in items:
+                self._count(namespace, "writes")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """Süresi dolmuş SQLite kayıtlarını sil"""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            return self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Namespace bazlı hit/miss sayıları ve hit rate"""
+        with self._lock:
+            result = {}
+            for namespace, counts in self._stats.items():
+                hits = counts["memory_hits"] + counts["sqlite_hits"]
+                lookups = hits + counts["misses"]
+                result[namespace] = {**counts, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+            return result
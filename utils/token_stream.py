@@ -0,0 +1,199 @@
+"""
+LLM token streaming (web platformu için SSE)
+
+Streaming endpoint'i bir TokenStream oluşturup context'e bağlar; turn'ün geri kalanı
+aynen çalışır. Agent'lar serbest metin üreten LLM çağrılarını stream_llm /
+astream_llm ile yapar: context'te stream yoksa normal invoke, varsa chunk'lar
+geldikçe stream'e yazılır ve sonunda birleşik mesaj döner (agent'ın parse ve
+session kaydı değişmez). Sync agent'lar thread'de çalıştığı için yazma
+loop.call_soon_threadsafe ile yapılır.
+
+JSON döndüren prompt'larda (ListingWriter) ham JSON yerine istenen string
+alanlarının içeriği stream edilir (JsonFieldStreamer).
+"""
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import json
+
+_stream: ContextVar[Optional["TokenStream"]] = ContextVar("token_stream", default=None)
+
+_DONE = object()
+
+
+class TokenStream:
+    """Event kuyruğu (event adı, data dict); farklı thread'lerden yazılabilir"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def push(self, event: str, data: Dict[str, Any]):
+        if self.closed:
+            return
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, _DONE)
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        while True:
+            item = await self.queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+
+def bind(stream: Optional[TokenStream]):
+    return _stream.set(stream)
+
+
+def reset(token):
+    _stream.reset(token)
+
+
+def active() -> Optional[TokenStream]:
+    return _stream.get()
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class JsonFieldStreamer:
+    """
+    Parça parça gelen JSON metninden seçili string alanların içeriğini çıkarır:
+    feed('{"title": "iPh') -> [("title", "iPh")], feed('one 13", "desc') -> [("title", "one 13")]
+    Escape'ler çözülür; yarım kalan escape bir sonraki parçaya bırakılır.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self.buffer = ""
+        self.pos = 0
+        self.current: Optional[str] = None  # içinde olunan alan
+        self.key: Optional[str] = None      # son okunan key (değeri bekleniyor)
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self.buffer += text
+        out: List[Tuple[str, str]] = []
+        while self.pos < len(self.buffer):
+            if self.current is not None:
+                if not self._read_value(out):
+                    break
+                continue
+            ch = self.buffer[self.pos]
+            if ch == '"':
+                end = self._string_end(self.pos + 1)
+                if end is None:
+                    break
+                literal = self.buffer[self.pos:end + 1]
+                self.pos = end + 1
+                if self.key is None:
+                    self.key = json.loads(literal)
+                else:
+                    self.key = None  # stream edilmeyen alanın değeri
+            elif ch == ":" and self.key is not None:
+                rest = self.buffer[self.pos + 1:].lstrip()
+                if not rest:
+                    break
+                self.pos = len(self.buffer) - len(rest)
+                if rest[0] == '"' and self.key in self.fields:
+                    self.current, self.key = self.key, None
+                    self.pos += 1
+                elif rest[0] != '"':
+                    self.key = None
+            else:
+                if ch in ",{}[":
+                    self.key = None
+                self.pos += 1
+        return out
+
+    def _read_value(self, out: List[Tuple[str, str]]) -> bool:
+        """Alan değerini okuyabildiği kadar out'a ekler; yarım escape'te False"""
+        chars = []
+        complete = True
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            if ch == '"':
+                self.pos += 1
+                if chars:
+                    out.append((self.current, "".join(chars)))
+                self.current = None
+                return True
+            if ch == "\\":
+                if self.pos + 1 >= len(self.buffer):
+                    complete = False
+                    break
+                code = self.buffer[self.pos + 1]
+                if code == "u":
+                    if self.pos + 6 > len(self.buffer):
+                        complete = False
+                        break
+                    chars.append(chr(int(self.buffer[self.pos + 2:self.pos + 6], 16)))
+                    self.pos += 6
+                else:
+                    chars.append(self._ESCAPES.get(code, code))
+                    self.pos += 2
+                continue
+            chars.append(ch)
+            self.pos += 1
+        if chars:
+            out.append((self.current, "".join(chars)))
+        return complete and self.pos < len(self.buffer)
+
+    def _string_end(self, start: int) -> Optional[int]:
+        i = start
+        while i < len(self.buffer):
+            if self.buffer[i] == "\\":
+                i += 2
+                continue
+            if self.buffer[i] == '"':
+                return i
+            i += 1
+        return None
+
+
+class _Forwarder:
+    def __init__(self, stream: TokenStream, source: str, json_fields: Optional[Iterable[str]]):
+        self.stream = stream
+        self.source = source
+        self.parser = JsonFieldStreamer(json_fields) if json_fields else None
+        self.message = None
+
+    def add(self, chunk):
+        self.message = chunk if self.message is None else self.message + chunk
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        if not text:
+            return
+        if self.parser is None:
+            self.stream.push("token", {"source": self.source, "text": text})
+            return
+        for field, value in self.parser.feed(text):
+            self.stream.push("token", {"source": self.source, "field": field, "text": value})
+
+
+def stream_llm(llm, prompt, source: str, json_fields: Optional[Iterable[str]] = None):
+    """Context'te TokenStream varsa chunk'ları ileterek, yoksa normal invoke ile çağır"""
+    stream = active()
+    if stream is None:
+        return llm.invoke(prompt)
+    forwarder = _Forwarder(stream, source, json_fields)
+    for chunk in llm.stream(prompt, stream_usage=True):
+        forwarder.add(chunk)
+    return forwarder.message if forwarder.message is not None else llm.invoke(prompt)
+
+
+async def astream_llm(llm, prompt, source: str, json_fields: Optional[Iterable[str]] = None):
+    stream = active()
+    if stream is None:
+        return await llm.ainvoke(prompt)
+    forwarder = _Forwarder(stream, source, json_fields)
+    async for chunk in llm.astream(prompt, stream_usage=True):
+        forwarder.add(chunk)
+    return forwarder.message if forwarder.message is not None else await llm.ainvoke(prompt)
@@ -0,0 +1,370 @@
+"""
+Request bazlı span tracing (OpenTelemetry uyumlu)
+
+Her HTTP isteği bir request id alır (X-Request-ID header'ı ya da uuid4); bu id
+trace_id olarak kullanılır ve contextvar ile workflow node'larına, LLM
+çağrılarına ve Supabase isteklerine taşınır (asyncio.to_thread ve LangGraph
+executor'ları context'i kopyalar).
+
+Exporter'lar (TRACING_EXPORTER):
+- none:    span üretilmez (varsayılan, overhead yok)
+- console: her span tek satır JSON olarak loglanır
+- file:    JSONL olarak TRACING_FILE_PATH'e yazılır
+- otel:    opentelemetry-api kuruluysa global tracer'a aktarılır (SDK/exporter
+           konfigürasyonu uygulamanın sorumluluğunda)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from utils.logger import setup_logger
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+logger = setup_logger("tracing")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """Tek bir zamanlanmış işlem (OTel span'ının sade karşılığı)"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set_attributes(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def set_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)[:500]
+
+    def end(self):
+        """Span'ı kapat ve export et (ikinci çağrı etkisizdir)"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        exporter = get_exporter()
+        if exporter is not None:
+            try:
+                exporter.export(self)
+            except Exception as e:
+                logger.warning(f"Span export failed: {str(e)}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class ConsoleExporter:
+    def export(self, span: Span):
+        logger.info(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+
+class FileExporter:
+    """
+    Span'ları JSONL dosyasına ekler (worker'lar arası satır bazında append).
+    export sadece kuyruğa koyar (event loop'ta biten span'lar disk I/O beklemez);
+    dosyayı açık tutan arka plan thread'i biriken satırları tek seferde yazar.
+    Kuyruk doluysa span atılır (dropped).
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-file-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    f.write("".join(json.dumps(item, ensure_ascii=False, default=str) + "\n" for item in batch))
+                    f.flush()
+                except Exception as e:
+                    logger.warning(f"Trace file write failed ({len(batch)} spans): {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def flush(self):
+        """Kuyruktaki span'lar dosyaya yazılana kadar bekle (shutdown/test)"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+
+class OTelExporter:
+    """Biten span'ı opentelemetry tracer'ına aynı zaman damgalarıyla aktarır"""
+
+    def __init__(self):
+        from opentelemetry import trace
+        self._tracer = trace.get_tracer("megapazar")
+
+    def export(self, span: Span):
+        attributes = {
+            "megapazar.request_id": span.trace_id,
+            "megapazar.span_id": span.span_id,
+            "megapazar.parent_id": span.parent_id or "",
+        }
+        for key, value in span.attributes.items():
+            attributes[key] = value if isinstance(value, (str, bool, int, float)) else str(value)
+        otel_span = self._tracer.start_span(span.name, start_time=span.start_ns, attributes=attributes)
+        if span.status == "ERROR":
+            from opentelemetry.trace import Status, StatusCode
+            otel_span.set_status(Status(StatusCode.ERROR, span.attributes.get("error.message")))
+        otel_span.end(end_time=span.end_ns)
+
+
+@lru_cache()
+def get_exporter():
+    """TRACING_EXPORTER ayarına göre exporter (none -> None)"""
+    from config import get_settings
+    settings = get_settings()
+    kind = (settings.tracing_exporter or "none").lower()
+    if kind == "console":
+        return ConsoleExporter()
+    if kind == "file":
+        return FileExporter(settings.tracing_file_path)
+    if kind == "otel":
+        try:
+            return OTelExporter()
+        except ImportError:
+            logger.warning("opentelemetry not installed, tracing disabled")
+            return None
+    return None
+
+
+def tracing_enabled() -> bool:
+    return get_exporter() is not None
+
+
+# ---------------------------------------------------------------------------
+# Request id
+# ---------------------------------------------------------------------------
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str]):
+    """Request id'yi context'e yaz; reset için token döner"""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Span API
+# ---------------------------------------------------------------------------
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """
+    Leaf span başlat (current span değişmez). Callback/hook gibi with bloğu
+    kullanılamayan yerler için; kapatmak çağıranın sorumluluğunda (span.end()).
+    Tracing kapalıysa None döner.
+    """
+    if not tracing_enabled():
+        return None
+    parent = _current_span.get()
+    trace_id = parent.trace_id if parent else (_request_id.get() or new_request_id())
+    span = Span(name, trace_id, parent.span_id if parent else None)
+    span.set_attributes(**attributes)
+    return span
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    with span("node.pricing"): ... -> blok içindeki span'lar bunun child'ı olur.
+    Exception span'a ERROR olarak işlenir ve tekrar fırlatılır.
+    """
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def set_attributes(**attributes):
+    """Aktif span'a attribute ekle (span yoksa etkisiz)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attributes(**attributes)
+
+
+# ---------------------------------------------------------------------------
+# LLM çağrıları (LangChain callback)
+# ---------------------------------------------------------------------------
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # pragma: no cover
+    BaseCallbackHandler = object
+
+
+class LLMTracingHandler(BaseCallbackHandler):
+    """
+    Her chat model çağrısı için "llm.<model>" span'ı: model, prompt/completion
+    token sayıları, gecikme. run_inline: async çağrılarda da caller'ın context'i
+    (request id, parent span) kullanılsın diye.
+    """
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[Any, Span] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        model = params.get("model") or params.get("model_name") or metadata.get("ls_model_name") or "unknown"
+        current = start_span(f"llm.{model}", **{"llm.model": model, "llm.temperature": params.get("temperature")})
+        if current is not None:
+            self._spans[run_id] = current
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        current = self._spans.pop(run_id, None)
+        if current is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if not usage:
+            # Cache'ten dönen ya da llm_output taşımayan cevaplar: usage_metadata
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    usage = {
+                        "prompt_tokens": metadata.get("input_tokens"),
+                        "completion_tokens": metadata.get("output_tokens"),
+                    }
+        current.set_attributes(**{
+            "llm.prompt_tokens": usage.get("prompt_tokens"),
+            "llm.completion_tokens": usage.get("completion_tokens"),
+            "llm.response_model": (response.llm_output or {}).get("model_name"),
+        })
+        current.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        current = self._spans.pop(run_id, None)
+        if current is not None:
+            current.set_error(error)
+            current.end()
+
+
+@lru_cache()
+def get_llm_tracing_handler() -> LLMTracingHandler:
+    return LLMTracingHandler()
+
+
+# ---------------------------------------------------------------------------
+# Supabase (PostgREST httpx session event hook'ları)
+# ---------------------------------------------------------------------------
+
+def _supabase_span_name(request) -> tuple:
+    """/rest/v1/rpc/search_listings -> ("supabase.rpc", "search_listings")"""
+    parts = [p for p in request.url.path.split("/") if p]
+    if "rpc" in parts and parts.index("rpc") + 1 < len(parts):
+        return "supabase.rpc", parts[parts.index("rpc") + 1]
+    return f"supabase.{request.method.lower()}", parts[-1] if parts else ""
+
+
+def _on_request(request):
+    kind, target = _supabase_span_name(request)
+    current = start_span(f"{kind} {target}", **{"db.system": "postgrest", "db.operation": target,
+                                                 "http.method": request.method})
+    if current is not None:
+        request.extensions["trace_span"] = current
+
+
+def _on_response(response):
+    current = response.request.extensions.get("trace_span")
+    if current is None:
+        return
+    current.set_attributes(**{"http.status_code": response.status_code})
+    if response.status_code >= 400:
+        current.status = "ERROR"
+    current.end()
+
+
+async def _aon_request(request):
+    _on_request(request)
+
+
+async def _aon_response(response):
+    _on_response(response)
+
+
+def instrument_supabase(client, is_async: bool = False):
+    """
+    Client'ın PostgREST session'ına span hook'larını ekle (idempotent).
+    Bağlantı hatasında response hook çalışmaz; o span export edilmez.
+    """
+    session = client.postgrest.session
+    if getattr(session, "_megapazar_traced", False):
+        return client
+    hooks = session.event_hooks
+    hooks["request"].append(_aon_request if is_async else _on_request)
+    hooks["response"].append(_aon_response if is_async else _on_response)
+    session.event_hooks = hooks
+    session._megapazar_traced = True
+    return client
@@ -0,0 +1,233 @@
+"""
+Vector Index
+product_embeddings için process içi ANN index (NumPy IVF).
+
+- Küçük koleksiyonlarda (< ivf_min_size) brute-force cosine (zaten sub-ms)
+- Büyüklerde IVF: spherical k-means ile sqrt(N) küme, sorguda en yakın nprobe küme taranır
+- Yeni/güncellenen vektörler bir buffer'a eklenir (brute-force aranır), buffer
+  büyüyünce index yeniden kurulur; silinenler tombstone ile elenir
+- Index "cold" iken (henüz yüklenmemiş) search None döner -> çağıran match_products RPC'ye düşer
+
+Sonuçlar match_products RPC ile aynı formattadır: [{"listing_id": ..., "similarity": ...}]
+Bellek: N x boyut x 4 byte (text-embedding-3-small: 1536 boyut -> 10k ilan ≈ 60MB)
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy opsiyonel
+    np = None
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _parse_embedding(value: Any) -> List[float]:
+    """PostgREST pgvector'ü "[0.1,0.2,...]" string'i olarak döndürür"""
+    return json.loads(value) if isinstance(value, str) else value
+
+class VectorIndex:
+    """NumPy tabanlı IVF / brute-force cosine index"""
+
+    def __init__(
+        self,
+        ivf_min_size: int = 5000,
+        nprobe: int = 8,
+        kmeans_iterations: int = 8,
+        rebuild_threshold: int = 1000
+    ):
+        if np is None:
+            raise RuntimeError("VectorIndex requires numpy")
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.rebuild_threshold = rebuild_threshold
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._matrix = None  # (N, D) float32, normalize edilmiş
+        self._centroids = None
+        self._lists: List[Any] = []
+        self._buffer: Dict[str, Any] = {}  # son eklenen/güncellenenler
+        self._deleted = set()
+        self.ready = False
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            base = sum(1 for i in self._ids if i not in self._deleted and i not in self._buffer)
+            return base + len(self._buffer)
+
+    def build(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Index'i baştan kur (mevcut veriyi değiştirir)"""
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32)) if len(ids) else None
+        centroids, lists = self._train(matrix) if matrix is not None else (None, [])
+        with self._lock:
+            self._ids = list(ids)
+            self._matrix = matrix
+            self._centroids = centroids
+            self._lists = lists
+            self._buffer = {}
+            self._deleted = set()
+            self.ready = True
+            self.loaded_at = time.time()
+
+    def _train(self, matrix):
+        """Spherical k-means (IVF kümeleri). Küçük koleksiyonda IVF kurulmaz."""
+        n = len(matrix)
+        if n < self.ivf_min_size:
+            return None, []
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = matrix[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assign = np.argmax(matrix @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, matrix)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        assign = np.argmax(matrix @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        lists = [order[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+        return centroids, lists
+
+    def upsert(self, listing_id: str, vector: Sequence[float]):
+        """Yeni/güncellenen ilan vektörü (buffer'a eklenir, eski satır gölgelenir)"""
+        normalized = _normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            self._buffer[listing_id] = normalized
+            self._deleted.discard(listing_id)
+            needs_rebuild = len(self._buffer) >= self.rebuild_threshold
+        if needs_rebuild:
+            self.compact()
+
+    def remove(self, listing_id: str):
+        with self._lock:
+            self._buffer.pop(listing_id, None)
+            self._deleted.add(listing_id)
+            needs_rebuild = len(self._deleted) >= self.rebuild_threshold
+        if needs_rebuild:
+            self.compact()
+
+    def compact(self):
+        """Buffer ve tombstone'ları ana matrise işle, IVF'i yeniden kur"""
+        with self._lock:
+            ids, rows = [], []
+            for i, listing_id in enumerate(self._ids):
+                if listing_id not in self._deleted and listing_id not in self._buffer:
+                    ids.append(listing_id)
+                    rows.append(self._matrix[i])
+            for listing_id, vector in self._buffer.items():
+                ids.append(listing_id)
+                rows.append(vector)
+        self.build(ids, rows)
+
+    def search(self, query: Sequence[float], k: int = 50, threshold: float = 0.0) -> Optional[List[Dict[str, Any]]]:
+        """
+        En benzer k ilan (similarity > threshold, azalan sırada).
+        Index cold ise None (çağıran RPC'ye düşmeli).
+        """
+        if not self.ready:
+            return None
+        q = _normalize(np.asarray(query, dtype=np.float32))
+
+        with self._lock:
+            ids, matrix, centroids, lists = self._ids, self._matrix, self._centroids, self._lists
+            buffer_ids = list(self._buffer)
+            buffer_matrix = np.stack([self._buffer[i] for i in buffer_ids]) if buffer_ids else None
+            hidden = self._deleted | set(buffer_ids)
+
+        candidate_ids: List[str] = []
+        candidate_scores = []
+        if matrix is not None:
+            if centroids is not None:
+                nprobe = min(self.nprobe, len(centroids))
+                probe = np.argpartition(-(centroids @ q), nprobe - 1)[:nprobe]
+                rows = np.concatenate([lists[c] for c in probe])
+            else:
+                rows = np.arange(len(ids))
+            scores = matrix[rows] @ q
+            keep = scores > threshold
+            rows, scores = rows[keep], scores[keep]
+            if len(rows) > k + len(hidden):
+                top = np.argpartition(-scores, k + len(hidden) - 1)[:k + len(hidden)]
+                rows, scores = rows[top], scores[top]
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                if ids[row] not in hidden:
+                    candidate_ids.append(ids[row])
+                    candidate_scores.append(score)
+
+        if buffer_matrix is not None:
+            for listing_id, score in zip(buffer_ids, (buffer_matrix @ q).tolist()):
+                if score > threshold:
+                    candidate_ids.append(listing_id)
+                    candidate_scores.append(score)
+
+        ranked = sorted(zip(candidate_ids, candidate_scores), key=lambda item: item[1], reverse=True)[:k]
+        return [{"listing_id": listing_id, "similarity": float(score)} for listing_id, score in ranked]
+
+    def load_from_supabase(self, supabase, page_size: int = 1000):
+        """product_embeddings tablosunun tamamını sayfalayarak yükle"""
+        ids, vectors = [], []
+        start = 0
+        while True:
+            page = supabase.table('product_embeddings')\
+                .select('listing_id, embedding')\
+                .range(start, start + page_size - 1)\
+                .execute()
+            rows = page.data or []
+            for row in rows:
+                if row.get('listing_id') and row.get('embedding') is not None:
+                    ids.append(row['listing_id'])
+                    vectors.append(_parse_embedding(row['embedding']))
+            if len(rows) < page_size:
+                break
+            start += page_size
+        self.build(ids, vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "size": len(self),
+                "ivf": self._centroids is not None,
+                "clusters": len(self._lists),
+                "buffered": len(self._buffer),
+                "deleted": len(self._deleted),
+                "loaded_at": self.loaded_at,
+            }
+
+@lru_cache()
+def get_vector_index() -> Optional[VectorIndex]:
+    """Config'te açıksa (ve numpy kuruluysa) process genelinde tek index"""
+    from config import get_settings
+    settings = get_settings()
+    if not settings.vector_index_enabled or np is None:
+        return None
+    return VectorIndex(nprobe=settings.vector_index_nprobe)
+
+def local_vector_search(embedding: Sequence[float], k: int, threshold: float) -> Optional[List[Dict[str, Any]]]:
+    """Index açık ve hazırsa yerel sonuç, değilse None (RPC fallback)"""
+    index = get_vector_index()
+    if index is None:
+        return None
+    results = index.search(embedding, k=k, threshold=threshold)
+    if results is None:
+        from utils.metrics import record_fallback
+        record_fallback("vector_index", "cold")
+    return results
+
+def refresh_vector_index():
+    """Index'i Supabase'den yeniden yükle (startup + periyodik; diğer replica'ların eklediklerini yakalar)"""
+    index = get_vector_index()
+    if index is None:
+        return
+    from utils.supabase_client import get_supabase_admin
+    index.load_from_supabase(get_supabase_admin())
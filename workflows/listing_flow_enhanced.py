@@ -3,9 +3,58 @@ Enhanced Listing Workflow
 Multi-turn conversation, müzakere, düzenleme destekli workflow
 """
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, TypedDict
+from langchain_core.runnables import RunnableLambda
+from typing import Annotated, Dict, Any, TypedDict
 from models.conversation_state import ConversationStage, UserIntent, session_manager
+from utils.logger import setup_logger
+from utils.tracing import span
+from utils.metrics import record_fallback
+from utils.structured_output import invoke_structured, ainvoke_structured
+from models.schemas import CriticalFieldsCheck
+import asyncio
 import json
+import time
+
+timing_logger = setup_logger("workflow_timing")
+
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """Paralel node'lar aynı step'te node_timings yazabilsin diye reducer"""
+    return {**(left or {}), **(right or {})}
+
+def timed_node(name: str, func, afunc):
+    """
+    Node'u süre ölçümüyle sar: log + state["node_timings"][name] (ms).
+    Node tam state ya da kısmi update döndürebilir.
+    """
+    def record(result: Dict[str, Any], started: float) -> Dict[str, Any]:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        timing_logger.info(f"⏱️ {name}: {elapsed_ms} ms")
+        result["node_timings"] = {name: elapsed_ms}
+        return result
+    
+    run, arun = traced(f"node.{name}", func, afunc)
+    
+    def timed_run(state):
+        started = time.perf_counter()
+        return record(run(state), started)
+    
+    async def atimed_run(state):
+        started = time.perf_counter()
+        return record(await arun(state), started)
+    
+    return RunnableLambda(timed_run, afunc=atimed_run, name=name)
+
+def traced(span_name: str, func, afunc):
+    """func/afunc'u span içinde çalıştıran (run, arun) çifti - node içindeki LLM/Supabase span'ları bunun child'ı olur"""
+    def run(state):
+        with span(span_name, **{"workflow.user_id": state.get("user_id")}):
+            return func(state)
+    
+    async def arun(state):
+        with span(span_name, **{"workflow.user_id": state.get("user_id")}):
+            return await afunc(state)
+    
+    return run, arun
 
 # State tanımı
 class EnhancedWorkflowState(TypedDict):
@@ -36,10 +85,18 @@ class EnhancedWorkflowState(TypedDict):
     edit_field: str    # Düzenlenecek alan
     edit_value: str    # Düzenleme değeri (direkt değer varsa, örn: "3500")
     edit_description: str  # Düzenleme açıklaması
+    
+    # Node süreleri (ms) - paralel node'lar için reducer ile birleştirilir
+    node_timings: Annotated[Dict[str, float], merge_timings]
 
-def create_enhanced_listing_workflow():
+def create_enhanced_listing_workflow(parallel_analysis: bool = True):
     """
     Enhanced workflow with multi-turn conversation
+    
+    parallel_analysis=True: product_match (Supabase vector search) ve
+    market_search (Tavily + LLM) birbirinden bağımsız olduğu için aynı
+    step'te paralel çalışır ve pricing'de birleşir. False: eski sıralı akış
+    (bench_listing_workflow.py karşılaştırması için).
     """
     from agents.conversation_enhanced import EnhancedConversationAgent
     from agents.text_parser import TextParserAgent
@@ -48,19 +105,25 @@ def create_enhanced_listing_workflow():
     from agents.pricing import PricingAgent
     from agents.listing_writer import ListingWriterAgent
     
-    # Agents
-    conversation_agent = EnhancedConversationAgent()
-    text_parser = TextParserAgent()
-    product_match = ProductMatchAgent()
-    market_search = MarketSearchAgent()
-    pricing_agent = PricingAgent()
-    listing_writer = ListingWriterAgent()
+    from agents.registry import get_agent_registry
+    
+    # Agents (registry'den paylaşılan instance'lar)
+    registry = get_agent_registry()
+    conversation_agent = registry.get(EnhancedConversationAgent)
+    text_parser = registry.get(TextParserAgent)
+    product_match = registry.get(ProductMatchAgent)
+    market_search = registry.get(MarketSearchAgent)
+    pricing_agent = registry.get(PricingAgent)
+    listing_writer = registry.get(ListingWriterAgent)
     
     # Nodes
     def conversation_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         """Conversation management"""
         return conversation_agent(state)
     
+    async def aconversation_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+        return await conversation_agent.acall(state)
+    
     def check_response_type(state: EnhancedWorkflowState) -> str:
         """Response type'a göre routing"""
         response_type = state.get("response_type", "conversation")
@@ -82,10 +145,14 @@ def create_enhanced_listing_workflow():
     
     def text_parser_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         """Text parsing"""
-        result = text_parser(state)
-        
+        return _after_text_parser(text_parser(state))
+    
+    async def atext_parser_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+        return _after_text_parser(await text_parser.acall(state))
+    
+    def _after_text_parser(result: EnhancedWorkflowState) -> EnhancedWorkflowState:
         # Session'ı güncelle
-        session = session_manager.get_session(state["user_id"])
+        session = session_manager.get_session(result["user_id"])
         if session:
             session.update_product_info(result.get("product_info", {}))
             session.set_stage(ConversationStage.ANALYZING)
@@ -95,7 +162,44 @@ def create_enhanced_listing_workflow():
     
     def check_product_info(state: EnhancedWorkflowState) -> str:
         """Ürün bilgisi yeterli mi kontrol et - RECURSION GUARD"""
-        from utils.openai_client import get_llm
+        route = _check_required_fields(state)
+        if route:
+            return route
+        
+        # LLM ile dinamik eksik alan tespiti
+        from utils.model_policy import tiered_llm
+        llm = tiered_llm("product_check", temperature=0, cache_namespace="product_check")
+        
+        try:
+            return _apply_critical_fields(state, invoke_structured(llm, _build_critical_fields_prompt(state), CriticalFieldsCheck))
+        except Exception as e:
+            # LLM hatası - güvenli tarafta kal, devam et
+            from utils.logger import setup_logger
+            logger = setup_logger("check_product_info")
+            logger.error(f"Dynamic check failed: {e}, continuing...")
+            record_fallback("check_product_info", "llm_failed")
+            return "product_match"
+    
+    async def acheck_product_info(state: EnhancedWorkflowState) -> str:
+        route = _check_required_fields(state)
+        if route:
+            return route
+        
+        from utils.model_policy import tiered_llm
+        llm = tiered_llm("product_check", temperature=0, cache_namespace="product_check")
+        
+        try:
+            result = await ainvoke_structured(llm, _build_critical_fields_prompt(state), CriticalFieldsCheck)
+            return _apply_critical_fields(state, result)
+        except Exception as e:
+            from utils.logger import setup_logger
+            logger = setup_logger("check_product_info")
+            logger.error(f"Dynamic check failed: {e}, continuing...")
+            record_fallback("check_product_info", "llm_failed")
+            return "product_match"
+    
+    def _check_required_fields(state: EnhancedWorkflowState):
+        """Minimum alan kontrolü - LLM gerekmiyorsa route döndürür, gerekiyorsa None"""
         from utils.logger import setup_logger
         
         logger = setup_logger("check_product_info")
@@ -132,10 +236,14 @@ def create_enhanced_listing_workflow():
             state["ai_response"] = f"Birkaç detay daha öğrenebilir miyim?"
             return "conversation"
         
-        # LLM ile dinamik eksik alan tespiti
-        llm = get_llm(model="gpt-4o", temperature=0.3)
+        return None
+    
+    def _build_critical_fields_prompt(state: EnhancedWorkflowState) -> str:
+        product_info = state.get("product_info", {})
+        product_type = product_info.get("product_type", "")
+        category = product_info.get("category", "")
         
-        prompt = f"""Bir kullanıcı "{product_type}" kategorisinde "{category}" ürünü satmak istiyor.
+        return f"""Bir kullanıcı "{product_type}" kategorisinde "{category}" ürünü satmak istiyor.
 
 Mevcut bilgiler:
 {json.dumps(product_info, ensure_ascii=False, indent=2)}
@@ -156,48 +264,47 @@ JSON döndür:
 - Endüstriyel rotor: ürün tipi belli (yeterli)
 
 SADECE gerçekten kritik olanları belirt! Opsiyonel bilgileri ekleme."""
-
-        try:
-            response = llm.invoke(prompt)
-            content = response.content.strip()
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            result = json.loads(content)
-            critical_missing = result.get("critical_missing", [])
-            
-            if critical_missing:
-                # Kritik bilgi eksik
-                session = session_manager.get_session(state["user_id"])
-                if session:
-                    session.set_missing_fields(critical_missing)
-                    session.set_stage(ConversationStage.GATHERING_INFO)
-                    session_manager.update_session(session)
-                
-                state["response_type"] = "gathering_info"
-                
-                # İlk soruyu oluştur
-                first_field = critical_missing[0]
-                state["ai_response"] = f"{first_field} nedir?"
-                return "conversation"
+    
+    def _apply_critical_fields(state: EnhancedWorkflowState, result: CriticalFieldsCheck) -> str:
+        critical_missing = result.critical_missing
+        
+        if critical_missing:
+            # Kritik bilgi eksik
+            session = session_manager.get_session(state["user_id"])
+            if session:
+                session.set_missing_fields(critical_missing)
+                session.set_stage(ConversationStage.GATHERING_INFO)
+                session_manager.update_session(session)
             
-            # Bilgi yeterli, devam et
-            return "product_match"
+            state["response_type"] = "gathering_info"
             
-        except Exception as e:
-            # LLM hatası - güvenli tarafta kal, devam et
-            from utils.logger import setup_logger
-            logger = setup_logger("check_product_info")
-            logger.error(f"Dynamic check failed: {e}, continuing...")
-            return "product_match"
+            # İlk soruyu oluştur
+            first_field = critical_missing[0]
+            state["ai_response"] = f"{first_field} nedir?"
+            return "conversation"
+        
+        # Bilgi yeterli, devam et
+        return "product_match"
     
-    def product_match_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+    # Paralel branch'ler aynı step'te çalıştığından sadece kendi alanlarını döndürür
+    # (aynı key'e iki branch'ten yazmak LangGraph'ta InvalidUpdateError verir)
+    def product_match_node(state: EnhancedWorkflowState) -> Dict[str, Any]:
         """Product matching"""
-        return product_match(state)
+        result = product_match(dict(state))
+        return {"internal_stats": result.get("internal_stats", {})}
     
-    def market_search_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+    async def aproduct_match_node(state: EnhancedWorkflowState) -> Dict[str, Any]:
+        result = await product_match.acall(dict(state))
+        return {"internal_stats": result.get("internal_stats", {})}
+    
+    def market_search_node(state: EnhancedWorkflowState) -> Dict[str, Any]:
         """Market search"""
-        return market_search(state)
+        result = market_search(dict(state))
+        return {"external_stats": result.get("external_stats", {})}
+    
+    async def amarket_search_node(state: EnhancedWorkflowState) -> Dict[str, Any]:
+        result = await market_search.acall(dict(state))
+        return {"external_stats": result.get("external_stats", {})}
     
     def pricing_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         """Pricing calculation"""
@@ -208,8 +315,17 @@ SADECE gerçekten kritik olanları belirt! Opsiyonel bilgileri ekleme."""
             return state
         
         # İlk kez hesaplama yapılacak
-        result = pricing_agent(state)
+        return _after_pricing(session, pricing_agent(state))
+    
+    async def apricing_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+        session = session_manager.get_session(state["user_id"])
+        if session and session.pricing:
+            state["pricing"] = session.pricing
+            return state
         
+        return _after_pricing(session, await pricing_agent.acall(state))
+    
+    def _after_pricing(session, result: EnhancedWorkflowState) -> EnhancedWorkflowState:
         # Session'a kaydet (bir daha hesaplamayacak)
         if session:
             session.pricing = result.get("pricing")
@@ -234,10 +350,14 @@ SADECE gerçekten kritik olanları belirt! Opsiyonel bilgileri ekleme."""
     
     def listing_writer_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         """Listing writing"""
-        result = listing_writer(state)
-        
+        return _after_listing_writer(listing_writer(state))
+    
+    async def alisting_writer_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+        return _after_listing_writer(await listing_writer.acall(state))
+    
+    def _after_listing_writer(result: EnhancedWorkflowState) -> EnhancedWorkflowState:
         # Session'ı güncelle
-        session = session_manager.get_session(state["user_id"])
+        session = session_manager.get_session(result["user_id"])
         if session:
             session.update_listing_draft(result.get("listing_draft", {}))
             session.set_stage(ConversationStage.PREVIEW)
@@ -266,6 +386,13 @@ Değişiklik yapmak için "Düzenle" yazın.
     
     def reprice_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         """Fiyatı değiştir ve tekrar listing yaz"""
+        # Direkt listing writer çağır
+        return listing_writer_node(_prepare_reprice(state))
+    
+    async def areprice_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+        return await alisting_writer_node(_prepare_reprice(state))
+    
+    def _prepare_reprice(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         user_price = state.get("user_price")
         
         if user_price:
@@ -283,12 +410,11 @@ Değişiklik yapmak için "Düzenle" yazın.
             if session and session.external_stats:
                 state["external_stats"] = session.external_stats
         
-        # Direkt listing writer çağır
-        return listing_writer_node(state)
+        return state
     
     def edit_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
         """Alan düzenle"""
-        from utils.openai_client import get_llm
+        from utils.model_policy import tiered_llm
         
         edit_field = state.get("edit_field")
         edit_value = state.get("edit_value")
@@ -321,7 +447,7 @@ Değişiklik yapmak için "Düzenle" yazın.
         
         # LLM ile field düzenle (title, description, category)
         elif edit_field in ["title", "description", "category"]:
-            llm = get_llm(model="gpt-4o", temperature=0.7)
+            llm = tiered_llm("listing_edit", temperature=0.7)
             
             field_names = {
                 "title": "başlık",
@@ -380,18 +506,25 @@ Başka değişiklik için "Düzenle" yazın."""
         
         return state
     
+    async def aedit_node(state: EnhancedWorkflowState) -> EnhancedWorkflowState:
+        # Nadir kullanılan yol - sync implementasyon thread'de çalışır
+        return await asyncio.to_thread(edit_node, state)
+    
+    # Router'daki dinamik alan kontrolü de LLM çağırabildiği için span alır
+    check_product_info, acheck_product_info = traced("router.check_product_info", check_product_info, acheck_product_info)
+    
     # Graph oluştur
     workflow = StateGraph(EnhancedWorkflowState)
     
-    # Nodes ekle
-    workflow.add_node("conversation", conversation_node)
-    workflow.add_node("text_parser", text_parser_node)
-    workflow.add_node("product_match", product_match_node)
-    workflow.add_node("market_search", market_search_node)
-    workflow.add_node("pricing", pricing_node)
-    workflow.add_node("listing_writer", listing_writer_node)
-    workflow.add_node("reprice", reprice_node)
-    workflow.add_node("edit", edit_node)
+    # Nodes ekle (sync: invoke, async: ainvoke) - hepsi süre ölçümlü
+    workflow.add_node("conversation", timed_node("conversation", conversation_node, aconversation_node))
+    workflow.add_node("text_parser", timed_node("text_parser", text_parser_node, atext_parser_node))
+    workflow.add_node("product_match", timed_node("product_match", product_match_node, aproduct_match_node))
+    workflow.add_node("market_search", timed_node("market_search", market_search_node, amarket_search_node))
+    workflow.add_node("pricing", timed_node("pricing", pricing_node, apricing_node))
+    workflow.add_node("listing_writer", timed_node("listing_writer", listing_writer_node, alisting_writer_node))
+    workflow.add_node("reprice", timed_node("reprice", reprice_node, areprice_node))
+    workflow.add_node("edit", timed_node("edit", edit_node, aedit_node))
     
     # Entry point
     workflow.set_entry_point("conversation")
@@ -408,17 +541,37 @@ Başka değişiklik için "Düzenle" yazın."""
         }
     )
     
-    workflow.add_conditional_edges(
-        "text_parser",
-        check_product_info,
-        {
-            "product_match": "product_match",
-            "conversation": "conversation"
-        }
-    )
-    
-    workflow.add_edge("product_match", "market_search")
-    workflow.add_edge("market_search", "pricing")
+    if parallel_analysis:
+        # Fan-out: "product_match" kararı iki branch'i birlikte başlatır
+        def fan_out(route: str):
+            return ["product_match", "market_search"] if route == "product_match" else route
+        
+        def route_product_info(state: EnhancedWorkflowState):
+            return fan_out(check_product_info(state))
+        
+        async def aroute_product_info(state: EnhancedWorkflowState):
+            return fan_out(await acheck_product_info(state))
+        
+        workflow.add_conditional_edges(
+            "text_parser",
+            RunnableLambda(route_product_info, afunc=aroute_product_info),
+            ["product_match", "market_search", "conversation"]
+        )
+        
+        # Join: pricing her iki branch bitince bir kez çalışır
+        workflow.add_edge(["product_match", "market_search"], "pricing")
+    else:
+        workflow.add_conditional_edges(
+            "text_parser",
+            RunnableLambda(check_product_info, afunc=acheck_product_info),
+            {
+                "product_match": "product_match",
+                "conversation": "conversation"
+            }
+        )
+        
+        workflow.add_edge("product_match", "market_search")
+        workflow.add_edge("market_search", "pricing")
     
     workflow.add_conditional_edges(
         "pricing",